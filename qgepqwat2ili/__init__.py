@@ -1,22 +1,34 @@
 import argparse
+import hashlib
+import os
 import sys
 from logging import INFO, FileHandler, Formatter
 
 from . import config, utils
 from .qgep.export import qgep_export_kek
 from .qgep.import_ import qgep_import_kek
+from .qgep.mapping import get_import_classes as get_kek_import_classes
 from .qgep.mapping import get_qgep_mapping
 from .qgep.model_abwasser import Base as BaseAbwasser
 from .qgep.model_qgep import Base as BaseQgep
 from .qgepdss.export import qgep_export_dss
 from .qgepdss.import_ import qgep_import_dss
+from .qgepdss.mapping import get_qgep_mapping as get_qgep_dss_mapping
 from .qgepsia405.export import qgep_export_sia405
 from .qgepsia405.import_ import qgep_import_sia405
+from .qgepsia405.mapping import get_import_classes as get_sia405_import_classes
 from .qwat.export import qwat_export
 from .qwat.import_ import qwat_import
 from .qwat.mapping import get_qwat_mapping
 from .qwat.model_qwat import Base as BaseQwat
 from .qwat.model_wasser import Base as BaseWasser
+from .utils.qgep_export_utils import (
+    get_selection_from_query,
+    get_selection_in_geometry,
+    is_selection_empty,
+    read_selection_file,
+)
+from .utils.qgep_import_utils import BulkLoadIndexes
 from .utils.various import make_log_path
 
 
@@ -42,6 +54,30 @@ def main(args):
         "--selection",
         help="if provided, limits the export to networkelements that are provided in the selection (comma separated list of ids)",
     )
+    parser_qgep.add_argument(
+        "--bbox",
+        help="if provided, limits the export to reaches and wastewater nodes intersecting the bounding box (xmin,ymin,xmax,ymax in EPSG:2056)",
+    )
+    parser_qgep.add_argument(
+        "--polygon_wkt",
+        "--polygon-wkt",
+        help="if provided, limits the export to reaches and wastewater nodes intersecting the polygon (WKT in EPSG:2056)",
+    )
+    parser_qgep.add_argument(
+        "--polygon_file",
+        "--polygon-file",
+        help="if provided, limits the export to reaches and wastewater nodes intersecting the polygon read from the file (WKT in EPSG:2056)",
+    )
+    parser_qgep.add_argument(
+        "--selection_file",
+        "--selection-file",
+        help="if provided, limits the export to networkelements listed in the file (one id per line or comma separated)",
+    )
+    parser_qgep.add_argument(
+        "--selection_query",
+        "--selection-query",
+        help="if provided, limits the export to networkelements returned by the SQL query (first column is used as obj_id)",
+    )
 
     # TODO: this only makes sense for export
     parser_qgep.add_argument(
@@ -66,19 +102,66 @@ def main(args):
     parser_qgep.add_argument(
         "--recreate_schema",
         action="store_true",
-        help="drops schema and reruns ili2pg importschema",
+        help="drops the template schema and reruns ili2pg importschema (each run imports/exports in its own job schema)",
     )
     parser_qgep.add_argument(
         "--skip_validation",
         action="store_true",
         help="skips running ilivalidator on input/output xtf (required to import invalid files, invalid outputs are still generated)",
     )
-    parser_qgep.add_argument("path", help="path to the input/output .xtf file")
+    parser_qgep.add_argument(
+        "--upsert",
+        action="store_true",
+        help="imports with set-based INSERT ... ON CONFLICT statements instead of the object mapping (VSA_KEK and SIA405 Abwasser only, DSS files are refused, needs the staging schemas in the main database)",
+    )
+    parser_qgep.add_argument(
+        "--chunk_size",
+        type=int,
+        help="on import, flushes the objects in savepoints of CHUNK_SIZE objects and commits after each class, skipping and reporting the objects that fail (by default the import is committed at once)",
+    )
+    parser_qgep.add_argument(
+        "--resume",
+        action="store_true",
+        help="on import, keeps the ili2pg schema if the import fails, and resumes it on the next run of the same file: the ili2pg import is skipped and the classes already committed are skipped (implies --chunk_size 1000 if not set)",
+    )
+    parser_qgep.add_argument(
+        "--drop_indexes",
+        action="store_true",
+        help="on import, drops the secondary indexes of the qgep_od tables written by the import, then rebuilds them in parallel and runs ANALYZE (faster for large imports, the indexes are restored on failure, or by the next run with --drop_indexes if the process is killed)",
+    )
+    parser_qgep.add_argument(
+        "--session_triggers",
+        action="store_true",
+        help="on import, skips the symbology triggers for the import session only instead of dropping them for all users (adds a condition to the triggers on first use)",
+    )
+    parser_qgep.add_argument(
+        "--workers",
+        type=int,
+        help="on DSS import, imports the groups of classes that don't depend on each other (organisations, hydrology, structures, network, measurements, maintenance) in WORKERS parallel connections, each group committed separately",
+    )
+    parser_qgep.add_argument(
+        "--match_examinations",
+        action="store_true",
+        help="on VSA_KEK import, assigns the examinations without wastewater structure to the structure matching their from/to point identifiers, if there's exactly one (as the GUI import does)",
+    )
+    parser_qgep.add_argument(
+        "path",
+        nargs="+",
+        help="path to the input/output .xtf file (on VSA_KEK import, several files or directories of .xtf files can be given to import them together)",
+    )
     parser_qgep.add_argument(
         "--pgservice",
         help="name of the pgservice to use to connect to the database",
         default=config.QGEP_DEFAULT_PGSERVICE,
     )
+    parser_qgep.add_argument(
+        "--source_pgservice",
+        help="name of the pgservice to read the data from on export, e.g. a read-only replica (defaults to --pgservice)",
+    )
+    parser_qgep.add_argument(
+        "--staging_pgservice",
+        help="name of the pgservice of the database where ili2pg creates its schemas (defaults to --pgservice)",
+    )
     parser_qgep.add_argument(
         "--log",
         action="store_true",
@@ -124,6 +207,14 @@ def main(args):
         help="name of the pgservice to use to connect to the database",
         default=config.QWAT_DEFAULT_PGSERVICE,
     )
+    parser_qwat.add_argument(
+        "--source_pgservice",
+        help="name of the pgservice to read the data from on export, e.g. a read-only replica (defaults to --pgservice)",
+    )
+    parser_qwat.add_argument(
+        "--staging_pgservice",
+        help="name of the pgservice of the database where ili2pg creates its schemas (defaults to --pgservice)",
+    )
     parser_qwat.add_argument(
         "--log",
         action="store_true",
@@ -153,6 +244,16 @@ def main(args):
         parser.print_help(sys.stderr)
         exit(1)
 
+    # on import, several files (or the .xtf files of directories) are imported together
+    xtf_files = None
+    if args.parser == "qgep":
+        if args.direction == "import" and (len(args.path) > 1 or os.path.isdir(args.path[0])):
+            xtf_files = utils.various.list_xtf_files(args.path)
+        elif len(args.path) > 1:
+            print("Several files are only supported on import")
+            exit(1)
+        args.path = os.path.normpath(args.path[0])
+
     # Set log path
     log_path = args.path if args.parser in ["qgep", "qwat"] and args.log else None
 
@@ -177,6 +278,8 @@ def main(args):
     # if args.labels_orientation in orientation_list :
     if args.parser == "qgep":
         config.PGSERVICE = args.pgservice
+        config.SOURCE_PGSERVICE = args.source_pgservice
+        config.STAGING_PGSERVICE = args.staging_pgservice
         # SCHEMA = config.ABWASSER_SCHEMA
         # ILI_MODEL = config.ABWASSER_ILI_MODEL
         if args.export_sia405:
@@ -201,50 +304,100 @@ def main(args):
             ILI_EXPORT_MODEL_NAME = config.ABWASSER_ILI_MODEL_NAME
 
         if args.direction == "export":
+            if (
+                args.upsert
+                or args.chunk_size
+                or args.resume
+                or args.drop_indexes
+                or args.session_triggers
+                or args.workers
+            ):
+                print(
+                    "--upsert, --chunk_size, --resume, --drop_indexes, --session_triggers and --workers are only supported on import"
+                )
+                exit(1)
             basket_enabled = True
             if args.export_sia405 or args.export_dss:
                 basket_enabled = False
 
-            utils.ili2db.create_ili_schema(
+            selection_args = [
+                args.selection,
+                args.bbox,
+                args.polygon_wkt,
+                args.polygon_file,
+                args.selection_file,
+                args.selection_query,
+            ]
+            if len([arg for arg in selection_args if arg]) > 1:
+                print(
+                    "Only one of --selection, --bbox, --polygon_wkt, --polygon_file, --selection_file or --selection_query can be used"
+                )
+                exit(1)
+
+            selection = args.selection.split(",") if args.selection else None
+            if args.bbox:
+                try:
+                    bbox = [float(value) for value in args.bbox.split(",")]
+                except ValueError:
+                    bbox = None
+                if bbox is None or len(bbox) != 4:
+                    print("--bbox must be provided as xmin,ymin,xmax,ymax")
+                    exit(1)
+                selection = get_selection_in_geometry(bbox=bbox)
+            elif args.polygon_wkt or args.polygon_file:
+                polygon_wkt = args.polygon_wkt
+                if args.polygon_file:
+                    with open(args.polygon_file, encoding="utf-8") as f:
+                        polygon_wkt = f.read().strip()
+                selection = get_selection_in_geometry(polygon_wkt=polygon_wkt)
+            elif args.selection_file:
+                selection = read_selection_file(args.selection_file)
+            elif args.selection_query:
+                selection = get_selection_from_query(args.selection_query)
+
+            if selection is not None and is_selection_empty(selection):
+                print("No networkelements found in the provided selection")
+                exit(1)
+
+            with utils.ili2db.JobSchema(
                 SCHEMA,
                 ILI_MODEL,
                 make_log_path(log_path, "ilicreate"),
                 recreate_schema=args.recreate_schema,
                 create_basket_col=basket_enabled,
-            )
+            ) as job_schema:
+                if args.export_sia405:
+                    # SIA405_ABWASSER_2015_LV95
+                    qgep_export_sia405(
+                        selection=selection,
+                        labels_file=args.labels_file,
+                        orientation=args.labels_orientation,
+                        basket_enabled=basket_enabled,
+                    )
+                elif args.export_dss:
+                    # DSS_2015_LV95 expor5t
+                    qgep_export_dss(
+                        selection=selection,
+                        labels_file=args.labels_file,
+                        orientation=args.labels_orientation,
+                        basket_enabled=basket_enabled,
+                    )
+                else:
+                    # VSA_KEK_2019_LV95 export
+                    qgep_export_kek(
+                        selection=selection,
+                        labels_file=args.labels_file,
+                        orientation=args.labels_orientation,
+                        basket_enabled=basket_enabled,
+                    )
 
-            if args.export_sia405:
-                # SIA405_ABWASSER_2015_LV95
-                qgep_export_sia405(
-                    selection=args.selection.split(",") if args.selection else None,
-                    labels_file=args.labels_file,
-                    orientation=args.labels_orientation,
-                    basket_enabled=basket_enabled,
+                utils.ili2db.export_xtf_data(
+                    job_schema,
+                    ILI_MODEL_NAME,
+                    ILI_EXPORT_MODEL_NAME,
+                    args.path,
+                    make_log_path(log_path, "iliexport"),
                 )
-            elif args.export_dss:
-                # DSS_2015_LV95 expor5t
-                qgep_export_dss(
-                    selection=args.selection.split(",") if args.selection else None,
-                    labels_file=args.labels_file,
-                    orientation=args.labels_orientation,
-                    basket_enabled=basket_enabled,
-                )
-            else:
-                # VSA_KEK_2019_LV95 export
-                qgep_export_kek(
-                    selection=args.selection.split(",") if args.selection else None,
-                    labels_file=args.labels_file,
-                    orientation=args.labels_orientation,
-                    basket_enabled=basket_enabled,
-                )
-
-            utils.ili2db.export_xtf_data(
-                SCHEMA,
-                ILI_MODEL_NAME,
-                ILI_EXPORT_MODEL_NAME,
-                args.path,
-                make_log_path(log_path, "iliexport"),
-            )
 
             if not args.skip_validation:
                 try:
@@ -258,89 +411,163 @@ def main(args):
                     exit(1)
 
         elif args.direction == "import":
-            if args.selection:
+            if (
+                args.selection
+                or args.bbox
+                or args.polygon_wkt
+                or args.polygon_file
+                or args.selection_file
+                or args.selection_query
+            ):
                 print("Selection is only supported on export")
                 exit(1)
             if args.labels_orientation:
                 print("Labels_orientation is only supported on export")
                 exit(1)
-            if not args.skip_validation:
-                try:
-                    utils.ili2db.validate_xtf_data(
-                        args.path, make_log_path(log_path, "ilivalidate")
-                    )
-                except utils.various.CmdException:
-                    print(
-                        "Ilivalidator doesn't recognize input as valid ! Run with --skip_validation to ignore"
-                    )
+            if xtf_files is not None:
+                if not import_kek_files(xtf_files, args, log_path):
                     exit(1)
-
-            # add model dependency, as in __init_.py
-            impmodel = "nothing"
-            # impmodel = utils.ili2db.get_xtf_model(args.path)
-            impmodel = utils.ili2db.get_xtf_model2(args.path)
-
-            if impmodel == "VSA_KEK_2019_LV95":
-                SCHEMA = config.ABWASSER_SCHEMA
-                ILI_MODEL = config.ABWASSER_ILI_MODEL
-                utils.ili2db.create_ili_schema(
-                    SCHEMA,
-                    ILI_MODEL,
-                    make_log_path(log_path, "ilicreate"),
-                    recreate_schema=args.recreate_schema,
-                    create_basket_col=True,
-                )
-                utils.ili2db.import_xtf_data(
-                    SCHEMA, args.path, make_log_path(log_path, "iliimport")
-                )
-                print("qgep_import_kek: " + SCHEMA + "/" + ILI_MODEL)
-                qgep_import_kek()
-            elif impmodel == "SIA405_ABWASSER_2015_LV95":
-                ABWASSER_SIA405_SCHEMA = config.ABWASSER_SIA405_SCHEMA
-                ABWASSER_SIA405_ILI_MODEL = config.ABWASSER_SIA405_ILI_MODEL
-                utils.ili2db.create_ili_schema(
-                    ABWASSER_SIA405_SCHEMA,
-                    ABWASSER_SIA405_ILI_MODEL,
-                    make_log_path(log_path, "ilicreate"),
-                    recreate_schema=args.recreate_schema,
-                    create_basket_col=False,
-                )
-                utils.ili2db.import_xtf_data(
-                    ABWASSER_SIA405_SCHEMA, args.path, make_log_path(log_path, "iliimport")
-                )
-                print(
-                    "qgepsia405_import: "
-                    + ABWASSER_SIA405_SCHEMA
-                    + "/"
-                    + ABWASSER_SIA405_ILI_MODEL
-                )
-                qgep_import_sia405()
-
-            elif impmodel == "DSS_2015_LV95":
-                ABWASSER_DSS_SCHEMA = config.ABWASSER_DSS_SCHEMA
-                ABWASSER_DSS_ILI_MODEL = config.ABWASSER_DSS_ILI_MODEL
-                utils.ili2db.create_ili_schema(
-                    ABWASSER_DSS_SCHEMA,
-                    ABWASSER_DSS_ILI_MODEL,
-                    make_log_path(log_path, "ilicreate"),
-                    recreate_schema=args.recreate_schema,
-                    create_basket_col=False,
-                )
-                utils.ili2db.import_xtf_data(
-                    ABWASSER_DSS_SCHEMA, args.path, make_log_path(log_path, "iliimport")
-                )
-                print("qgepdss_import: " + ABWASSER_DSS_SCHEMA + "/" + ABWASSER_DSS_ILI_MODEL)
-                qgep_import_dss()
-
             else:
-                print(
-                    "MODEL "
-                    + impmodel
-                    + " schema creation failed: Not yet supported for INTERLIS import - no configuration available in config.py / _init_.py"
-                )
+                if not args.skip_validation:
+                    try:
+                        utils.ili2db.validate_xtf_data(
+                            args.path, make_log_path(log_path, "ilivalidate")
+                        )
+                    except utils.various.CmdException:
+                        print(
+                            "Ilivalidator doesn't recognize input as valid ! Run with --skip_validation to ignore"
+                        )
+                        exit(1)
+
+                # add model dependency, as in __init_.py
+                impmodel = "nothing"
+                # impmodel = utils.ili2db.get_xtf_model(args.path)
+                impmodel = utils.ili2db.get_xtf_model2(args.path)
+                if args.workers and impmodel != "DSS_2015_LV95":
+                    print("--workers is only supported for DSS_2015_LV95, importing without it")
+
+                # a resumed import reuses the job schema of the same file, and needs chunked commits
+                resume_key = None
+                chunk_size = args.chunk_size
+                if args.resume:
+                    resume_key = utils.various.get_file_hash(args.path)[:16]
+                    chunk_size = chunk_size or 1000
+
+                if impmodel == "VSA_KEK_2019_LV95":
+                    SCHEMA = config.ABWASSER_SCHEMA
+                    ILI_MODEL = config.ABWASSER_ILI_MODEL
+                    with utils.ili2db.JobSchema(
+                        SCHEMA,
+                        ILI_MODEL,
+                        make_log_path(log_path, "ilicreate"),
+                        recreate_schema=args.recreate_schema,
+                        create_basket_col=True,
+                        resume_key=resume_key,
+                    ) as job_schema:
+                        checkpoints = utils.ili2db.ImportCheckpoints(
+                            job_schema if args.resume else None
+                        )
+                        utils.ili2db.import_xtf_data(
+                            job_schema,
+                            args.path,
+                            make_log_path(log_path, "iliimport"),
+                            checkpoints,
+                        )
+                        print("qgep_import_kek: " + job_schema + "/" + ILI_MODEL)
+                        with BulkLoadIndexes(
+                            enabled=args.drop_indexes, classes=get_kek_import_classes()
+                        ):
+                            qgep_import_kek(
+                                upsert=args.upsert,
+                                chunk_size=chunk_size,
+                                checkpoints=checkpoints,
+                                session_triggers=args.session_triggers,
+                                match_examinations=args.match_examinations,
+                            )
+                elif impmodel == "SIA405_ABWASSER_2015_LV95":
+                    ABWASSER_SIA405_SCHEMA = config.ABWASSER_SIA405_SCHEMA
+                    ABWASSER_SIA405_ILI_MODEL = config.ABWASSER_SIA405_ILI_MODEL
+                    with utils.ili2db.JobSchema(
+                        ABWASSER_SIA405_SCHEMA,
+                        ABWASSER_SIA405_ILI_MODEL,
+                        make_log_path(log_path, "ilicreate"),
+                        recreate_schema=args.recreate_schema,
+                        create_basket_col=False,
+                        resume_key=resume_key,
+                    ) as job_schema:
+                        checkpoints = utils.ili2db.ImportCheckpoints(
+                            job_schema if args.resume else None
+                        )
+                        utils.ili2db.import_xtf_data(
+                            job_schema,
+                            args.path,
+                            make_log_path(log_path, "iliimport"),
+                            checkpoints,
+                        )
+                        print("qgepsia405_import: " + job_schema + "/" + ABWASSER_SIA405_ILI_MODEL)
+                        with BulkLoadIndexes(
+                            enabled=args.drop_indexes, classes=get_sia405_import_classes()
+                        ):
+                            qgep_import_sia405(
+                                upsert=args.upsert,
+                                chunk_size=chunk_size,
+                                checkpoints=checkpoints,
+                                session_triggers=args.session_triggers,
+                            )
+
+                elif impmodel == "DSS_2015_LV95":
+                    if args.upsert:
+                        # the set-based mappings (qgep.upsert) cover VSA_KEK and SIA405 Abwasser only
+                        print(
+                            "--upsert is not supported for DSS_2015_LV95, run without it (large DSS files can be imported with --workers or --chunk_size)"
+                        )
+                        exit(1)
+                    ABWASSER_DSS_SCHEMA = config.ABWASSER_DSS_SCHEMA
+                    ABWASSER_DSS_ILI_MODEL = config.ABWASSER_DSS_ILI_MODEL
+                    with utils.ili2db.JobSchema(
+                        ABWASSER_DSS_SCHEMA,
+                        ABWASSER_DSS_ILI_MODEL,
+                        make_log_path(log_path, "ilicreate"),
+                        recreate_schema=args.recreate_schema,
+                        create_basket_col=False,
+                        resume_key=resume_key,
+                    ) as job_schema:
+                        checkpoints = utils.ili2db.ImportCheckpoints(
+                            job_schema if args.resume else None
+                        )
+                        utils.ili2db.import_xtf_data(
+                            job_schema,
+                            args.path,
+                            make_log_path(log_path, "iliimport"),
+                            checkpoints,
+                        )
+                        print("qgepdss_import: " + job_schema + "/" + ABWASSER_DSS_ILI_MODEL)
+                        with BulkLoadIndexes(
+                            enabled=args.drop_indexes, classes=get_qgep_dss_mapping()
+                        ):
+                            checks_ok = qgep_import_dss(
+                                chunk_size=chunk_size,
+                                checkpoints=checkpoints,
+                                session_triggers=args.session_triggers,
+                                workers=args.workers,
+                            )
+                    if not checks_ok:
+                        print(
+                            "The imported data failed the integrity checks, see the errors in the log"
+                        )
+                        exit(1)
+
+                else:
+                    print(
+                        "MODEL "
+                        + impmodel
+                        + " schema creation failed: Not yet supported for INTERLIS import - no configuration available in config.py / _init_.py"
+                    )
 
     elif args.parser == "qwat":
         config.PGSERVICE = args.pgservice
+        config.SOURCE_PGSERVICE = args.source_pgservice
+        config.STAGING_PGSERVICE = args.staging_pgservice
         SCHEMA = config.WASSER_SCHEMA
         ILI_MODEL = config.WASSER_ILI_MODEL
         ILI_MODEL_NAME = config.WASSER_ILI_MODEL_NAME
@@ -442,3 +669,106 @@ def main(args):
     # print("No valid value for labels_orientation: [0.0, 90.0, -90.0]")
     # exit(1)
     print("Operation completed sucessfully !")
+
+
+def import_kek_files(xtf_files, args, log_path):
+    """
+    Imports several VSA_KEK files together : each file is validated and added to the same ili2pg schema as its
+    own dataset, then the staging data of all files is imported into QGEP at once. Files that are not valid
+    or can't be imported by ili2pg are skipped. Prints a report per file, and returns whether all files were
+    imported.
+    """
+    if not xtf_files:
+        print("No .xtf file to import")
+        return False
+    if args.workers:
+        print("--workers is only supported for DSS_2015_LV95, importing without it")
+
+    # status of each file, and its dataset name in the ili2pg schema
+    status = {}
+    datasets = {}
+    for xtf_file in xtf_files:
+        file_log_path = xtf_file if args.log else None
+        impmodel = utils.ili2db.get_xtf_model2(xtf_file)
+        if impmodel != "VSA_KEK_2019_LV95":
+            status[xtf_file] = (
+                f"skipped: model {impmodel} (only VSA_KEK_2019_LV95 files can be imported together)"
+            )
+            continue
+        if not args.skip_validation:
+            try:
+                utils.ili2db.validate_xtf_data(
+                    xtf_file, make_log_path(file_log_path, "ilivalidate")
+                )
+            except utils.various.CmdException:
+                status[xtf_file] = "skipped: not valid (run with --skip_validation to import it)"
+                continue
+        dataset = os.path.splitext(os.path.basename(xtf_file))[0]
+        while dataset in datasets.values():
+            dataset = f"{dataset}_{len(datasets)}"
+        datasets[xtf_file] = dataset
+        status[xtf_file] = "validated"
+
+    # a resumed import reuses the job schema of the same files, and needs chunked commits
+    resume_key = None
+    chunk_size = args.chunk_size
+    if args.resume:
+        files_hash = "".join(utils.various.get_file_hash(xtf_file) for xtf_file in datasets)
+        resume_key = hashlib.sha256(files_hash.encode()).hexdigest()[:16]
+        chunk_size = chunk_size or 1000
+
+    object_counts = {}
+    try:
+        if datasets:
+            with utils.ili2db.JobSchema(
+                config.ABWASSER_SCHEMA,
+                config.ABWASSER_ILI_MODEL,
+                make_log_path(log_path, "ilicreate"),
+                recreate_schema=args.recreate_schema,
+                create_basket_col=True,
+                resume_key=resume_key,
+            ) as job_schema:
+                checkpoints = utils.ili2db.ImportCheckpoints(job_schema if args.resume else None)
+                for xtf_file, dataset in datasets.items():
+                    file_log_path = xtf_file if args.log else None
+                    try:
+                        utils.ili2db.import_xtf_data(
+                            job_schema,
+                            xtf_file,
+                            make_log_path(file_log_path, "iliimport"),
+                            checkpoints,
+                            dataset=dataset,
+                        )
+                    except utils.various.CmdException:
+                        status[xtf_file] = "skipped: ili2pg import failed"
+                        continue
+                    status[xtf_file] = "staged"
+                object_counts = utils.ili2db.get_dataset_object_counts(job_schema)
+
+                staged_count = list(status.values()).count("staged")
+                if staged_count:
+                    print(
+                        f"qgep_import_kek: {job_schema}/{config.ABWASSER_ILI_MODEL} ({staged_count} files)"
+                    )
+                    with BulkLoadIndexes(
+                        enabled=args.drop_indexes, classes=get_kek_import_classes()
+                    ):
+                        qgep_import_kek(
+                            upsert=args.upsert,
+                            chunk_size=chunk_size,
+                            checkpoints=checkpoints,
+                            session_triggers=args.session_triggers,
+                            match_examinations=args.match_examinations,
+                        )
+                    for xtf_file, file_status in status.items():
+                        if file_status == "staged":
+                            status[xtf_file] = "imported"
+    finally:
+        print("Import report:")
+        for xtf_file in xtf_files:
+            objects = object_counts.get(datasets.get(xtf_file))
+            objects = "" if objects is None else f" ({objects} objects)"
+            print(f"  {xtf_file}: {status[xtf_file]}{objects}")
+            utils.various.logger.info(f"{xtf_file}: {status[xtf_file]}{objects}")
+
+    return all(file_status == "imported" for file_status in status.values())
@@ -8,8 +8,24 @@ PGPORT = os.getenv("PGPORT", None)
 PGDATABASE = os.getenv("PGDATABASE", None)
 PGUSER = os.getenv("PGUSER", None)
 PGPASS = os.getenv("PGPASS", None)
+# optional separate services to read qgep_od from when exporting (e.g. a hot-standby replica)
+# and to create the ili2pg staging schemas in, both default to the settings above
+SOURCE_PGSERVICE = None
+STAGING_PGSERVICE = None
+# ili2pg schemas kept to resume failed imports (--resume) are dropped by the next job once their last
+# checkpoint is older than that
+RESUME_SCHEMA_MAX_AGE_DAYS = 7
 JAVA = r"java"
 
+# KEK and SIA405 files with at least that many objects are reviewed in the import wizard as a diff
+# of the staging schema against qgep_od (without the per-object editors), as loading them all in
+# a session would take too long and too much memory
+REVIEW_DIFF_MIN_OBJECTS = 10000
+
+# scoped post-imports update the qgep_network segments and nodes derived from the affected reaches, reach
+# points and wastewater nodes, and rebuild the whole network above that many of them
+NETWORK_REFRESH_MAX_CHANGES = 1000
+
 # 12.7.2022 Anpassung auf 4.61 damit auch VSA-DSS kompatibel siehe https://github.com/claeis/ili2db/issues/374
 ILI2PG = os.path.join(BASE, "bin", "ili2pg-5.2.0", "ili2pg-5.2.0.jar")
 ILIVALIDATOR = os.path.join(BASE, "bin", "ilivalidator-1.14.3", "ilivalidator-1.14.3.jar")
@@ -26,6 +26,7 @@ from ..qgepdss.import_ import qgep_import_dss
 from ..qgepsia405.export import qgep_export_sia405
 from ..qgepsia405.import_ import qgep_import_sia405
 from ..utils.ili2db import (  # neu 22.7.2022; get_xtf_model,; neu 31.3.2023; neu 12.4.2023
+    JobSchema,
     check_fk_dataowner_null,
     check_fk_operator_null,
     check_fk_owner_null,
@@ -34,8 +35,8 @@ from ..utils.ili2db import (  # neu 22.7.2022; get_xtf_model,; neu 31.3.2023; ne
     check_identifier_null,
     check_organisation_subclass_data,
     check_wastewater_structure_subclass_data,
-    create_ili_schema,
     export_xtf_data,
+    get_staging_object_count,
     get_xtf_model2,
     import_xtf_data,
     validate_xtf_data,
@@ -171,150 +172,131 @@ def action_import(plugin):
 
     QApplication.processEvents()
     log_path = make_log_path(base_log_path, "ili2pg-schemaimport")
-    try:
-        # 22.7.2022 create_ili_schema depending of imodel
-        if imodel == "VSA_KEK_2019_LV95":
-            create_ili_schema(
-                config.ABWASSER_SCHEMA,
-                config.ABWASSER_ILI_MODEL,
-                log_path,
-                recreate_schema=True,
-                create_basket_col=True,
-            )
-        elif imodel == "SIA405_ABWASSER_2015_LV95":
-            create_ili_schema(
-                config.ABWASSER_SIA405_SCHEMA,
-                config.ABWASSER_SIA405_ILI_MODEL,
-                log_path,
-                recreate_schema=True,
-                create_basket_col=False,
-            )
-        elif imodel == "DSS_2015_LV95":
-            create_ili_schema(
-                config.ABWASSER_DSS_SCHEMA,
-                config.ABWASSER_DSS_ILI_MODEL,
-                log_path,
-                recreate_schema=True,
-                create_basket_col=False,
-            )
-        else:
-            # print(imodel)
-            # breakpoint()
-            progress_dialog.close()
-            show_failure(
-                "MODEL "
-                + imodel
-                + " schema creation failed: Not yet supported for INTERLIS import - no configuration available in config.py / _init_.py",
-                "Open the logs for more details on the error.",
-                log_path,
-            )
 
-    except CmdException:
+    # 22.7.2022 create_ili_schema depending of imodel
+    if imodel == "VSA_KEK_2019_LV95":
+        job_schema = JobSchema(
+            config.ABWASSER_SCHEMA,
+            config.ABWASSER_ILI_MODEL,
+            log_path,
+            create_basket_col=True,
+        )
+    elif imodel == "SIA405_ABWASSER_2015_LV95":
+        job_schema = JobSchema(
+            config.ABWASSER_SIA405_SCHEMA,
+            config.ABWASSER_SIA405_ILI_MODEL,
+            log_path,
+            create_basket_col=False,
+        )
+    elif imodel == "DSS_2015_LV95":
+        job_schema = JobSchema(
+            config.ABWASSER_DSS_SCHEMA,
+            config.ABWASSER_DSS_ILI_MODEL,
+            log_path,
+            create_basket_col=False,
+        )
+    else:
         progress_dialog.close()
         show_failure(
-            "Could not create the ili2pg schema" + imodel,
+            "MODEL "
+            + imodel
+            + " schema creation failed: Not yet supported for INTERLIS import - no configuration available in config.py / _init_.py",
             "Open the logs for more details on the error.",
             log_path,
         )
         return
-    progress_dialog.setValue(33)
-
-    # Export from ili2pg model to file
-    progress_dialog.setLabelText("Importing XTF data...")
 
-    # time.sleep(6.5)
-
-    QApplication.processEvents()
-    log_path = make_log_path(base_log_path, "ili2pg-import")
     try:
-        #        import_xtf_data(
-        #            config.ABWASSER_SCHEMA,
-        #            file_name,
-        #            log_path,
-        #        )
-        # 27.6.2022 to do dependant on Model Selection
-        if imodel == "VSA_KEK_2019_LV95":
-            import_xtf_data(
-                config.ABWASSER_SCHEMA,
-                file_name,
-                log_path,
-                # imodel,
-                # "VSA_KEK_2019_LV95",
-            )
-        elif imodel == "SIA405_ABWASSER_2015_LV95":
-            import_xtf_data(
-                config.ABWASSER_SIA405_SCHEMA,
-                file_name,
-                log_path,
-                # imodel,
-            )
-        elif imodel == "DSS_2015_LV95":
-            import_xtf_data(
-                config.ABWASSER_DSS_SCHEMA,
-                file_name,
-                log_path,
-                # imodel,
-            )
-        else:
-            # # print(imodel)
-            # breakpoint()
-            progress_dialog.close()
-            show_failure(
-                "Import xtf in MODEL "
-                + imodel
-                + " not yet supported for INTERLIS import - no configuration available in config.py / _init_.py",
-                "Open the logs for more details on the error.",
-                log_path,
-            )
-
+        job_schema_name = job_schema.create()
     except CmdException:
         progress_dialog.close()
         show_failure(
-            "Could not import data",
+            "Could not create the ili2pg schema" + imodel,
             "Open the logs for more details on the error.",
             log_path,
         )
         return
 
-    # Export to the temporary ili2pg model
-    progress_dialog.setLabelText("Converting to QGEP...")
-    QApplication.processEvents()
+    # the job schema is only needed until the data is converted to QGEP (or until the diff is
+    # reviewed, see below)
+    keep_job_schema = False
+    try:
+        progress_dialog.setValue(33)
 
-    # 22.7.2022 nach oben verschoben
-    # import_dialog = GuiImport(plugin.iface.mainWindow())
-    # 25.7.2022 new 80 instead of 100 (to show that still something is happening
-    # progress_dialog.setValue(100)
-    progress_dialog.setValue(66)
+        # Export from ili2pg model to file
+        progress_dialog.setLabelText("Importing XTF data...")
 
-    log_handler = logging.FileHandler(
-        make_log_path(base_log_path, "qgepqwat2ili-import"), mode="w", encoding="utf-8"
-    )
-    log_handler.setLevel(logging.INFO)
-    log_handler.setFormatter(logging.Formatter("%(levelname)-8s %(message)s"))
-    with LoggingHandlerContext(log_handler):
-        progress_dialog.setLabelText("Loading import wizard - please be patient...")
-        # 24.3.2023 added model dependency
-        if imodel == "VSA_KEK_2019_LV95":
-            qgep_import_kek(
-                precommit_callback=import_dialog.init_with_session,
-            )
-        elif imodel == "SIA405_ABWASSER_2015_LV95":
-            qgep_import_sia405(
-                precommit_callback=import_dialog.init_with_session,
-            )
-        elif imodel == "DSS_2015_LV95":
-            qgep_import_dss(
-                precommit_callback=import_dialog.init_with_session,
+        # time.sleep(6.5)
+
+        QApplication.processEvents()
+        log_path = make_log_path(base_log_path, "ili2pg-import")
+        try:
+            import_xtf_data(
+                job_schema_name,
+                file_name,
+                log_path,
             )
-        else:
+        except CmdException:
             progress_dialog.close()
             show_failure(
-                "Import xtf in qgep with "
-                + imodel
-                + " not yet supported for INTERLIS import - no configuration available in config.py / _init_.py",
+                "Could not import data",
                 "Open the logs for more details on the error.",
                 log_path,
             )
+            return
+
+        # large KEK and SIA405 files are reviewed as a diff computed in the database instead of
+        # loading all their objects in the import wizard
+        review_diff = imodel in (
+            "VSA_KEK_2019_LV95",
+            "SIA405_ABWASSER_2015_LV95",
+        ) and (get_staging_object_count(job_schema_name) >= config.REVIEW_DIFF_MIN_OBJECTS)
+
+        # Export to the temporary ili2pg model
+        progress_dialog.setLabelText("Converting to QGEP...")
+        QApplication.processEvents()
+
+        # 22.7.2022 nach oben verschoben
+        # import_dialog = GuiImport(plugin.iface.mainWindow())
+        # 25.7.2022 new 80 instead of 100 (to show that still something is happening
+        # progress_dialog.setValue(100)
+        progress_dialog.setValue(66)
+
+        log_handler = logging.FileHandler(
+            make_log_path(base_log_path, "qgepqwat2ili-import"), mode="w", encoding="utf-8"
+        )
+        log_handler.setLevel(logging.INFO)
+        log_handler.setFormatter(logging.Formatter("%(levelname)-8s %(message)s"))
+        with LoggingHandlerContext(log_handler):
+            progress_dialog.setLabelText("Loading import wizard - please be patient...")
+            # 24.3.2023 added model dependency
+            if review_diff:
+                if imodel == "VSA_KEK_2019_LV95":
+                    qgep_import_kek(
+                        review_callback=import_dialog.init_with_diff,
+                    )
+                else:
+                    qgep_import_sia405(
+                        review_callback=import_dialog.init_with_diff,
+                    )
+                # the diff is read from the job schema until it's applied or discarded
+                import_dialog.job_schema = job_schema
+                keep_job_schema = True
+            elif imodel == "VSA_KEK_2019_LV95":
+                qgep_import_kek(
+                    precommit_callback=import_dialog.init_with_session,
+                )
+            elif imodel == "SIA405_ABWASSER_2015_LV95":
+                qgep_import_sia405(
+                    precommit_callback=import_dialog.init_with_session,
+                )
+            elif imodel == "DSS_2015_LV95":
+                qgep_import_dss(
+                    precommit_callback=import_dialog.init_with_session,
+                )
+    finally:
+        if not keep_job_schema:
+            job_schema.drop()
 
     # 31.5.2024 should not be needed anymore
     # progress_dialog.setLabelText("Set main_cover manually after import if vw_qgep_wastewater_structure does not display correctly!")
@@ -383,7 +365,7 @@ def action_export(plugin):
         if emodel == "DSS_2015_LV95":
 
             check_organisation = False
-            check_organisation = check_organisation_subclass_data()
+            check_organisation = check_organisation_subclass_data(target="source")
             if check_organisation:
                 # print("OK: Integrity checks organisation")
                 show_success(
@@ -406,7 +388,7 @@ def action_export(plugin):
         flag_test = True
         if flag_test:
             check_wastewater_structure = False
-            check_wastewater_structure = check_wastewater_structure_subclass_data()
+            check_wastewater_structure = check_wastewater_structure_subclass_data(target="source")
             if check_wastewater_structure:
                 # print("OK: Integrity checks wastewater_structure")
                 show_success(
@@ -427,7 +409,7 @@ def action_export(plugin):
         # 3a. identifier check check_identifier_null
         if flag_test:
             check_identifier = False
-            check_identifier = check_identifier_null()
+            check_identifier = check_identifier_null(target="source")
             if check_identifier:
                 # print("OK: Integrity checks identifiers is not NULL")
                 show_success(
@@ -450,7 +432,7 @@ def action_export(plugin):
         # 3b. identifier check check_identifier_length
         if flag_test:
             check_identifier_too_long = False
-            check_identifier_too_long = check_identifier_length()
+            check_identifier_too_long = check_identifier_length(target="source")
             if check_identifier_too_long:
                 # print("OK: Integrity checks identifiers is not NULL")
                 show_success(
@@ -473,7 +455,7 @@ def action_export(plugin):
         # 4. relation check check_fk_owner_null
         if flag_test:
             check_fk_owner = False
-            check_fk_owner = check_fk_owner_null()
+            check_fk_owner = check_fk_owner_null(target="source")
             if check_fk_owner:
                 # print("OK: Integrity checks fk_owner is not NULL")
                 show_success(
@@ -495,7 +477,7 @@ def action_export(plugin):
 
             # 5. relation check check_fk_operator_null
             check_fk_operator = False
-            check_fk_operator = check_fk_operator_null()
+            check_fk_operator = check_fk_operator_null(target="source")
             if check_fk_operator:
                 # print("OK: Integrity checks fk_operator is not NULL")
                 show_success(
@@ -518,7 +500,7 @@ def action_export(plugin):
         # 6. relation check check_fk_dataowner_null
         if flag_test:
             check_fk_dataowner = False
-            check_fk_dataowner = check_fk_dataowner_null()
+            check_fk_dataowner = check_fk_dataowner_null(target="source")
             if check_fk_dataowner:
                 # print("OK: Integrity checks fk_dataowner is not NULL")
                 show_success(
@@ -540,7 +522,7 @@ def action_export(plugin):
 
             # 6. relation check check_fk_provider_null
             check_fk_provider = False
-            check_fk_provider = check_fk_provider_null()
+            check_fk_provider = check_fk_provider_null(target="source")
             if check_fk_provider:
                 # print("OK: Integrity checks fk_provider is not NULL")
                 show_success(
@@ -571,27 +553,24 @@ def action_export(plugin):
         # 28.6.2022 https://pythontect.com/python-configparser-tutorial/
         if emodel == "VSA_KEK_2019_LV95":
             # alte Konfiguration behalten
-            create_ili_schema(
+            job_schema = JobSchema(
                 config.ABWASSER_SCHEMA,
                 config.ABWASSER_ILI_MODEL,
                 log_path,
-                recreate_schema=True,
                 create_basket_col=True,
             )
         elif emodel == "SIA405_ABWASSER_2015_LV95":
-            create_ili_schema(
+            job_schema = JobSchema(
                 config.ABWASSER_SIA405_SCHEMA,
                 config.ABWASSER_SIA405_ILI_MODEL,
                 log_path,
-                recreate_schema=True,
                 create_basket_col=False,
             )
         elif emodel == "DSS_2015_LV95":
-            create_ili_schema(
+            job_schema = JobSchema(
                 config.ABWASSER_DSS_SCHEMA,
                 config.ABWASSER_DSS_ILI_MODEL,
                 log_path,
-                recreate_schema=True,
                 create_basket_col=False,
             )
 
@@ -605,319 +584,331 @@ def action_export(plugin):
             )
             return
 
-        # 28.3.2023 replaced by else
-        # except CmdException:
-        # progress_dialog.close()
-        # show_failure(
-        # "Could not create the ili2pg schema",
-        # "Open the logs for more details on the error.",
-        # log_path,
-        # )
-        # return
-
-        #        progress_dialog.setValue(25)
-        progress_dialog.setValue(5)
-
-        # neu 12.7.2022
-        progress_dialog.setLabelText(emodel)
-
-        # # print("GFG # printed immediately.")
-        # time.sleep(5.5)
-
-        # delays the execution
-        # for 5.5 secs.
-        # # print("GFG # printed after 5.5 secs.")
-
-        progress_dialog.setValue(25)
-
-        # Export the labels file
-        tempdir = tempfile.TemporaryDirectory()
-        labels_file_path = None
-
-        if len(export_dialog.selected_labels_scales_indices):
-            labels_file_path = os.path.join(tempdir.name, "labels.geojson")
-
-            progress_dialog.setLabelText("Extracting labels...")
-
-            structures_lyr = QgepLayerManager.layer("vw_qgep_wastewater_structure")
-            reaches_lyr = QgepLayerManager.layer("vw_qgep_reach")
-            # 4.4.2023 add catchment_area
-            catchment_area_lyr = QgepLayerManager.layer("catchment_area")
-            # if not structures_lyr or not reaches_lyr:
-            if not structures_lyr or not reaches_lyr or not catchment_area_lyr:
-                progress_dialog.close()
-                show_failure(
-                    "Could not find the vw_qgep_wastewater_structure and/or the vw_qgep_reach and/or catchment_area layers.",
-                    "Make sure your QGEP project is open.",
-                    None,
-                )
-                return
-
-            QApplication.processEvents()
-            processing.run(
-                "qgep:extractlabels_interlis",
-                {
-                    "OUTPUT": labels_file_path,
-                    "RESTRICT_TO_SELECTION": export_dialog.limit_to_selection,
-                    "STRUCTURE_VIEW_LAYER": structures_lyr,
-                    "REACH_VIEW_LAYER": reaches_lyr,
-                    "CATCHMENT_AREA_VIEW_LAYER": catchment_area_lyr,
-                    "SCALES": export_dialog.selected_labels_scales_indices,
-                },
+        try:
+            job_schema_name = job_schema.create()
+        except CmdException:
+            progress_dialog.close()
+            show_failure(
+                "Could not create the ili2pg schema",
+                "Open the logs for more details on the error.",
+                log_path,
             )
-            progress_dialog.setValue(35)
+            return
 
-        # Export to the temporary ili2pg model
-        progress_dialog.setLabelText("Converting from QGEP...")
-        QApplication.processEvents()
+        # the job schema is only needed until the XTF files are written
+        try:
+            #        progress_dialog.setValue(25)
+            progress_dialog.setValue(5)
 
-        log_handler = logging.FileHandler(
-            make_log_path(file_name, "qgepqwat2ili-export"), mode="w", encoding="utf-8"
-        )
-        log_handler.setLevel(logging.INFO)
-        log_handler.setFormatter(logging.Formatter("%(levelname)-8s %(message)s"))
-        with LoggingHandlerContext(log_handler):
-            # 18.3.2023
-            # 22.3.2023 added try - seems not to work
-            #            try:
+            # neu 12.7.2022
+            progress_dialog.setLabelText(emodel)
 
-            # add logger info to check what selection is used
-            # 18.12.2024
-            logger.info(f"Start Exporting with selection {str(export_dialog.selected_ids)}")
-            # logger.info(
-            # f"Start Exporting with selection {str(export_dialog.selected_ids)} - without automatic extension of neigbouring wwn elements"
-            # )
+            # # print("GFG # printed immediately.")
+            # time.sleep(5.5)
 
-            if emodel == "VSA_KEK_2019_LV95":
-                logger.info("Start Exporting VSA_KEK_2019_LV95")
-                qgep_export_kek(
-                    selection=export_dialog.selected_ids,
-                    labels_file=labels_file_path,
-                    orientation=eorientation,
-                    basket_enabled=True,
-                )
-            # 22.3.2023 / 28.3.2023 adjusted to qgepsia405_export
-            elif emodel == "SIA405_ABWASSER_2015_LV95":
-                logger.info("Start Exporting SIA405_ABWASSER_2015_LV95 - qgepsia405_export")
-                # qgepsia405_export(selection=export_dialog.selected_ids, labels_file=labels_file_path)
-                # 3.4.2023 neu mit eorientation
-                qgep_export_sia405(
-                    selection=export_dialog.selected_ids,
-                    labels_file=labels_file_path,
-                    orientation=eorientation,
-                    basket_enabled=False,
-                )
-            elif emodel == "DSS_2015_LV95":
-                logger.info("Start Exporting DSS_2015_LV95 - qgepdss_export")
-                # qgepdss_export(selection=export_dialog.selected_ids, labels_file=labels_file_path)
-                # 3.4.2023 neu mit eorientation
-                qgep_export_dss(
-                    selection=export_dialog.selected_ids,
-                    labels_file=labels_file_path,
-                    orientation=eorientation,
-                    basket_enabled=False,
-                )
-            else:
-                progress_dialog.close()
-                show_failure(
-                    "Could not export data for model " + emodel,
-                    "Model not yet supported on export!",
-                    log_path,
-                )
-                return
+            # delays the execution
+            # for 5.5 secs.
+            # # print("GFG # printed after 5.5 secs.")
 
-        progress_dialog.setValue(51)
+            progress_dialog.setValue(25)
 
-        # Cleanup
-        tempdir.cleanup()
+            # Export the labels file
+            tempdir = tempfile.TemporaryDirectory()
+            labels_file_path = None
 
-        # 12.7.2022 to do dependant on Model Selection
-        if emodel == "VSA_KEK_2019_LV95":
-            for model_name, export_model_name, progress in [
-                (config.ABWASSER_ILI_MODEL_NAME, config.ABWASSER_ILI_MODEL_NAME, 50),
-                (config.ABWASSER_ILI_MODEL_NAME_SIA405, config.ABWASSER_ILI_MODEL_NAME_SIA405, 70),
-            ]:
+            if len(export_dialog.selected_labels_scales_indices):
+                labels_file_path = os.path.join(tempdir.name, "labels.geojson")
 
-                export_file_name = f"{file_name_base}_{model_name}.xtf"
+                progress_dialog.setLabelText("Extracting labels...")
 
-                # Export from ili2pg model to file
-                progress_dialog.setLabelText(f"Saving XTF file [{model_name}]...")
-                QApplication.processEvents()
-                log_path = make_log_path(base_log_path, f"ili2pg-export-{model_name}")
-                try:
-                    export_xtf_data(
-                        config.ABWASSER_SCHEMA,
-                        model_name,
-                        export_model_name,
-                        export_file_name,
-                        log_path,
-                    )
-                except CmdException:
+                structures_lyr = QgepLayerManager.layer("vw_qgep_wastewater_structure")
+                reaches_lyr = QgepLayerManager.layer("vw_qgep_reach")
+                # 4.4.2023 add catchment_area
+                catchment_area_lyr = QgepLayerManager.layer("catchment_area")
+                # if not structures_lyr or not reaches_lyr:
+                if not structures_lyr or not reaches_lyr or not catchment_area_lyr:
                     progress_dialog.close()
                     show_failure(
-                        "Could not export the ili2pg schema " + config.ABWASSER_SCHEMA,
-                        "Open the logs for more details on the error.",
-                        log_path,
+                        "Could not find the vw_qgep_wastewater_structure and/or the vw_qgep_reach and/or catchment_area layers.",
+                        "Make sure your QGEP project is open.",
+                        None,
                     )
-                    continue
-                progress_dialog.setValue(progress + 10)
+                    return
 
-                progress_dialog.setLabelText(
-                    f"Validating the network output file [{model_name}]..."
-                )
                 QApplication.processEvents()
-                log_path = make_log_path(base_log_path, f"ilivalidator-{model_name}")
-                try:
-                    validate_xtf_data(
-                        export_file_name,
-                        log_path,
-                    )
-
-                    # 24.3.2023 moved up here
-                    show_success(
-                        "Sucess",
-                        # f"Data successfully exported to {file_name_base}",
-                        f"Data successfully exported to {export_file_name}",
-                        os.path.dirname(log_path),
-                    )
-                except CmdException:
-                    progress_dialog.close()
-                    show_failure(
-                        "Invalid file",
-                        f"The created file is not a valid {model_name} XTF file. Open the logs for more details on the error.",
-                        log_path,
-                    )
-                    continue
-
-                progress_dialog.setValue(progress + 20)
-
-        elif emodel == "DSS_2015_LV95":
-            for model_name, export_model_name, progress in [
-                (config.ABWASSER_DSS_ILI_MODEL_NAME, None, 50),
-            ]:
+                processing.run(
+                    "qgep:extractlabels_interlis",
+                    {
+                        "OUTPUT": labels_file_path,
+                        "RESTRICT_TO_SELECTION": export_dialog.limit_to_selection,
+                        "STRUCTURE_VIEW_LAYER": structures_lyr,
+                        "REACH_VIEW_LAYER": reaches_lyr,
+                        "CATCHMENT_AREA_VIEW_LAYER": catchment_area_lyr,
+                        "SCALES": export_dialog.selected_labels_scales_indices,
+                    },
+                )
+                progress_dialog.setValue(35)
 
-                export_file_name = f"{file_name_base}_{model_name}.xtf"
+            # Export to the temporary ili2pg model
+            progress_dialog.setLabelText("Converting from QGEP...")
+            QApplication.processEvents()
 
-                # Export from ili2pg model to file
-                progress_dialog.setLabelText(f"Saving XTF file [{model_name}]...")
-                QApplication.processEvents()
-                log_path = make_log_path(base_log_path, f"ili2pg-export-{model_name}")
-                try:
-                    export_xtf_data(
-                        config.ABWASSER_DSS_SCHEMA,
-                        model_name,
-                        export_model_name,
-                        export_file_name,
-                        log_path,
+            log_handler = logging.FileHandler(
+                make_log_path(file_name, "qgepqwat2ili-export"), mode="w", encoding="utf-8"
+            )
+            log_handler.setLevel(logging.INFO)
+            log_handler.setFormatter(logging.Formatter("%(levelname)-8s %(message)s"))
+            with LoggingHandlerContext(log_handler):
+                # 18.3.2023
+                # 22.3.2023 added try - seems not to work
+                #            try:
+
+                # add logger info to check what selection is used
+                # 18.12.2024
+                logger.info(f"Start Exporting with selection {str(export_dialog.selected_ids)}")
+                # logger.info(
+                # f"Start Exporting with selection {str(export_dialog.selected_ids)} - without automatic extension of neigbouring wwn elements"
+                # )
+
+                if emodel == "VSA_KEK_2019_LV95":
+                    logger.info("Start Exporting VSA_KEK_2019_LV95")
+                    qgep_export_kek(
+                        selection=export_dialog.selected_ids,
+                        labels_file=labels_file_path,
+                        orientation=eorientation,
+                        basket_enabled=True,
                     )
-                except CmdException:
-                    progress_dialog.close()
-                    show_failure(
-                        "Could not export the ili2pg schema " + config.ABWASSER_DSS_SCHEMA,
-                        "Open the logs for more details on the error.",
-                        log_path,
+                # 22.3.2023 / 28.3.2023 adjusted to qgepsia405_export
+                elif emodel == "SIA405_ABWASSER_2015_LV95":
+                    logger.info("Start Exporting SIA405_ABWASSER_2015_LV95 - qgepsia405_export")
+                    # qgepsia405_export(selection=export_dialog.selected_ids, labels_file=labels_file_path)
+                    # 3.4.2023 neu mit eorientation
+                    qgep_export_sia405(
+                        selection=export_dialog.selected_ids,
+                        labels_file=labels_file_path,
+                        orientation=eorientation,
+                        basket_enabled=False,
                     )
-                    continue
-
-                progress_dialog.setValue(progress + 10)
-
-                progress_dialog.setLabelText(f"Validating the GEP output file [{model_name}]...")
-                QApplication.processEvents()
-                log_path = make_log_path(base_log_path, f"ilivalidator-{model_name}")
-                try:
-                    validate_xtf_data(
-                        export_file_name,
-                        log_path,
+                elif emodel == "DSS_2015_LV95":
+                    logger.info("Start Exporting DSS_2015_LV95 - qgepdss_export")
+                    # qgepdss_export(selection=export_dialog.selected_ids, labels_file=labels_file_path)
+                    # 3.4.2023 neu mit eorientation
+                    qgep_export_dss(
+                        selection=export_dialog.selected_ids,
+                        labels_file=labels_file_path,
+                        orientation=eorientation,
+                        basket_enabled=False,
                     )
-
-                    # 24.3.2023 moved up here
-                    show_success(
-                        "Sucess",
-                        f"Data successfully exported to {file_name_base}",
-                        os.path.dirname(log_path),
-                    )
-
-                except CmdException:
+                else:
                     progress_dialog.close()
                     show_failure(
-                        "Invalid file",
-                        f"The created file is not a valid {model_name} XTF file. Open the logs for more details on the error.",
+                        "Could not export data for model " + emodel,
+                        "Model not yet supported on export!",
                         log_path,
                     )
-                    continue
+                    return
 
-                progress_dialog.setValue(progress + 20)
+            progress_dialog.setValue(51)
 
-        # 29.3.2023 SIA405_ABWASSER_2015_LV95
-        elif emodel == "SIA405_ABWASSER_2015_LV95":
-            for model_name, export_model_name, progress in [
-                # (config.ABWASSER_DSS_ILI_MODEL_NAME, None, 50),
-                (config.ABWASSER_SIA405_ILI_MODEL_NAME, None, 50),
-            ]:
-
-                export_file_name = f"{file_name_base}_{model_name}.xtf"
+            # Cleanup
+            tempdir.cleanup()
 
-                # Export from ili2pg model to file
-                progress_dialog.setLabelText(f"Saving XTF file [{model_name}]...")
-                QApplication.processEvents()
-                log_path = make_log_path(base_log_path, f"ili2pg-export-{model_name}")
-                try:
-                    export_xtf_data(
-                        # config.ABWASSER_DSS_SCHEMA,
-                        config.ABWASSER_SIA405_SCHEMA,
-                        model_name,
-                        export_model_name,
-                        export_file_name,
-                        log_path,
-                    )
-                except CmdException:
-                    progress_dialog.close()
-                    show_failure(
-                        "Could not export the ili2pg schema " + config.ABWASSER_SIA405_SCHEMA,
-                        "Open the logs for more details on the error.",
-                        log_path,
-                    )
-                    continue
-
-                progress_dialog.setValue(progress + 10)
-
-                progress_dialog.setLabelText(f"Validating the GEP output file [{model_name}]...")
-                QApplication.processEvents()
-                log_path = make_log_path(base_log_path, f"ilivalidator-{model_name}")
-                try:
-                    validate_xtf_data(
-                        export_file_name,
-                        log_path,
+            # 12.7.2022 to do dependant on Model Selection
+            if emodel == "VSA_KEK_2019_LV95":
+                for model_name, export_model_name, progress in [
+                    (config.ABWASSER_ILI_MODEL_NAME, config.ABWASSER_ILI_MODEL_NAME, 50),
+                    (
+                        config.ABWASSER_ILI_MODEL_NAME_SIA405,
+                        config.ABWASSER_ILI_MODEL_NAME_SIA405,
+                        70,
+                    ),
+                ]:
+
+                    export_file_name = f"{file_name_base}_{model_name}.xtf"
+
+                    # Export from ili2pg model to file
+                    progress_dialog.setLabelText(f"Saving XTF file [{model_name}]...")
+                    QApplication.processEvents()
+                    log_path = make_log_path(base_log_path, f"ili2pg-export-{model_name}")
+                    try:
+                        export_xtf_data(
+                            job_schema_name,
+                            model_name,
+                            export_model_name,
+                            export_file_name,
+                            log_path,
+                        )
+                    except CmdException:
+                        progress_dialog.close()
+                        show_failure(
+                            "Could not export the ili2pg schema " + job_schema_name,
+                            "Open the logs for more details on the error.",
+                            log_path,
+                        )
+                        continue
+                    progress_dialog.setValue(progress + 10)
+
+                    progress_dialog.setLabelText(
+                        f"Validating the network output file [{model_name}]..."
                     )
+                    QApplication.processEvents()
+                    log_path = make_log_path(base_log_path, f"ilivalidator-{model_name}")
+                    try:
+                        validate_xtf_data(
+                            export_file_name,
+                            log_path,
+                        )
+
+                        # 24.3.2023 moved up here
+                        show_success(
+                            "Sucess",
+                            # f"Data successfully exported to {file_name_base}",
+                            f"Data successfully exported to {export_file_name}",
+                            os.path.dirname(log_path),
+                        )
+                    except CmdException:
+                        progress_dialog.close()
+                        show_failure(
+                            "Invalid file",
+                            f"The created file is not a valid {model_name} XTF file. Open the logs for more details on the error.",
+                            log_path,
+                        )
+                        continue
+
+                    progress_dialog.setValue(progress + 20)
 
-                    # 24.3.2023 moved up here
-                    show_success(
-                        "Sucess",
-                        f"Data successfully exported to {file_name_base}",
-                        os.path.dirname(log_path),
+            elif emodel == "DSS_2015_LV95":
+                for model_name, export_model_name, progress in [
+                    (config.ABWASSER_DSS_ILI_MODEL_NAME, None, 50),
+                ]:
+
+                    export_file_name = f"{file_name_base}_{model_name}.xtf"
+
+                    # Export from ili2pg model to file
+                    progress_dialog.setLabelText(f"Saving XTF file [{model_name}]...")
+                    QApplication.processEvents()
+                    log_path = make_log_path(base_log_path, f"ili2pg-export-{model_name}")
+                    try:
+                        export_xtf_data(
+                            job_schema_name,
+                            model_name,
+                            export_model_name,
+                            export_file_name,
+                            log_path,
+                        )
+                    except CmdException:
+                        progress_dialog.close()
+                        show_failure(
+                            "Could not export the ili2pg schema " + job_schema_name,
+                            "Open the logs for more details on the error.",
+                            log_path,
+                        )
+                        continue
+
+                    progress_dialog.setValue(progress + 10)
+
+                    progress_dialog.setLabelText(
+                        f"Validating the GEP output file [{model_name}]..."
                     )
-
-                except CmdException:
-                    progress_dialog.close()
-                    show_failure(
-                        "Invalid file",
-                        f"The created file is not a valid {model_name} XTF file. Open the logs for more details on the error.",
-                        log_path,
+                    QApplication.processEvents()
+                    log_path = make_log_path(base_log_path, f"ilivalidator-{model_name}")
+                    try:
+                        validate_xtf_data(
+                            export_file_name,
+                            log_path,
+                        )
+
+                        # 24.3.2023 moved up here
+                        show_success(
+                            "Sucess",
+                            f"Data successfully exported to {file_name_base}",
+                            os.path.dirname(log_path),
+                        )
+
+                    except CmdException:
+                        progress_dialog.close()
+                        show_failure(
+                            "Invalid file",
+                            f"The created file is not a valid {model_name} XTF file. Open the logs for more details on the error.",
+                            log_path,
+                        )
+                        continue
+
+                    progress_dialog.setValue(progress + 20)
+
+            # 29.3.2023 SIA405_ABWASSER_2015_LV95
+            elif emodel == "SIA405_ABWASSER_2015_LV95":
+                for model_name, export_model_name, progress in [
+                    # (config.ABWASSER_DSS_ILI_MODEL_NAME, None, 50),
+                    (config.ABWASSER_SIA405_ILI_MODEL_NAME, None, 50),
+                ]:
+
+                    export_file_name = f"{file_name_base}_{model_name}.xtf"
+
+                    # Export from ili2pg model to file
+                    progress_dialog.setLabelText(f"Saving XTF file [{model_name}]...")
+                    QApplication.processEvents()
+                    log_path = make_log_path(base_log_path, f"ili2pg-export-{model_name}")
+                    try:
+                        export_xtf_data(
+                            job_schema_name,
+                            model_name,
+                            export_model_name,
+                            export_file_name,
+                            log_path,
+                        )
+                    except CmdException:
+                        progress_dialog.close()
+                        show_failure(
+                            "Could not export the ili2pg schema " + job_schema_name,
+                            "Open the logs for more details on the error.",
+                            log_path,
+                        )
+                        continue
+
+                    progress_dialog.setValue(progress + 10)
+
+                    progress_dialog.setLabelText(
+                        f"Validating the GEP output file [{model_name}]..."
                     )
-                    continue
-
-                progress_dialog.setValue(progress + 20)
+                    QApplication.processEvents()
+                    log_path = make_log_path(base_log_path, f"ilivalidator-{model_name}")
+                    try:
+                        validate_xtf_data(
+                            export_file_name,
+                            log_path,
+                        )
+
+                        # 24.3.2023 moved up here
+                        show_success(
+                            "Sucess",
+                            f"Data successfully exported to {file_name_base}",
+                            os.path.dirname(log_path),
+                        )
+
+                    except CmdException:
+                        progress_dialog.close()
+                        show_failure(
+                            "Invalid file",
+                            f"The created file is not a valid {model_name} XTF file. Open the logs for more details on the error.",
+                            log_path,
+                        )
+                        continue
+
+                    progress_dialog.setValue(progress + 20)
 
-        else:
-            progress_dialog.close()
-            show_failure(
-                "No supported model",
-                f"The selected {emodel} is not supported yet.",
-                log_path,
-            )
-            return
+            else:
+                progress_dialog.close()
+                show_failure(
+                    "No supported model",
+                    f"The selected {emodel} is not supported yet.",
+                    log_path,
+                )
+                return
 
-        progress_dialog.setValue(100)
+            progress_dialog.setValue(100)
+        finally:
+            job_schema.drop()
 
         # show_success(
         # "Sucess",
@@ -4,7 +4,6 @@ from qgis.core import QgsFeature, QgsProject
 from qgis.PyQt.QtCore import Qt
 from qgis.PyQt.QtWidgets import QHeaderView, QListWidgetItem, QTreeWidgetItem
 from qgis.utils import iface
-from sqlalchemy.orm import aliased
 
 from ...qgep.model_qgep import get_qgep_model
 from .base import Editor
@@ -162,62 +161,8 @@ class ExaminationEditor(Editor):
                 break
 
     def _get_suggested_structures(self):
-
-        from_id = self.obj.from_point_identifier
-        to_id = self.obj.to_point_identifier
-
-        if from_id is not None and to_id is not None:
-            # If both from/to point identifier are set, we are trying to find a channel
-            structures_nrm = self._get_suggested_structures_for_channel(from_id, to_id)
-            structures_rev = self._get_suggested_structures_for_channel(to_id, from_id)
-            return list(structures_nrm) + list(structures_rev)
-        elif from_id is not None:
-            # If just from point identifier is set, we are trying to find a manhole
-            structures = self._get_suggested_structures_for_manhole(from_id)
-            return list(structures)
-        else:
-            # Otherwise we don't have anything to suggest
-            return []
-
-    def _get_suggested_structures_for_channel(self, from_id, to_id):
-
-        QGEP = get_qgep_model()
-
-        wastewater_ne_from = aliased(QGEP.wastewater_networkelement)
-        wastewater_ne_to = aliased(QGEP.wastewater_networkelement)
-        rp_from = aliased(QGEP.reach_point)
-        rp_to = aliased(QGEP.reach_point)
-        wastewater_st_from = aliased(QGEP.wastewater_structure)
-        wastewater_st_to = aliased(QGEP.wastewater_structure)
-
-        return (
-            self.session.query(QGEP.wastewater_structure)
-            .join(QGEP.reach)
-            .join(rp_from, rp_from.obj_id == QGEP.reach.fk_reach_point_from)
-            .join(
-                wastewater_ne_from,
-                wastewater_ne_from.obj_id == rp_from.fk_wastewater_networkelement,
-            )
-            .join(
-                wastewater_st_from,
-                wastewater_st_from.obj_id == wastewater_ne_from.fk_wastewater_structure,
-            )
-            .join(rp_to, rp_to.obj_id == QGEP.reach.fk_reach_point_to)
-            .join(wastewater_ne_to, wastewater_ne_to.obj_id == rp_to.fk_wastewater_networkelement)
-            .join(
-                wastewater_st_to,
-                wastewater_st_to.obj_id == wastewater_ne_to.fk_wastewater_structure,
-            )
-            .filter(wastewater_st_from.identifier == from_id, wastewater_st_to.identifier == to_id)
-        )
-
-    def _get_suggested_structures_for_manhole(self, from_id):
-
-        QGEP = get_qgep_model()
-
-        return self.session.query(QGEP.wastewater_structure).filter(
-            QGEP.wastewater_structure.identifier == from_id
-        )
+        # the suggestions of all the examinations are loaded at once (see GuiImport.init_with_session)
+        return self.main_dialog.structure_suggestions.get(self.obj)
 
     def _get_assigned_structures(self):
 
@@ -4,7 +4,7 @@ from collections import defaultdict
 
 from qgis.core import Qgis
 from qgis.PyQt.QtCore import Qt
-from qgis.PyQt.QtGui import QFont
+from qgis.PyQt.QtGui import QBrush, QColor, QFont
 from qgis.PyQt.QtWidgets import QDialog, QHeaderView, QTreeWidgetItem
 from qgis.PyQt.uic import loadUi
 from qgis.utils import iface
@@ -14,6 +14,7 @@ from sqlalchemy.orm import Session
 # 31.5.2024 pfad angepasst, neu in gui_import.py statt _init_.py
 from ..postimport import qgep_postimport
 from ..qgep.model_qgep import get_qgep_model
+from ..utils.qgep_import_utils import StagingDiff, StructureSuggestions
 from .editors.base import Editor
 
 # neu 27.4.2023
@@ -36,6 +37,11 @@ class GuiImport(QDialog):
         header.setSectionResizeMode(QHeaderView.ResizeToContents)
         header.setSectionResizeMode(0, QHeaderView.Stretch)
 
+        self.session = None
+        self.diff = None
+        # the staging schema reviewed with a diff, kept until the diff is applied or discarded
+        self.job_schema = None
+
         # Not required here, but this way we load before opening the dialog
         get_qgep_model()
 
@@ -45,6 +51,13 @@ class GuiImport(QDialog):
         """
         self.session = session
 
+        # wastewater structures suggested for the examinations, queried at once for all of them
+        QGEP = get_qgep_model()
+        self.structure_suggestions = StructureSuggestions(session, QGEP)
+        self.structure_suggestions.prefetch(
+            obj for obj in session if isinstance(obj, QGEP.examination)
+        )
+
         self.category_items = defaultdict(QTreeWidgetItem)  # keys are instances' classes
         self.editors = {}
 
@@ -60,6 +73,167 @@ class GuiImport(QDialog):
         self.resize(iface.mainWindow().size() * 0.75)
         self.show()
 
+    def init_with_diff(self, diff: StagingDiff):
+        """
+        Shows the dialog with a diff of the staging schema, and executes the dialog allowing to filter the rows to
+        import. The objects are only loaded page by page when expanding their class.
+        """
+        self.diff = diff
+
+        self.diff_rows = {}  # keys are (class_name, obj_id)
+        self.diff_counts = {}  # keys are class names, values are [count, accepted]
+        self.diff_loading = False
+
+        self.debugGroupBox.setChecked(False)
+
+        self.treeWidget.clear()
+        self.diff_loading = True
+        for class_name, count, new, modified, invalid, accepted in diff.counts():
+            self.diff_counts[class_name] = [count, accepted]
+            item = QTreeWidgetItem()
+            item.setData(0, Qt.UserRole, (class_name, None))
+            item.setText(0, f"{class_name} ({count})")
+            item.setText(1, f"{new} new, {modified} modified")
+            item.setText(2, f"{invalid} invalid")
+            item.setFont(0, QFont(QFont().defaultFamily(), weight=QFont.Weight.Bold))
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            self.update_diff_class_item(item)
+            self.treeWidget.addTopLevelItem(item)
+        self.diff_loading = False
+
+        self.treeWidget.itemChanged.connect(self.diff_item_changed)
+        self.treeWidget.itemExpanded.connect(self.diff_item_expanded)
+        self.treeWidget.itemClicked.connect(self.diff_item_clicked)
+        self.treeWidget.currentItemChanged.connect(self.diff_current_item_changed)
+
+        # Execute the dialog
+        self.resize(iface.mainWindow().size() * 0.75)
+        self.show()
+
+    def update_diff_class_item(self, item):
+        """
+        Checks the class item according to its accepted objects
+        """
+        class_name, _ = item.data(0, Qt.UserRole)
+        count, accepted = self.diff_counts[class_name]
+        if accepted == 0:
+            item.setCheckState(0, Qt.Unchecked)
+        elif accepted == count:
+            item.setCheckState(0, Qt.Checked)
+        else:
+            item.setCheckState(0, Qt.PartiallyChecked)
+
+    def load_diff_page(self, class_item):
+        """
+        Adds the next page of objects to the class item, followed by an item to load more if needed
+        """
+        class_name, _ = class_item.data(0, Qt.UserRole)
+        offset = class_item.childCount()
+
+        # replace the item to load more
+        if offset and class_item.child(offset - 1).data(0, Qt.UserRole)[1] is None:
+            class_item.removeChild(class_item.child(offset - 1))
+            offset -= 1
+
+        rows = self.diff.page(class_name, offset)
+
+        self.diff_loading = True
+        for row in rows:
+            row = dict(row)
+            self.diff_rows[(class_name, row["obj_id"])] = row
+            item = QTreeWidgetItem()
+            item.setData(0, Qt.UserRole, (class_name, row["obj_id"]))
+            item.setText(0, row["identifier"] or row["obj_id"])
+            item.setToolTip(0, row["obj_id"])
+            item.setText(1, row["status"])
+            item.setText(2, row["validity"])
+            if row["status"] == StagingDiff.UNCHANGED:
+                color = "lightgray"
+            elif row["validity"] == StagingDiff.INVALID:
+                color = "red"
+            elif row["validity"] == StagingDiff.WARNING:
+                color = "orange"
+            else:
+                color = "lightgreen"
+            item.setBackground(2, QBrush(QColor(color)))
+            item.setCheckState(0, Qt.Checked if row["accepted"] else Qt.Unchecked)
+            class_item.addChild(item)
+
+        if len(rows) == StagingDiff.PAGE_SIZE:
+            item = QTreeWidgetItem()
+            item.setData(0, Qt.UserRole, (class_name, None))
+            item.setText(0, "Load more...")
+            class_item.addChild(item)
+        self.diff_loading = False
+
+    def diff_item_expanded(self, item):
+        if item.parent() is None and item.childCount() == 0:
+            self.load_diff_page(item)
+
+    def diff_item_clicked(self, item, column):
+        class_name, obj_id = item.data(0, Qt.UserRole)
+        if item.parent() is not None and obj_id is None:
+            self.load_diff_page(item.parent())
+
+    def diff_item_changed(self, item, column):
+        """
+        Accepts or rejects the item's objects in the diff
+        """
+        if self.diff_loading or column != 0:
+            return
+
+        checked = item.checkState(0) == Qt.Checked
+        class_name, obj_id = item.data(0, Qt.UserRole)
+        counts = self.diff_counts[class_name]
+
+        self.diff_loading = True
+        if item.parent() is None:
+            if item.checkState(0) == Qt.PartiallyChecked:
+                self.diff_loading = False
+                return
+            # accept or reject the whole class, including the objects that are not loaded yet
+            self.diff.set_accepted(class_name, checked)
+            counts[1] = counts[0] if checked else 0
+            for child in [item.child(i) for i in range(item.childCount())]:
+                child_obj_id = child.data(0, Qt.UserRole)[1]
+                if child_obj_id is not None:
+                    self.diff_rows[(class_name, child_obj_id)]["accepted"] = checked
+                    child.setCheckState(0, item.checkState(0))
+        elif obj_id is not None:
+            row = self.diff_rows[(class_name, obj_id)]
+            if checked != row["accepted"]:
+                self.diff.set_accepted(class_name, checked, [obj_id])
+                row["accepted"] = checked
+                counts[1] += 1 if checked else -1
+            self.update_diff_class_item(item.parent())
+        self.diff_loading = False
+
+    def diff_current_item_changed(self, current_item, previous_item):
+        """
+        Shows the validity and the data of the currently selected object
+        """
+        self.debugTextEdit.clear()
+        self.validityLabel.clear()
+        self.validityLabel.setStyleSheet("background-color: lightgray; padding: 15px;")
+        if current_item is None:
+            return
+
+        row = self.diff_rows.get(tuple(current_item.data(0, Qt.UserRole)))
+        if row is None:
+            return
+
+        self.validityLabel.setText(row["message"] or row["validity"])
+        if row["validity"] == StagingDiff.INVALID:
+            self.validityLabel.setStyleSheet("background-color: red; padding: 15px;")
+        elif row["validity"] == StagingDiff.WARNING:
+            self.validityLabel.setStyleSheet("background-color: orange; padding: 15px;")
+        elif row["validity"] == StagingDiff.VALID:
+            self.validityLabel.setStyleSheet("background-color: lightgreen; padding: 15px;")
+
+        self.debugTextEdit.append("-- DIFF --")
+        for key, val in row.items():
+            self.debugTextEdit.append(f"{key}: {val}")
+
     def update_tree(self):
         """
         Populates the tree, creating/updating items
@@ -214,7 +388,10 @@ class GuiImport(QDialog):
         self.stackedWidget.setCurrentWidget(editor.widget)
 
     def rollback_session(self, emessage):
-        self.session.rollback()
+        if self.diff is not None:
+            self.diff.discard()
+        else:
+            self.session.rollback()
 
         iface.messageBar().pushMessage(
             "Error", "An error occurred: rollback_session activated!", level=Qgis.Warning
@@ -228,7 +405,9 @@ class GuiImport(QDialog):
             )
             iface.messageBar().pushMessage("Error", "Import was canceled", level=Qgis.Warning)
 
-        self.session.close()
+        if self.session is not None:
+            self.session.close()
+        self.drop_job_schema()
 
     def commit_session(self):
         # TODO : rollback to pre-commit state, allowing user to try to fix issues
@@ -240,6 +419,30 @@ class GuiImport(QDialog):
             "Please be patient!", "Importing data in qgep - working ...", level=Qgis.Info
         )
 
+        if self.diff is not None:
+            try:
+                # the accepted new and modified objects, also to scope the postimport updates
+                obj_ids = self.diff.apply()
+            except Exception as e:
+                self.rollback_session(e)
+                return
+            self.drop_job_schema()
+
+            iface.messageBar().pushMessage(
+                "Sucess", "Data successfully imported", level=Qgis.Success
+            )
+            iface.messageBar().pushMessage("Info", "Start postimport", level=Qgis.Info)
+            qgep_postimport(obj_ids)
+            iface.messageBar().pushMessage("Sucess", "Finished postimport", level=Qgis.Success)
+            return
+
+        # the objects to import, to scope the postimport updates
+        obj_ids = {
+            obj.obj_id
+            for obj in list(self.session.new) + list(self.session.dirty)
+            if getattr(obj, "obj_id", None)
+        }
+
         try:
             self.session.commit()
         except Exception as e:
@@ -252,10 +455,15 @@ class GuiImport(QDialog):
 
         # add post session - in postimport.py
         iface.messageBar().pushMessage("Info", "Start postimport", level=Qgis.Info)
-        qgep_postimport()
+        qgep_postimport(obj_ids)
 
         iface.messageBar().pushMessage("Sucess", "Finished postimport", level=Qgis.Success)
 
+    def drop_job_schema(self):
+        if self.job_schema is not None:
+            self.job_schema.drop()
+            self.job_schema = None
+
     def get_obj_from_listitem(self, listitem):
         for obj, editor in self.editors.items():
             if editor.listitem == listitem:
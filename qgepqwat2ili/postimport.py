@@ -1,5 +1,6 @@
 # Needs delta_1.6.3_functions_update_fk_main_cover_main_wastewater_node.sql to work properly
 
+import collections
 
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import text
@@ -7,16 +8,164 @@ from sqlalchemy.sql import text
 # 31.5.2024 pfade anpassen
 # from .. import utils
 # from ..utils.various import logger
-from . import utils
-from .utils.various import logger
+from . import config, utils
+from .utils.various import logger, run_dependency_graph
 
 # from .model_abwasser import get_abwasser_model
 # from .model_qgep import get_qgep_model
 
 
-def qgep_postimport():
+# networkelements and wastewater structures affected by the imported objects : the imported ones, the
+# structures of the imported parts and networkelements, and the networkelements connected to the imported
+# reaches and reach points, with their structures
+AFFECTED_OBJECTS_SQL = """
+CREATE TEMP TABLE postimport_imported ON COMMIT DROP AS
+SELECT unnest(CAST(:obj_ids AS text[])) AS obj_id;
+
+CREATE TEMP TABLE postimport_reach_point ON COMMIT DROP AS
+SELECT rp.obj_id, rp.fk_wastewater_networkelement
+FROM qgep_od.reach_point rp
+WHERE rp.obj_id IN (
+    SELECT obj_id FROM postimport_imported
+    UNION SELECT r.fk_reach_point_from FROM qgep_od.reach r JOIN postimport_imported i ON i.obj_id = r.obj_id
+    UNION SELECT r.fk_reach_point_to FROM qgep_od.reach r JOIN postimport_imported i ON i.obj_id = r.obj_id
+);
+
+CREATE TEMP TABLE postimport_networkelement ON COMMIT DROP AS
+SELECT ne.obj_id, ne.fk_wastewater_structure
+FROM qgep_od.wastewater_networkelement ne
+WHERE ne.obj_id IN (
+    SELECT obj_id FROM postimport_imported
+    UNION SELECT fk_wastewater_networkelement FROM postimport_reach_point
+    UNION SELECT r.obj_id FROM qgep_od.reach r JOIN postimport_reach_point rp
+        ON rp.obj_id IN (r.fk_reach_point_from, r.fk_reach_point_to)
+);
+
+CREATE TEMP TABLE postimport_structure ON COMMIT DROP AS
+SELECT obj_id FROM qgep_od.wastewater_structure WHERE obj_id IN (SELECT obj_id FROM postimport_imported)
+UNION SELECT fk_wastewater_structure FROM qgep_od.structure_part
+    WHERE obj_id IN (SELECT obj_id FROM postimport_imported) AND fk_wastewater_structure IS NOT NULL
+UNION SELECT fk_wastewater_structure FROM postimport_networkelement WHERE fk_wastewater_structure IS NOT NULL;
+
+CREATE TEMP TABLE postimport_node ON COMMIT DROP AS
+SELECT wn.obj_id FROM qgep_od.wastewater_node wn
+JOIN qgep_od.wastewater_networkelement ne ON ne.obj_id = wn.obj_id
+WHERE wn.obj_id IN (SELECT obj_id FROM postimport_networkelement)
+   OR ne.fk_wastewater_structure IN (SELECT obj_id FROM postimport_structure);
+"""
+
+
+# objects of the network graph (qgep_network) affected by the imported ones : the affected reaches with their
+# reach points, and the wastewater nodes imported or connected to these reach points
+NETWORK_AFFECTED_SQL = """
+CREATE TEMP TABLE postimport_network_reach ON COMMIT DROP AS
+SELECT r.obj_id FROM qgep_od.reach r WHERE r.obj_id IN (SELECT obj_id FROM postimport_networkelement);
+
+CREATE TEMP TABLE postimport_network_reach_point ON COMMIT DROP AS
+SELECT obj_id FROM postimport_reach_point
+UNION SELECT r.fk_reach_point_from FROM qgep_od.reach r JOIN postimport_network_reach n ON n.obj_id = r.obj_id
+UNION SELECT r.fk_reach_point_to FROM qgep_od.reach r JOIN postimport_network_reach n ON n.obj_id = r.obj_id;
+
+CREATE TEMP TABLE postimport_network_node ON COMMIT DROP AS
+SELECT wn.obj_id FROM qgep_od.wastewater_node wn
+WHERE wn.obj_id IN (SELECT obj_id FROM postimport_imported)
+   OR wn.obj_id IN (SELECT rp.fk_wastewater_networkelement FROM qgep_od.reach_point rp
+                    JOIN postimport_network_reach_point n ON n.obj_id = rp.obj_id);
+"""
+
+# whether an affected reach is subdivided by blind connections (reach points on the reach itself), which only
+# the full refresh derives
+NETWORK_BLIND_CONNECTIONS_SQL = """
+SELECT EXISTS (
+    SELECT 1 FROM qgep_od.reach_point rp
+    WHERE rp.fk_wastewater_networkelement IN (SELECT obj_id FROM postimport_network_reach)
+) OR EXISTS (
+    SELECT 1 FROM qgep_network.segment s
+    WHERE s.ne_id IN (SELECT obj_id FROM postimport_network_reach) GROUP BY s.ne_id HAVING count(*) > 1
+);
+"""
+
+# deletes and re-inserts the segments and nodes derived from the affected reaches, reach points and wastewater
+# nodes, as qgep_network.refresh_network_simple() derives them for reaches without blind connections
+NETWORK_UPDATE_SQL = """
+DELETE FROM qgep_network.segment
+WHERE ne_id = ANY(CAST(:network_reach_ids AS text[]))
+   OR from_node IN (SELECT id FROM qgep_network.node
+                    WHERE rp_id = ANY(CAST(:network_reach_point_ids AS text[]))
+                       OR ne_id = ANY(CAST(:network_node_ids AS text[])))
+   OR to_node IN (SELECT id FROM qgep_network.node
+                  WHERE rp_id = ANY(CAST(:network_reach_point_ids AS text[]))
+                     OR ne_id = ANY(CAST(:network_node_ids AS text[])));
+
+DELETE FROM qgep_network.node
+WHERE rp_id = ANY(CAST(:network_reach_point_ids AS text[])) OR ne_id = ANY(CAST(:network_node_ids AS text[]));
+
+INSERT INTO qgep_network.node(node_type, ne_id, geom)
+SELECT 'wastewater_node', wn.obj_id, wn.situation_geometry
+FROM qgep_od.wastewater_node wn WHERE wn.obj_id = ANY(CAST(:network_node_ids AS text[]));
+
+INSERT INTO qgep_network.node(node_type, rp_id, geom)
+SELECT 'reach_point', rp.obj_id, rp.situation_geometry
+FROM qgep_od.reach_point rp WHERE rp.obj_id = ANY(CAST(:network_reach_point_ids AS text[]));
+
+INSERT INTO qgep_network.segment(segment_type, from_node, to_node, ne_id, geom)
+SELECT 'reach', n_from.id, n_to.id, r.obj_id, ST_CurveToLine(r.progression_geometry)
+FROM qgep_od.reach r
+JOIN qgep_network.node n_from ON n_from.rp_id = r.fk_reach_point_from
+JOIN qgep_network.node n_to ON n_to.rp_id = r.fk_reach_point_to
+WHERE r.obj_id = ANY(CAST(:network_reach_ids AS text[]));
+
+-- the reach points of the affected reaches and the ones connected to the affected wastewater nodes, from the
+-- wastewater node to the start of a reach and from the end of a reach to the wastewater node
+INSERT INTO qgep_network.segment(segment_type, from_node, to_node, geom)
+SELECT
+  'reach_point',
+  CASE WHEN r.obj_id IS NULL THEN n_rp.id ELSE n_wn.id END,
+  CASE WHEN r.obj_id IS NULL THEN n_wn.id ELSE n_rp.id END,
+  CASE WHEN r.obj_id IS NULL THEN ST_MakeLine(n_rp.geom, n_wn.geom) ELSE ST_MakeLine(n_wn.geom, n_rp.geom) END
+FROM qgep_od.reach_point rp
+JOIN qgep_network.node n_rp ON n_rp.rp_id = rp.obj_id
+JOIN qgep_network.node n_wn ON n_wn.ne_id = rp.fk_wastewater_networkelement
+LEFT JOIN qgep_od.reach r ON r.fk_reach_point_from = rp.obj_id
+WHERE rp.obj_id = ANY(CAST(:network_reach_point_ids AS text[]))
+   OR rp.fk_wastewater_networkelement = ANY(CAST(:network_node_ids AS text[]));
+"""
+
+# a post-import query, run on its own connection once the steps it depends on are done
+PostImportStep = collections.namedtuple("PostImportStep", ["name", "sql", "depends_on"])
+
+
+def run_steps(steps, params=None, workers=3):
+    """
+    Runs the steps in parallel on separate connections, each step starting when the steps it depends on
+    are committed (see utils.various.run_dependency_graph).
+    """
+    engine = utils.sqlalchemy.create_engine()
+
+    def run(step):
+        with engine.begin() as connection:
+            connection.execute(text(step.sql), params or {})
+
+    try:
+        run_dependency_graph(steps, run, workers, label="Post-import step")
+    finally:
+        engine.dispose()
+
+
+def qgep_postimport(obj_ids=None):
     """
     Additional queries run after qgep_import
+
+    The updates of the wastewater structures run one after the other, as they update the same rows, while
+    the wastewater node symbology and the network refresh run in parallel.
+
+    With obj_ids, only the network segments and nodes derived from the affected reaches, reach points and
+    wastewater nodes are updated (see NETWORK_UPDATE_SQL). The network is rebuilt completely when more than
+    config.NETWORK_REFRESH_MAX_CHANGES of them are affected or an affected reach has blind connections.
+
+    Args:
+        obj_ids: optional obj_ids of the imported objects, to update the wastewater structures and nodes
+                 affected by them only (see AFFECTED_OBJECTS_SQL) instead of the whole database
     """
 
     # move in extra file and function postimport
@@ -28,34 +177,103 @@ def qgep_postimport():
     post_session.execute(text("SELECT qgep_sys.create_symbology_triggers();"))
     logger.info("symbology triggers successfully created! (postimport.py)")
 
-    # add queries for main_cover and main_node as in TEKSI, add to symbology functions
-    # see teksi ww https://github.com/teksi/wastewater/blob/3acfba249866d299f8a22e249d9f1e475fe7b88d/datamodel/app/symbology_functions.sql#L290
-    # needs delta_1.6.3_functions_update_fk_main_cover_main_wastewater_node.sql
-    logger.info("Update wastewater structure fk_main_cover")
-    post_session.execute(
-        text("SELECT qgep_od.wastewater_structure_update_fk_main_cover('', True);")
-    )
-
-    logger.info("Update wastewater structure fk_main_wastewater_node")
-    post_session.execute(
-        text("SELECT qgep_od.wastewater_structure_update_fk_main_wastewater_node('', True);")
-    )
-
-    # add symbology update queries - backporting from tww https://github.com/teksi/wastewater/pull/263
-    logger.info("update_wastewater_node_symbology for all datasets - please be patient")
-    post_session.execute(text("SELECT qgep_od.update_wastewater_node_symbology(NULL, True);"))
-
-    logger.info("update_wastewater_node_symbology for all datasets - please be patient")
-    logger.info("update_wastewater_structure_label for all datasets - please be patient")
-    post_session.execute(text("SELECT qgep_od.update_wastewater_structure_label(NULL, True);"))
-
-    logger.info("update_wastewater_node_symbology for all datasets - please be patient")
-    # update_wastewater_structure_symbology instead of update_wn_symbology_by_overflow (tww)
-    logger.info("update_wastewater_structure_symbology for all datasets - please be patient")
-    post_session.execute(text("SELECT qgep_od.update_wastewater_structure_symbology(NULL, True);"))
-
-    logger.info("Refresh materialized views")
-    post_session.execute(text("SELECT qgep_network.refresh_network_simple();"))
-
+    params = {}
+    if obj_ids is not None:
+        # the affected ids are passed to the steps, as temp tables are not shared between connections
+        post_session.execute(text(AFFECTED_OBJECTS_SQL), {"obj_ids": list(obj_ids)})
+        params["structure_ids"] = [
+            row[0]
+            for row in post_session.execute(text("SELECT obj_id FROM postimport_structure;"))
+        ]
+        params["node_ids"] = [
+            row[0] for row in post_session.execute(text("SELECT obj_id FROM postimport_node;"))
+        ]
+        logger.info(
+            f"Updating the {len(params['structure_ids'])} wastewater structures and {len(params['node_ids'])} wastewater nodes affected by {len(obj_ids)} imported objects"
+        )
+        # the network graph is derived from the reaches, reach points and wastewater nodes only
+        post_session.execute(text(NETWORK_AFFECTED_SQL))
+        for param, table in [
+            ("network_reach_ids", "postimport_network_reach"),
+            ("network_reach_point_ids", "postimport_network_reach_point"),
+            ("network_node_ids", "postimport_network_node"),
+        ]:
+            params[param] = [
+                row[0] for row in post_session.execute(text(f"SELECT obj_id FROM {table};"))
+            ]
+        network_changes = sum(
+            len(params[param])
+            for param in ["network_reach_ids", "network_reach_point_ids", "network_node_ids"]
+        )
+        blind_connections = (
+            network_changes and post_session.execute(text(NETWORK_BLIND_CONNECTIONS_SQL)).scalar()
+        )
     post_session.commit()
     post_session.close()
+
+    def update(function, all_args, affected_ids):
+        """
+        Query calling the update function for all datasets, or for each affected obj_id
+        """
+        if obj_ids is None:
+            return f"SELECT {function}({all_args});"
+        return f"SELECT {function}(obj_id, False) FROM unnest(CAST(:{affected_ids} AS text[])) AS obj_id;"
+
+    steps = [
+        # add queries for main_cover and main_node as in TEKSI, add to symbology functions
+        # see teksi ww https://github.com/teksi/wastewater/blob/3acfba249866d299f8a22e249d9f1e475fe7b88d/datamodel/app/symbology_functions.sql#L290
+        # needs delta_1.6.3_functions_update_fk_main_cover_main_wastewater_node.sql
+        PostImportStep(
+            "fk_main_cover",
+            update(
+                "qgep_od.wastewater_structure_update_fk_main_cover", "'', True", "structure_ids"
+            ),
+            [],
+        ),
+        PostImportStep(
+            "fk_main_wastewater_node",
+            update(
+                "qgep_od.wastewater_structure_update_fk_main_wastewater_node",
+                "'', True",
+                "structure_ids",
+            ),
+            ["fk_main_cover"],
+        ),
+        # add symbology update queries - backporting from tww https://github.com/teksi/wastewater/pull/263
+        PostImportStep(
+            "wastewater_node_symbology",
+            update("qgep_od.update_wastewater_node_symbology", "NULL, True", "node_ids"),
+            [],
+        ),
+        PostImportStep(
+            "wastewater_structure_label",
+            update("qgep_od.update_wastewater_structure_label", "NULL, True", "structure_ids"),
+            ["fk_main_wastewater_node"],
+        ),
+        # update_wastewater_structure_symbology instead of update_wn_symbology_by_overflow (tww)
+        PostImportStep(
+            "wastewater_structure_symbology",
+            update("qgep_od.update_wastewater_structure_symbology", "NULL, True", "structure_ids"),
+            ["wastewater_structure_label"],
+        ),
+    ]
+    if obj_ids is None:
+        # materialized views
+        steps.append(
+            PostImportStep("network", "SELECT qgep_network.refresh_network_simple();", [])
+        )
+    elif not network_changes:
+        logger.info("No reach, reach point or wastewater node imported, network not refreshed")
+    elif network_changes > config.NETWORK_REFRESH_MAX_CHANGES or blind_connections:
+        logger.info(
+            f"{network_changes} reaches, reach points and wastewater nodes affected (or blind connections), network refreshed completely"
+        )
+        steps.append(
+            PostImportStep("network", "SELECT qgep_network.refresh_network_simple();", [])
+        )
+    else:
+        logger.info(
+            f"Updating the network segments and nodes of {network_changes} reaches, reach points and wastewater nodes"
+        )
+        steps.append(PostImportStep("network", NETWORK_UPDATE_SQL, []))
+    run_steps(steps, params)
@@ -1,24 +1,29 @@
 import json
 
 from geoalchemy2.functions import ST_Force2D
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import text
 
 from .. import utils
 from ..utils.basket_utils import BasketUtils
 from ..utils.qgep_export_utils import (
+    SELECTION_WWS_TABLE,
     QgepExportUtils,
+    SelectionQuery,
     add_to_selection,
+    create_selection_table,
     filter_reaches,
     get_connected_overflow_to_wn_ids,
     get_connected_we_from_re,
     get_connected_we_to_re,
     get_ws_ids,
     get_ws_selected_ww_networkelements,
+    read_selection,
     remove_from_selection,
 )
 from ..utils.various import logger
+from .mapping import get_qgep_mapping
 from .model_abwasser import get_abwasser_model
 from .model_qgep import get_qgep_model
 
@@ -37,8 +42,12 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
     # Logging disabled (very slow)
     # qgep_session = Session(utils.sqlalchemy.create_engine(logger_name="qgep"), autocommit=False, autoflush=False)
     # abwasser_session = Session(utils.sqlalchemy.create_engine(logger_name="abwasser"), autocommit=False, autoflush=False)
-    qgep_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
-    abwasser_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    qgep_session = Session(
+        utils.sqlalchemy.create_engine(target="source"), autocommit=False, autoflush=False
+    )
+    abwasser_session = Session(
+        utils.sqlalchemy.create_engine(target="staging"), autocommit=False, autoflush=False
+    )
     tid_maker = utils.ili2db.TidMaker(id_attribute="obj_id")
 
     # backport from tww https://github.com/teksi/wastewater/blob/3acfba249866d299f8a22e249d9f1e475fe7b88d/plugin/teksi_wastewater/interlis/interlis_model_mapping/interlis_exporter_to_intermediate_schema.py#L83
@@ -57,6 +66,12 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
     # 1. Filtering - check if selection
     filtered = selection is not None
 
+    # Store the selection in a temporary table, so the export queries join it instead of id lists
+    subset_filter = create_selection_table(qgep_session, selection or [])
+    if isinstance(selection, SelectionQuery):
+        # a spatial selection is inserted from the database, its id's are read for the selection expansion
+        selection = read_selection(qgep_session, subset_filter)
+
     # Logging for debugging
     logger.debug(f"print filtered '{str(filtered)}'")
 
@@ -205,6 +220,10 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
         labelorientation = orientation
     else:
         labelorientation = 0
+    logger.info(f"modulo_angle - added orientation: {labelorientation}")
+
+    # Store the selected wastewater structures in a temporary table as well
+    subset_wws_filter = create_selection_table(qgep_session, subset_wws_ids, SELECTION_WWS_TABLE)
 
     qgep_export_utils = QgepExportUtils(
         tid_maker=tid_maker,
@@ -218,8 +237,13 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
         subset_ids=subset_ids,
         subset_wws_ids=subset_wws_ids,
         ws_off_sia405abwasser=ws_off_sia405abwasser,
+        subset_filter=subset_filter,
+        subset_wws_filter=subset_wws_filter,
     )
 
+    # Report values that will be truncated or are missing once, instead of for each exported row
+    qgep_export_utils.check_export_values(get_qgep_mapping())
+
     # ADAPTED FROM 052a_sia405_abwasser_2015_2_d_interlisexport2.sql
     logger.info("Exporting QGEP.organisation -> ABWASSER.organisation, ABWASSER.metaattribute")
     qgep_export_utils.export_organisation()
@@ -230,45 +254,33 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
     logger.info("Exporting QGEP.manhole -> ABWASSER.normschacht, ABWASSER.metaattribute")
     qgep_export_utils.export_manhole()
 
+    # the wastewater structures of the selected networkelements
+    selected_ws_ids = select([qgep_model.wastewater_networkelement.fk_wastewater_structure]).where(
+        qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
+    )
+
     logger.info("Exporting QGEP.discharge_point -> ABWASSER.einleitstelle, ABWASSER.metaattribute")
     query = qgep_session.query(qgep_model.discharge_point)
     if filtered:
-        query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
-        )
-    for row in query:
-        # AVAILABLE FIELDS IN QGEP.discharge_point
-
-        # --- wastewater_structure ---
-        # to do attributeslist of superclass
-        # --- discharge_point ---
-        # to do attributeslist of subclass
-        # to do extra funktion schreiben wo alle englischen attribute erzeugt werden
-
-        # --- _bwrel_ ---
-        # to do extra funktion schreiben wo alle fk auf diese superklasse erzeugt werden z.B. # measuring_point__BWREL_fk_wastewater_structure,
-
-        # --- _rel_ ---
-        # to do extra funktion schreiben wo alle fk auf diese klasse erzeugt werden z.B. # accessibility__REL, bedding_encasement__REL,
-
-        einleitstelle = abwasser_model.einleitstelle(
-            # FIELDS TO MAP TO ABWASSER.einleitstelle
-            # --- baseclass ---
-            # --- sia405_baseclass ---
-            **qgep_export_utils.base_common(row, "einleitstelle"),
+        # a subquery, as a join would return the structure once per selected networkelement
+        query = query.filter(qgep_model.discharge_point.obj_id.in_(selected_ws_ids))
+    # pure column mappings, exported column by column instead of row by row
+    qgep_export_utils.export_columnar(
+        query,
+        abwasser_model.einleitstelle,
+        "einleitstelle",
+        {
             # --- abwasserbauwerk ---
-            **qgep_export_utils.wastewater_structure_common(row),
+            **qgep_export_utils.wastewater_structure_columns(qgep_model.discharge_point),
             # --- einleitstelle ---
-            hochwasserkote=row.highwater_level,
+            "hochwasserkote": qgep_model.discharge_point.highwater_level,
             # -- attribute 3D ---
             # maechtigkeit=row.depth,
-            relevanz=qgep_export_utils.get_vl(row.relevance__REL),
-            terrainkote=row.terrain_level,
-            wasserspiegel_hydraulik=row.waterlevel_hydraulic,
-        )
-        abwasser_session.add(einleitstelle)
-        qgep_export_utils.create_metaattributes(row)
-        print(".", end="")
+            "relevanz": qgep_export_utils.vl_column(qgep_model.discharge_point.relevance),
+            "terrainkote": qgep_model.discharge_point.terrain_level,
+            "wasserspiegel_hydraulik": qgep_model.discharge_point.waterlevel_hydraulic,
+        },
+    )
     logger.info("done")
     abwasser_session.flush()
 
@@ -282,52 +294,44 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
     )
     query = qgep_session.query(qgep_model.infiltration_installation)
     if filtered:
-        query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
-        )
-    for row in query:
-        # AVAILABLE FIELDS IN QGEP.infiltration_installation
-
-        # --- wastewater_structure ---
-        # _bottom_label, _cover_label, _depth, _function_hierarchic, _input_label, _label, _output_label, _usage_current, accessibility, contract_section, detail_geometry_geometry, financing, fk_dataowner, fk_main_cover, fk_main_wastewater_node, fk_operator, fk_owner, fk_provider, gross_costs, identifier, inspection_interval, last_modification, location_name, records, remark, renovation_necessity, replacement_value, rv_base_year, rv_construction_type, status, structure_condition, subsidies, year_of_construction, year_of_replacement
-
-        # --- infiltration_installation ---
-        # absorption_capacity, defects, dimension1, dimension2, distance_to_aquifer, effective_area, emergency_spillway, fk_aquifier, kind, labeling, obj_id, seepage_utilization, upper_elevation, vehicle_access, watertightness
-
-        # --- _bwrel_ ---
-        # measuring_point__BWREL_fk_wastewater_structure, mechanical_pretreatment__BWREL_fk_infiltration_installation, mechanical_pretreatment__BWREL_fk_wastewater_structure, re_maintenance_event_wastewater_structure__BWREL_fk_wastewater_structure, retention_body__BWREL_fk_infiltration_installation, structure_part__BWREL_fk_wastewater_structure, txt_symbol__BWREL_fk_wastewater_structure, txt_text__BWREL_fk_wastewater_structure, wastewater_networkelement__BWREL_fk_wastewater_structure, wastewater_structure_symbol__BWREL_fk_wastewater_structure, wastewater_structure_text__BWREL_fk_wastewater_structure, wwtp_structure_kind__BWREL_obj_id
-
-        # --- _rel_ ---
-        # accessibility__REL, defects__REL, emergency_spillway__REL, financing__REL, fk_aquifier__REL, fk_dataowner__REL, fk_main_cover__REL, fk_main_wastewater_node__REL, fk_operator__REL, fk_owner__REL, fk_provider__REL, kind__REL, labeling__REL, renovation_necessity__REL, rv_construction_type__REL, seepage_utilization__REL, status__REL, structure_condition__REL, vehicle_access__REL, watertightness__REL
-
-        logger.info(
-            "QGEP field infiltration_installation.upper_elevation is part of 3D extension. It will be ignored."
-        )
-        versickerungsanlage = abwasser_model.versickerungsanlage(
-            # FIELDS TO MAP TO ABWASSER.versickerungsanlage
-            # --- baseclass ---
-            # --- sia405_baseclass ---
-            **qgep_export_utils.base_common(row, "versickerungsanlage"),
+        # a subquery, as a join would return the structure once per selected networkelement
+        query = query.filter(qgep_model.infiltration_installation.obj_id.in_(selected_ws_ids))
+    logger.info(
+        "QGEP field infiltration_installation.upper_elevation is part of 3D extension. It will be ignored."
+    )
+    qgep_export_utils.export_columnar(
+        query,
+        abwasser_model.versickerungsanlage,
+        "versickerungsanlage",
+        {
             # --- abwasserbauwerk ---
-            **qgep_export_utils.wastewater_structure_common(row),
+            **qgep_export_utils.wastewater_structure_columns(qgep_model.infiltration_installation),
             # --- versickerungsanlage ---
             # TODO : NOT MAPPED : upper_elevation
-            art=qgep_export_utils.get_vl(row.kind__REL),
-            beschriftung=qgep_export_utils.get_vl(row.labeling__REL),
-            dimension1=row.dimension1,
-            dimension2=row.dimension2,
-            gwdistanz=row.distance_to_aquifer,
-            maengel=qgep_export_utils.get_vl(row.defects__REL),
-            notueberlauf=qgep_export_utils.get_vl(row.emergency_spillway__REL),
-            saugwagen=qgep_export_utils.get_vl(row.vehicle_access__REL),
-            schluckvermoegen=row.absorption_capacity,
-            versickerungswasser=qgep_export_utils.get_vl(row.seepage_utilization__REL),
-            wasserdichtheit=qgep_export_utils.get_vl(row.watertightness__REL),
-            wirksameflaeche=row.effective_area,
-        )
-        abwasser_session.add(versickerungsanlage)
-        qgep_export_utils.create_metaattributes(row)
-        print(".", end="")
+            "art": qgep_export_utils.vl_column(qgep_model.infiltration_installation.kind),
+            "beschriftung": qgep_export_utils.vl_column(
+                qgep_model.infiltration_installation.labeling
+            ),
+            "dimension1": qgep_model.infiltration_installation.dimension1,
+            "dimension2": qgep_model.infiltration_installation.dimension2,
+            "gwdistanz": qgep_model.infiltration_installation.distance_to_aquifer,
+            "maengel": qgep_export_utils.vl_column(qgep_model.infiltration_installation.defects),
+            "notueberlauf": qgep_export_utils.vl_column(
+                qgep_model.infiltration_installation.emergency_spillway
+            ),
+            "saugwagen": qgep_export_utils.vl_column(
+                qgep_model.infiltration_installation.vehicle_access
+            ),
+            "schluckvermoegen": qgep_model.infiltration_installation.absorption_capacity,
+            "versickerungswasser": qgep_export_utils.vl_column(
+                qgep_model.infiltration_installation.seepage_utilization
+            ),
+            "wasserdichtheit": qgep_export_utils.vl_column(
+                qgep_model.infiltration_installation.watertightness
+            ),
+            "wirksameflaeche": qgep_model.infiltration_installation.effective_area,
+        },
+    )
     logger.info("done")
     abwasser_session.flush()
 
@@ -350,43 +354,26 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
 
         query = qgep_session.query(qgep_model.wastewater_node)
         if filtered:
-            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
             # add sql statement to logger
             statement = query.statement
             logger.debug(f" selection query = {statement}")
-        for row in query:
-            # AVAILABLE FIELDS IN QGEP.wastewater_node
-
-            # --- wastewater_networkelement ---
-            # fk_dataowner, fk_provider, fk_wastewater_structure, identifier, last_modification, remark
-
-            # --- wastewater_node ---
-
-            # --- _bwrel_ ---
-            # catchment_area__BWREL_fk_wastewater_networkelement_rw_current, catchment_area__BWREL_fk_wastewater_networkelement_rw_planned, catchment_area__BWREL_fk_wastewater_networkelement_ww_current, catchment_area__BWREL_fk_wastewater_networkelement_ww_planned, connection_object__BWREL_fk_wastewater_networkelement, hydraulic_char_data__BWREL_fk_wastewater_node, overflow__BWREL_fk_overflow_to, overflow__BWREL_fk_wastewater_node, reach_point__BWREL_fk_wastewater_networkelement, throttle_shut_off_unit__BWREL_fk_wastewater_node, wastewater_structure__BWREL_fk_main_wastewater_node
-
-            # --- _rel_ ---
-            # fk_dataowner__REL, fk_hydr_geometry__REL, fk_provider__REL, fk_wastewater_structure__REL
-
-            # QGEP field wastewater_node.fk_hydr_geometry has no equivalent in the interlis model. It will be ignored.
-
-            abwasserknoten = abwasser_model.abwasserknoten(
-                # FIELDS TO MAP TO ABWASSER.abwasserknoten
-                # --- baseclass ---
-                # --- sia405_baseclass ---
-                **qgep_export_utils.base_common(row, "abwasserknoten"),
+        # QGEP field wastewater_node.fk_hydr_geometry has no equivalent in the interlis model. It will be ignored.
+        qgep_export_utils.export_columnar(
+            query,
+            abwasser_model.abwasserknoten,
+            "abwasserknoten",
+            {
                 # --- abwassernetzelement ---
-                # **qgep_export_utils.wastewater_networkelement_common(row),
-                **qgep_export_utils.wastewater_networkelement_common_check_fk_in_subset(row),
+                **qgep_export_utils.wastewater_networkelement_columns(
+                    qgep_model.wastewater_node, check_fk_in_subset=True
+                ),
                 # --- abwasserknoten ---
-                # TODO : WARNING : fk_hydr_geometry is not mapped
-                lage=ST_Force2D(row.situation_geometry),
-                rueckstaukote=row.backflow_level,
-                sohlenkote=row.bottom_level,
-            )
-            abwasser_session.add(abwasserknoten)
-            qgep_export_utils.create_metaattributes(row)
-            print(".", end="")
+                "lage": ST_Force2D(qgep_model.wastewater_node.situation_geometry),
+                "rueckstaukote": qgep_model.wastewater_node.backflow_level,
+                "sohlenkote": qgep_model.wastewater_node.bottom_level,
+            },
+        )
         logger.info("done")
         abwasser_session.flush()
 
@@ -407,42 +394,24 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
 
         query = qgep_session.query(qgep_model.wastewater_node)
         if filtered:
-            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
             # add sql statement to logger
             statement = query.statement
             logger.debug(f" selection query = {statement}")
-        for row in query:
-            # AVAILABLE FIELDS IN QGEP.wastewater_node
-
-            # --- wastewater_networkelement ---
-            # fk_dataowner, fk_provider, fk_wastewater_structure, identifier, last_modification, remark
-
-            # --- wastewater_node ---
-
-            # --- _bwrel_ ---
-            # catchment_area__BWREL_fk_wastewater_networkelement_rw_current, catchment_area__BWREL_fk_wastewater_networkelement_rw_planned, catchment_area__BWREL_fk_wastewater_networkelement_ww_current, catchment_area__BWREL_fk_wastewater_networkelement_ww_planned, connection_object__BWREL_fk_wastewater_networkelement, hydraulic_char_data__BWREL_fk_wastewater_node, overflow__BWREL_fk_overflow_to, overflow__BWREL_fk_wastewater_node, reach_point__BWREL_fk_wastewater_networkelement, throttle_shut_off_unit__BWREL_fk_wastewater_node, wastewater_structure__BWREL_fk_main_wastewater_node
-
-            # --- _rel_ ---
-            # fk_dataowner__REL, fk_hydr_geometry__REL, fk_provider__REL, fk_wastewater_structure__REL
-
-            # QGEP field wastewater_node.fk_hydr_geometry has no equivalent in the interlis model. It will be ignored.
-
-            abwasserknoten = abwasser_model.abwasserknoten(
-                # FIELDS TO MAP TO ABWASSER.abwasserknoten
-                # --- baseclass ---
-                # --- sia405_baseclass ---
-                **qgep_export_utils.base_common(row, "abwasserknoten"),
+        # QGEP field wastewater_node.fk_hydr_geometry has no equivalent in the interlis model. It will be ignored.
+        qgep_export_utils.export_columnar(
+            query,
+            abwasser_model.abwasserknoten,
+            "abwasserknoten",
+            {
                 # --- abwassernetzelement ---
-                **qgep_export_utils.wastewater_networkelement_common(row),
+                **qgep_export_utils.wastewater_networkelement_columns(qgep_model.wastewater_node),
                 # --- abwasserknoten ---
-                # TODO : WARNING : fk_hydr_geometry is not mapped
-                lage=ST_Force2D(row.situation_geometry),
-                rueckstaukote=row.backflow_level,
-                sohlenkote=row.bottom_level,
-            )
-            abwasser_session.add(abwasserknoten)
-            qgep_export_utils.create_metaattributes(row)
-            print(".", end="")
+                "lage": ST_Force2D(qgep_model.wastewater_node.situation_geometry),
+                "rueckstaukote": qgep_model.wastewater_node.backflow_level,
+                "sohlenkote": qgep_model.wastewater_node.bottom_level,
+            },
+        )
         logger.info("done")
         abwasser_session.flush()
 
@@ -505,7 +474,7 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
             query.join(qgep_model.re_maintenance_event_wastewater_structure)
             .join(qgep_model.wastewater_structure)
             .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
 
     for row in query:
@@ -576,7 +545,7 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
             .join(qgep_model.re_maintenance_event_wastewater_structure)
             .join(qgep_model.wastewater_structure)
             .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
     for row in query:
 
@@ -629,7 +598,7 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
             .join(qgep_model.re_maintenance_event_wastewater_structure)
             .join(qgep_model.wastewater_structure)
             .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
     for row in query:
 
@@ -724,7 +693,7 @@ def qgep_export_kek(selection=None, labels_file=None, orientation=None, basket_e
             .join(qgep_model.re_maintenance_event_wastewater_structure)
             .join(qgep_model.wastewater_structure)
             .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
     for row in query:
 
@@ -278,3 +278,11 @@ def get_qgep_mapping():
         # QGEP.wwtp_structure_kind: [ABWASSER.REPLACE_ME],
         # QGEP.zone: [ABWASSER.REPLACE_ME],
     }
+
+
+def get_import_classes():
+    """
+    Classes of qgep_od written by the import, which also links examinations to wastewater structures
+    """
+    QGEP = get_qgep_model()
+    return [*get_qgep_mapping(), QGEP.re_maintenance_event_wastewater_structure]
@@ -0,0 +1,417 @@
+from ..utils.qgep_import_utils import Geom3DValue, RefValue, StagingDiff, VlValue
+
+
+def wastewater_structure_common(QGEP):
+    return {
+        "accessibility": VlValue(QGEP.wastewater_structure_accessibility, "zugaenglichkeit"),
+        "contract_section": "baulos",
+        "detail_geometry_geometry": Geom3DValue("detailgeometrie"),
+        "financing": VlValue(QGEP.wastewater_structure_financing, "finanzierung"),
+        "fk_operator": RefValue("betreiberref"),
+        "fk_owner": RefValue("eigentuemerref"),
+        "gross_costs": "bruttokosten",
+        "identifier": "bezeichnung",
+        "inspection_interval": "inspektionsintervall",
+        "location_name": "standortname",
+        "records": "akten",
+        "remark": "bemerkung",
+        "renovation_necessity": VlValue(
+            QGEP.wastewater_structure_renovation_necessity, "sanierungsbedarf"
+        ),
+        "replacement_value": "wiederbeschaffungswert",
+        "rv_base_year": "wbw_basisjahr",
+        "rv_construction_type": VlValue(
+            QGEP.wastewater_structure_rv_construction_type, "wbw_bauart"
+        ),
+        "status": VlValue(QGEP.wastewater_structure_status, "astatus"),
+        "structure_condition": VlValue(
+            QGEP.wastewater_structure_structure_condition, "baulicherzustand"
+        ),
+        "subsidies": "subventionen",
+        "year_of_construction": "baujahr",
+        "year_of_replacement": "ersatzjahr",
+    }
+
+
+def wastewater_networkelement_common(QGEP):
+    return {
+        "fk_wastewater_structure": RefValue("abwasserbauwerkref"),
+        "identifier": "bezeichnung",
+        "remark": "bemerkung",
+    }
+
+
+def structure_part_common(QGEP):
+    return {
+        "fk_wastewater_structure": RefValue("abwasserbauwerkref"),
+        "identifier": "bezeichnung",
+        "remark": "bemerkung",
+        "renovation_demand": VlValue(QGEP.structure_part_renovation_demand, "instandstellung"),
+    }
+
+
+def damage_common(QGEP):
+    return {
+        "comments": "anmerkung",
+        "connection": VlValue(QGEP.damage_connection, "verbindung"),
+        "damage_begin": "schadenlageanfang",
+        "damage_end": "schadenlageende",
+        "damage_reach": "streckenschaden",
+        "distance": "distanz",
+        "fk_examination": RefValue("untersuchungref"),
+        "quantification1": "quantifizierung1",
+        "quantification2": "quantifizierung2",
+        "single_damage_class": VlValue(QGEP.damage_single_damage_class, "einzelschadenklasse"),
+        "video_counter": "videozaehlerstand",
+        "view_parameters": "ansichtsparameter",
+    }
+
+
+def get_upsert_mapping(QGEP, ABWASSER, kek=True):
+    """
+    Set-based import mappings (see utils.qgep_import_utils.UpsertImport) of SIA405 Abwasser, and of
+    VSA-KEK if kek is set, in import order. They follow the ORM mappings of qgep_import_kek.
+    """
+    mapping = [
+        (
+            QGEP.channel,
+            ABWASSER.kanal,
+            {
+                **wastewater_structure_common(QGEP),
+                "bedding_encasement": VlValue(
+                    QGEP.channel_bedding_encasement, "bettung_umhuellung"
+                ),
+                "connection_type": VlValue(QGEP.channel_connection_type, "verbindungsart"),
+                "function_hierarchic": VlValue(
+                    QGEP.channel_function_hierarchic, "funktionhierarchisch"
+                ),
+                "function_hydraulic": VlValue(
+                    QGEP.channel_function_hydraulic, "funktionhydraulisch"
+                ),
+                "jetting_interval": "spuelintervall",
+                "pipe_length": "rohrlaenge",
+                "usage_current": VlValue(QGEP.channel_usage_current, "nutzungsart_ist"),
+                "usage_planned": VlValue(QGEP.channel_usage_planned, "nutzungsart_geplant"),
+            },
+        ),
+        (
+            QGEP.manhole,
+            ABWASSER.normschacht,
+            {
+                **wastewater_structure_common(QGEP),
+                "dimension1": "dimension1",
+                "dimension2": "dimension2",
+                "function": VlValue(QGEP.manhole_function, "funktion"),
+                "material": VlValue(QGEP.manhole_material, "material"),
+                "surface_inflow": VlValue(QGEP.manhole_surface_inflow, "oberflaechenzulauf"),
+            },
+        ),
+        (
+            QGEP.discharge_point,
+            ABWASSER.einleitstelle,
+            {
+                **wastewater_structure_common(QGEP),
+                "highwater_level": "hochwasserkote",
+                "relevance": VlValue(QGEP.discharge_point_relevance, "relevanz"),
+                "terrain_level": "terrainkote",
+                "waterlevel_hydraulic": "wasserspiegel_hydraulik",
+            },
+        ),
+        (
+            QGEP.special_structure,
+            ABWASSER.spezialbauwerk,
+            {
+                **wastewater_structure_common(QGEP),
+                "bypass": VlValue(QGEP.special_structure_bypass, "bypass"),
+                "emergency_spillway": VlValue(
+                    QGEP.special_structure_emergency_spillway, "notueberlauf"
+                ),
+                "function": VlValue(QGEP.special_structure_function, "funktion"),
+                "stormwater_tank_arrangement": VlValue(
+                    QGEP.special_structure_stormwater_tank_arrangement, "regenbecken_anordnung"
+                ),
+            },
+        ),
+        (
+            QGEP.infiltration_installation,
+            ABWASSER.versickerungsanlage,
+            {
+                **wastewater_structure_common(QGEP),
+                "absorption_capacity": "schluckvermoegen",
+                "defects": VlValue(QGEP.infiltration_installation_defects, "maengel"),
+                "dimension1": "dimension1",
+                "dimension2": "dimension2",
+                "distance_to_aquifer": "gwdistanz",
+                "effective_area": "wirksameflaeche",
+                "emergency_spillway": VlValue(
+                    QGEP.infiltration_installation_emergency_spillway, "notueberlauf"
+                ),
+                "kind": VlValue(QGEP.infiltration_installation_kind, "art"),
+                "labeling": VlValue(QGEP.infiltration_installation_labeling, "beschriftung"),
+                "seepage_utilization": VlValue(
+                    QGEP.infiltration_installation_seepage_utilization, "versickerungswasser"
+                ),
+                "vehicle_access": VlValue(
+                    QGEP.infiltration_installation_vehicle_access, "saugwagen"
+                ),
+                "watertightness": VlValue(
+                    QGEP.infiltration_installation_watertightness, "wasserdichtheit"
+                ),
+            },
+        ),
+        (
+            QGEP.pipe_profile,
+            ABWASSER.rohrprofil,
+            {
+                "height_width_ratio": "hoehenbreitenverhaeltnis",
+                "identifier": "bezeichnung",
+                "profile_type": VlValue(QGEP.pipe_profile_profile_type, "profiltyp"),
+                "remark": "bemerkung",
+            },
+        ),
+        (
+            QGEP.reach_point,
+            ABWASSER.haltungspunkt,
+            {
+                "elevation_accuracy": VlValue(
+                    QGEP.reach_point_elevation_accuracy, "hoehengenauigkeit"
+                ),
+                "fk_wastewater_networkelement": RefValue("abwassernetzelementref"),
+                "identifier": "bezeichnung",
+                "level": "kote",
+                "outlet_shape": VlValue(QGEP.reach_point_outlet_shape, "auslaufform"),
+                "position_of_connection": "lage_anschluss",
+                "remark": "bemerkung",
+                "situation_geometry": Geom3DValue("lage"),
+            },
+        ),
+        (
+            QGEP.wastewater_node,
+            ABWASSER.abwasserknoten,
+            {
+                **wastewater_networkelement_common(QGEP),
+                "backflow_level": "rueckstaukote",
+                "bottom_level": "sohlenkote",
+                "situation_geometry": Geom3DValue("lage"),
+            },
+        ),
+        (
+            QGEP.reach,
+            ABWASSER.haltung,
+            {
+                **wastewater_networkelement_common(QGEP),
+                "clear_height": "lichte_hoehe",
+                "coefficient_of_friction": "reibungsbeiwert",
+                "fk_pipe_profile": RefValue("rohrprofilref"),
+                "fk_reach_point_from": RefValue("vonhaltungspunktref"),
+                "fk_reach_point_to": RefValue("nachhaltungspunktref"),
+                "horizontal_positioning": VlValue(
+                    QGEP.reach_horizontal_positioning, "lagebestimmung"
+                ),
+                "inside_coating": VlValue(QGEP.reach_inside_coating, "innenschutz"),
+                "length_effective": "laengeeffektiv",
+                "material": VlValue(QGEP.reach_material, "material"),
+                "progression_geometry": Geom3DValue("verlauf"),
+                "reliner_material": VlValue(QGEP.reach_reliner_material, "reliner_material"),
+                "reliner_nominal_size": "reliner_nennweite",
+                "relining_construction": VlValue(
+                    QGEP.reach_relining_construction, "reliner_bautechnik"
+                ),
+                "relining_kind": VlValue(QGEP.reach_relining_kind, "reliner_art"),
+                "ring_stiffness": "ringsteifigkeit",
+                "slope_building_plan": "plangefaelle",
+                "wall_roughness": "wandrauhigkeit",
+            },
+        ),
+        (
+            QGEP.dryweather_downspout,
+            ABWASSER.trockenwetterfallrohr,
+            {**structure_part_common(QGEP), "diameter": "durchmesser"},
+        ),
+        (
+            QGEP.access_aid,
+            ABWASSER.einstiegshilfe,
+            {**structure_part_common(QGEP), "kind": VlValue(QGEP.access_aid_kind, "art")},
+        ),
+        (
+            QGEP.dryweather_flume,
+            ABWASSER.trockenwetterrinne,
+            {
+                **structure_part_common(QGEP),
+                "material": VlValue(QGEP.dryweather_flume_material, "material"),
+            },
+        ),
+        (
+            QGEP.cover,
+            ABWASSER.deckel,
+            {
+                **structure_part_common(QGEP),
+                "brand": "fabrikat",
+                "cover_shape": VlValue(QGEP.cover_cover_shape, "deckelform"),
+                "diameter": "durchmesser",
+                "fastening": VlValue(QGEP.cover_fastening, "verschluss"),
+                "level": "kote",
+                "material": VlValue(QGEP.cover_material, "material"),
+                "positional_accuracy": VlValue(QGEP.cover_positional_accuracy, "lagegenauigkeit"),
+                "situation_geometry": Geom3DValue("lage"),
+                "sludge_bucket": VlValue(QGEP.cover_sludge_bucket, "schlammeimer"),
+                "venting": VlValue(QGEP.cover_venting, "entlueftung"),
+            },
+        ),
+        (
+            QGEP.benching,
+            ABWASSER.bankett,
+            {**structure_part_common(QGEP), "kind": VlValue(QGEP.benching_kind, "art")},
+        ),
+    ]
+    if not kek:
+        return mapping
+
+    return mapping + [
+        (
+            QGEP.examination,
+            ABWASSER.untersuchung,
+            {
+                # --- maintenance_event ---
+                "base_data": "datengrundlage",
+                "cost": "kosten",
+                "data_details": "detaildaten",
+                "duration": "dauer",
+                "fk_operating_company": RefValue("ausfuehrende_firmaref"),
+                "identifier": "bezeichnung",
+                "kind": VlValue(QGEP.maintenance_event_kind, "art"),
+                "operator": "ausfuehrender",
+                "reason": "grund",
+                "remark": "bemerkung",
+                "result": "ergebnis",
+                "status": VlValue(QGEP.maintenance_event_status, "astatus"),
+                "time_point": "zeitpunkt",
+                # --- examination ---
+                "equipment": "geraet",
+                "fk_reach_point": RefValue("haltungspunktref"),
+                "from_point_identifier": "vonpunktbezeichnung",
+                "inspected_length": "inspizierte_laenge",
+                "recording_type": VlValue(QGEP.examination_recording_type, "erfassungsart"),
+                "to_point_identifier": "bispunktbezeichnung",
+                "vehicle": "fahrzeug",
+                "videonumber": "videonummer",
+                "weather": VlValue(QGEP.examination_weather, "witterung"),
+            },
+        ),
+        (
+            QGEP.damage_manhole,
+            ABWASSER.normschachtschaden,
+            {
+                **damage_common(QGEP),
+                "manhole_damage_code": VlValue(
+                    QGEP.damage_manhole_manhole_damage_code, "schachtschadencode"
+                ),
+                "manhole_shaft_area": VlValue(
+                    QGEP.damage_manhole_manhole_shaft_area, "schachtbereich"
+                ),
+            },
+        ),
+        (
+            QGEP.damage_channel,
+            ABWASSER.kanalschaden,
+            {
+                **damage_common(QGEP),
+                "channel_damage_code": VlValue(
+                    QGEP.damage_channel_channel_damage_code, "kanalschadencode"
+                ),
+            },
+        ),
+        (
+            QGEP.data_media,
+            ABWASSER.datentraeger,
+            {
+                "identifier": "bezeichnung",
+                "kind": VlValue(QGEP.data_media_kind, "art"),
+                "location": "standort",
+                "path": "pfad",
+                "remark": "bemerkung",
+            },
+        ),
+        (
+            QGEP.file,
+            ABWASSER.datei,
+            {
+                "class": VlValue(QGEP.file_class, "klasse"),
+                "fk_data_media": RefValue("datentraegerref"),
+                "identifier": "bezeichnung",
+                "kind": VlValue(QGEP.file_kind, "art"),
+                "object": "objekt",
+                "path_relative": "relativpfad",
+                "remark": "bemerkung",
+            },
+        ),
+    ]
+
+
+# organisations are imported first, without their metaattributes as they can reference themselves
+ORGANISATION_VALUES = {"identifier": "bezeichnung", "remark": "bemerkung", "uid": "auid"}
+
+
+def import_upsert(upsert_import, kek=True, diff=None):
+    """
+    Runs the set-based import of the staging schema into qgep_od, of the objects accepted in the diff only if
+    given (see review_upsert)
+    """
+    QGEP = upsert_import.QGEP
+    ABWASSER = upsert_import.ABWASSER
+
+    def accepted(target_cls, changed_only=True):
+        return None if diff is None else diff.accepted_obj_ids(target_cls, changed_only)
+
+    upsert_import.upsert(
+        QGEP.organisation,
+        ABWASSER.organisation,
+        ORGANISATION_VALUES,
+        metaattributes=False,
+        obj_ids=accepted(QGEP.organisation),
+    )
+    upsert_import.insert_missing_organisations()
+    upsert_import.upsert(
+        QGEP.organisation,
+        ABWASSER.organisation,
+        ORGANISATION_VALUES,
+        obj_ids=accepted(QGEP.organisation),
+    )
+
+    for target_cls, source_cls, values in get_upsert_mapping(QGEP, ABWASSER, kek):
+        upsert_import.upsert(target_cls, source_cls, values, obj_ids=accepted(target_cls))
+
+    if kek:
+        # In QGEP, relation between maintenance_event and wastewater_structure is done with
+        # an association table instead of a foreign key on maintenance_event.
+        upsert_import.link(
+            QGEP.re_maintenance_event_wastewater_structure,
+            ABWASSER.untersuchung,
+            {
+                "fk_wastewater_structure": RefValue("abwasserbauwerkref"),
+                "fk_maintenance_event": "obj_id",
+            },
+            # the links of unchanged examinations may be new
+            obj_ids=accepted(QGEP.examination, changed_only=False),
+        )
+
+
+def review_upsert(connection, QGEP, ABWASSER, kek=True):
+    """
+    Computes the diff of the staging schema with qgep_od (see utils.qgep_import_utils.StagingDiff) on the
+    connection, to review it before importing the accepted objects with import_upsert
+    """
+    mapping = [(QGEP.organisation, ABWASSER.organisation, ORGANISATION_VALUES, True)]
+    mapping.extend(
+        (target_cls, source_cls, values, True)
+        for target_cls, source_cls, values in get_upsert_mapping(QGEP, ABWASSER, kek)
+    )
+    diff = StagingDiff(
+        connection,
+        QGEP,
+        ABWASSER,
+        mapping,
+        lambda upsert_import, diff: import_upsert(upsert_import, kek, diff),
+    )
+    diff.compute()
+    return diff
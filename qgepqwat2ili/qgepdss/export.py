@@ -8,16 +8,21 @@ from sqlalchemy.sql import text
 from .. import utils
 from ..utils.basket_utils import BasketUtils
 from ..utils.qgep_export_utils import (
+    SELECTION_WWS_TABLE,
     QgepExportUtils,
+    SelectionQuery,
     add_to_selection,
+    create_selection_table,
     filter_reaches,
     get_connected_overflow_to_wn_ids,
     get_connected_we_from_re,
     get_connected_we_to_re,
     get_ws_selected_ww_networkelements,
+    read_selection,
     remove_from_selection,
 )
 from ..utils.various import logger
+from .mapping import get_qgep_mapping
 from .model_abwasser import get_abwasser_model
 from .model_qgep import get_qgep_model
 
@@ -36,8 +41,12 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     # Logging disabled (very slow)
     # qgep_session = Session(utils.sqlalchemy.create_engine(logger_name="qgep"), autocommit=False, autoflush=False)
     # abwasser_session = Session(utils.sqlalchemy.create_engine(logger_name="abwasser"), autocommit=False, autoflush=False)
-    qgep_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
-    abwasser_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    qgep_session = Session(
+        utils.sqlalchemy.create_engine(target="source"), autocommit=False, autoflush=False
+    )
+    abwasser_session = Session(
+        utils.sqlalchemy.create_engine(target="staging"), autocommit=False, autoflush=False
+    )
     tid_maker = utils.ili2db.TidMaker(id_attribute="obj_id")
 
     # backport from tww https://github.com/teksi/wastewater/blob/3acfba249866d299f8a22e249d9f1e475fe7b88d/plugin/teksi_wastewater/interlis/interlis_model_mapping/interlis_exporter_to_intermediate_schema.py#L83
@@ -56,6 +65,12 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     # 1. Filtering - check if selection
     filtered = selection is not None
 
+    # Store the selection in a temporary table, so the export queries join it instead of id lists
+    subset_filter = create_selection_table(qgep_session, selection or [])
+    if isinstance(selection, SelectionQuery):
+        # a spatial selection is inserted from the database, its id's are read for the selection expansion
+        selection = read_selection(qgep_session, subset_filter)
+
     # Logging for debugging
     logger.debug(f"print filtered '{filtered}'")
 
@@ -192,6 +207,10 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         labelorientation = orientation
     else:
         labelorientation = 0
+    logger.info(f"modulo_angle - added orientation: {labelorientation}")
+
+    # Store the selected wastewater structures in a temporary table as well
+    subset_wws_filter = create_selection_table(qgep_session, subset_wws_ids, SELECTION_WWS_TABLE)
 
     qgep_export_utils = QgepExportUtils(
         tid_maker=tid_maker,
@@ -205,8 +224,13 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         subset_ids=subset_ids,
         subset_wws_ids=subset_wws_ids,
         ws_off_sia405abwasser=ws_off_sia405abwasser,
+        subset_filter=subset_filter,
+        subset_wws_filter=subset_wws_filter,
     )
 
+    # Report values that will be truncated or are missing once, instead of for each exported row
+    qgep_export_utils.check_export_values(get_qgep_mapping())
+
     def organisation_common(row):
         """
         Returns common attributes for organisation
@@ -342,7 +366,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.mutation)
     # only export explicitly specified mutation objects if filtered
     if filtered:
-        query = query.filter(qgep_model.mutation.obj_id.in_(subset_ids))
+        query = query.filter(qgep_model.mutation.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -1023,7 +1047,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.discharge_point)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -1078,7 +1102,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.infiltration_installation)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -1137,7 +1161,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.wwtp_structure)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -1525,7 +1549,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 qgep_model.wastewater_node.obj_id
                 == qgep_model.throttle_shut_off_unit.fk_wastewater_node,
             )
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
         # add sql statement to logger
         statement = query.statement
@@ -1862,7 +1886,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.hydr_geometry)
     if filtered:
         query = query.join(qgep_model.wastewater_node).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -1915,7 +1939,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
 
         query = qgep_session.query(qgep_model.wastewater_node)
         if filtered:
-            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
             # add sql statement to logger
             statement = query.statement
             logger.debug(f" selection query = {statement}")
@@ -1970,7 +1994,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
 
         query = qgep_session.query(qgep_model.wastewater_node)
         if filtered:
-            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
             # add sql statement to logger
             statement = query.statement
             logger.debug(f" selection query = {statement}")
@@ -2059,7 +2083,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         query = (
             query.join(qgep_model.hydr_geometry)
             .join(qgep_model.wastewater_node)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
         # add sql statement to logger
         statement = query.statement
@@ -2106,7 +2130,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 == qgep_model.wastewater_structure.obj_id,
             )
             .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
         # add sql statement to logger
         statement = query.statement
@@ -2158,7 +2182,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 == qgep_model.infiltration_installation.obj_id,
             )
             .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
         # add sql statement to logger
         statement = query.statement
@@ -2304,14 +2328,14 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # == qgep_model.wastewater_structure.obj_id,
         # )
         # .join(qgep_model.wastewater_networkelement)
-        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # )
         # filtering only on wastewater_structures that are in subset_wws_ids
         query = query.join(
             qgep_model.wastewater_structure,
             qgep_model.structure_part.fk_wastewater_structure
             == qgep_model.wastewater_structure.obj_id,
-        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_ids))
+        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -2360,13 +2384,13 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # == qgep_model.wastewater_structure.obj_id,
         # )
         # .join(qgep_model.wastewater_networkelement)
-        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # )
         query = query.join(
             qgep_model.wastewater_structure,
             qgep_model.structure_part.fk_wastewater_structure
             == qgep_model.wastewater_structure.obj_id,
-        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_ids))
+        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -2410,7 +2434,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.building)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -2468,7 +2492,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.reservoir)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -2524,7 +2548,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.individual_surface)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -2582,7 +2606,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.fountain)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -2642,7 +2666,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 == qgep_model.connection_object.obj_id,
             )
             .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         )
         # add sql statement to logger
         statement = query.statement
@@ -2690,7 +2714,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 == qgep_model.connection_object.obj_id,
             )
             .join(qgep_model.wastewater_networkelement)
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -2740,7 +2764,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 == qgep_model.connection_object.obj_id,
             )
             .join(qgep_model.wastewater_networkelement)
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -2791,7 +2815,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 qgep_model.wastewater_networkelement.obj_id
                 == qgep_model.catchment_area.fk_wastewater_networkelement_ww_current,
             ),
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3009,7 +3033,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         )
         query = query.union(query1, query2, query3)
         # query = query.union(query1, query3)
-        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3087,7 +3111,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     if filtered:
         # query = query.join(
         # QGEP.measuring_point, QGEP.wastewater_structure, QGEP.wastewater_networkelement
-        # ).filter(QGEP.wastewater_networkelement.obj_id.in_(subset_ids))
+        # ).filter(QGEP.wastewater_networkelement.obj_id.in_(subset_filter))
 
         query1 = (
             query.join(
@@ -3152,7 +3176,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         )
         query = query.union(query1, query2, query3)
         # query = query.union(query1, query3)
-        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3196,7 +3220,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
 
         # query = query.join(
         # qgep_model.measuring_point, qgep_model.wastewater_structure, qgep_model.wastewater_networkelement
-        # ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        # ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         query1 = (
             query.join(
                 qgep_model.measuring_point,
@@ -3260,7 +3284,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         )
         query = query.union(query1, query2, query3)
         # query = query.union(query1, query3)
-        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3309,7 +3333,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # QGEP.measuring_point,
         # QGEP.wastewater_structure,
         # QGEP.wastewater_networkelement,
-        # ).filter(QGEP.wastewater_networkelement.obj_id.in_(subset_ids))
+        # ).filter(QGEP.wastewater_networkelement.obj_id.in_(subset_filter))
         query1 = (
             query.join(
                 qgep_model.measurement_series,
@@ -3389,7 +3413,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # query4 not implemented via measuring_device
         query = query.union(query1, query2, query3)
         # query = query.union(query1, query3)
-        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3440,7 +3464,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
             qgep_model.wastewater_node,
             qgep_model.wastewater_node.obj_id
             == qgep_model.throttle_shut_off_unit.fk_wastewater_node,
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3498,7 +3522,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 qgep_model.wastewater_node.obj_id == qgep_model.prank_weir.fk_wastewater_node,
                 qgep_model.wastewater_node.obj_id == qgep_model.prank_weir.fk_overflow_to,
             ),
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3548,7 +3572,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 qgep_model.wastewater_node.obj_id == qgep_model.prank_weir.fk_wastewater_node,
                 qgep_model.wastewater_node.obj_id == qgep_model.prank_weir.fk_overflow_to,
             ),
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3601,7 +3625,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 qgep_model.wastewater_node.obj_id == qgep_model.prank_weir.fk_wastewater_node,
                 qgep_model.wastewater_node.obj_id == qgep_model.prank_weir.fk_overflow_to,
             ),
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3651,7 +3675,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
                 == qgep_model.hydraulic_char_data.fk_wastewater_node,
                 # fk_primary_direction only added with VSA-DSS 2020
             ),
-        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3716,13 +3740,13 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # == qgep_model.wastewater_structure.obj_id,
         # )
         # .join(qgep_model.wastewater_networkelement)
-        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # )
         query = query.join(
             qgep_model.wastewater_structure,
             qgep_model.structure_part.fk_wastewater_structure
             == qgep_model.wastewater_structure.obj_id,
-        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_ids))
+        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3773,13 +3797,13 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # == qgep_model.wastewater_structure.obj_id,
         # )
         # .join(qgep_model.wastewater_networkelement)
-        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # )
         query = query.join(
             qgep_model.wastewater_structure,
             qgep_model.structure_part.fk_wastewater_structure
             == qgep_model.wastewater_structure.obj_id,
-        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_ids))
+        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3828,13 +3852,13 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # == qgep_model.wastewater_structure.obj_id,
         # )
         # .join(qgep_model.wastewater_networkelement)
-        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # )
         query = query.join(
             qgep_model.wastewater_structure,
             qgep_model.structure_part.fk_wastewater_structure
             == qgep_model.wastewater_structure.obj_id,
-        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_ids))
+        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3884,13 +3908,13 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
         # == qgep_model.wastewater_structure.obj_id,
         # )
         # .join(qgep_model.wastewater_networkelement)
-        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+        # .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
         # )
         query = query.join(
             qgep_model.wastewater_structure,
             qgep_model.structure_part.fk_wastewater_structure
             == qgep_model.wastewater_structure.obj_id,
-        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_ids))
+        ).filter(qgep_model.wastewater_structure.obj_id.in_(subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -3936,7 +3960,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.param_ca_general)
     if filtered:
         query = query.join(qgep_model.catchment_area).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -3982,7 +4006,7 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     query = qgep_session.query(qgep_model.param_ca_mouse1)
     if filtered:
         query = query.join(qgep_model.catchment_area).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -4027,22 +4051,24 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     logger.info(
         "Exporting QGEP.maintenance_event -> ABWASSER.maintenance_event, ABWASSER.metaattribute"
     )
+    # wastewater_structures of the selected networkelements
+    subset_wws_query = qgep_session.query(
+        qgep_model.wastewater_networkelement.fk_wastewater_structure
+    ).filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
     query = qgep_session.query(qgep_model.maintenance_event)
-    # explicit join for n:m re_maintenance_event_wastewater_structure
+    # n:m re_maintenance_event_wastewater_structure as subquery, so events linked to
+    # several structures or networkelements of the subset are only exported once
     if filtered:
-        query = (
-            query.join(
-                qgep_model.re_maintenance_event_wastewater_structure,
-                qgep_model.re_maintenance_event_wastewater_structure.fk_maintenance_event
-                == qgep_model.maintenance_event.obj_id,
-            )
-            .join(
-                qgep_model.wastewater_structure,
-                qgep_model.re_maintenance_event_wastewater_structure.fk_wastewater_structure
-                == qgep_model.wastewater_structure.obj_id,
+        query = query.filter(
+            qgep_model.maintenance_event.obj_id.in_(
+                qgep_session.query(
+                    qgep_model.re_maintenance_event_wastewater_structure.fk_maintenance_event
+                ).filter(
+                    qgep_model.re_maintenance_event_wastewater_structure.fk_wastewater_structure.in_(
+                        subset_wws_query
+                    )
+                )
             )
-            .join(qgep_model.wastewater_networkelement)
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
         )
         # add sql statement to logger
         statement = query.statement
@@ -4191,66 +4217,49 @@ def qgep_export_dss(selection=None, labels_file=None, orientation=None, basket_e
     # -- extra commit
     abwasser_session.commit()
 
-    # -- extra session2 for re_maintenance_event_wastewater_structure
-    abwasser_session2 = Session(
-        utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False
-    )
-
     logger.info(
         "Exporting QGEP.re_maintenance_event_wastewater_structure -> ABWASSER.erhaltungsereignis_abwasserbauwerkassoc"
     )
-    query = qgep_session.query(qgep_model.re_maintenance_event_wastewater_structure)
+    # set-based: distinct id pairs in one statement, t_ids resolved from the tid mapping
+    re_class = qgep_model.re_maintenance_event_wastewater_structure
+    query = qgep_session.query(
+        re_class.fk_wastewater_structure, re_class.fk_maintenance_event
+    ).distinct()
     if filtered:
-        query = (
-            query.join(
-                qgep_model.maintenance_event,
-                qgep_model.re_maintenance_event_wastewater_structure.fk_maintenance_event
-                == qgep_model.maintenance_event.obj_id,
-            )
-            .join(
-                qgep_model.wastewater_structure,
-                qgep_model.re_maintenance_event_wastewater_structure.fk_wastewater_structure
-                == qgep_model.wastewater_structure.obj_id,
-            )
-            .join(
-                qgep_model.wastewater_networkelement,
-            )
-            .filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
-        )
+        query = query.filter(re_class.fk_wastewater_structure.in_(subset_wws_query))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
-    for row in query:
-
-        # AVAILABLE FIELDS IN QGEP.maintenance_event_wastewater_structure
-
-        # --- maintenance_event_wastewater_structure ---
-        # to do e.g. fk_dataowner, fk_provider, height_width_ratio, identifier, last_modification, obj_id, profile_type, remark
-        # --- _bwrel_ ---
-        # to do add superclassrelations e.g. profile_geometry__BWREL_fk_pipe_profile, reach__BWREL_fk_pipe_profile
-
-        # --- _rel_ ---
-        # to do add relations fk_dataowner__REL, fk_provider__REL, profile_type__REL
 
-        erhaltungsereignis_abwasserbauwerk = abwasser_model.erhaltungsereignis_abwasserbauwerkassoc(
-            # FIELDS TO MAP TO ABWASSER.erhaltungsereignis_abwasserbauwerk
-            # --- baseclass ---
-            # --- sia405_baseclass ---
-            # --- erhaltungsereignis_abwasserbauwerk ---
-            abwasserbauwerkref=qgep_export_utils.get_tid(row.fk_wastewater_structure__REL),
-            erhaltungsereignis_abwasserbauwerkassocref=qgep_export_utils.get_tid(
-                row.fk_maintenance_event__REL
-            ),
+    mappings = []
+    skipped = 0
+    for fk_wastewater_structure, fk_maintenance_event in query:
+        abwasserbauwerkref = tid_maker.existing_tid_for_id(
+            qgep_model.wastewater_structure, fk_wastewater_structure
         )
+        erhaltungsereignisref = tid_maker.existing_tid_for_id(
+            qgep_model.maintenance_event, fk_maintenance_event
+        )
+        # both ends must have been exported, otherwise the reference would dangle
+        if abwasserbauwerkref is None or erhaltungsereignisref is None:
+            skipped += 1
+            continue
+        mappings.append(
+            {
+                "abwasserbauwerkref": abwasserbauwerkref,
+                "erhaltungsereignis_abwasserbauwerkassocref": erhaltungsereignisref,
+            }
+        )
+    abwasser_session.bulk_insert_mappings(
+        abwasser_model.erhaltungsereignis_abwasserbauwerkassoc, mappings
+    )
+    if skipped:
+        logger.warning(
+            f"{skipped} maintenance_event/wastewater_structure associations skipped, as the maintenance_event or wastewater_structure was not exported"
+        )
+    logger.info(f"done ({len(mappings)} associations)")
 
-        abwasser_session2.add(erhaltungsereignis_abwasserbauwerk)
-
-        print(".", end="")
-    logger.info("done")
-
-    abwasser_session2.flush()
-
-    abwasser_session2.commit()
+    abwasser_session.commit()
 
     qgep_session.close()
     abwasser_session.close()
@@ -1,19 +1,162 @@
 # Definitions for qgep datamodel with delta >= 1.5.91
 
+import collections
 from functools import lru_cache
 
 from geoalchemy2.functions import ST_Force3D
+from sqlalchemy import false
 from sqlalchemy.orm import Session
-from sqlalchemy.orm.attributes import flag_dirty
 from sqlalchemy.sql import text
 
 from .. import utils
-from ..utils.various import logger
+from ..utils.qgep_import_utils import (
+    SKIP_SYMBOLOGY_TRIGGERS_SETTING,
+    ChangeDetector,
+    ChunkedCommit,
+    ExistingObjectCache,
+    OrganisationIndex,
+    StagingObjIdIndex,
+    ValueListCache,
+    install_symbology_trigger_guards,
+)
+from ..utils.various import logger, run_dependency_graph
 from .model_abwasser import get_abwasser_model
 from .model_qgep import get_qgep_model
 
-
-def qgep_import_dss(precommit_callback=None):
+# staging classes imported together by a worker of a parallel import, once the groups it depends on are committed
+ImportGroup = collections.namedtuple("ImportGroup", ["name", "classes", "depends_on"])
+
+# The classes of a group only reference the classes of its own group and of the groups it depends on (cyclic
+# references, e.g. between reach and reach_point, stay within a group as they are only checked on commit).
+# Every staging class imported by _import_dss_classes must be listed in one group.
+IMPORT_GROUPS = [
+    ImportGroup(
+        "organisations",
+        [
+            "mutation",
+            "amt",
+            "genossenschaft_korporation",
+            "kanton",
+            "abwasserverband",
+            "gemeinde",
+            "abwasserreinigungsanlage",
+            "privat",
+            "araenergienutzung",
+            "abwasserbehandlung",
+            "schlammbehandlung",
+        ],
+        [],
+    ),
+    ImportGroup(
+        "hydrology",
+        [
+            "grundwasserleiter",
+            "fliessgewaesser",
+            "see",
+            "gewaesserabschnitt",
+            "wasserfassung",
+            "ufer",
+            "gewaessersohle",
+            "gewaessersektor",
+            "planungszone",
+            "versickerungsbereich",
+            "entwaesserungssystem",
+            "gewaesserschutzbereich",
+            "grundwasserschutzareal",
+            "grundwasserschutzzone",
+            "furt",
+            "gewaesserabsturz",
+            "schleuse",
+            "durchlass",
+            "geschiebesperre",
+            "gewaesserwehr",
+            "sohlrampe",
+            "fischpass",
+            "badestelle",
+        ],
+        ["organisations"],
+    ),
+    ImportGroup(
+        "structures",
+        [
+            "kanal",
+            "normschacht",
+            "einleitstelle",
+            "spezialbauwerk",
+            "versickerungsanlage",
+            "arabauwerk",
+            "mechanischevorreinigung",
+            "retentionskoerper",
+            "trockenwetterfallrohr",
+            "einstiegshilfe",
+            "trockenwetterrinne",
+            "deckel",
+            "elektrischeeinrichtung",
+            "elektromechanischeausruestung",
+            "bankett",
+            "feststoffrueckhalt",
+            "beckenreinigung",
+        ],
+        ["organisations", "hydrology"],
+    ),
+    ImportGroup(
+        "network",
+        [
+            "rohrprofil",
+            "steuerungszentrale",
+            "hydr_geometrie",
+            "haltungspunkt",
+            "abwasserknoten",
+            "haltung",
+            "rohrprofil_geometrie",
+            "hydr_geomrelation",
+            "ueberlaufcharakteristik",
+            "hq_relation",
+            "gebaeude",
+            "reservoir",
+            "einzelflaeche",
+            "brunnen",
+            "einzugsgebiet",
+            "absperr_drosselorgan",
+            "streichwehr",
+            "foerderaggregat",
+            "leapingwehr",
+            "hydr_kennwerte",
+            "rueckstausicherung",
+            "beckenentleerung",
+            "ezg_parameter_allg",
+            "ezg_parameter_mouse1",
+        ],
+        ["structures"],
+    ),
+    ImportGroup(
+        "measurements",
+        [
+            "gefahrenquelle",
+            "unfall",
+            "stoff",
+            "messstelle",
+            "messgeraet",
+            "messreihe",
+            "messresultat",
+        ],
+        ["network"],
+    ),
+    ImportGroup(
+        "maintenance",
+        ["erhaltungsereignis", "erhaltungsereignis_abwasserbauwerkassoc"],
+        ["structures"],
+    ),
+]
+
+
+def qgep_import_dss(
+    precommit_callback=None,
+    chunk_size=None,
+    checkpoints=None,
+    session_triggers=False,
+    workers=None,
+):
     """
     Imports data from the ili2pg model into the QGEP model.
 
@@ -21,53 +164,124 @@ def qgep_import_dss(precommit_callback=None):
         precommit_callback: optional callable that gets invoked with the sqlalchemy's session,
                             allowing for a GUI to  filter objects before committing. It MUST either
                             commit or rollback and close the session.
+        chunk_size: if set, flushes the objects in savepoints of chunk_size objects and commits after each
+                    class, skipping and reporting the objects that fail (see utils.qgep_import_utils.ChunkedCommit).
+                    Not supported with precommit_callback.
+        checkpoints: optional utils.ili2db.ImportCheckpoints of a resumable import, skipping the classes
+                     committed by a previous run and recording the classes committed by chunk_size.
+        session_triggers: skips the symbology triggers for the import session only (see
+                          utils.qgep_import_utils.install_symbology_trigger_guards) instead of dropping them.
+        workers: if set, imports the groups of classes (see IMPORT_GROUPS) in parallel workers, each with its
+                 own connection and commit, a group starting once the groups it depends on are committed.
+                 Not supported with precommit_callback.
+
+    Returns:
+        False if the organisations or wastewater structures imported by the workers fail the integrity checks
+        of the main database, True otherwise
     """
 
-    QGEP = get_qgep_model()
-    ABWASSER = get_abwasser_model()
+    # the models are reflected before the workers use them
+    get_qgep_model()
+    get_abwasser_model()
 
     pre_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
 
-    # We also drop symbology triggers as they badly affect performance. This must be done in a separate session as it
-    # would deadlock other sessions.
-    logger.info("drop symbology triggers")
-    pre_session.execute(text("SELECT qgep_sys.drop_symbology_triggers();"))
+    if session_triggers:
+        # The symbology triggers are only skipped for the import session, so that other users keep them
+        install_symbology_trigger_guards(pre_session)
+    else:
+        # We also drop symbology triggers as they badly affect performance. This must be done in a separate session as it
+        # would deadlock other sessions.
+        logger.info("drop symbology triggers")
+        pre_session.execute(text("SELECT qgep_sys.drop_symbology_triggers();"))
     pre_session.commit()
     pre_session.close()
 
+    if not workers or precommit_callback:
+        _import_dss_classes(precommit_callback, chunk_size, checkpoints, session_triggers)
+        return True
+
+    checkpoints = checkpoints or utils.ili2db.ImportCheckpoints()
+
+    def run(group):
+        _import_dss_classes(
+            None, chunk_size, checkpoints.fork(), session_triggers, classes=set(group.classes)
+        )
+
+    run_dependency_graph(IMPORT_GROUPS, run, workers, label="Import group")
+
+    # the groups were committed separately, check the objects split over several classes as a whole
+    organisations_ok = utils.ili2db.check_organisation_subclass_data()
+    wastewater_structures_ok = utils.ili2db.check_wastewater_structure_subclass_data()
+    return organisations_ok and wastewater_structures_ok
+
+
+def _import_dss_classes(
+    precommit_callback=None,
+    chunk_size=None,
+    checkpoints=None,
+    session_triggers=False,
+    classes=None,
+):
+    """
+    Imports the staging classes into QGEP in one session (see qgep_import_dss), or only the staging classes
+    named in classes if set.
+    """
+
+    QGEP = get_qgep_model()
+    ABWASSER = get_abwasser_model()
+
     # We use two different sessions for reading and writing so it's easier to
     # review imports and to keep the door open to getting data from another
     # connection / database type.
-    abwasser_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    abwasser_session = Session(
+        utils.sqlalchemy.create_engine(target="staging"), autocommit=False, autoflush=False
+    )
     qgep_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    if session_triggers:
+        qgep_session.execute(text(f"SET {SKIP_SYMBOLOGY_TRIGGERS_SETTING} = 'on';"))
 
     # Allow to insert rows with cyclic dependencies at once, needs data modell version 1.6.2 https://github.com/QGEP/datamodel/pull/235 to work properly
     logger.info("SET CONSTRAINTS ALL DEFERRED;")
     qgep_session.execute(text("SET CONSTRAINTS ALL DEFERRED;"))
 
-    def get_vl_instance(vl_table, value):
-        """
-        Gets a value list instance from the value_de name. Returns None and a warning if not found.
-        """
-        # TODO : memoize (and get the whole table at once) to improve N+1 performance issue
-        # TODO : return "other" (or other applicable value) rather than None, or even throwing an exception, would probably be better
-        row = qgep_session.query(vl_table).filter(vl_table.value_de == value).first()
-        if row is None:
-            # write logger.warning only if value is not None
-            if value is not None:
-                logger.debug(
-                    f'Could not find value `{value}` in value list "{vl_table.__table__.schema}.{vl_table.__name__}". Setting to None instead.'
-                )
-            return None
-        return row
+    # value lists are loaded once per table instead of queried for every attribute of every row
+    vl_cache = ValueListCache(qgep_session)
+    get_vl_instance = vl_cache.get_vl_instance
+
+    # existing objects are loaded in batches per class before it is imported (see create_or_update)
+    existing_objects = ExistingObjectCache(qgep_session, abwasser_session, staging_classes=classes)
 
-    def get_pk(relation):
+    # obj_id of the staging objects by t_id, to resolve the references of the staging rows (see get_pk)
+    staging_obj_ids = StagingObjIdIndex(abwasser_session, ABWASSER.sia405_baseclass)
+
+    # only the changed attributes of existing objects are updated (see create_or_update)
+    changes = ChangeDetector(qgep_session)
+
+    # organisations by identifier and obj_id, for create_or_update_organisation
+    organisations = OrganisationIndex(qgep_session, QGEP.organisation)
+
+    # classes committed by a previous run of a resumed import are skipped
+    checkpoints = checkpoints or utils.ili2db.ImportCheckpoints()
+
+    def staging_query(*entities):
+        if classes is not None and entities[0].__name__ not in classes:
+            # imported by another worker
+            return abwasser_session.query(*entities).filter(false())
+        # in t_id order, so the last imported file wins if several files contain an obj_id
+        query = abwasser_session.query(*entities).order_by(entities[0].t_id)
+        return checkpoints.filter_done(query)
+
+    # optional chunked commits, the whole import is committed at once if not set
+    chunks = ChunkedCommit(
+        qgep_session, None if precommit_callback else chunk_size, checkpoints=checkpoints
+    )
+
+    def get_pk(t_id):
         """
-        Returns the primary key for a relation
+        Returns the obj_id of the staging object referenced by t_id
         """
-        if relation is None:
-            return None
-        return relation.obj_id
+        return staging_obj_ids.get(t_id)
 
     def create_or_update(cls, **kwargs):
         """
@@ -79,15 +293,21 @@ def qgep_import_dss(precommit_callback=None):
         # We try to get the instance from the session/database
         obj_id = kwargs.get("obj_id", None)
         if obj_id:
-            instance = qgep_session.query(cls).get(kwargs.get("obj_id", None))
+            instance = existing_objects.get(cls, obj_id)
 
         if instance:
-            # We found it -> update
-            instance.__dict__.update(kwargs)
-            flag_dirty(instance)  # we flag it as dirty so it stays in the session
+            # We found it -> update the changed attributes only
+            changes.update(instance, kwargs)
         else:
             # We didn't find it -> create
             instance = cls(**kwargs)
+            changes.insert(instance)
+            if obj_id:
+                # later rows with this obj_id (e.g. of another imported file) update it
+                existing_objects.add(cls, instance)
+
+        if isinstance(instance, QGEP.organisation):
+            organisations.add(instance)
 
         return instance
 
@@ -99,71 +319,11 @@ def qgep_import_dss(precommit_callback=None):
         if not name:
             return None
 
-        instance = (
-            qgep_session.query(QGEP.organisation)
-            .filter(QGEP.organisation.identifier == name)
-            .first()
-        )
-
-        # also look for non-flushed objects in the session
-        if not instance:
-            for obj in qgep_session:
-                # for VSA-DSS look in subclasses instead of organisation
-                # if obj.__class__ is QGEP.organisation and obj.identifier == name:
-                #    instance = obj
-                #    break
-                if obj.__class__ is QGEP.municipality and obj.identifier == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.administrative_office and obj.identifier == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.canton and obj.identifier == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.cooperative and obj.identifier == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.private and obj.identifier == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.waste_water_association and obj.identifier == name:
-                    instance = obj
-                    break
+        instance = organisations.by_identifier(name)
 
         # set instance with organisation.obj instead of organisation.name, as fk_dataowner / fk_provider could already be a obj_id instead of an identifier
         if not instance:
-            instance = (
-                qgep_session.query(QGEP.organisation)
-                .filter(QGEP.organisation.obj_id == name)
-                .first()
-            )
-
-        # also look for non-flushed objects in the session
-        if not instance:
-            for obj in qgep_session:
-                # for VSA-DSS look in subclasses instead of organisation
-                # if obj.__class__ is QGEP.organisation and obj.obj_id == name:
-                #    instance = obj
-                #    break
-                if obj.__class__ is QGEP.municipality and obj.obj_id == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.administrative_office and obj.obj_id == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.canton and obj.obj_id == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.cooperative and obj.obj_id == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.private and obj.obj_id == name:
-                    instance = obj
-                    break
-                if obj.__class__ is QGEP.waste_water_association and obj.obj_id == name:
-                    instance = obj
-                    break
+            instance = organisations.by_obj_id(name)
 
         # if still nothing, we create it
         if not instance:
@@ -195,7 +355,7 @@ def qgep_import_dss(precommit_callback=None):
             # # 11.8.2022 v10 wieder erstellt, damit zusätzliche organisation erstellt wird
             # identifier=name
             # )
-            qgep_session.add(instance)
+            chunks.add(instance)
         return instance
 
     def metaattribute_common(metaattribute):
@@ -222,7 +382,7 @@ def qgep_import_dss(precommit_callback=None):
         """
         return {
             # not supported in qgep datamodel yet, reference on same class
-            # "fk_part_of": get_pk(row.teil_vonref__REL),
+            # "fk_part_of": get_pk(row.teil_vonref),
             "identifier": row.bezeichnung,
             # not part of qgep datamodel, only for release 2020
             # "municipality_number": row.gemeindenummer,
@@ -254,8 +414,8 @@ def qgep_import_dss(precommit_callback=None):
             "financing__REL": get_vl_instance(
                 QGEP.wastewater_structure_financing, row.finanzierung
             ),
-            "fk_operator": get_pk(row.betreiberref__REL),
-            "fk_owner": get_pk(row.eigentuemerref__REL),
+            "fk_operator": get_pk(row.betreiberref),
+            "fk_owner": get_pk(row.eigentuemerref),
             "gross_costs": row.bruttokosten,
             "identifier": row.bezeichnung,
             "inspection_interval": row.inspektionsintervall,
@@ -284,8 +444,8 @@ def qgep_import_dss(precommit_callback=None):
         Returns common attributes for maintenance_event
         """
         return {
-            "fk_measure": get_pk(row.massnahmeref__REL),
-            "fk_operating_company": get_pk(row.ausfuehrende_firmaref__REL),
+            "fk_measure": get_pk(row.massnahmeref),
+            "fk_operating_company": get_pk(row.ausfuehrende_firmaref),
         }
 
     def zone_common(row):
@@ -302,7 +462,7 @@ def qgep_import_dss(precommit_callback=None):
         Returns common attributes for water_control_structure
         """
         return {
-            "fk_water_course_segment": get_pk(row.gewaesserabschnittref__REL),
+            "fk_water_course_segment": get_pk(row.gewaesserabschnittref),
             "identifier": row.bezeichnung,
             "remark": row.bemerkung,
             "situation_geometry": (row.lage),
@@ -313,7 +473,7 @@ def qgep_import_dss(precommit_callback=None):
         Returns common attributes for wastewater_networkelement
         """
         return {
-            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref__REL),
+            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref),
             "identifier": row.bezeichnung,
             "remark": row.bemerkung,
         }
@@ -323,7 +483,7 @@ def qgep_import_dss(precommit_callback=None):
         Returns common attributes for structure_part
         """
         return {
-            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref__REL),
+            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref),
             "identifier": row.bezeichnung,
             "remark": row.bemerkung,
             "renovation_demand__REL": get_vl_instance(
@@ -336,9 +496,9 @@ def qgep_import_dss(precommit_callback=None):
         Returns common attributes for connection_object
         """
         return {
-            "fk_operator": get_pk(row.betreiberref__REL),
-            "fk_owner": get_pk(row.eigentuemerref__REL),
-            "fk_wastewater_networkelement": get_pk(row.abwassernetzelementref__REL),
+            "fk_operator": get_pk(row.betreiberref),
+            "fk_owner": get_pk(row.eigentuemerref),
+            "fk_wastewater_networkelement": get_pk(row.abwassernetzelementref),
             "identifier": row.bezeichnung,
             "remark": row.bemerkung,
             "sewer_infiltration_water_production": row.fremdwasseranfall,
@@ -350,7 +510,7 @@ def qgep_import_dss(precommit_callback=None):
         """
         return {
             "evaporation_loss": row.verdunstungsverlust,
-            "fk_catchment_area": get_pk(row.einzugsgebietref__REL),
+            "fk_catchment_area": get_pk(row.einzugsgebietref),
             "identifier": row.bezeichnung,
             "infiltration_loss": row.versickerungsverlust,
             "remark": row.bemerkung,
@@ -370,10 +530,10 @@ def qgep_import_dss(precommit_callback=None):
             "brand": row.fabrikat,
             "control__REL": get_vl_instance(QGEP.overflow_control, row.steuerung),
             "discharge_point": row.einleitstelle,
-            "fk_control_center": get_pk(row.steuerungszentraleref__REL),
-            "fk_overflow_char": get_pk(row.ueberlaufcharakteristikref__REL),
-            "fk_overflow_to": get_pk(row.ueberlaufnachref__REL),
-            "fk_wastewater_node": get_pk(row.abwasserknotenref__REL),
+            "fk_control_center": get_pk(row.steuerungszentraleref),
+            "fk_overflow_char": get_pk(row.ueberlaufcharakteristikref),
+            "fk_overflow_to": get_pk(row.ueberlaufnachref),
+            "fk_wastewater_node": get_pk(row.abwasserknotenref),
             "function__REL": get_vl_instance(QGEP.overflow_function, row.funktion),
             "gross_costs": row.bruttokosten,
             "identifier": row.bezeichnung,
@@ -386,9 +546,10 @@ def qgep_import_dss(precommit_callback=None):
         }
 
     logger.info("Importing ABWASSER.mutation, ABWASSER.metaattribute -> QGEP.mutation")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.mutation, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.mutation, ABWASSER.mutation)
+    for row, metaattribute in staging_query(ABWASSER.mutation, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         mutation = create_or_update(
             QGEP.mutation,
             **base_common(row),
@@ -405,12 +566,14 @@ def qgep_import_dss(precommit_callback=None):
             remark=row.bemerkung,
             user_system=row.systembenutzer,
         )
-        qgep_session.add(mutation)
+        chunks.add(mutation)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.grundwasserleiter, ABWASSER.metaattribute -> QGEP.aquifier")
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.aquifier, ABWASSER.grundwasserleiter)
+    for row, metaattribute in staging_query(
         ABWASSER.grundwasserleiter, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         aquifier = create_or_update(
@@ -425,14 +588,16 @@ def qgep_import_dss(precommit_callback=None):
             perimeter_geometry=(row.perimeter),
             remark=row.bemerkung,
         )
-        qgep_session.add(aquifier)
+        chunks.add(aquifier)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.fliessgewaesser, ABWASSER.metaattribute -> QGEP.river")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.fliessgewaesser, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.river, ABWASSER.fliessgewaesser)
+    for row, metaattribute in staging_query(ABWASSER.fliessgewaesser, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN fliessgewaesser
 
         # --- baseclass ---
@@ -468,12 +633,14 @@ def qgep_import_dss(precommit_callback=None):
             # --- river ---
             kind__REL=get_vl_instance(QGEP.river_kind, row.art),
         )
-        qgep_session.add(river)
+        chunks.add(river)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.see, ABWASSER.metaattribute -> QGEP.lake")
-    for row, metaattribute in abwasser_session.query(ABWASSER.see, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.lake, ABWASSER.see)
+    for row, metaattribute in staging_query(ABWASSER.see, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         # AVAILABLE FIELDS IN see
@@ -511,14 +678,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- lake ---
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(lake)
+        chunks.add(lake)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.gewaesserabschnitt, ABWASSER.metaattribute -> QGEP.water_course_segment"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.water_course_segment, ABWASSER.gewaesserabschnitt)
+    for row, metaattribute in staging_query(
         ABWASSER.gewaesserabschnitt, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         water_course_segment = create_or_update(
@@ -543,7 +712,7 @@ def qgep_import_dss(precommit_callback=None):
             ecom_classification__REL=get_vl_instance(
                 QGEP.water_course_segment_ecom_classification, row.oekom_klassifizierung
             ),
-            fk_watercourse=get_pk(row.fliessgewaesserref__REL),
+            fk_watercourse=get_pk(row.fliessgewaesserref),
             from_geometry=(row.von),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.water_course_segment_kind, row.art),
@@ -568,32 +737,36 @@ def qgep_import_dss(precommit_callback=None):
                 QGEP.water_course_segment_width_variability, row.breitenvariabilitaet
             ),
         )
-        qgep_session.add(water_course_segment)
+        chunks.add(water_course_segment)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.wasserfassung, ABWASSER.metaattribute -> QGEP.water_catchment")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.wasserfassung, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.water_catchment, ABWASSER.wasserfassung)
+    for row, metaattribute in staging_query(ABWASSER.wasserfassung, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         water_catchment = create_or_update(
             QGEP.water_catchment,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- water_catchment ---
-            fk_aquifier=get_pk(row.grundwasserleiterref__REL),
-            fk_surface_water_bodies=get_pk(row.oberflaechengewaesserref__REL),
+            fk_aquifier=get_pk(row.grundwasserleiterref),
+            fk_surface_water_bodies=get_pk(row.oberflaechengewaesserref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.water_catchment_kind, row.art),
             remark=row.bemerkung,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(water_catchment)
+        chunks.add(water_catchment)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.ufer, ABWASSER.metaattribute -> QGEP.river_bank")
-    for row, metaattribute in abwasser_session.query(ABWASSER.ufer, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.river_bank, ABWASSER.ufer)
+    for row, metaattribute in staging_query(ABWASSER.ufer, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         river_bank = create_or_update(
@@ -604,7 +777,7 @@ def qgep_import_dss(precommit_callback=None):
             control_grade_of_river__REL=get_vl_instance(
                 QGEP.river_bank_control_grade_of_river, row.verbauungsgrad
             ),
-            fk_water_course_segment=get_pk(row.gewaesserabschnittref__REL),
+            fk_water_course_segment=get_pk(row.gewaesserabschnittref),
             identifier=row.bezeichnung,
             remark=row.bemerkung,
             river_control_type__REL=get_vl_instance(
@@ -618,14 +791,16 @@ def qgep_import_dss(precommit_callback=None):
             vegetation__REL=get_vl_instance(QGEP.river_bank_vegetation, row.vegetation),
             width=row.breite,
         )
-        qgep_session.add(river_bank)
+        chunks.add(river_bank)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.gewaessersohle, ABWASSER.metaattribute -> QGEP.river_bed")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.gewaessersohle, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.river_bed, ABWASSER.gewaessersohle)
+    for row, metaattribute in staging_query(ABWASSER.gewaessersohle, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         river_bed = create_or_update(
             QGEP.river_bed,
             **base_common(row),
@@ -634,7 +809,7 @@ def qgep_import_dss(precommit_callback=None):
             control_grade_of_river__REL=get_vl_instance(
                 QGEP.river_bed_control_grade_of_river, row.verbauungsgrad
             ),
-            fk_water_course_segment=get_pk(row.gewaesserabschnittref__REL),
+            fk_water_course_segment=get_pk(row.gewaesserabschnittref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.river_bed_kind, row.art),
             remark=row.bemerkung,
@@ -643,16 +818,18 @@ def qgep_import_dss(precommit_callback=None):
             ),
             width=row.breite,
         )
-        qgep_session.add(river_bed)
+        chunks.add(river_bed)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.gewaessersektor, ABWASSER.metaattribute -> QGEP.sector_water_body"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.gewaessersektor, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.sector_water_body, ABWASSER.gewaessersektor)
+    for row, metaattribute in staging_query(ABWASSER.gewaessersektor, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         sector_water_body = create_or_update(
             QGEP.sector_water_body,
             **base_common(row),
@@ -660,8 +837,8 @@ def qgep_import_dss(precommit_callback=None):
             # --- sector_water_body ---
             code_bwg=row.bwg_code,
             # not supported in qgep datamodel yet, reference on same class
-            # fk_sector_previous=get_pk(row.vorherigersektorref__REL),
-            fk_surface_water_bodies=get_pk(row.oberflaechengewaesserref__REL),
+            # fk_sector_previous=get_pk(row.vorherigersektorref),
+            fk_surface_water_bodies=get_pk(row.oberflaechengewaesserref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.sector_water_body_kind, row.art),
             km_down=row.kilomo,
@@ -670,12 +847,14 @@ def qgep_import_dss(precommit_callback=None):
             ref_length=row.reflaenge,
             remark=row.bemerkung,
         )
-        qgep_session.add(sector_water_body)
+        chunks.add(sector_water_body)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.amt, ABWASSER.metaattribute -> QGEP.administrative_office")
-    for row, metaattribute in abwasser_session.query(ABWASSER.amt, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.administrative_office, ABWASSER.amt)
+    for row, metaattribute in staging_query(ABWASSER.amt, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         # AVAILABLE FIELDS IN amt
@@ -716,14 +895,16 @@ def qgep_import_dss(precommit_callback=None):
             # test 10.8.2022 / 11.8.2022 v9 wieder gelöscht
             #            dummy = "dummy"
         )
-        qgep_session.add(administrative_office)
+        chunks.add(administrative_office)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.genossenschaft_korporation, ABWASSER.metaattribute -> QGEP.cooperative"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.cooperative, ABWASSER.genossenschaft_korporation)
+    for row, metaattribute in staging_query(
         ABWASSER.genossenschaft_korporation, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN genossenschaft_korporation
@@ -760,12 +941,14 @@ def qgep_import_dss(precommit_callback=None):
             **organisation_common(row),
             # --- cooperative ---
         )
-        qgep_session.add(cooperative)
+        chunks.add(cooperative)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.kanton, ABWASSER.metaattribute -> QGEP.canton")
-    for row, metaattribute in abwasser_session.query(ABWASSER.kanton, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.canton, ABWASSER.kanton)
+    for row, metaattribute in staging_query(ABWASSER.kanton, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         # AVAILABLE FIELDS IN kanton
@@ -803,16 +986,18 @@ def qgep_import_dss(precommit_callback=None):
             # --- canton ---
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(canton)
+        chunks.add(canton)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.abwasserverband, ABWASSER.metaattribute -> QGEP.waste_water_association"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.abwasserverband, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.waste_water_association, ABWASSER.abwasserverband)
+    for row, metaattribute in staging_query(ABWASSER.abwasserverband, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN abwasserverband
 
         # --- baseclass ---
@@ -847,14 +1032,16 @@ def qgep_import_dss(precommit_callback=None):
             **organisation_common(row),
             # --- waste_water_association ---
         )
-        qgep_session.add(waste_water_association)
+        chunks.add(waste_water_association)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.gemeinde, ABWASSER.metaattribute -> QGEP.municipality")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.gemeinde, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.municipality, ABWASSER.gemeinde)
+    for row, metaattribute in staging_query(ABWASSER.gemeinde, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN gemeinde
 
         # --- baseclass ---
@@ -895,14 +1082,16 @@ def qgep_import_dss(precommit_callback=None):
             population=row.einwohner,
             total_surface=row.flaeche,
         )
-        qgep_session.add(municipality)
+        chunks.add(municipality)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.abwasserreinigungsanlage, ABWASSER.metaattribute -> QGEP.waste_water_treatment_plant"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.waste_water_treatment_plant, ABWASSER.abwasserreinigungsanlage)
+    for row, metaattribute in staging_query(
         ABWASSER.abwasserreinigungsanlage, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN abwasserreinigungsanlage
@@ -949,12 +1138,14 @@ def qgep_import_dss(precommit_callback=None):
             nh4=row.nh4,
             start_year=row.inbetriebnahme,
         )
-        qgep_session.add(waste_water_treatment_plant)
+        chunks.add(waste_water_treatment_plant)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.privat, ABWASSER.metaattribute -> QGEP.private")
-    for row, metaattribute in abwasser_session.query(ABWASSER.privat, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.private, ABWASSER.privat)
+    for row, metaattribute in staging_query(ABWASSER.privat, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         # AVAILABLE FIELDS IN privat
@@ -992,12 +1183,26 @@ def qgep_import_dss(precommit_callback=None):
             # --- private ---
             kind=row.art,
         )
-        qgep_session.add(private)
+        chunks.add(private)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
+
+    if classes is not None and "privat" in classes:
+        # The organisations named in the metaattributes of all classes are created with the organisations,
+        # so that the workers of the other groups find them instead of creating them concurrently
+        logger.info("Importing the organisations of ABWASSER.metaattribute")
+        for datenherr, datenlieferant in abwasser_session.query(
+            ABWASSER.metaattribute.datenherr, ABWASSER.metaattribute.datenlieferant
+        ).distinct():
+            create_or_update_organisation(datenherr)
+            create_or_update_organisation(datenlieferant)
+        logger.info("done")
+        chunks.commit()
 
     logger.info("Importing ABWASSER.kanal, ABWASSER.metaattribute -> QGEP.channel")
-    for row, metaattribute in abwasser_session.query(ABWASSER.kanal, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.channel, ABWASSER.kanal)
+    for row, metaattribute in staging_query(ABWASSER.kanal, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         # AVAILABLE FIELDS IN kanal
@@ -1050,14 +1255,16 @@ def qgep_import_dss(precommit_callback=None):
                 QGEP.channel_usage_planned, row.nutzungsart_geplant
             ),
         )
-        qgep_session.add(channel)
+        chunks.add(channel)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.normschacht, ABWASSER.metaattribute -> QGEP.manhole")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.normschacht, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.manhole, ABWASSER.normschacht)
+    for row, metaattribute in staging_query(ABWASSER.normschacht, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN normschacht
 
         # --- baseclass ---
@@ -1101,14 +1308,16 @@ def qgep_import_dss(precommit_callback=None):
                 QGEP.manhole_surface_inflow, row.oberflaechenzulauf
             ),
         )
-        qgep_session.add(manhole)
+        chunks.add(manhole)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.einleitstelle, ABWASSER.metaattribute -> QGEP.discharge_point")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.einleitstelle, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.discharge_point, ABWASSER.einleitstelle)
+    for row, metaattribute in staging_query(ABWASSER.einleitstelle, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN einleitstelle
 
         # --- baseclass ---
@@ -1144,7 +1353,7 @@ def qgep_import_dss(precommit_callback=None):
             # --- discharge_point ---
             # -- attribute 3D ---
             # depth=row.maechtigkeit,
-            fk_sector_water_body=get_pk(row.gewaessersektorref__REL),
+            fk_sector_water_body=get_pk(row.gewaessersektorref),
             highwater_level=row.hochwasserkote,
             relevance__REL=get_vl_instance(QGEP.discharge_point_relevance, row.relevanz),
             terrain_level=row.terrainkote,
@@ -1152,16 +1361,18 @@ def qgep_import_dss(precommit_callback=None):
             # upper_elevation=row.deckenkote,
             waterlevel_hydraulic=row.wasserspiegel_hydraulik,
         )
-        qgep_session.add(discharge_point)
+        chunks.add(discharge_point)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.spezialbauwerk, ABWASSER.metaattribute -> QGEP.special_structure"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.spezialbauwerk, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.special_structure, ABWASSER.spezialbauwerk)
+    for row, metaattribute in staging_query(ABWASSER.spezialbauwerk, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN spezialbauwerk
 
         # --- baseclass ---
@@ -1208,14 +1419,16 @@ def qgep_import_dss(precommit_callback=None):
             # -- attribute 3D ---
             # upper_elevation=row.deckenkote,
         )
-        qgep_session.add(special_structure)
+        chunks.add(special_structure)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.versickerungsanlage, ABWASSER.metaattribute -> QGEP.infiltration_installation"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.infiltration_installation, ABWASSER.versickerungsanlage)
+    for row, metaattribute in staging_query(
         ABWASSER.versickerungsanlage, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN versickerungsanlage
@@ -1262,7 +1475,7 @@ def qgep_import_dss(precommit_callback=None):
             emergency_spillway__REL=get_vl_instance(
                 QGEP.infiltration_installation_emergency_spillway, row.notueberlauf
             ),
-            fk_aquifier=get_pk(row.grundwasserleiterref__REL),
+            fk_aquifier=get_pk(row.grundwasserleiterref),
             kind__REL=get_vl_instance(QGEP.infiltration_installation_kind, row.art),
             labeling__REL=get_vl_instance(
                 QGEP.infiltration_installation_labeling, row.beschriftung
@@ -1279,14 +1492,16 @@ def qgep_import_dss(precommit_callback=None):
                 QGEP.infiltration_installation_watertightness, row.wasserdichtheit
             ),
         )
-        qgep_session.add(infiltration_installation)
+        chunks.add(infiltration_installation)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.arabauwerk, ABWASSER.metaattribute -> QGEP.wwtp_structure")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.arabauwerk, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.wwtp_structure, ABWASSER.arabauwerk)
+    for row, metaattribute in staging_query(ABWASSER.arabauwerk, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN arabauwerk
 
         # --- baseclass ---
@@ -1322,14 +1537,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- wwtp_structure ---
             kind__REL=get_vl_instance(QGEP.wwtp_structure_kind, row.art),
         )
-        qgep_session.add(wwtp_structure)
+        chunks.add(wwtp_structure)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.planungszone, ABWASSER.metaattribute -> QGEP.planning_zone")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.planungszone, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.planning_zone, ABWASSER.planungszone)
+    for row, metaattribute in staging_query(ABWASSER.planungszone, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN planungszone
 
         # --- baseclass ---
@@ -1366,14 +1583,16 @@ def qgep_import_dss(precommit_callback=None):
             kind__REL=get_vl_instance(QGEP.planning_zone_kind, row.art),
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(planning_zone)
+        chunks.add(planning_zone)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.versickerungsbereich, ABWASSER.metaattribute -> QGEP.infiltration_zone"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.infiltration_zone, ABWASSER.versickerungsbereich)
+    for row, metaattribute in staging_query(
         ABWASSER.versickerungsbereich, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN versickerungsbereich
@@ -1414,14 +1633,16 @@ def qgep_import_dss(precommit_callback=None):
             ),
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(infiltration_zone)
+        chunks.add(infiltration_zone)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.entwaesserungssystem, ABWASSER.metaattribute -> QGEP.drainage_system"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.drainage_system, ABWASSER.entwaesserungssystem)
+    for row, metaattribute in staging_query(
         ABWASSER.entwaesserungssystem, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN entwaesserungssystem
@@ -1460,14 +1681,16 @@ def qgep_import_dss(precommit_callback=None):
             kind__REL=get_vl_instance(QGEP.drainage_system_kind, row.art),
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(drainage_system)
+        chunks.add(drainage_system)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.gewaesserschutzbereich, ABWASSER.metaattribute -> QGEP.water_body_protection_sector"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.water_body_protection_sector, ABWASSER.gewaesserschutzbereich)
+    for row, metaattribute in staging_query(
         ABWASSER.gewaesserschutzbereich, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN gewaesserschutzbereich
@@ -1506,14 +1729,18 @@ def qgep_import_dss(precommit_callback=None):
             kind__REL=get_vl_instance(QGEP.water_body_protection_sector_kind, row.art),
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(water_body_protection_sector)
+        chunks.add(water_body_protection_sector)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.grundwasserschutzareal, ABWASSER.metaattribute -> QGEP.ground_water_protection_perimeter"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(
+        QGEP.ground_water_protection_perimeter, ABWASSER.grundwasserschutzareal
+    )
+    for row, metaattribute in staging_query(
         ABWASSER.grundwasserschutzareal, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN grundwasserschutzareal
@@ -1551,14 +1778,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- ground_water_protection_perimeter ---
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(ground_water_protection_perimeter)
+        chunks.add(ground_water_protection_perimeter)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.grundwasserschutzzone, ABWASSER.metaattribute -> QGEP.groundwater_protection_zone"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.groundwater_protection_zone, ABWASSER.grundwasserschutzzone)
+    for row, metaattribute in staging_query(
         ABWASSER.grundwasserschutzzone, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN grundwasserschutzzone
@@ -1597,14 +1826,16 @@ def qgep_import_dss(precommit_callback=None):
             kind__REL=get_vl_instance(QGEP.groundwater_protection_zone_kind, row.art),
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(groundwater_protection_zone)
+        chunks.add(groundwater_protection_zone)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.rohrprofil, ABWASSER.metaattribute -> QGEP.pipe_profile")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.rohrprofil, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.pipe_profile, ABWASSER.rohrprofil)
+    for row, metaattribute in staging_query(ABWASSER.rohrprofil, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         pipe_profile = create_or_update(
             QGEP.pipe_profile,
             **base_common(row),
@@ -1615,14 +1846,16 @@ def qgep_import_dss(precommit_callback=None):
             profile_type__REL=get_vl_instance(QGEP.pipe_profile_profile_type, row.profiltyp),
             remark=row.bemerkung,
         )
-        qgep_session.add(pipe_profile)
+        chunks.add(pipe_profile)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.araenergienutzung, ABWASSER.metaattribute -> QGEP.wwtp_energy_use"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.wwtp_energy_use, ABWASSER.araenergienutzung)
+    for row, metaattribute in staging_query(
         ABWASSER.araenergienutzung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         wwtp_energy_use = create_or_update(
@@ -1630,21 +1863,23 @@ def qgep_import_dss(precommit_callback=None):
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- wwtp_energy_use ---
-            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref__REL),
+            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref),
             gas_motor=row.gasmotor,
             heat_pump=row.waermepumpe,
             identifier=row.bezeichnung,
             remark=row.bemerkung,
             turbining=row.turbinierung,
         )
-        qgep_session.add(wwtp_energy_use)
+        chunks.add(wwtp_energy_use)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.abwasserbehandlung, ABWASSER.metaattribute -> QGEP.waste_water_treatment"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.waste_water_treatment, ABWASSER.abwasserbehandlung)
+    for row, metaattribute in staging_query(
         ABWASSER.abwasserbehandlung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         waste_water_treatment = create_or_update(
@@ -1652,19 +1887,21 @@ def qgep_import_dss(precommit_callback=None):
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- waste_water_treatment ---
-            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref__REL),
+            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.waste_water_treatment_kind, row.art),
             remark=row.bemerkung,
         )
-        qgep_session.add(waste_water_treatment)
+        chunks.add(waste_water_treatment)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.schlammbehandlung, ABWASSER.metaattribute -> QGEP.sludge_treatment"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.sludge_treatment, ABWASSER.schlammbehandlung)
+    for row, metaattribute in staging_query(
         ABWASSER.schlammbehandlung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         sludge_treatment = create_or_update(
@@ -1676,7 +1913,7 @@ def qgep_import_dss(precommit_callback=None):
             dehydration=row.entwaesserung,
             digested_sludge_combustion=row.faulschlammverbrennung,
             drying=row.trocknung,
-            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref__REL),
+            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref),
             fresh_sludge_combustion=row.frischschlammverbrennung,
             hygenisation=row.hygienisierung,
             identifier=row.bezeichnung,
@@ -1690,14 +1927,16 @@ def qgep_import_dss(precommit_callback=None):
             stacking_of_dehydrated_sludge=row.entwaessertklaerschlammstapelung,
             stacking_of_liquid_sludge=row.fluessigklaerschlammstapelung,
         )
-        qgep_session.add(sludge_treatment)
+        chunks.add(sludge_treatment)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.steuerungszentrale, ABWASSER.metaattribute -> QGEP.control_center"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.control_center, ABWASSER.steuerungszentrale)
+    for row, metaattribute in staging_query(
         ABWASSER.steuerungszentrale, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         control_center = create_or_update(
@@ -1708,12 +1947,14 @@ def qgep_import_dss(precommit_callback=None):
             identifier=row.bezeichnung,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(control_center)
+        chunks.add(control_center)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.furt, ABWASSER.metaattribute -> QGEP.ford")
-    for row, metaattribute in abwasser_session.query(ABWASSER.furt, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.ford, ABWASSER.furt)
+    for row, metaattribute in staging_query(ABWASSER.furt, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         # AVAILABLE FIELDS IN furt
@@ -1750,12 +1991,14 @@ def qgep_import_dss(precommit_callback=None):
             **water_control_structure_common(row),
             # --- ford ---
         )
-        qgep_session.add(ford)
+        chunks.add(ford)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.gewaesserabsturz, ABWASSER.metaattribute -> QGEP.chute")
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.chute, ABWASSER.gewaesserabsturz)
+    for row, metaattribute in staging_query(
         ABWASSER.gewaesserabsturz, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN gewaesserabsturz
@@ -1795,14 +2038,16 @@ def qgep_import_dss(precommit_callback=None):
             material__REL=get_vl_instance(QGEP.chute_material, row.material),
             vertical_drop=row.absturzhoehe,
         )
-        qgep_session.add(chute)
+        chunks.add(chute)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.schleuse, ABWASSER.metaattribute -> QGEP.lock")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.schleuse, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.lock, ABWASSER.schleuse)
+    for row, metaattribute in staging_query(ABWASSER.schleuse, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN schleuse
 
         # --- baseclass ---
@@ -1838,14 +2083,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- lock ---
             vertical_drop=row.absturzhoehe,
         )
-        qgep_session.add(lock)
+        chunks.add(lock)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.durchlass, ABWASSER.metaattribute -> QGEP.passage")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.durchlass, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.passage, ABWASSER.durchlass)
+    for row, metaattribute in staging_query(ABWASSER.durchlass, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN durchlass
 
         # --- baseclass ---
@@ -1880,16 +2127,18 @@ def qgep_import_dss(precommit_callback=None):
             **water_control_structure_common(row),
             # --- passage ---
         )
-        qgep_session.add(passage)
+        chunks.add(passage)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.geschiebesperre, ABWASSER.metaattribute -> QGEP.blocking_debris"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.geschiebesperre, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.blocking_debris, ABWASSER.geschiebesperre)
+    for row, metaattribute in staging_query(ABWASSER.geschiebesperre, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN geschiebesperre
 
         # --- baseclass ---
@@ -1925,14 +2174,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- blocking_debris ---
             vertical_drop=row.absturzhoehe,
         )
-        qgep_session.add(blocking_debris)
+        chunks.add(blocking_debris)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.gewaesserwehr, ABWASSER.metaattribute -> QGEP.dam")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.gewaesserwehr, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.dam, ABWASSER.gewaesserwehr)
+    for row, metaattribute in staging_query(ABWASSER.gewaesserwehr, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN gewaesserwehr
 
         # --- baseclass ---
@@ -1969,14 +2220,16 @@ def qgep_import_dss(precommit_callback=None):
             kind__REL=get_vl_instance(QGEP.dam_kind, row.art),
             vertical_drop=row.absturzhoehe,
         )
-        qgep_session.add(dam)
+        chunks.add(dam)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.sohlrampe, ABWASSER.metaattribute -> QGEP.rock_ramp")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.sohlrampe, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.rock_ramp, ABWASSER.sohlrampe)
+    for row, metaattribute in staging_query(ABWASSER.sohlrampe, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN sohlrampe
 
         # --- baseclass ---
@@ -2013,50 +2266,56 @@ def qgep_import_dss(precommit_callback=None):
             stabilisation__REL=get_vl_instance(QGEP.rock_ramp_stabilisation, row.befestigung),
             vertical_drop=row.absturzhoehe,
         )
-        qgep_session.add(rock_ramp)
+        chunks.add(rock_ramp)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.fischpass, ABWASSER.metaattribute -> QGEP.fish_pass")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.fischpass, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.fish_pass, ABWASSER.fischpass)
+    for row, metaattribute in staging_query(ABWASSER.fischpass, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         fish_pass = create_or_update(
             QGEP.fish_pass,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- fish_pass ---
-            fk_water_control_structure=get_pk(row.gewaesserverbauungref__REL),
+            fk_water_control_structure=get_pk(row.gewaesserverbauungref),
             identifier=row.bezeichnung,
             remark=row.bemerkung,
             vertical_drop=row.absturzhoehe,
         )
-        qgep_session.add(fish_pass)
+        chunks.add(fish_pass)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.badestelle, ABWASSER.metaattribute -> QGEP.bathing_area")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.badestelle, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.bathing_area, ABWASSER.badestelle)
+    for row, metaattribute in staging_query(ABWASSER.badestelle, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         bathing_area = create_or_update(
             QGEP.bathing_area,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- bathing_area ---
-            fk_surface_water_bodies=get_pk(row.oberflaechengewaesserref__REL),
+            fk_surface_water_bodies=get_pk(row.oberflaechengewaesserref),
             identifier=row.bezeichnung,
             remark=row.bemerkung,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(bathing_area)
+        chunks.add(bathing_area)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.hydr_geometrie, ABWASSER.metaattribute -> QGEP.hydr_geometry")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.hydr_geometrie, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.hydr_geometry, ABWASSER.hydr_geometrie)
+    for row, metaattribute in staging_query(ABWASSER.hydr_geometrie, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         hydr_geometry = create_or_update(
             QGEP.hydr_geometry,
             **base_common(row),
@@ -2070,14 +2329,16 @@ def qgep_import_dss(precommit_callback=None):
             utilisable_capacity=row.nutzinhalt,
             volume_pump_sump=row.volumen_pumpensumpf,
         )
-        qgep_session.add(hydr_geometry)
+        chunks.add(hydr_geometry)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.haltungspunkt, ABWASSER.metaattribute -> QGEP.reach_point")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.haltungspunkt, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.reach_point, ABWASSER.haltungspunkt)
+    for row, metaattribute in staging_query(ABWASSER.haltungspunkt, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         reach_point = create_or_update(
             QGEP.reach_point,
             **base_common(row),
@@ -2086,7 +2347,7 @@ def qgep_import_dss(precommit_callback=None):
             elevation_accuracy__REL=get_vl_instance(
                 QGEP.reach_point_elevation_accuracy, row.hoehengenauigkeit
             ),
-            fk_wastewater_networkelement=get_pk(row.abwassernetzelementref__REL),
+            fk_wastewater_networkelement=get_pk(row.abwassernetzelementref),
             identifier=row.bezeichnung,
             level=row.kote,
             outlet_shape__REL=get_vl_instance(QGEP.reach_point_outlet_shape, row.auslaufform),
@@ -2094,16 +2355,18 @@ def qgep_import_dss(precommit_callback=None):
             remark=row.bemerkung,
             situation_geometry=ST_Force3D(row.lage),
         )
-        qgep_session.add(reach_point)
+        chunks.add(reach_point)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.abwasserknoten, ABWASSER.metaattribute -> QGEP.wastewater_node"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.abwasserknoten, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.wastewater_node, ABWASSER.abwasserknoten)
+    for row, metaattribute in staging_query(ABWASSER.abwasserknoten, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN abwasserknoten
 
         # --- baseclass ---
@@ -2139,17 +2402,19 @@ def qgep_import_dss(precommit_callback=None):
             # --- wastewater_node ---
             backflow_level=row.rueckstaukote,
             bottom_level=row.sohlenkote,
-            fk_hydr_geometry=get_pk(row.hydr_geometrieref__REL),
+            fk_hydr_geometry=get_pk(row.hydr_geometrieref),
             situation_geometry=ST_Force3D(row.lage),
         )
-        qgep_session.add(wastewater_node)
+        chunks.add(wastewater_node)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.haltung, ABWASSER.metaattribute -> QGEP.reach")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.haltung, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.reach, ABWASSER.haltung)
+    for row, metaattribute in staging_query(ABWASSER.haltung, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN haltung
 
         # --- baseclass ---
@@ -2188,9 +2453,9 @@ def qgep_import_dss(precommit_callback=None):
             # -- attribute 3D ---            #elevation_determination__REL=get_vl_instance(
             # QGEP.reach_elevation_determination, row.hoehenbestimmung
             # ),
-            fk_pipe_profile=get_pk(row.rohrprofilref__REL),
-            fk_reach_point_from=get_pk(row.vonhaltungspunktref__REL),
-            fk_reach_point_to=get_pk(row.nachhaltungspunktref__REL),
+            fk_pipe_profile=get_pk(row.rohrprofilref),
+            fk_reach_point_from=get_pk(row.vonhaltungspunktref),
+            fk_reach_point_to=get_pk(row.nachhaltungspunktref),
             horizontal_positioning__REL=get_vl_instance(
                 QGEP.reach_horizontal_positioning, row.lagebestimmung
             ),
@@ -2212,14 +2477,16 @@ def qgep_import_dss(precommit_callback=None):
             slope_building_plan=row.plangefaelle,
             wall_roughness=row.wandrauhigkeit,
         )
-        qgep_session.add(reach)
+        chunks.add(reach)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.rohrprofil_geometrie, ABWASSER.metaattribute -> QGEP.profile_geometry"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.profile_geometry, ABWASSER.rohrprofil_geometrie)
+    for row, metaattribute in staging_query(
         ABWASSER.rohrprofil_geometrie, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         profile_geometry = create_or_update(
@@ -2227,19 +2494,21 @@ def qgep_import_dss(precommit_callback=None):
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- profile_geometry ---
-            fk_pipe_profile=get_pk(row.rohrprofilref__REL),
+            fk_pipe_profile=get_pk(row.rohrprofilref),
             position=row.aposition,
             x=row.x,
             y=row.y,
         )
-        qgep_session.add(profile_geometry)
+        chunks.add(profile_geometry)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.hydr_geomrelation, ABWASSER.metaattribute -> QGEP.hydr_geom_relation"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.hydr_geom_relation, ABWASSER.hydr_geomrelation)
+    for row, metaattribute in staging_query(
         ABWASSER.hydr_geomrelation, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         hydr_geom_relation = create_or_update(
@@ -2247,19 +2516,21 @@ def qgep_import_dss(precommit_callback=None):
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- hydr_geom_relation ---
-            fk_hydr_geometry=get_pk(row.hydr_geometrieref__REL),
+            fk_hydr_geometry=get_pk(row.hydr_geometrieref),
             water_depth=row.wassertiefe,
             water_surface=row.wasseroberflaeche,
             wet_cross_section_area=row.benetztequerschnittsflaeche,
         )
-        qgep_session.add(hydr_geom_relation)
+        chunks.add(hydr_geom_relation)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.mechanischevorreinigung, ABWASSER.metaattribute -> QGEP.mechanical_pretreatment"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.mechanical_pretreatment, ABWASSER.mechanischevorreinigung)
+    for row, metaattribute in staging_query(
         ABWASSER.mechanischevorreinigung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         mechanical_pretreatment = create_or_update(
@@ -2267,20 +2538,22 @@ def qgep_import_dss(precommit_callback=None):
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- mechanical_pretreatment ---
-            fk_infiltration_installation=get_pk(row.versickerungsanlageref__REL),
-            fk_wastewater_structure=get_pk(row.abwasserbauwerkref__REL),
+            fk_infiltration_installation=get_pk(row.versickerungsanlageref),
+            fk_wastewater_structure=get_pk(row.abwasserbauwerkref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.mechanical_pretreatment_kind, row.art),
             remark=row.bemerkung,
         )
-        qgep_session.add(mechanical_pretreatment)
+        chunks.add(mechanical_pretreatment)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.retentionskoerper, ABWASSER.metaattribute -> QGEP.retention_body"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.retention_body, ABWASSER.retentionskoerper)
+    for row, metaattribute in staging_query(
         ABWASSER.retentionskoerper, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         retention_body = create_or_update(
@@ -2288,20 +2561,22 @@ def qgep_import_dss(precommit_callback=None):
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- retention_body ---
-            fk_infiltration_installation=get_pk(row.versickerungsanlageref__REL),
+            fk_infiltration_installation=get_pk(row.versickerungsanlageref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.retention_body_kind, row.art),
             remark=row.bemerkung,
             volume=row.retention_volumen,
         )
-        qgep_session.add(retention_body)
+        chunks.add(retention_body)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.ueberlaufcharakteristik, ABWASSER.metaattribute -> QGEP.overflow_char"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.overflow_char, ABWASSER.ueberlaufcharakteristik)
+    for row, metaattribute in staging_query(
         ABWASSER.ueberlaufcharakteristik, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         overflow_char = create_or_update(
@@ -2318,32 +2593,36 @@ def qgep_import_dss(precommit_callback=None):
             ),
             remark=row.bemerkung,
         )
-        qgep_session.add(overflow_char)
+        chunks.add(overflow_char)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.hq_relation, ABWASSER.metaattribute -> QGEP.hq_relation")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.hq_relation, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.hq_relation, ABWASSER.hq_relation)
+    for row, metaattribute in staging_query(ABWASSER.hq_relation, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         hq_relation = create_or_update(
             QGEP.hq_relation,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- hq_relation ---
             altitude=row.hoehe,
-            fk_overflow_char=get_pk(row.ueberlaufcharakteristikref__REL),
+            fk_overflow_char=get_pk(row.ueberlaufcharakteristikref),
             flow=row.abfluss,
             flow_from=row.zufluss,
         )
-        qgep_session.add(hq_relation)
+        chunks.add(hq_relation)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.trockenwetterfallrohr, ABWASSER.metaattribute -> QGEP.dryweather_downspout"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.dryweather_downspout, ABWASSER.trockenwetterfallrohr)
+    for row, metaattribute in staging_query(
         ABWASSER.trockenwetterfallrohr, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN trockenwetterfallrohr
@@ -2381,14 +2660,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- dryweather_downspout ---
             diameter=row.durchmesser,
         )
-        qgep_session.add(dryweather_downspout)
+        chunks.add(dryweather_downspout)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.einstiegshilfe, ABWASSER.metaattribute -> QGEP.access_aid")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.einstiegshilfe, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.access_aid, ABWASSER.einstiegshilfe)
+    for row, metaattribute in staging_query(ABWASSER.einstiegshilfe, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN einstiegshilfe
 
         # --- baseclass ---
@@ -2424,14 +2705,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- access_aid ---
             kind__REL=get_vl_instance(QGEP.access_aid_kind, row.art),
         )
-        qgep_session.add(access_aid)
+        chunks.add(access_aid)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.trockenwetterrinne, ABWASSER.metaattribute -> QGEP.dryweather_flume"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.dryweather_flume, ABWASSER.trockenwetterrinne)
+    for row, metaattribute in staging_query(
         ABWASSER.trockenwetterrinne, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN trockenwetterrinne
@@ -2469,12 +2752,14 @@ def qgep_import_dss(precommit_callback=None):
             # --- dryweather_flume ---
             material__REL=get_vl_instance(QGEP.dryweather_flume_material, row.material),
         )
-        qgep_session.add(dryweather_flume)
+        chunks.add(dryweather_flume)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.deckel, ABWASSER.metaattribute -> QGEP.cover")
-    for row, metaattribute in abwasser_session.query(ABWASSER.deckel, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.cover, ABWASSER.deckel)
+    for row, metaattribute in staging_query(ABWASSER.deckel, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         # AVAILABLE FIELDS IN deckel
@@ -2525,14 +2810,16 @@ def qgep_import_dss(precommit_callback=None):
             sludge_bucket__REL=get_vl_instance(QGEP.cover_sludge_bucket, row.schlammeimer),
             venting__REL=get_vl_instance(QGEP.cover_venting, row.entlueftung),
         )
-        qgep_session.add(cover)
+        chunks.add(cover)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.elektrischeeinrichtung, ABWASSER.metaattribute -> QGEP.electric_equipment"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.electric_equipment, ABWASSER.elektrischeeinrichtung)
+    for row, metaattribute in staging_query(
         ABWASSER.elektrischeeinrichtung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN elektrischeeinrichtung
@@ -2572,14 +2859,18 @@ def qgep_import_dss(precommit_callback=None):
             kind__REL=get_vl_instance(QGEP.electric_equipment_kind, row.art),
             year_of_replacement=row.ersatzjahr,
         )
-        qgep_session.add(electric_equipment)
+        chunks.add(electric_equipment)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.elektromechanischeausruestung, ABWASSER.metaattribute -> QGEP.electromechanical_equipment"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(
+        QGEP.electromechanical_equipment, ABWASSER.elektromechanischeausruestung
+    )
+    for row, metaattribute in staging_query(
         ABWASSER.elektromechanischeausruestung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN elektromechanischeausruestung
@@ -2619,14 +2910,16 @@ def qgep_import_dss(precommit_callback=None):
             kind__REL=get_vl_instance(QGEP.electromechanical_equipment_kind, row.art),
             year_of_replacement=row.ersatzjahr,
         )
-        qgep_session.add(electromechanical_equipment)
+        chunks.add(electromechanical_equipment)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.bankett, ABWASSER.metaattribute -> QGEP.benching")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.bankett, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.benching, ABWASSER.bankett)
+    for row, metaattribute in staging_query(ABWASSER.bankett, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN bankett
 
         # --- baseclass ---
@@ -2662,14 +2955,16 @@ def qgep_import_dss(precommit_callback=None):
             # --- benching ---
             kind__REL=get_vl_instance(QGEP.benching_kind, row.art),
         )
-        qgep_session.add(benching)
+        chunks.add(benching)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.gebaeude, ABWASSER.metaattribute -> QGEP.building")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.gebaeude, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.building, ABWASSER.gebaeude)
+    for row, metaattribute in staging_query(ABWASSER.gebaeude, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN gebaeude
 
         # --- baseclass ---
@@ -2708,14 +3003,16 @@ def qgep_import_dss(precommit_callback=None):
             perimeter_geometry=(row.perimeter),
             reference_point_geometry=(row.referenzpunkt),
         )
-        qgep_session.add(building)
+        chunks.add(building)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.reservoir, ABWASSER.metaattribute -> QGEP.reservoir")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.reservoir, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.reservoir, ABWASSER.reservoir)
+    for row, metaattribute in staging_query(ABWASSER.reservoir, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN reservoir
 
         # --- baseclass ---
@@ -2752,16 +3049,18 @@ def qgep_import_dss(precommit_callback=None):
             location_name=row.standortname,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(reservoir)
+        chunks.add(reservoir)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.einzelflaeche, ABWASSER.metaattribute -> QGEP.individual_surface"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.einzelflaeche, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.individual_surface, ABWASSER.einzelflaeche)
+    for row, metaattribute in staging_query(ABWASSER.einzelflaeche, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN einzelflaeche
 
         # --- baseclass ---
@@ -2800,14 +3099,16 @@ def qgep_import_dss(precommit_callback=None):
             pavement__REL=get_vl_instance(QGEP.individual_surface_pavement, row.befestigung),
             perimeter_geometry=(row.perimeter),
         )
-        qgep_session.add(individual_surface)
+        chunks.add(individual_surface)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.brunnen, ABWASSER.metaattribute -> QGEP.fountain")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.brunnen, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.fountain, ABWASSER.brunnen)
+    for row, metaattribute in staging_query(ABWASSER.brunnen, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN brunnen
 
         # --- baseclass ---
@@ -2844,31 +3145,35 @@ def qgep_import_dss(precommit_callback=None):
             location_name=row.standortname,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(fountain)
+        chunks.add(fountain)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.gefahrenquelle, ABWASSER.metaattribute -> QGEP.hazard_source")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.gefahrenquelle, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.hazard_source, ABWASSER.gefahrenquelle)
+    for row, metaattribute in staging_query(ABWASSER.gefahrenquelle, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         hazard_source = create_or_update(
             QGEP.hazard_source,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- hazard_source ---
-            fk_connection_object=get_pk(row.anschlussobjektref__REL),
-            fk_owner=get_pk(row.eigentuemerref__REL),
+            fk_connection_object=get_pk(row.anschlussobjektref),
+            fk_owner=get_pk(row.eigentuemerref),
             identifier=row.bezeichnung,
             remark=row.bemerkung,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(hazard_source)
+        chunks.add(hazard_source)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.unfall, ABWASSER.metaattribute -> QGEP.accident")
-    for row, metaattribute in abwasser_session.query(ABWASSER.unfall, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.accident, ABWASSER.unfall)
+    for row, metaattribute in staging_query(ABWASSER.unfall, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         accident = create_or_update(
@@ -2877,19 +3182,21 @@ def qgep_import_dss(precommit_callback=None):
             **metaattribute_common(metaattribute),
             # --- accident ---
             date=row.datum,
-            fk_hazard_source=get_pk(row.gefahrenquelleref__REL),
+            fk_hazard_source=get_pk(row.gefahrenquelleref),
             identifier=row.bezeichnung,
             place=row.ort,
             remark=row.bemerkung,
             responsible=row.verursacher,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(accident)
+        chunks.add(accident)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.stoff, ABWASSER.metaattribute -> QGEP.substance")
-    for row, metaattribute in abwasser_session.query(ABWASSER.stoff, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.substance, ABWASSER.stoff)
+    for row, metaattribute in staging_query(ABWASSER.stoff, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
         substance = create_or_update(
@@ -2897,20 +3204,22 @@ def qgep_import_dss(precommit_callback=None):
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- substance ---
-            fk_hazard_source=get_pk(row.gefahrenquelleref__REL),
+            fk_hazard_source=get_pk(row.gefahrenquelleref),
             identifier=row.bezeichnung,
             kind=row.art,
             remark=row.bemerkung,
             stockage=row.lagerung,
         )
-        qgep_session.add(substance)
+        chunks.add(substance)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.einzugsgebiet, ABWASSER.metaattribute -> QGEP.catchment_area")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.einzugsgebiet, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.catchment_area, ABWASSER.einzugsgebiet)
+    for row, metaattribute in staging_query(ABWASSER.einzugsgebiet, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         catchment_area = create_or_update(
             QGEP.catchment_area,
             **base_common(row),
@@ -2934,21 +3243,17 @@ def qgep_import_dss(precommit_callback=None):
                 QGEP.catchment_area_drainage_system_planned, row.entwaesserungssystem_geplant
             ),
             # not supported in qgep datamodel, vsa-dss release 2020 only
-            # fk_special_building_rw_current=get_pk(row.sbw_rw_istref__REL),
+            # fk_special_building_rw_current=get_pk(row.sbw_rw_istref),
             # not supported in qgep datamodel, vsa-dss release 2020 only
-            # fk_special_building_rw_planned=get_pk(row.sbw_rw_geplantref__REL),
+            # fk_special_building_rw_planned=get_pk(row.sbw_rw_geplantref),
             # not supported in qgep datamodel, vsa-dss release 2020 only
-            # fk_special_building_ww_current=get_pk(row.sbw_sw_istref__REL),
+            # fk_special_building_ww_current=get_pk(row.sbw_sw_istref),
             # not supported in qgep datamodel, vsa-dss release 2020 only
-            # fk_special_building_ww_planned=get_pk(row.sbw_sw_geplantref__REL),
-            fk_wastewater_networkelement_rw_current=get_pk(row.abwassernetzelement_rw_istref__REL),
-            fk_wastewater_networkelement_rw_planned=get_pk(
-                row.abwassernetzelement_rw_geplantref__REL
-            ),
-            fk_wastewater_networkelement_ww_current=get_pk(row.abwassernetzelement_sw_istref__REL),
-            fk_wastewater_networkelement_ww_planned=get_pk(
-                row.abwassernetzelement_sw_geplantref__REL
-            ),
+            # fk_special_building_ww_planned=get_pk(row.sbw_sw_geplantref),
+            fk_wastewater_networkelement_rw_current=get_pk(row.abwassernetzelement_rw_istref),
+            fk_wastewater_networkelement_rw_planned=get_pk(row.abwassernetzelement_rw_geplantref),
+            fk_wastewater_networkelement_ww_current=get_pk(row.abwassernetzelement_sw_istref),
+            fk_wastewater_networkelement_ww_planned=get_pk(row.abwassernetzelement_sw_geplantref),
             identifier=row.bezeichnung,
             infiltration_current__REL=get_vl_instance(
                 QGEP.catchment_area_infiltration_current, row.versickerung_ist
@@ -2978,14 +3283,16 @@ def qgep_import_dss(precommit_callback=None):
             waste_water_production_current=row.schmutzabwasseranfall_ist,
             waste_water_production_planned=row.schmutzabwasseranfall_geplant,
         )
-        qgep_session.add(catchment_area)
+        chunks.add(catchment_area)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.messstelle, ABWASSER.metaattribute -> QGEP.measuring_point")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.messstelle, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.measuring_point, ABWASSER.messstelle)
+    for row, metaattribute in staging_query(ABWASSER.messstelle, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         measuring_point = create_or_update(
             QGEP.measuring_point,
             **base_common(row),
@@ -2994,76 +3301,82 @@ def qgep_import_dss(precommit_callback=None):
             damming_device__REL=get_vl_instance(
                 QGEP.measuring_point_damming_device, row.staukoerper
             ),
-            fk_operator=get_pk(row.betreiberref__REL),
+            fk_operator=get_pk(row.betreiberref),
             # not supported in qgep datamodel yet, reference on same class
-            # fk_reference_station=get_pk(row.referenzstelleref__REL),
-            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref__REL),
-            fk_wastewater_structure=get_pk(row.abwasserbauwerkref__REL),
-            fk_water_course_segment=get_pk(row.gewaesserabschnittref__REL),
+            # fk_reference_station=get_pk(row.referenzstelleref),
+            fk_waste_water_treatment_plant=get_pk(row.abwasserreinigungsanlageref),
+            fk_wastewater_structure=get_pk(row.abwasserbauwerkref),
+            fk_water_course_segment=get_pk(row.gewaesserabschnittref),
             identifier=row.bezeichnung,
             kind=row.art,
             purpose__REL=get_vl_instance(QGEP.measuring_point_purpose, row.zweck),
             remark=row.bemerkung,
             situation_geometry=(row.lage),
         )
-        qgep_session.add(measuring_point)
+        chunks.add(measuring_point)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.messgeraet, ABWASSER.metaattribute -> QGEP.measuring_device")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.messgeraet, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.measuring_device, ABWASSER.messgeraet)
+    for row, metaattribute in staging_query(ABWASSER.messgeraet, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         measuring_device = create_or_update(
             QGEP.measuring_device,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- measuring_device ---
             brand=row.fabrikat,
-            fk_measuring_point=get_pk(row.messstelleref__REL),
+            fk_measuring_point=get_pk(row.messstelleref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.measuring_device_kind, row.art),
             remark=row.bemerkung,
             serial_number=row.seriennummer,
         )
-        qgep_session.add(measuring_device)
+        chunks.add(measuring_device)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.messreihe, ABWASSER.metaattribute -> QGEP.measurement_series")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.messreihe, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.measurement_series, ABWASSER.messreihe)
+    for row, metaattribute in staging_query(ABWASSER.messreihe, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         measurement_series = create_or_update(
             QGEP.measurement_series,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- measurement_series ---
             dimension=row.dimension,
-            fk_measuring_point=get_pk(row.messstelleref__REL),
+            fk_measuring_point=get_pk(row.messstelleref),
             # not supported in qgep datamodel yet, reference on same class
-            # fk_wastewater_networkelement=get_pk(row.abwassernetzelementref__REL),
+            # fk_wastewater_networkelement=get_pk(row.abwassernetzelementref),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.measurement_series_kind, row.art),
             remark=row.bemerkung,
         )
-        qgep_session.add(measurement_series)
+        chunks.add(measurement_series)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.messresultat, ABWASSER.metaattribute -> QGEP.measurement_result"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.messresultat, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.measurement_result, ABWASSER.messresultat)
+    for row, metaattribute in staging_query(ABWASSER.messresultat, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         measurement_result = create_or_update(
             QGEP.measurement_result,
             **base_common(row),
             **metaattribute_common(metaattribute),
             # --- measurement_result ---
-            fk_measurement_series=get_pk(row.messreiheref__REL),
-            fk_measuring_device=get_pk(row.messgeraetref__REL),
+            fk_measurement_series=get_pk(row.messreiheref),
+            fk_measuring_device=get_pk(row.messgeraetref),
             identifier=row.bezeichnung,
             measurement_type__REL=get_vl_instance(
                 QGEP.measurement_result_measurement_type, row.messart
@@ -3073,14 +3386,16 @@ def qgep_import_dss(precommit_callback=None):
             time=row.zeit,
             value=row.wert,
         )
-        qgep_session.add(measurement_result)
+        chunks.add(measurement_result)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.absperr_drosselorgan, ABWASSER.metaattribute -> QGEP.throttle_shut_off_unit"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.throttle_shut_off_unit, ABWASSER.absperr_drosselorgan)
+    for row, metaattribute in staging_query(
         ABWASSER.absperr_drosselorgan, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         throttle_shut_off_unit = create_or_update(
@@ -3095,9 +3410,9 @@ def qgep_import_dss(precommit_callback=None):
             control__REL=get_vl_instance(QGEP.throttle_shut_off_unit_control, row.steuerung),
             cross_section=row.querschnitt,
             effective_cross_section=row.wirksamer_qs,
-            fk_control_center=get_pk(row.steuerungszentraleref__REL),
-            fk_overflow=get_pk(row.ueberlaufref__REL),
-            fk_wastewater_node=get_pk(row.abwasserknotenref__REL),
+            fk_control_center=get_pk(row.steuerungszentraleref),
+            fk_overflow=get_pk(row.ueberlaufref),
+            fk_wastewater_node=get_pk(row.abwasserknotenref),
             gross_costs=row.bruttokosten,
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.throttle_shut_off_unit_kind, row.art),
@@ -3110,14 +3425,16 @@ def qgep_import_dss(precommit_callback=None):
             throttle_unit_opening_current=row.drosselorgan_oeffnung_ist,
             throttle_unit_opening_current_optimized=row.drosselorgan_oeffnung_ist_optimiert,
         )
-        qgep_session.add(throttle_shut_off_unit)
+        chunks.add(throttle_shut_off_unit)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.streichwehr, ABWASSER.metaattribute -> QGEP.prank_weir")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.streichwehr, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.prank_weir, ABWASSER.streichwehr)
+    for row, metaattribute in staging_query(ABWASSER.streichwehr, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN streichwehr
 
         # --- baseclass ---
@@ -3157,14 +3474,16 @@ def qgep_import_dss(precommit_callback=None):
             weir_edge__REL=get_vl_instance(QGEP.prank_weir_weir_edge, row.ueberfallkante),
             weir_kind__REL=get_vl_instance(QGEP.prank_weir_weir_kind, row.wehr_art),
         )
-        qgep_session.add(prank_weir)
+        chunks.add(prank_weir)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.foerderaggregat, ABWASSER.metaattribute -> QGEP.pump")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.foerderaggregat, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.pump, ABWASSER.foerderaggregat)
+    for row, metaattribute in staging_query(ABWASSER.foerderaggregat, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN foerderaggregat
 
         # --- baseclass ---
@@ -3212,14 +3531,16 @@ def qgep_import_dss(precommit_callback=None):
             stop_level=row.kotestop,
             usage_current__REL=get_vl_instance(QGEP.pump_usage_current, row.nutzungsart_ist),
         )
-        qgep_session.add(pump)
+        chunks.add(pump)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.leapingwehr, ABWASSER.metaattribute -> QGEP.leapingweir")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.leapingwehr, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.leapingweir, ABWASSER.leapingwehr)
+    for row, metaattribute in staging_query(ABWASSER.leapingwehr, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN leapingwehr
 
         # --- baseclass ---
@@ -3257,16 +3578,18 @@ def qgep_import_dss(precommit_callback=None):
             opening_shape__REL=get_vl_instance(QGEP.leapingweir_opening_shape, row.oeffnungsform),
             width=row.breite,
         )
-        qgep_session.add(leapingweir)
+        chunks.add(leapingweir)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.hydr_kennwerte, ABWASSER.metaattribute -> QGEP.hydraulic_char_data"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.hydr_kennwerte, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.hydraulic_char_data, ABWASSER.hydr_kennwerte)
+    for row, metaattribute in staging_query(ABWASSER.hydr_kennwerte, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         hydraulic_char_data = create_or_update(
             QGEP.hydraulic_char_data,
             **base_common(row),
@@ -3274,10 +3597,10 @@ def qgep_import_dss(precommit_callback=None):
             # --- hydraulic_char_data ---
             aggregate_number=row.aggregatezahl,
             delivery_height_geodaetic=row.foerderhoehe_geodaetisch,
-            fk_overflow_char=get_pk(row.ueberlaufcharakteristikref__REL),
+            fk_overflow_char=get_pk(row.ueberlaufcharakteristikref),
             # not supported in qgep datamodel, vsa-dss release 2020 only
-            # fk_primary_direction=get_pk(row.primaerrichtungref__REL),
-            fk_wastewater_node=get_pk(row.abwasserknotenref__REL),
+            # fk_primary_direction=get_pk(row.primaerrichtungref),
+            fk_wastewater_node=get_pk(row.abwasserknotenref),
             identifier=row.bezeichnung,
             is_overflowing__REL=get_vl_instance(
                 QGEP.hydraulic_char_data_is_overflowing, row.springt_an
@@ -3300,14 +3623,16 @@ def qgep_import_dss(precommit_callback=None):
             remark=row.bemerkung,
             status__REL=get_vl_instance(QGEP.hydraulic_char_data_status, row.astatus),
         )
-        qgep_session.add(hydraulic_char_data)
+        chunks.add(hydraulic_char_data)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.rueckstausicherung, ABWASSER.metaattribute -> QGEP.backflow_prevention"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.backflow_prevention, ABWASSER.rueckstausicherung)
+    for row, metaattribute in staging_query(
         ABWASSER.rueckstausicherung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN rueckstausicherung
@@ -3343,20 +3668,22 @@ def qgep_import_dss(precommit_callback=None):
             # --- structure_part ---
             **structure_part_common(row),
             # --- backflow_prevention ---
-            fk_pump=get_pk(row.foerderaggregatref__REL),
-            fk_throttle_shut_off_unit=get_pk(row.absperr_drosselorganref__REL),
+            fk_pump=get_pk(row.foerderaggregatref),
+            fk_throttle_shut_off_unit=get_pk(row.absperr_drosselorganref),
             gross_costs=row.bruttokosten,
             kind__REL=get_vl_instance(QGEP.backflow_prevention_kind, row.art),
             year_of_replacement=row.ersatzjahr,
         )
-        qgep_session.add(backflow_prevention)
+        chunks.add(backflow_prevention)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.feststoffrueckhalt, ABWASSER.metaattribute -> QGEP.solids_retention"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.solids_retention, ABWASSER.feststoffrueckhalt)
+    for row, metaattribute in staging_query(
         ABWASSER.feststoffrueckhalt, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN feststoffrueckhalt
@@ -3398,14 +3725,16 @@ def qgep_import_dss(precommit_callback=None):
             type__REL=get_vl_instance(QGEP.solids_retention_type, row.art),
             year_of_replacement=row.ersatzjahr,
         )
-        qgep_session.add(solids_retention)
+        chunks.add(solids_retention)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.beckenreinigung, ABWASSER.metaattribute -> QGEP.tank_cleaning")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.beckenreinigung, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.tank_cleaning, ABWASSER.beckenreinigung)
+    for row, metaattribute in staging_query(ABWASSER.beckenreinigung, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         # AVAILABLE FIELDS IN beckenreinigung
 
         # --- baseclass ---
@@ -3443,14 +3772,16 @@ def qgep_import_dss(precommit_callback=None):
             type__REL=get_vl_instance(QGEP.tank_cleaning_type, row.art),
             year_of_replacement=row.ersatzjahr,
         )
-        qgep_session.add(tank_cleaning)
+        chunks.add(tank_cleaning)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.beckenentleerung, ABWASSER.metaattribute -> QGEP.tank_emptying"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.tank_emptying, ABWASSER.beckenentleerung)
+    for row, metaattribute in staging_query(
         ABWASSER.beckenentleerung, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN beckenentleerung
@@ -3486,21 +3817,23 @@ def qgep_import_dss(precommit_callback=None):
             # --- structure_part ---
             **structure_part_common(row),
             # --- tank_emptying ---
-            fk_overflow=get_pk(row.ueberlaufref__REL),
-            fk_throttle_shut_off_unit=get_pk(row.absperr_drosselorganref__REL),
+            fk_overflow=get_pk(row.ueberlaufref),
+            fk_throttle_shut_off_unit=get_pk(row.absperr_drosselorganref),
             flow=row.leistung,
             gross_costs=row.bruttokosten,
             type__REL=get_vl_instance(QGEP.tank_emptying_type, row.art),
             year_of_replacement=row.ersatzjahr,
         )
-        qgep_session.add(tank_emptying)
+        chunks.add(tank_emptying)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.ezg_parameter_allg, ABWASSER.metaattribute -> QGEP.param_ca_general"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.param_ca_general, ABWASSER.ezg_parameter_allg)
+    for row, metaattribute in staging_query(
         ABWASSER.ezg_parameter_allg, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN ezg_parameter_allg
@@ -3542,14 +3875,16 @@ def qgep_import_dss(precommit_callback=None):
             population_equivalent=row.einwohnergleichwert,
             surface_ca=row.flaeche,
         )
-        qgep_session.add(param_ca_general)
+        chunks.add(param_ca_general)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.ezg_parameter_mouse1, ABWASSER.metaattribute -> QGEP.param_ca_mouse1"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.param_ca_mouse1, ABWASSER.ezg_parameter_mouse1)
+    for row, metaattribute in staging_query(
         ABWASSER.ezg_parameter_mouse1, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
         # AVAILABLE FIELDS IN ezg_parameter_mouse1
@@ -3592,15 +3927,17 @@ def qgep_import_dss(precommit_callback=None):
             surface_ca_mouse=row.flaeche,
             usage=row.nutzungsart,
         )
-        qgep_session.add(param_ca_mouse1)
+        chunks.add(param_ca_mouse1)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     # added logger info
     logger.info(
         "Importing ABWASSER.erhaltungsereignis, ABWASSER.metaattribute -> QGEP.maintenance_event"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.maintenance_event, ABWASSER.erhaltungsereignis)
+    for row, metaattribute in staging_query(
         ABWASSER.erhaltungsereignis, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
 
@@ -3617,9 +3954,7 @@ def qgep_import_dss(precommit_callback=None):
             cost=row.kosten,
             data_details=row.detaildaten,
             duration=row.dauer,
-            fk_operating_company=(
-                row.ausfuehrende_firmaref__REL.obj_id if row.ausfuehrende_firmaref__REL else None
-            ),
+            fk_operating_company=(get_pk(row.ausfuehrende_firmaref)),
             identifier=row.bezeichnung,
             kind__REL=get_vl_instance(QGEP.maintenance_event_kind, row.art),
             operator=row.ausfuehrender,
@@ -3629,25 +3964,32 @@ def qgep_import_dss(precommit_callback=None):
             status__REL=get_vl_instance(QGEP.maintenance_event_status, row.astatus),
             time_point=row.zeitpunkt,
         )
-        qgep_session.add(maintenance_event)
+        chunks.add(maintenance_event)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.erhaltungsereignis_abwasserbauwerkassoc -> QGEP.re_maintenance_event_wastewater_structure"
     )
-    for row in abwasser_session.query(ABWASSER.erhaltungsereignis_abwasserbauwerkassoc):
+    for row in staging_query(ABWASSER.erhaltungsereignis_abwasserbauwerkassoc):
         re_maintenance_event_wastewater_structure = create_or_update(
             QGEP.re_maintenance_event_wastewater_structure,
             # **base_common(row),
             # **metaattribute_common(metaattribute),
             # --- maintenance_event_wastewater_structure ---
-            fk_maintenance_event=get_pk(row.erhaltungsereignis_abwasserbauwerkassocref__REL),
-            fk_wastewater_structure=get_pk(row.abwasserbauwerkref__REL),
+            fk_maintenance_event=get_pk(row.erhaltungsereignis_abwasserbauwerkassocref),
+            fk_wastewater_structure=get_pk(row.abwasserbauwerkref),
         )
-        qgep_session.add(re_maintenance_event_wastewater_structure)
+        chunks.add(re_maintenance_event_wastewater_structure)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
+
+    chunks.finish()
+    chunks.log_failures()
+    changes.log_counts()
+    vl_cache.log_misses()
 
     # Calling the precommit callback if provided, allowing to filter before final import
     if precommit_callback:
@@ -12,6 +12,7 @@ def get_qgep_mapping():
             ABWASSER.erhaltungsereignis_abwasserbauwerk,
             ABWASSER.metaattribute,
         ],
+        QGEP.maintenance_event: [ABWASSER.erhaltungsereignis, ABWASSER.metaattribute],
         QGEP.mutation: [ABWASSER.mutation, ABWASSER.metaattribute],
         QGEP.aquifier: [ABWASSER.grundwasserleiter, ABWASSER.metaattribute],
         QGEP.river: [ABWASSER.fliessgewaesser, ABWASSER.metaattribute],
@@ -7,17 +7,22 @@ from sqlalchemy.sql import text
 from .. import utils
 from ..utils.basket_utils import BasketUtils
 from ..utils.qgep_export_utils import (
+    SELECTION_WWS_TABLE,
     QgepExportUtils,
+    SelectionQuery,
     add_to_selection,
+    create_selection_table,
     filter_reaches,
     get_connected_overflow_to_wn_ids,
     get_connected_we_from_re,
     get_connected_we_to_re,
     get_ws_ids,
     get_ws_selected_ww_networkelements,
+    read_selection,
     remove_from_selection,
 )
 from ..utils.various import logger
+from .mapping import get_qgep_mapping
 from .model_abwasser import get_abwasser_model
 from .model_qgep import get_qgep_model
 
@@ -36,8 +41,12 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
     # Logging disabled (very slow)
     # qgep_session = Session(utils.sqlalchemy.create_engine(logger_name="qgep"), autocommit=False, autoflush=False)
     # abwasser_session = Session(utils.sqlalchemy.create_engine(logger_name="abwasser"), autocommit=False, autoflush=False)
-    qgep_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
-    abwasser_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    qgep_session = Session(
+        utils.sqlalchemy.create_engine(target="source"), autocommit=False, autoflush=False
+    )
+    abwasser_session = Session(
+        utils.sqlalchemy.create_engine(target="staging"), autocommit=False, autoflush=False
+    )
     tid_maker = utils.ili2db.TidMaker(id_attribute="obj_id")
 
     # backport from tww https://github.com/teksi/wastewater/blob/3acfba249866d299f8a22e249d9f1e475fe7b88d/plugin/teksi_wastewater/interlis/interlis_model_mapping/interlis_exporter_to_intermediate_schema.py#L83
@@ -56,6 +65,12 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
     # 1. Filtering - check if selection
     filtered = selection is not None
 
+    # Store the selection in a temporary table, so the export queries join it instead of id lists
+    subset_filter = create_selection_table(qgep_session, selection or [])
+    if isinstance(selection, SelectionQuery):
+        # a spatial selection is inserted from the database, its id's are read for the selection expansion
+        selection = read_selection(qgep_session, subset_filter)
+
     # Logging for debugging
     logger.debug(f"print filtered '{str(filtered)}'")
 
@@ -204,6 +219,10 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
         labelorientation = orientation
     else:
         labelorientation = 0
+    logger.info(f"modulo_angle - added orientation: {labelorientation}")
+
+    # Store the selected wastewater structures in a temporary table as well
+    subset_wws_filter = create_selection_table(qgep_session, subset_wws_ids, SELECTION_WWS_TABLE)
 
     qgep_export_utils = QgepExportUtils(
         tid_maker=tid_maker,
@@ -217,8 +236,13 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
         subset_ids=subset_ids,
         subset_wws_ids=subset_wws_ids,
         ws_off_sia405abwasser=ws_off_sia405abwasser,
+        subset_filter=subset_filter,
+        subset_wws_filter=subset_wws_filter,
     )
 
+    # Report values that will be truncated or are missing once, instead of for each exported row
+    qgep_export_utils.check_export_values(get_qgep_mapping())
+
     # ADAPTED FROM 052a_sia405_abwasser_2015_2_d_interlisexport2.sql
     logger.info("Exporting QGEP.organisation -> ABWASSER.organisation, ABWASSER.metaattribute")
     qgep_export_utils.export_organisation()
@@ -233,7 +257,7 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
     query = qgep_session.query(qgep_model.discharge_point)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
     for row in query:
         # AVAILABLE FIELDS IN QGEP.discharge_point
@@ -282,7 +306,7 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
     query = qgep_session.query(qgep_model.infiltration_installation)
     if filtered:
         query = query.join(qgep_model.wastewater_networkelement).filter(
-            qgep_model.wastewater_networkelement.obj_id.in_(subset_ids)
+            qgep_model.wastewater_networkelement.obj_id.in_(subset_filter)
         )
     for row in query:
         # AVAILABLE FIELDS IN QGEP.infiltration_installation
@@ -360,7 +384,7 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
 
         query = qgep_session.query(qgep_model.wastewater_node)
         if filtered:
-            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
             # add sql statement to logger
             statement = query.statement
             logger.debug(f" selection query = {statement}")
@@ -417,7 +441,7 @@ def qgep_export_sia405(selection=None, labels_file=None, orientation=None, baske
 
         query = qgep_session.query(qgep_model.wastewater_node)
         if filtered:
-            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_ids))
+            query = query.filter(qgep_model.wastewater_networkelement.obj_id.in_(subset_filter))
             # add sql statement to logger
             statement = query.statement
             logger.debug(f" selection query = {statement}")
@@ -2,16 +2,34 @@ from functools import lru_cache
 
 from geoalchemy2.functions import ST_Force3D
 from sqlalchemy.orm import Session
-from sqlalchemy.orm.attributes import flag_dirty
 from sqlalchemy.sql import text
 
 from .. import utils
+from ..qgep.upsert import import_upsert, review_upsert
+from ..utils.qgep_import_utils import (
+    SKIP_SYMBOLOGY_TRIGGERS_SETTING,
+    ChangeDetector,
+    ChunkedCommit,
+    ExistingObjectCache,
+    OrganisationIndex,
+    StagingObjIdIndex,
+    UpsertImport,
+    ValueListCache,
+    install_symbology_trigger_guards,
+)
 from ..utils.various import logger
 from .model_abwasser import get_abwasser_model
 from .model_qgep import get_qgep_model
 
 
-def qgep_import_sia405(precommit_callback=None):
+def qgep_import_sia405(
+    precommit_callback=None,
+    upsert=False,
+    chunk_size=None,
+    checkpoints=None,
+    session_triggers=False,
+    review_callback=None,
+):
     """
     Imports data from the ili2pg model into the QGEP model.
 
@@ -19,6 +37,19 @@ def qgep_import_sia405(precommit_callback=None):
         precommit_callback: optional callable that gets invoked with the sqlalchemy's session,
                             allowing for a GUI to  filter objects before committing. It MUST either
                             commit or rollback and close the session.
+        upsert: imports with set-based statements (see utils.qgep_import_utils.UpsertImport) instead of
+                the object mapping below, precommit_callback is not supported then.
+        chunk_size: if set, flushes the objects in savepoints of chunk_size objects and commits after each
+                    class, skipping and reporting the objects that fail (see utils.qgep_import_utils.ChunkedCommit).
+                    Not supported with precommit_callback.
+        checkpoints: optional utils.ili2db.ImportCheckpoints of a resumable import, skipping the classes
+                     committed by a previous run and recording the classes committed by chunk_size.
+        session_triggers: skips the symbology triggers for the import session only (see
+                          utils.qgep_import_utils.install_symbology_trigger_guards) instead of dropping them.
+        review_callback: optional callable that gets invoked with a utils.qgep_import_utils.StagingDiff of the
+                         set-based import, allowing for a GUI to review the new and modified objects page by page
+                         instead of loading them in a session. It MUST either apply or discard the diff, and the
+                         staging schema must be kept until then.
     """
 
     QGEP = get_qgep_model()
@@ -26,43 +57,86 @@ def qgep_import_sia405(precommit_callback=None):
 
     pre_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
 
-    # We also drop symbology triggers as they badly affect performance. This must be done in a separate session as it
-    # would deadlock other sessions.
-    pre_session.execute(text("SELECT qgep_sys.drop_symbology_triggers();"))
+    if session_triggers:
+        # The symbology triggers are only skipped for the import session, so that other users keep them
+        install_symbology_trigger_guards(pre_session)
+    else:
+        # We also drop symbology triggers as they badly affect performance. This must be done in a separate session as it
+        # would deadlock other sessions.
+        pre_session.execute(text("SELECT qgep_sys.drop_symbology_triggers();"))
     pre_session.commit()
     pre_session.close()
 
+    if review_callback:
+        # the diff is kept in a temporary table, on a connection of its own until it is applied
+        connection = utils.sqlalchemy.create_engine().connect()
+        try:
+            if session_triggers:
+                connection.execute(text(f"SET {SKIP_SYMBOLOGY_TRIGGERS_SETTING} = 'on';"))
+            review_callback(review_upsert(connection, QGEP, ABWASSER, kek=False))
+        except BaseException:
+            # otherwise, the connection is closed once the diff is applied or discarded
+            connection.close()
+            raise
+        return
+
     # We use two different sessions for reading and writing so it's easier to
     # review imports and to keep the door open to getting data from another
     # connection / database type.
-    abwasser_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    abwasser_session = Session(
+        utils.sqlalchemy.create_engine(target="staging"), autocommit=False, autoflush=False
+    )
     qgep_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    if session_triggers:
+        qgep_session.execute(text(f"SET {SKIP_SYMBOLOGY_TRIGGERS_SETTING} = 'on';"))
 
     # Allow to insert rows with cyclic dependencies at once, needs data modell version 1.6.2 https://github.com/QGEP/datamodel/pull/235 to work properly
     logger.info("SET CONSTRAINTS ALL DEFERRED;")
     qgep_session.execute(text("SET CONSTRAINTS ALL DEFERRED;"))
 
-    def get_vl_instance(vl_table, value):
-        """
-        Gets a value list instance from the value_de name. Returns None and a warning if not found.
-        """
-        # TODO : memoize (and get the whole table at once) to improve N+1 performance issue
-        # TODO : return "other" (or other applicable value) rather than None, or even throwing an exception, would probably be better
-        row = qgep_session.query(vl_table).filter(vl_table.value_de == value).first()
-        if row is None:
-            logger.debug(
-                f'Could not find value `{value}` in value list "{vl_table.__table__.schema}.{vl_table.__name__}". Setting to None instead.'
-            )
-            return None
-        return row
+    if upsert:
+        import_upsert(UpsertImport(qgep_session.connection(), QGEP, ABWASSER), kek=False)
+        logger.info("Comitting qgep_session - please be patient ...")
+        qgep_session.commit()
+        logger.info("qgep_session sucessfully committed")
+        qgep_session.close()
+        abwasser_session.close()
+        return
+
+    # value lists are loaded once per table instead of queried for every attribute of every row
+    vl_cache = ValueListCache(qgep_session)
+    get_vl_instance = vl_cache.get_vl_instance
+
+    # existing objects are loaded in batches per class before it is imported (see create_or_update)
+    existing_objects = ExistingObjectCache(qgep_session, abwasser_session)
+
+    # obj_id of the staging objects by t_id, to resolve the references of the staging rows (see get_pk)
+    staging_obj_ids = StagingObjIdIndex(abwasser_session, ABWASSER.sia405_baseclass)
+
+    # only the changed attributes of existing objects are updated (see create_or_update)
+    changes = ChangeDetector(qgep_session)
 
-    def get_pk(relation):
+    # organisations by identifier and obj_id, for create_or_update_organisation
+    organisations = OrganisationIndex(qgep_session, QGEP.organisation)
+
+    # classes committed by a previous run of a resumed import are skipped
+    checkpoints = checkpoints or utils.ili2db.ImportCheckpoints()
+
+    def staging_query(*entities):
+        # in t_id order, so the last imported file wins if several files contain an obj_id
+        query = abwasser_session.query(*entities).order_by(entities[0].t_id)
+        return checkpoints.filter_done(query)
+
+    # optional chunked commits, the whole import is committed at once if not set
+    chunks = ChunkedCommit(
+        qgep_session, None if precommit_callback else chunk_size, checkpoints=checkpoints
+    )
+
+    def get_pk(t_id):
         """
-        Returns the primary key for a relation
+        Returns the obj_id of the staging object referenced by t_id
         """
-        if relation is None:
-            return None
-        return relation.obj_id
+        return staging_obj_ids.get(t_id)
 
     def create_or_update(cls, **kwargs):
         """
@@ -74,15 +148,21 @@ def qgep_import_sia405(precommit_callback=None):
         # We try to get the instance from the session/database
         obj_id = kwargs.get("obj_id", None)
         if obj_id:
-            instance = qgep_session.query(cls).get(kwargs.get("obj_id", None))
+            instance = existing_objects.get(cls, obj_id)
 
         if instance:
-            # We found it -> update
-            instance.__dict__.update(kwargs)
-            flag_dirty(instance)  # we flag it as dirty so it stays in the session
+            # We found it -> update the changed attributes only
+            changes.update(instance, kwargs)
         else:
             # We didn't find it -> create
             instance = cls(**kwargs)
+            changes.insert(instance)
+            if obj_id:
+                # later rows with this obj_id (e.g. of another imported file) update it
+                existing_objects.add(cls, instance)
+
+        if isinstance(instance, QGEP.organisation):
+            organisations.add(instance)
 
         return instance
 
@@ -94,23 +174,12 @@ def qgep_import_sia405(precommit_callback=None):
         if not name:
             return None
 
-        instance = (
-            qgep_session.query(QGEP.organisation)
-            .filter(QGEP.organisation.identifier == name)
-            .first()
-        )
-
-        # also look for non-flushed objects in the session
-        if not instance:
-            for obj in qgep_session:
-                if obj.__class__ is QGEP.organisation and obj.identifier == name:
-                    instance = obj
-                    break
+        instance = organisations.by_identifier(name)
 
         # if still nothing, we create it
         if not instance:
             instance = create_or_update(QGEP.organisation, identifier=name)
-            qgep_session.add(instance)
+            chunks.add(instance)
 
         return instance
 
@@ -147,8 +216,8 @@ def qgep_import_sia405(precommit_callback=None):
             ),
             # "fk_main_cover": row.REPLACE_ME,  # TODO : NOT MAPPED, but I think this is not standard SIA405 ?
             # "fk_main_wastewater_node": row.REPLACE_ME,  # TODO : NOT MAPPED, but I think this is not standard SIA405 ?
-            "fk_operator": get_pk(row.betreiberref__REL),
-            "fk_owner": get_pk(row.eigentuemerref__REL),
+            "fk_operator": get_pk(row.betreiberref),
+            "fk_owner": get_pk(row.eigentuemerref),
             "gross_costs": row.bruttokosten,
             "identifier": row.bezeichnung,
             "inspection_interval": row.inspektionsintervall,
@@ -177,7 +246,7 @@ def qgep_import_sia405(precommit_callback=None):
         Returns common attributes for network_element
         """
         return {
-            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref__REL),
+            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref),
             "identifier": row.bezeichnung,
             "remark": row.bemerkung,
         }
@@ -187,7 +256,7 @@ def qgep_import_sia405(precommit_callback=None):
         Returns common attributes for structure_part
         """
         return {
-            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref__REL),
+            "fk_wastewater_structure": get_pk(row.abwasserbauwerkref),
             "identifier": row.bezeichnung,
             "remark": row.bemerkung,
             "renovation_demand__REL": get_vl_instance(
@@ -197,9 +266,10 @@ def qgep_import_sia405(precommit_callback=None):
 
     logger.info("Importing ABWASSER.organisation, ABWASSER.metaattribute -> QGEP.organisation")
     _imported_orgs = []
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.organisation, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.organisation, ABWASSER.organisation)
+    for row, metaattribute in staging_query(ABWASSER.organisation, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
         organisation = create_or_update(
             QGEP.organisation,
             **base_common(row),
@@ -209,7 +279,7 @@ def qgep_import_sia405(precommit_callback=None):
             remark=row.bemerkung,
             uid=row.auid,
         )
-        qgep_session.add(organisation)
+        chunks.add(organisation)
 
         _imported_orgs.append((organisation, metaattribute))
 
@@ -219,9 +289,11 @@ def qgep_import_sia405(precommit_callback=None):
         for k, v in metaattribute_common(metaattribute).items():
             setattr(organisation, k, v)
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.kanal, ABWASSER.metaattribute -> QGEP.channel")
-    for row, metaattribute in abwasser_session.query(ABWASSER.kanal, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.channel, ABWASSER.kanal)
+    for row, metaattribute in staging_query(ABWASSER.kanal, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
 
@@ -277,14 +349,16 @@ def qgep_import_sia405(precommit_callback=None):
                 QGEP.channel_usage_planned, row.nutzungsart_geplant
             ),
         )
-        qgep_session.add(channel)
+        chunks.add(channel)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.normschacht, ABWASSER.metaattribute -> QGEP.manhole")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.normschacht, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.manhole, ABWASSER.normschacht)
+    for row, metaattribute in staging_query(ABWASSER.normschacht, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN normschacht
 
@@ -330,14 +404,16 @@ def qgep_import_sia405(precommit_callback=None):
                 QGEP.manhole_surface_inflow, row.oberflaechenzulauf
             ),
         )
-        qgep_session.add(manhole)
+        chunks.add(manhole)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.einleitstelle, ABWASSER.metaattribute -> QGEP.discharge_point")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.einleitstelle, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.discharge_point, ABWASSER.einleitstelle)
+    for row, metaattribute in staging_query(ABWASSER.einleitstelle, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN einleitstelle
 
@@ -381,16 +457,18 @@ def qgep_import_sia405(precommit_callback=None):
             # upper_elevation=row.REPLACE_ME, # TODO : NOT MAPPED
             waterlevel_hydraulic=row.wasserspiegel_hydraulik,
         )
-        qgep_session.add(discharge_point)
+        chunks.add(discharge_point)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.spezialbauwerk, ABWASSER.metaattribute -> QGEP.special_structure"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.spezialbauwerk, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.special_structure, ABWASSER.spezialbauwerk)
+    for row, metaattribute in staging_query(ABWASSER.spezialbauwerk, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN spezialbauwerk
 
@@ -437,14 +515,16 @@ def qgep_import_sia405(precommit_callback=None):
             ),
             # upper_elevation=row.REPLACE_ME,   # TODO : NOT MAPPED
         )
-        qgep_session.add(special_structure)
+        chunks.add(special_structure)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.versickerungsanlage, ABWASSER.metaattribute -> QGEP.infiltration_installation"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.infiltration_installation, ABWASSER.versickerungsanlage)
+    for row, metaattribute in staging_query(
         ABWASSER.versickerungsanlage, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
 
@@ -508,14 +588,16 @@ def qgep_import_sia405(precommit_callback=None):
                 QGEP.infiltration_installation_watertightness, row.wasserdichtheit
             ),
         )
-        qgep_session.add(infiltration_installation)
+        chunks.add(infiltration_installation)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.rohrprofil, ABWASSER.metaattribute -> QGEP.pipe_profile")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.rohrprofil, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.pipe_profile, ABWASSER.rohrprofil)
+    for row, metaattribute in staging_query(ABWASSER.rohrprofil, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN rohrprofil
 
@@ -549,14 +631,16 @@ def qgep_import_sia405(precommit_callback=None):
             profile_type__REL=get_vl_instance(QGEP.pipe_profile_profile_type, row.profiltyp),
             remark=row.bemerkung,
         )
-        qgep_session.add(pipe_profile)
+        chunks.add(pipe_profile)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.haltungspunkt, ABWASSER.metaattribute -> QGEP.reach_point")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.haltungspunkt, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.reach_point, ABWASSER.haltungspunkt)
+    for row, metaattribute in staging_query(ABWASSER.haltungspunkt, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN haltungspunkt
 
@@ -592,7 +676,7 @@ def qgep_import_sia405(precommit_callback=None):
                 QGEP.reach_point_elevation_accuracy, row.hoehengenauigkeit
             ),
             fk_wastewater_networkelement=get_pk(
-                row.abwassernetzelementref__REL
+                row.abwassernetzelementref
             ),  # TODO : this fails for now, but probably only because we flush too soon
             identifier=row.bezeichnung,
             level=row.kote,
@@ -601,16 +685,18 @@ def qgep_import_sia405(precommit_callback=None):
             remark=row.bemerkung,
             situation_geometry=ST_Force3D(row.lage),
         )
-        qgep_session.add(reach_point)
+        chunks.add(reach_point)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.abwasserknoten, ABWASSER.metaattribute -> QGEP.wastewater_node"
     )
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.abwasserknoten, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.wastewater_node, ABWASSER.abwasserknoten)
+    for row, metaattribute in staging_query(ABWASSER.abwasserknoten, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN abwasserknoten
 
@@ -652,14 +738,16 @@ def qgep_import_sia405(precommit_callback=None):
             bottom_level=row.sohlenkote,
             situation_geometry=ST_Force3D(row.lage),
         )
-        qgep_session.add(wastewater_node)
+        chunks.add(wastewater_node)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.haltung, ABWASSER.metaattribute -> QGEP.reach")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.haltung, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.reach, ABWASSER.haltung)
+    for row, metaattribute in staging_query(ABWASSER.haltung, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN haltung
 
@@ -699,9 +787,9 @@ def qgep_import_sia405(precommit_callback=None):
             clear_height=row.lichte_hoehe,
             coefficient_of_friction=row.reibungsbeiwert,
             # elevation_determination__REL=get_vl_instance(QGEP.reach_elevation_determination, row.REPLACE_ME),  # TODO : NOT MAPPED
-            fk_pipe_profile=get_pk(row.rohrprofilref__REL),
-            fk_reach_point_from=get_pk(row.vonhaltungspunktref__REL),
-            fk_reach_point_to=get_pk(row.nachhaltungspunktref__REL),
+            fk_pipe_profile=get_pk(row.rohrprofilref),
+            fk_reach_point_from=get_pk(row.vonhaltungspunktref),
+            fk_reach_point_to=get_pk(row.nachhaltungspunktref),
             horizontal_positioning__REL=get_vl_instance(
                 QGEP.reach_horizontal_positioning, row.lagebestimmung
             ),
@@ -721,14 +809,16 @@ def qgep_import_sia405(precommit_callback=None):
             slope_building_plan=row.plangefaelle,  # TODO : check, does this need conversion ?
             wall_roughness=row.wandrauhigkeit,
         )
-        qgep_session.add(reach)
+        chunks.add(reach)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.trockenwetterfallrohr, ABWASSER.metaattribute -> QGEP.dryweather_downspout"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.dryweather_downspout, ABWASSER.trockenwetterfallrohr)
+    for row, metaattribute in staging_query(
         ABWASSER.trockenwetterfallrohr, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
 
@@ -769,14 +859,16 @@ def qgep_import_sia405(precommit_callback=None):
             # --- dryweather_downspout ---
             diameter=row.durchmesser,
         )
-        qgep_session.add(dryweather_downspout)
+        chunks.add(dryweather_downspout)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.einstiegshilfe, ABWASSER.metaattribute -> QGEP.access_aid")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.einstiegshilfe, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.access_aid, ABWASSER.einstiegshilfe)
+    for row, metaattribute in staging_query(ABWASSER.einstiegshilfe, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN einstiegshilfe
 
@@ -815,14 +907,16 @@ def qgep_import_sia405(precommit_callback=None):
             # --- access_aid ---
             kind__REL=get_vl_instance(QGEP.access_aid_kind, row.art),
         )
-        qgep_session.add(access_aid)
+        chunks.add(access_aid)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info(
         "Importing ABWASSER.trockenwetterrinne, ABWASSER.metaattribute -> QGEP.dryweather_flume"
     )
-    for row, metaattribute in abwasser_session.query(
+    existing_objects.prefetch(QGEP.dryweather_flume, ABWASSER.trockenwetterrinne)
+    for row, metaattribute in staging_query(
         ABWASSER.trockenwetterrinne, ABWASSER.metaattribute
     ).join(ABWASSER.metaattribute):
 
@@ -863,12 +957,14 @@ def qgep_import_sia405(precommit_callback=None):
             # --- dryweather_flume ---
             material__REL=get_vl_instance(QGEP.dryweather_flume_material, row.material),
         )
-        qgep_session.add(dryweather_flume)
+        chunks.add(dryweather_flume)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.deckel, ABWASSER.metaattribute -> QGEP.cover")
-    for row, metaattribute in abwasser_session.query(ABWASSER.deckel, ABWASSER.metaattribute).join(
+    existing_objects.prefetch(QGEP.cover, ABWASSER.deckel)
+    for row, metaattribute in staging_query(ABWASSER.deckel, ABWASSER.metaattribute).join(
         ABWASSER.metaattribute
     ):
 
@@ -920,14 +1016,16 @@ def qgep_import_sia405(precommit_callback=None):
             sludge_bucket__REL=get_vl_instance(QGEP.cover_sludge_bucket, row.schlammeimer),
             venting__REL=get_vl_instance(QGEP.cover_venting, row.entlueftung),
         )
-        qgep_session.add(cover)
+        chunks.add(cover)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     logger.info("Importing ABWASSER.bankett, ABWASSER.metaattribute -> QGEP.benching")
-    for row, metaattribute in abwasser_session.query(
-        ABWASSER.bankett, ABWASSER.metaattribute
-    ).join(ABWASSER.metaattribute):
+    existing_objects.prefetch(QGEP.benching, ABWASSER.bankett)
+    for row, metaattribute in staging_query(ABWASSER.bankett, ABWASSER.metaattribute).join(
+        ABWASSER.metaattribute
+    ):
 
         # AVAILABLE FIELDS IN bankett
 
@@ -966,9 +1064,10 @@ def qgep_import_sia405(precommit_callback=None):
             # --- benching ---
             kind__REL=get_vl_instance(QGEP.benching_kind, row.art),
         )
-        qgep_session.add(benching)
+        chunks.add(benching)
         print(".", end="")
     logger.info("done")
+    chunks.commit()
 
     ########################################
     # VSA_KEK classes
@@ -992,7 +1091,7 @@ def qgep_import_sia405(precommit_callback=None):
     # cost=row.kosten,
     # data_details=row.detaildaten,
     # duration=row.dauer,
-    # fk_operating_company=row.ausfuehrende_firmaref__REL.obj_id if row.ausfuehrende_firmaref__REL else None,
+    # fk_operating_company=get_pk(row.ausfuehrende_firmaref),
     # identifier=row.bezeichnung,
     # kind__REL=get_vl_instance(QGEP.maintenance_event_kind, row.art),
     # operator=row.ausfuehrender,
@@ -1003,7 +1102,7 @@ def qgep_import_sia405(precommit_callback=None):
     # time_point=row.zeitpunkt,
     # # --- examination ---
     # equipment=row.geraet,
-    # fk_reach_point=row.haltungspunktref__REL.obj_id if row.haltungspunktref__REL else None,
+    # fk_reach_point=get_pk(row.haltungspunktref),
     # from_point_identifier=row.vonpunktbezeichnung,
     # inspected_length=row.inspizierte_laenge,
     # recording_type__REL=get_vl_instance(QGEP.examination_recording_type, row.erfassungsart),
@@ -1053,7 +1152,7 @@ def qgep_import_sia405(precommit_callback=None):
     # damage_end=row.schadenlageende,
     # damage_reach=row.streckenschaden,
     # distance=row.distanz,
-    # fk_examination=row.untersuchungref__REL.obj_id if row.untersuchungref__REL else None,
+    # fk_examination=get_pk(row.untersuchungref),
     # quantification1=row.quantifizierung1,
     # quantification2=row.quantifizierung2,
     # single_damage_class__REL=get_vl_instance(QGEP.damage_single_damage_class, row.einzelschadenklasse),
@@ -1086,7 +1185,7 @@ def qgep_import_sia405(precommit_callback=None):
     # damage_end=row.schadenlageende,
     # damage_reach=row.streckenschaden,
     # distance=row.distanz,
-    # fk_examination=row.untersuchungref__REL.obj_id if row.untersuchungref__REL else None,
+    # fk_examination=get_pk(row.untersuchungref),
     # quantification1=row.quantifizierung1,
     # quantification2=row.quantifizierung2,
     # single_damage_class__REL=get_vl_instance(QGEP.damage_single_damage_class, row.einzelschadenklasse),
@@ -1128,7 +1227,7 @@ def qgep_import_sia405(precommit_callback=None):
     # **metaattribute_common(metaattribute),
     # # --- file ---
     # class__REL=get_vl_instance(QGEP.file_class, row.klasse),
-    # fk_data_media=row.datentraegerref__REL.obj_id,
+    # fk_data_media=get_pk(row.datentraegerref),
     # identifier=row.bezeichnung,
     # kind__REL=get_vl_instance(QGEP.file_kind, row.art),
     # object=row.objekt,
@@ -1139,6 +1238,11 @@ def qgep_import_sia405(precommit_callback=None):
     # print(".", end="")
     # logger.info("done")
 
+    chunks.finish()
+    chunks.log_failures()
+    changes.log_counts()
+    vl_cache.log_misses()
+
     # Calling the precommit callback if provided, allowing to filter before final import
     if precommit_callback:
         precommit_callback(qgep_session)
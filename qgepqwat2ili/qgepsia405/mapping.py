@@ -25,12 +25,7 @@ def get_qgep_mapping():
         QGEP.dryweather_flume: [ABWASSER.trockenwetterrinne, ABWASSER.metaattribute],
         QGEP.cover: [ABWASSER.deckel, ABWASSER.metaattribute],
         QGEP.benching: [ABWASSER.bankett, ABWASSER.metaattribute],
-        # VSA_KEK
-        QGEP.examination: [ABWASSER.untersuchung, ABWASSER.metaattribute],
-        QGEP.damage_manhole: [ABWASSER.normschachtschaden, ABWASSER.metaattribute],
-        QGEP.damage_channel: [ABWASSER.kanalschaden, ABWASSER.metaattribute],
-        QGEP.data_media: [ABWASSER.datentraeger, ABWASSER.metaattribute],
-        QGEP.file: [ABWASSER.datei, ABWASSER.metaattribute],
+        # the VSA_KEK classes are not part of SIA405_ABWASSER_2015 (see model_abwasser)
         # AVAILABLE TABLES
         # ABWASSER.abwasserbauwerk, ABWASSER.abwasserknoten, ABWASSER.abwassernetzelement, ABWASSER.bankett, ABWASSER.baseclass, ABWASSER.bauwerksteil, ABWASSER.datei, ABWASSER.datentraeger, ABWASSER.deckel, ABWASSER.einleitstelle, ABWASSER.einstiegshilfe, ABWASSER.erhaltungsereignis, ABWASSER.haltung, ABWASSER.haltung_alternativverlauf, ABWASSER.haltungspunkt, ABWASSER.kanal, ABWASSER.kanalschaden, ABWASSER.metaattribute, ABWASSER.normschacht, ABWASSER.normschachtschaden, ABWASSER.organisation, ABWASSER.organisation_teil_vonassoc, ABWASSER.rohrprofil, ABWASSER.schaden, ABWASSER.sia405_baseclass, ABWASSER.sia405_symbolpos, ABWASSER.sia405_textpos, ABWASSER.spezialbauwerk, ABWASSER.symbolpos, ABWASSER.t_ili2db_attrname, ABWASSER.t_ili2db_basket, ABWASSER.t_ili2db_classname, ABWASSER.t_ili2db_dataset, ABWASSER.t_ili2db_inheritance, ABWASSER.t_ili2db_model, ABWASSER.t_ili2db_settings, ABWASSER.textpos, ABWASSER.trockenwetterfallrohr, ABWASSER.trockenwetterrinne, ABWASSER.untersuchung, ABWASSER.versickerungsanlage, ABWASSER.videozaehlerstand
         # NOT YET MAPPED
@@ -278,3 +273,10 @@ def get_qgep_mapping():
         # QGEP.wwtp_structure_kind: [ABWASSER.REPLACE_ME],
         # QGEP.zone: [ABWASSER.REPLACE_ME],
     }
+
+
+def get_import_classes():
+    """
+    Classes of qgep_od written by the import
+    """
+    return list(get_qgep_mapping())
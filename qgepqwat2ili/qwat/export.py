@@ -37,8 +37,12 @@ def qwat_export(include_hydraulics=False):
     # Logging disabled (very slow)
     # qwat_session = Session(utils.sqlalchemy.create_engine(logger_name='qwat'), autocommit=False, autoflush=False)
     # wasser_session = Session(utils.sqlalchemy.create_engine(logger_name='wasser'), autocommit=False, autoflush=False)
-    qwat_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
-    wasser_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    qwat_session = Session(
+        utils.sqlalchemy.create_engine(target="source"), autocommit=False, autoflush=False
+    )
+    wasser_session = Session(
+        utils.sqlalchemy.create_engine(target="staging"), autocommit=False, autoflush=False
+    )
     tid_maker = utils.ili2db.TidMaker(id_attribute="id")
 
     def tid2oid(tid):
@@ -11,7 +11,9 @@ def qwat_import():
     QWAT = get_qwat_model()
     WASSER = get_wasser_model()
 
-    wasser_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
+    wasser_session = Session(
+        utils.sqlalchemy.create_engine(target="staging"), autocommit=False, autoflush=False
+    )
     qwat_session = Session(utils.sqlalchemy.create_engine(), autocommit=False, autoflush=False)
 
     logger.info("Importing WASSER.hydraulischer_knoten -> QWAT.node")
@@ -93,6 +93,6 @@ _prepared = False
 def get_wasser_model():
     global _prepared
     if not _prepared:
-        utils.sqlalchemy.prepare_automap_base(Base, SCHEMA)
+        utils.sqlalchemy.prepare_automap_base(Base, SCHEMA, target="staging")
         _prepared = True
     return Base.classes
@@ -1,18 +1,31 @@
 import decimal
 import logging
 import os
+import re
 import sys
 import tempfile
 import unittest
 import xml.etree.ElementTree as ET
+from unittest import mock
 
 # to check with additional models if adaption is needed
 # from qgepqwat2ili.qgep.model_qgep import get_qgep_model_sia405
 # from qgepqwat2ili.qgep.model_qgep import get_qgep_model_dss
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import text
 
-from qgepqwat2ili import main, utils
+from qgepqwat2ili import config, main, utils
+from qgepqwat2ili.postimport import qgep_postimport
+from qgepqwat2ili.qgep.import_ import qgep_import_kek
+from qgepqwat2ili.qgep.mapping import get_import_classes as get_kek_import_classes
 from qgepqwat2ili.qgep.model_qgep import get_qgep_model
+from qgepqwat2ili.qgepdss import import_ as qgepdss_import
+from qgepqwat2ili.qgepdss.mapping import get_qgep_mapping as get_dss_mapping
+from qgepqwat2ili.qgepsia405.mapping import (
+    get_import_classes as get_sia405_import_classes,
+)
+from qgepqwat2ili.utils.qgep_import_utils import ChunkedCommit
 
 # Display logging in unittest output
 logger = logging.getLogger()
@@ -146,6 +159,521 @@ class TestQGEPUseCases(unittest.TestCase):
         )
         session.close()
 
+    def test_case_d_scoped_postimport(self):
+        """
+        # D. the post-import of some imported objects only updates the structures and nodes affected by them
+        """
+
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "data",
+            "test_data",
+            "case_d_import_all_without_errors.xtf",
+        )
+        main(["setupdb", "empty"])
+        main(["qgep", "import", path, "--recreate_schema"])
+
+        structures_sql = text(
+            "SELECT obj_id, _label, _usage_current, _function_hierarchic FROM qgep_od.wastewater_structure ORDER BY obj_id;"
+        )
+        nodes_sql = text(
+            "SELECT obj_id, _usage_current, _function_hierarchic FROM qgep_od.wastewater_node ORDER BY obj_id;"
+        )
+
+        # labels and symbology of the whole database
+        qgep_postimport()
+        session = Session(utils.sqlalchemy.create_engine())
+        structures = {row.obj_id: tuple(row) for row in session.execute(structures_sql)}
+        nodes = {row.obj_id: tuple(row) for row in session.execute(nodes_sql)}
+
+        # a reach with the structures of its channel and of the wastewater nodes at its ends
+        reach_id, channel_id = session.execute(
+            text(
+                "SELECT obj_id, fk_wastewater_structure FROM qgep_od.reach r WHERE EXISTS (SELECT 1 FROM qgep_od.reach_point rp JOIN qgep_od.wastewater_node wn ON wn.obj_id = rp.fk_wastewater_networkelement WHERE rp.obj_id = r.fk_reach_point_from) ORDER BY obj_id LIMIT 1;"
+            )
+        ).fetchone()
+        affected_nodes = {
+            row[0]
+            for row in session.execute(
+                text(
+                    "SELECT rp.fk_wastewater_networkelement FROM qgep_od.reach r JOIN qgep_od.reach_point rp ON rp.obj_id IN (r.fk_reach_point_from, r.fk_reach_point_to) WHERE r.obj_id = :reach_id AND rp.fk_wastewater_networkelement IN (SELECT obj_id FROM qgep_od.wastewater_node);"
+                ),
+                {"reach_id": reach_id},
+            )
+        }
+        affected_structures = {channel_id} | {
+            row[0]
+            for row in session.execute(
+                text(
+                    "SELECT fk_wastewater_structure FROM qgep_od.wastewater_networkelement WHERE obj_id = ANY(:node_ids) AND fk_wastewater_structure IS NOT NULL;"
+                ),
+                {"node_ids": list(affected_nodes)},
+            )
+        }
+        # their nodes are affected too
+        affected_nodes |= {
+            row[0]
+            for row in session.execute(
+                text(
+                    "SELECT obj_id FROM qgep_od.wastewater_networkelement WHERE fk_wastewater_structure = ANY(:structure_ids) AND obj_id IN (SELECT obj_id FROM qgep_od.wastewater_node);"
+                ),
+                {"structure_ids": list(affected_structures)},
+            )
+        }
+        self.assertTrue(affected_nodes)
+
+        # clear the labels and symbology, without the triggers computing them again
+        session.execute(text("SELECT qgep_sys.drop_symbology_triggers();"))
+        session.execute(
+            text(
+                "UPDATE qgep_od.wastewater_structure SET _label = NULL, _usage_current = NULL, _function_hierarchic = NULL;"
+            )
+        )
+        session.execute(
+            text(
+                "UPDATE qgep_od.wastewater_node SET _usage_current = NULL, _function_hierarchic = NULL;"
+            )
+        )
+        session.commit()
+        session.close()
+
+        qgep_postimport([reach_id])
+
+        session = Session(utils.sqlalchemy.create_engine())
+        for obj_id, row in [(row.obj_id, tuple(row)) for row in session.execute(structures_sql)]:
+            if obj_id in affected_structures:
+                self.assertEqual(row, structures[obj_id])
+            else:
+                self.assertEqual(row, (obj_id, None, None, None))
+        for obj_id, row in [(row.obj_id, tuple(row)) for row in session.execute(nodes_sql)]:
+            if obj_id in affected_nodes:
+                self.assertEqual(row, nodes[obj_id])
+            else:
+                self.assertEqual(row, (obj_id, None, None))
+        self.assertIsNotNone(structures[channel_id][1])
+        # the unrelated structures had labels before, so they were left untouched
+        self.assertTrue(
+            any(row[1] for obj_id, row in structures.items() if obj_id not in affected_structures)
+        )
+        session.close()
+
+    # test VSA_KEK_2019_LV95 set-based import
+    def test_case_a_upsert_import_wincan_xtf(self):
+        """
+        # A. import Wincan-generated xtf data into QGEP with the set-based import (--upsert)
+
+        Same data and counts as test_case_a_import_wincan_xtf.
+        """
+
+        path = os.path.join(
+            os.path.dirname(__file__), "..", "data", "test_data", "case_a_import_from_wincan.xtf"
+        )
+
+        # Prepare db (we import in a full schema)
+        main(["setupdb", "full"])
+
+        QGEP = get_qgep_model()
+        main(["qgep", "import", path, "--recreate_schema", "--upsert"])
+
+        # make sure all elements got imported
+        session = Session(utils.sqlalchemy.create_engine())
+        self.assertEqual(session.query(QGEP.damage_channel).count(), 8)
+        self.assertEqual(session.query(QGEP.examination).count(), 1)
+        self.assertEqual(session.query(QGEP.data_media).count(), 2)
+        self.assertEqual(session.query(QGEP.file).count(), 4)
+        self.assertEqual(session.query(QGEP.organisation).count(), 18)
+
+        # checking some properties
+        damage = session.query(QGEP.damage_channel).get("fk11abk6w70lrfne")
+        self.assertEqual(damage.quantification1, decimal.Decimal("300"))
+
+        data = session.query(QGEP.file).get("fk11abk6w70lrfnc")
+        self.assertEqual(data.identifier, "8486-8486.0010_0001.mpg")
+        self.assertEqual(data.path_relative, "inspectiondata20210120/videos/")
+        session.close()
+
+        # assert idempotency
+
+        main(["qgep", "import", path, "--recreate_schema", "--upsert"])
+        session = Session(utils.sqlalchemy.create_engine())
+        self.assertEqual(session.query(QGEP.damage_channel).count(), 8)
+        self.assertEqual(session.query(QGEP.examination).count(), 1)
+        self.assertEqual(session.query(QGEP.data_media).count(), 2)
+        self.assertEqual(session.query(QGEP.file).count(), 4)
+        self.assertEqual(session.query(QGEP.organisation).count(), 18)
+        session.close()
+
+    # test VSA_KEK_2019_LV95 set-based import reviewed as a diff
+    def test_case_a_review_diff_wincan_xtf(self):
+        """
+        # A. import Wincan-generated xtf data into QGEP, reviewing the diff of the staging schema
+
+        A rejected new object is not imported, and the unchanged objects are not rewritten.
+        """
+
+        path = os.path.join(
+            os.path.dirname(__file__), "..", "data", "test_data", "case_a_import_from_wincan.xtf"
+        )
+
+        # Prepare db (we import in a full schema), with case_a imported except a damage, and a changed file
+        main(["setupdb", "full"])
+        main(["qgep", "import", path, "--recreate_schema"])
+        session = Session(utils.sqlalchemy.create_engine())
+        session.execute(
+            text("DELETE FROM qgep_od.damage_channel WHERE obj_id = 'fk11abk6w70lrfne';")
+        )
+        session.execute(text("DELETE FROM qgep_od.damage WHERE obj_id = 'fk11abk6w70lrfne';"))
+        session.execute(
+            text(
+                "UPDATE qgep_od.file SET identifier = 'changed' WHERE obj_id = 'fk11abk6w70lrfnc';"
+            )
+        )
+        session.commit()
+        unchanged_sql = text(
+            "SELECT xmin::text FROM qgep_od.damage WHERE obj_id = 'fk11abk6w70lrfnf' UNION ALL SELECT xmin::text FROM qgep_od.data_media WHERE obj_id = 'fk11abk6w70lrfmz';"
+        )
+        unchanged_xmins = [row[0] for row in session.execute(unchanged_sql)]
+        session.close()
+
+        imported = []
+
+        def review(diff):
+            damages = {row.obj_id: row for row in diff.page("damage_channel")}
+            self.assertEqual(damages["fk11abk6w70lrfne"].status, diff.NEW)
+            self.assertEqual(damages["fk11abk6w70lrfnf"].status, diff.UNCHANGED)
+            files = {row.obj_id: row for row in diff.page("file")}
+            self.assertEqual(files["fk11abk6w70lrfnc"].status, diff.MODIFIED)
+
+            diff.set_accepted("damage_channel", False, ["fk11abk6w70lrfne"])
+            imported.extend(diff.apply())
+
+        with mock.patch(
+            "qgepqwat2ili.qgep_import_kek",
+            side_effect=lambda **kwargs: qgep_import_kek(**kwargs, review_callback=review),
+        ):
+            main(["qgep", "import", path, "--recreate_schema", "--upsert"])
+
+        self.assertIn("fk11abk6w70lrfnc", imported)
+        self.assertNotIn("fk11abk6w70lrfne", imported)
+
+        QGEP = get_qgep_model()
+        session = Session(utils.sqlalchemy.create_engine())
+        # the rejected damage is not imported, the accepted file is updated
+        self.assertIsNone(session.query(QGEP.damage_channel).get("fk11abk6w70lrfne"))
+        self.assertEqual(session.query(QGEP.damage_channel).count(), 7)
+        self.assertEqual(
+            session.query(QGEP.file).get("fk11abk6w70lrfnc").identifier, "8486-8486.0010_0001.mpg"
+        )
+        # the unchanged rows were not rewritten
+        self.assertEqual([row[0] for row in session.execute(unchanged_sql)], unchanged_xmins)
+        session.close()
+
+    # test VSA_KEK_2019_LV95 resumed import
+    def test_case_a_resume_import_wincan_xtf(self):
+        """
+        # A. import Wincan-generated xtf data into QGEP, resuming an interrupted import (--resume)
+
+        The first run fails after committing some classes, the second run of the same file resumes
+        from its checkpoints : the ili2pg import and the committed classes are skipped.
+        """
+
+        path = os.path.join(
+            os.path.dirname(__file__), "..", "data", "test_data", "case_a_import_from_wincan.xtf"
+        )
+        job_schema = f"{config.ABWASSER_SCHEMA}_resume_{utils.various.get_file_hash(path)[:16]}"
+
+        # Prepare db (we import in a full schema)
+        main(["setupdb", "full"])
+
+        QGEP = get_qgep_model()
+        with mock.patch.object(
+            ChunkedCommit, "finish", side_effect=RuntimeError("interrupted")
+        ), self.assertRaises(RuntimeError):
+            main(["qgep", "import", path, "--recreate_schema", "--resume"])
+
+        # the job schema is kept, with the checkpoints of the first run
+        session = Session(utils.sqlalchemy.create_engine(target="staging"))
+        steps = {
+            row.step
+            for row in session.execute(
+                text(f'SELECT step FROM "{job_schema}".qgepqwat2ili_checkpoint;')
+            )
+        }
+        session.close()
+        self.assertIn("ili2pg", steps)
+        self.assertIn("organisation", steps)
+
+        with mock.patch(
+            "qgepqwat2ili.utils.ili2db.exec_", wraps=utils.various.exec_
+        ) as exec_, self.assertLogs(utils.various.logger, logging.INFO) as logs:
+            main(["qgep", "import", path, "--resume"])
+
+        # the staging data of the first run was reused
+        self.assertFalse(any("--import" in call.args[0] for call in exec_.call_args_list))
+        self.assertTrue(any("XTF DATA ALREADY IMPORTED" in line for line in logs.output))
+        for step in steps - {"ili2pg"}:
+            self.assertTrue(
+                any(f"{step} already imported, skipped" in line for line in logs.output)
+            )
+
+        # make sure all elements got imported
+        session = Session(utils.sqlalchemy.create_engine())
+        self.assertEqual(session.query(QGEP.damage_channel).count(), 8)
+        self.assertEqual(session.query(QGEP.examination).count(), 1)
+        self.assertEqual(session.query(QGEP.data_media).count(), 2)
+        self.assertEqual(session.query(QGEP.file).count(), 4)
+        self.assertEqual(session.query(QGEP.organisation).count(), 18)
+        session.close()
+
+        # the job schema is dropped once the import succeeded
+        session = Session(utils.sqlalchemy.create_engine(target="staging"))
+        self.assertIsNone(
+            session.execute(
+                text("SELECT to_regnamespace(:schema);"), {"schema": job_schema}
+            ).scalar()
+        )
+        session.close()
+
+    # test VSA_KEK_2019_LV95 import of several files
+    def test_case_a_import_several_xtf(self):
+        """
+        # A. import two VSA_KEK_2019_LV95 files together into QGEP
+
+        Both files are added to the same ili2pg schema and imported at once.
+        """
+
+        paths = [
+            os.path.join(
+                os.path.dirname(__file__),
+                "..",
+                "data",
+                "test_data",
+                "case_a_import_from_wincan.xtf",
+            ),
+            os.path.join(
+                os.path.dirname(__file__),
+                "..",
+                "data",
+                "test_data",
+                "regression_001_self_referencing_organisation.xtf",
+            ),
+        ]
+
+        # Prepare db (we import in a full schema)
+        main(["setupdb", "full"])
+
+        QGEP = get_qgep_model()
+        session = Session(utils.sqlalchemy.create_engine())
+        new_organisation = session.query(QGEP.organisation).get("ch080qwzAV000007") is None
+        session.close()
+
+        # returns without exit(1) if all files were imported
+        main(["qgep", "import", *paths, "--recreate_schema"])
+
+        # make sure all elements of both files got imported
+        session = Session(utils.sqlalchemy.create_engine())
+        self.assertEqual(session.query(QGEP.damage_channel).count(), 8)
+        self.assertEqual(session.query(QGEP.examination).count(), 1)
+        self.assertEqual(session.query(QGEP.data_media).count(), 2)
+        self.assertEqual(session.query(QGEP.file).count(), 4)
+        self.assertEqual(session.query(QGEP.organisation).count(), 18 + new_organisation)
+        organisation = session.query(QGEP.organisation).get("ch080qwzAV000007")
+        self.assertEqual(organisation.identifier, "organisation_a")
+        self.assertEqual(organisation, organisation.fk_dataowner__REL)
+        session.close()
+
+        # a file of another model is skipped and reported, the import fails
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "data",
+            "test_data",
+            "case_d_import_all_without_errors.xtf",
+        )
+        with self.assertRaises(SystemExit) as exit_:
+            main(["qgep", "import", *paths, path])
+        self.assertEqual(exit_.exception.code, 1)
+
+        # the files of the same model are still imported
+        session = Session(utils.sqlalchemy.create_engine())
+        self.assertEqual(session.query(QGEP.damage_channel).count(), 8)
+        self.assertEqual(session.query(QGEP.organisation).count(), 18 + new_organisation)
+        session.close()
+
+    def test_case_a_import_several_xtf_shared_objects(self):
+        """
+        # A. import two VSA_KEK_2019_LV95 files with the same organisation and data medium into QGEP
+
+        The objects contained in both files are imported once, with the values of the last file.
+        """
+
+        path = os.path.join(
+            os.path.dirname(__file__), "..", "data", "test_data", "case_a_import_from_wincan.xtf"
+        )
+
+        # a second delivery of the organisation and a data medium of case_a, with a new file
+        interlis = "http://www.interlis.ch/INTERLIS2.3"
+        ET.register_namespace("", interlis)
+        tree = ET.parse(path)
+        for basket in tree.getroot().find(f"{{{interlis}}}DATASECTION"):
+            basket.set("BID", "x" + basket.get("BID")[1:])
+            for obj in list(basket):
+                tid = obj.get("TID")
+                if tid == "fk11abk6w70lrfmz":
+                    obj.find(f"{{{interlis}}}Bezeichnung").text = "Testdisk 2"
+                elif tid == "fk11abk6w70lrfnc":
+                    obj.set("TID", "fk11abk6w70lrfnx")
+                    obj.find(f"{{{interlis}}}OBJ_ID").text = "fk11abk6w70lrfnx"
+                elif tid != "ch080qwzPR000017":
+                    basket.remove(obj)
+        second_path = os.path.join(tempfile.mkdtemp(), "case_a_second_delivery.xtf")
+        tree.write(second_path, encoding="UTF-8", xml_declaration=True)
+
+        QGEP = get_qgep_model()
+        for options in [[], ["--upsert"]]:
+            with self.subTest(options=options):
+                # Prepare db (we import in a full schema)
+                main(["setupdb", "full"])
+                main(["qgep", "import", path, second_path, "--recreate_schema", *options])
+
+                session = Session(utils.sqlalchemy.create_engine())
+                self.assertEqual(session.query(QGEP.damage_channel).count(), 8)
+                self.assertEqual(session.query(QGEP.data_media).count(), 2)
+                self.assertEqual(session.query(QGEP.file).count(), 5)
+                self.assertEqual(session.query(QGEP.organisation).count(), 18)
+                self.assertEqual(
+                    session.query(QGEP.data_media).get("fk11abk6w70lrfmz").identifier,
+                    "Testdisk 2",
+                )
+                session.close()
+
+    def test_dss_import_groups(self):
+        """
+        Every staging class imported by the DSS import is in exactly one group of the parallel import
+        """
+
+        with open(qgepdss_import.__file__, encoding="utf-8") as f:
+            imported = re.findall(r"staging_query\(\s*ABWASSER\.(\w+)", f.read())
+        grouped = [name for group in qgepdss_import.IMPORT_GROUPS for name in group.classes]
+        self.assertEqual(len(imported), len(set(imported)))
+        self.assertEqual(len(grouped), len(set(grouped)))
+        self.assertEqual(set(imported), set(grouped))
+
+    def test_case_g_import_dss_workers(self):
+        """
+        # G. export the whole QGEP model to DSS_2015_LV95 and import it again, once sequentially and once
+        in parallel workers (--workers) : both imports must import the same objects and pass the checks
+        """
+
+        main(["setupdb", "full"])
+        path = os.path.join(tempfile.mkdtemp(), "export_DSS_2015_LV95.xtf")
+        main(["qgep", "export", path, "--export_dss", "--recreate_schema"])
+
+        counts = []
+        for options in [[], ["--workers", "3"]]:
+            # Prepare subset db (we import in an empty schema)
+            main(["setupdb", "empty"])
+            # returns without exit(1) if the integrity checks passed
+            main(["qgep", "import", path, "--recreate_schema", *options])
+
+            self.assertTrue(utils.ili2db.check_organisation_subclass_data())
+            self.assertTrue(utils.ili2db.check_wastewater_structure_subclass_data())
+            tables = sorted(
+                {
+                    table.fullname
+                    for cls in get_dss_mapping()
+                    for table in inspect(cls).mapper.tables
+                }
+            )
+            session = Session(utils.sqlalchemy.create_engine())
+            counts.append(
+                {
+                    table: session.execute(text(f"SELECT count(*) FROM {table};")).scalar()
+                    for table in tables
+                }
+            )
+            session.close()
+
+        sequential_counts, workers_counts = counts
+        self.assertGreater(sequential_counts["qgep_od.wastewater_structure"], 0)
+        self.assertGreater(sequential_counts["qgep_od.organisation"], 0)
+        self.assertEqual(sequential_counts, workers_counts)
+
+    def _import_rows(self, setup, path, *options, import_classes):
+        """
+        Imports the file into a fresh database, returns the rows of the tables of the imported classes
+        """
+        main(["setupdb", setup])
+        main(["qgep", "import", path, "--recreate_schema", *options])
+
+        tables = sorted(
+            {table.fullname for cls in import_classes() for table in inspect(cls).mapper.tables}
+        )
+        session = Session(utils.sqlalchemy.create_engine())
+        rows = {
+            table: [
+                row[0]
+                for row in session.execute(
+                    text(f"SELECT to_jsonb(t) FROM {table} t ORDER BY obj_id;")
+                )
+            ]
+            for table in tables
+        }
+        session.close()
+        return rows
+
+    def test_upsert_matches_orm_import(self):
+        """
+        The set-based mappings (qgep.upsert) are written after the ORM imports : both must import the same rows
+        """
+
+        test_data = os.path.join(os.path.dirname(__file__), "..", "data", "test_data")
+        for setup, file_name, import_classes in [
+            ("full", "case_a_import_from_wincan.xtf", get_kek_import_classes),
+            ("empty", "case_d_import_all_without_errors.xtf", get_sia405_import_classes),
+        ]:
+            with self.subTest(file_name):
+                path = os.path.join(test_data, file_name)
+                orm_rows = self._import_rows(setup, path, import_classes=import_classes)
+                upsert_rows = self._import_rows(
+                    setup, path, "--upsert", import_classes=import_classes
+                )
+                self.assertEqual(orm_rows.keys(), upsert_rows.keys())
+                for table, rows in orm_rows.items():
+                    self.assertEqual(rows, upsert_rows[table], table)
+
+    # test for SIA405_ABWASSER_2015_LV95 set-based import
+    def test_case_d_upsert_import_complete_xtf_to_qgep(self):
+        """
+        # D. import a whole valid INTERLIS transfer file into QGEP with the set-based import (--upsert)
+
+        Same data and counts as test_case_d_import_complete_xtf_to_qgep.
+        """
+
+        path = os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "data",
+            "test_data",
+            "case_d_import_all_without_errors.xtf",
+        )
+
+        # Prepare subset db (we import in an empty schema)
+        main(["setupdb", "empty"])
+
+        QGEP = get_qgep_model()
+        main(["qgep", "import", path, "--recreate_schema", "--upsert"])
+
+        # make sure all elements got imported
+        session = Session(utils.sqlalchemy.create_engine())
+        self.assertEqual(session.query(QGEP.channel).count(), 102)
+        self.assertEqual(session.query(QGEP.manhole).count(), 49)
+        self.assertEqual(
+            session.query(QGEP.manhole).get("ch080qwzNS000113").year_of_construction, 1950
+        )
+        session.close()
+
     @unittest.skip("KEK selection export test not working")
     def test_case_e_export_selection(self):
         """
@@ -291,6 +819,54 @@ class TestQGEPUseCases(unittest.TestCase):
             6,
         )
 
+    # test for SIA405_ABWASSER_2015_LV95 export with a spatial selection
+    def test_case_i_export_polygon_sia405(self):
+        """
+        # I. export a selection given as polygon
+        """
+
+        # Prepare db
+        main(["setupdb", "full"])
+
+        # a small polygon around the middle of reach ch13p7mzRE001221
+        session = Session(utils.sqlalchemy.create_engine())
+        polygon_wkt = session.execute(
+            "SELECT ST_AsText(ST_Buffer(ST_Force2D(ST_LineInterpolatePoint(ST_LineMerge(progression_geometry), 0.5)), 0.01)) FROM qgep_od.reach WHERE obj_id = 'ch13p7mzRE001221';"
+        ).scalar()
+        session.close()
+
+        path = os.path.join(tempfile.mkdtemp(), "export_polygon_SIA405.xtf")
+        main(
+            [
+                "qgep",
+                "export",
+                path,
+                "--export_sia405",
+                "--recreate_schema",
+                "--polygon_wkt",
+                polygon_wkt,
+            ]
+        )
+
+        root = ET.parse(path)
+
+        self.assertEqual(
+            len(
+                findall_in_xml_sia_abwasser_2015(
+                    root, "SIA405_ABWASSER_2015_LV95.SIA405_Abwasser.Kanal"
+                )
+            ),
+            1,
+        )
+        self.assertEqual(
+            len(
+                findall_in_xml_sia_abwasser_2015(
+                    root, "SIA405_ABWASSER_2015_LV95.SIA405_Abwasser.Normschacht"
+                )
+            ),
+            2,
+        )
+
     # # test for complete VSA-DSS 2015 export, labels_orientation not set, should be optional
     # def test_case_g_export_dss_complete_qgep_to_xtf(self):
     # """
@@ -1,22 +1,34 @@
 import collections
+import uuid
 
 # 11.4.2023
 import xml.etree.ElementTree as ET
 
 import psycopg2
+from sqlalchemy import false
 from sqlalchemy.ext.automap import AutomapBase
 
 from .. import config
-from .various import exec_, get_pgconf_as_ili_args, get_pgconf_as_psycopg2_dsn, logger
+from .sqlalchemy import register_job_schema, unregister_job_schema
+from .various import (
+    exec_,
+    get_file_hash,
+    get_pgconf_as_ili_args,
+    get_pgconf_as_psycopg2_dsn,
+    logger,
+)
 
+# The integrity checks run on the main database (after imports), or on the given target database (e.g.
+# "source" before exports, see utils.various.get_pgconf)
 
-def check_organisation_subclass_data():
+
+def check_organisation_subclass_data(target=None):
     """
     Check if subclass entries of organisation are set and match number of organisation entries
     """
     logger.info("INTEGRITY CHECK organisations subclass data...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -52,13 +64,13 @@ def check_organisation_subclass_data():
     return True
 
 
-def check_wastewater_structure_subclass_data():
+def check_wastewater_structure_subclass_data(target=None):
     """
     Check if subclass entries of wastewater_structure are set and match number of wastewater_structure entries
     """
     logger.info("INTEGRITY CHECK wastewater_structures subclass data...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
     cursor.execute("SELECT obj_id FROM qgep_od.wastewater_structure;")
@@ -92,13 +104,13 @@ def check_wastewater_structure_subclass_data():
     return True
 
 
-def check_identifier_null():
+def check_identifier_null(target=None):
     """
     Check if attribute identifier is Null
     """
     logger.info("INTEGRITY CHECK missing identifiers...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -182,13 +194,13 @@ def check_identifier_null():
     return identifier_null_check
 
 
-def check_identifier_length():
+def check_identifier_length(target=None):
     """
     Check if attribute identifier is too long (more than 20 characters)
     """
     logger.info("INTEGRITY CHECK too long identifiers...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -273,13 +285,13 @@ def check_identifier_length():
     return identifier_too_long_check
 
 
-def check_fk_owner_null():
+def check_fk_owner_null(target=None):
     """
     Check if MAMDATORY fk_owner is Null
     """
     logger.info("INTEGRITY CHECK missing MAMDATORY owner references fk_owner...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -321,13 +333,13 @@ def check_fk_owner_null():
     return check_fk_owner_null
 
 
-def check_fk_operator_null():
+def check_fk_operator_null(target=None):
     """
     Check if MAMDATORY fk_operator is Null
     """
     logger.info("INTEGRITY CHECK missing MAMDATORY operator references fk_operator...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -363,13 +375,13 @@ def check_fk_operator_null():
         return False
 
 
-def check_fk_dataowner_null():
+def check_fk_dataowner_null(target=None):
     """
     Check if MAMDATORY fk_dataowner is Null
     """
     logger.info("INTEGRITY CHECK missing dataowner references fk_dataowner...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -450,13 +462,13 @@ def check_fk_dataowner_null():
         return False
 
 
-def check_fk_provider_null():
+def check_fk_provider_null(target=None):
     """
     Check if MAMDATORY fk_provider is Null
     """
     logger.info("INTEGRITY CHECK missing provider references fk_provider...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn(target))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -542,7 +554,7 @@ def skip_wwtp_structure_ids():
     """
     logger.info("get list of id's of class wwtp_structure (ARABauwerk)...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("source"))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -583,7 +595,7 @@ def create_ili_schema(schema, model, log_path, recreate_schema=False, create_bas
     """
     logger.info("CONNECTING TO DATABASE...")
 
-    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("staging"))
     connection.set_session(autocommit=True)
     cursor = connection.cursor()
 
@@ -620,7 +632,7 @@ def create_ili_schema(schema, model, log_path, recreate_schema=False, create_bas
                 "-jar",
                 f'"{config.ILI2PG}"',
                 "--schemaimport",
-                *get_pgconf_as_ili_args(),
+                *get_pgconf_as_ili_args("staging"),
                 "--dbschema",
                 f"{schema}",
                 "--setupPgExt",
@@ -643,6 +655,290 @@ def create_ili_schema(schema, model, log_path, recreate_schema=False, create_bas
     )
 
 
+class JobSchema:
+    """
+    Context manager providing a job-scoped ili2pg schema for an import or export.
+
+    Each run gets its own schema (`<schema>_job_<id>`), so that concurrent runs on the same
+    database don't truncate each other's data. The run holds an advisory lock on its schema
+    and drops it on exit. Job schemas whose lock isn't held anymore (e.g. left by a crashed
+    run) are dropped when the next job starts.
+
+    The base schema is kept as (empty) template the models are reflected from, and is only
+    created if missing or if recreate_schema is set. While in the context, the engines created
+    by utils.sqlalchemy.create_engine() translate the base schema to the job schema.
+
+    With a resume_key (e.g. a hash of the imported file), the job schema is named
+    `<schema>_resume_<key>` instead: it is reused if it exists, and kept if the job fails, so that
+    the next job with the same key can resume from its checkpoints (see ImportCheckpoints). Kept
+    schemas that weren't resumed for config.RESUME_SCHEMA_MAX_AGE_DAYS are dropped like stale ones.
+    """
+
+    def __init__(
+        self,
+        schema,
+        model,
+        log_path,
+        recreate_schema=False,
+        create_basket_col=False,
+        resume_key=None,
+    ):
+        self.schema = schema
+        self.model = model
+        self.log_path = log_path
+        self.recreate_schema = recreate_schema
+        self.create_basket_col = create_basket_col
+        self.resume_key = resume_key
+        if resume_key:
+            self.job_schema = f"{schema}_resume_{resume_key}"
+        else:
+            self.job_schema = f"{schema}_job_{uuid.uuid4().hex[:12]}"
+        self.connection = None
+
+    def __enter__(self):
+        return self.create()
+
+    def __exit__(self, et, ev, tb):
+        if et is not None and self.resume_key:
+            self.release()
+        else:
+            self.drop()
+        # implicit return of None => don't swallow exceptions
+
+    def create(self):
+        """
+        Creates and locks the job schema (and the template schema if needed), returns the job schema name
+        """
+        # this connection stays open during the whole job : if the process dies, the server
+        # releases the advisory lock and the job schema gets cleaned up by the next job
+        self.connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("staging"))
+        self.connection.set_session(autocommit=True)
+        cursor = self.connection.cursor()
+
+        self._drop_stale_job_schemas(cursor)
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s));", (self.job_schema,))
+
+        try:
+            # the template schema is shared by all jobs, so we create it under lock
+            cursor.execute("SELECT pg_advisory_lock(hashtext(%s));", (self.schema,))
+            try:
+                cursor.execute(
+                    "SELECT schema_name FROM information_schema.schemata WHERE schema_name = %s;",
+                    (self.schema,),
+                )
+                if self.recreate_schema or cursor.rowcount == 0:
+                    create_ili_schema(
+                        self.schema,
+                        self.model,
+                        self.log_path,
+                        recreate_schema=True,
+                        create_basket_col=self.create_basket_col,
+                    )
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", (self.schema,))
+
+            cursor.execute(
+                "SELECT schema_name FROM information_schema.schemata WHERE schema_name = %s;",
+                (self.job_schema,),
+            )
+            if self.resume_key and cursor.rowcount > 0 and not self.recreate_schema:
+                logger.info(f"RESUMING THE JOB SCHEMA {self.job_schema}...")
+            else:
+                create_ili_schema(
+                    self.job_schema,
+                    self.model,
+                    self.log_path,
+                    recreate_schema=True,
+                    create_basket_col=self.create_basket_col,
+                )
+        except BaseException:
+            self._drop_job_schema()
+            raise
+
+        register_job_schema(self.schema, self.job_schema)
+        return self.job_schema
+
+    def drop(self):
+        """
+        Drops and unlocks the job schema
+        """
+        unregister_job_schema(self.schema, self.job_schema)
+        self._drop_job_schema()
+
+    def release(self):
+        """
+        Unlocks the job schema without dropping it, so that a later job can resume it
+        """
+        unregister_job_schema(self.schema, self.job_schema)
+        if self.connection is None:
+            return
+        logger.info(f"KEEPING THE JOB SCHEMA {self.job_schema} TO RESUME THE IMPORT...")
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", (self.job_schema,))
+        self.connection.close()
+        self.connection = None
+
+    def _drop_job_schema(self):
+        if self.connection is None:
+            return
+        cursor = self.connection.cursor()
+        logger.info(f"DROPPING THE JOB SCHEMA {self.job_schema}...")
+        cursor.execute(f'DROP SCHEMA IF EXISTS "{self.job_schema}" CASCADE;')
+        cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", (self.job_schema,))
+        self.connection.close()
+        self.connection = None
+
+    def _drop_stale_job_schemas(self, cursor):
+        escaped_schema = self.schema.replace("_", "\\_")
+        cursor.execute(
+            "SELECT schema_name FROM information_schema.schemata WHERE schema_name LIKE %s OR schema_name LIKE %s;",
+            (f"{escaped_schema}\\_job\\_%", f"{escaped_schema}\\_resume\\_%"),
+        )
+        for (stale_schema,) in cursor.fetchall():
+            if stale_schema == self.job_schema:
+                # the schema this job resumes
+                continue
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s));", (stale_schema,))
+            if not cursor.fetchone()[0]:
+                # the schema belongs to a running job
+                continue
+            if stale_schema.startswith(f"{self.schema}_resume_") and not self._is_expired(
+                cursor, stale_schema
+            ):
+                # kept to resume a failed job
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", (stale_schema,))
+                continue
+            logger.info(f"DROPPING THE STALE JOB SCHEMA {stale_schema}...")
+            cursor.execute(f'DROP SCHEMA IF EXISTS "{stale_schema}" CASCADE;')
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", (stale_schema,))
+
+    def _is_expired(self, cursor, resume_schema):
+        """
+        Whether the last checkpoint of a kept schema is older than config.RESUME_SCHEMA_MAX_AGE_DAYS
+        """
+        cursor.execute(
+            "SELECT to_regclass(%s);", (f'"{resume_schema}".{ImportCheckpoints.TABLE_NAME}',)
+        )
+        if cursor.fetchone()[0] is None:
+            # no checkpoint, nothing to resume
+            return True
+        cursor.execute(
+            f'SELECT coalesce(max(finished) < now() - make_interval(days => %s), true) FROM "{resume_schema}".{ImportCheckpoints.TABLE_NAME};',
+            (config.RESUME_SCHEMA_MAX_AGE_DAYS,),
+        )
+        return cursor.fetchone()[0]
+
+
+class ImportCheckpoints:
+    """
+    Steps of a resumable import recorded in a checkpoint table of the job schema : the ili2pg import
+    of the file, and the staging classes whose objects were committed (see
+    utils.qgep_import_utils.ChunkedCommit). Steps recorded by a failed run are skipped by the next
+    run on the same job schema.
+
+    Without job schema, checkpoints are disabled and nothing is skipped.
+    """
+
+    TABLE_NAME = "qgepqwat2ili_checkpoint"
+
+    def __init__(self, job_schema=None):
+        self.table = None
+        self._done = {}
+        self._pending = []
+        self._occurrences = collections.Counter()
+        if job_schema is None:
+            return
+
+        self.table = f'"{job_schema}".{self.TABLE_NAME}'
+        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("staging"))
+        connection.set_session(autocommit=True)
+        cursor = connection.cursor()
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (step text PRIMARY KEY, value text, finished timestamp with time zone DEFAULT now());"
+        )
+        cursor.execute(f"SELECT step, value FROM {self.table};")
+        self._done = dict(cursor.fetchall())
+        connection.close()
+
+    def __bool__(self):
+        return self.table is not None
+
+    def is_done(self, step, value=None):
+        """
+        Whether the step was recorded (with the same value if given)
+        """
+        return step in self._done and (value is None or self._done[step] == value)
+
+    def mark_done(self, *steps, value=None):
+        if self.table is None or not steps:
+            return
+        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("staging"))
+        cursor = connection.cursor()
+        for step in steps:
+            cursor.execute(
+                f"INSERT INTO {self.table} (step, value) VALUES (%s, %s) ON CONFLICT (step) DO UPDATE SET value = EXCLUDED.value, finished = now();",
+                (step, value),
+            )
+            self._done[step] = value
+        connection.commit()
+        connection.close()
+
+    def reset(self, keep_prefix=None):
+        """
+        Forgets all steps (except the ones starting with keep_prefix), e.g. when the staging data is imported again
+        """
+        if self.table is None:
+            return
+        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("staging"))
+        if keep_prefix is None:
+            connection.cursor().execute(f"DELETE FROM {self.table};")
+        else:
+            connection.cursor().execute(
+                f"DELETE FROM {self.table} WHERE step NOT LIKE %s;", (f"{keep_prefix}%",)
+            )
+        connection.commit()
+        connection.close()
+        self._done = {
+            step: value
+            for step, value in self._done.items()
+            if keep_prefix is not None and step.startswith(keep_prefix)
+        }
+
+    def filter_done(self, query):
+        """
+        Returns the staging query of a class, emptied if the class was committed by a previous run. Otherwise,
+        the class becomes pending until the next call to commit_pending.
+        """
+        if self.table is None:
+            return query
+        # some classes are imported more than once (e.g. in several passes)
+        name = query.column_descriptions[0]["name"]
+        self._occurrences[name] += 1
+        step = name if self._occurrences[name] == 1 else f"{name}_{self._occurrences[name]}"
+        if self.is_done(step):
+            logger.info(f"{step} already imported, skipped")
+            return query.filter(false())
+        self._pending.append(step)
+        return query
+
+    def commit_pending(self):
+        """
+        Records the pending classes, once their objects are committed
+        """
+        self.mark_done(*self._pending)
+        self._pending = []
+
+    def fork(self):
+        """
+        Returns checkpoints of the same table with their own pending classes, for a worker importing some of
+        the classes in parallel (see qgepdss.import_.qgep_import_dss)
+        """
+        forked = ImportCheckpoints()
+        forked.table = self.table
+        forked._done = dict(self._done)
+        return forked
+
+
 def validate_xtf_data(xtf_file, log_path):
     """
     Run XTF validation using ilivalidator
@@ -844,7 +1140,23 @@ def get_xtf_model2(xtf_file):
     return impmodel
 
 
-def import_xtf_data(schema, xtf_file, log_path):
+def import_xtf_data(schema, xtf_file, log_path, checkpoints=None, dataset=None):
+    """
+    Imports the xtf file into the schema, unless the checkpoints already record its import
+
+    By default, the data of the schema is replaced. With a dataset name, the file is added to the schema
+    as a new ili2pg dataset instead (needs a schema created with create_basket_col), so that several files
+    can be imported into the same schema.
+    """
+    step = "ili2pg" if dataset is None else f"ili2pg {dataset}"
+    file_hash = get_file_hash(xtf_file) if checkpoints else None
+    if checkpoints and checkpoints.is_done(step, file_hash):
+        logger.info("XTF DATA ALREADY IMPORTED, RESUMING...")
+        return
+    if checkpoints:
+        # the classes imported from previous staging data must be imported again (the other datasets are kept)
+        checkpoints.reset(keep_prefix=None if dataset is None else "ili2pg ")
+
     logger.info("IMPORTING XTF DATA...")
     exec_(
         " ".join(
@@ -853,8 +1165,8 @@ def import_xtf_data(schema, xtf_file, log_path):
                 "-jar",
                 f'"{config.ILI2PG}"',
                 "--import",
-                "--deleteData",
-                *get_pgconf_as_ili_args(),
+                *(["--deleteData"] if dataset is None else ["--dataset", f'"{dataset}"']),
+                *get_pgconf_as_ili_args("staging"),
                 "--dbschema",
                 f'"{schema}"',
                 "--modeldir",
@@ -871,6 +1183,41 @@ def import_xtf_data(schema, xtf_file, log_path):
             ]
         )
     )
+    if checkpoints:
+        checkpoints.mark_done(step, value=file_hash)
+
+
+def get_dataset_object_counts(schema):
+    """
+    Returns the number of objects of each ili2pg dataset of the schema (needs a schema created with
+    create_basket_col)
+    """
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("staging"))
+    cursor = connection.cursor()
+    cursor.execute(
+        f"""
+        SELECT dataset.datasetname, count(baseclass.t_id)
+        FROM "{schema}".t_ili2db_dataset dataset
+        LEFT JOIN "{schema}".t_ili2db_basket basket ON basket.dataset = dataset.t_id
+        LEFT JOIN "{schema}".baseclass baseclass ON baseclass.t_basket = basket.t_id
+        GROUP BY dataset.datasetname;
+        """
+    )
+    counts = dict(cursor.fetchall())
+    connection.close()
+    return counts
+
+
+def get_staging_object_count(schema):
+    """
+    Returns the number of objects imported into the ili2pg schema
+    """
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("staging"))
+    cursor = connection.cursor()
+    cursor.execute(f'SELECT count(*) FROM "{schema}".baseclass;')
+    count = cursor.fetchone()[0]
+    connection.close()
+    return count
 
 
 def export_xtf_data(schema, model_name, export_model_name, xtf_file, log_path):
@@ -892,7 +1239,7 @@ def export_xtf_data(schema, model_name, export_model_name, xtf_file, log_path):
                 "--models",
                 f"{model_name}",
                 *export_model_name_args,
-                *get_pgconf_as_ili_args(),
+                *get_pgconf_as_ili_args("staging"),
                 "--dbschema",
                 f"{schema}",
                 "--modeldir",
@@ -923,11 +1270,15 @@ class TidMaker:
         self._autoincrementer = collections.defaultdict(lambda: len(self._autoincrementer))
 
     def tid_for_row(self, row, for_class=None):
+        return self.tid_for_id(row.__class__, getattr(row, self._id_attr), for_class)
+
+    def tid_for_id(self, cls, id_, for_class=None):
+        """Same as tid_for_row, for an id of a class (e.g. fetched as a plain column)"""
         # tid are globally unique, while ids are only guaranteed unique per table,
         # so include the base table in the key
         # this finds the base class (the first parent class before sqlalchemy.ext.automap.Base)
-        class_for_id = row.__class__.__mro__[row.__class__.__mro__.index(AutomapBase) - 2]
-        key = (class_for_id, getattr(row, self._id_attr), for_class)
+        class_for_id = cls.__mro__[cls.__mro__.index(AutomapBase) - 2]
+        key = (class_for_id, id_, for_class)
         # was_created = key not in self._autoincrementer  # just for debugging
         tid = self._autoincrementer[key]
         # if was_created:
@@ -935,6 +1286,11 @@ class TidMaker:
         #     logger.info(f"created tid {tid} for {key}")
         return tid
 
+    def existing_tid_for_id(self, cls, id_, for_class=None):
+        """Same as tid_for_id, but returns None instead of creating a tid for an id not exported yet"""
+        class_for_id = cls.__mro__[cls.__mro__.index(AutomapBase) - 2]
+        return self._autoincrementer.get((class_for_id, id_, for_class))
+
     def next_tid(self):
         """Get an arbitrary unused tid"""
         key = len(self._autoincrementer)
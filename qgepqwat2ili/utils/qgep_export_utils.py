@@ -1,11 +1,66 @@
 import json
+from collections import namedtuple
 
 import psycopg2
 from geoalchemy2.functions import ST_Force2D, ST_GeomFromGeoJSON
-from sqlalchemy import or_
+from sqlalchemy import column, func, inspect, or_, select, table
+from sqlalchemy.sql import text
 
 from .various import get_pgconf_as_psycopg2_dsn, logger
 
+SELECTION_TABLE = "qgepqwat2ili_selection"
+SELECTION_WWS_TABLE = "qgepqwat2ili_selection_wws"
+
+# INTERLIS lengths the exporters truncate the text attributes to
+EXPORT_MAX_LENGTHS = {
+    "remark": 80,
+    "base_data": 50,
+    "result": 50,
+    "object": 16,
+}
+# text attributes checked against the length of the staging column they are exported to (ili2pg creates
+# varchar(n) columns for TEXT*n attributes), longer values are truncated or invalid
+EXPORT_TEXT_ATTRIBUTES = {
+    "remark": "bemerkung",
+    "base_data": "datengrundlage",
+    "result": "ergebnis",
+    "object": "objekt",
+    "identifier": "bezeichnung",
+}
+# mandatory attributes, exported as blank strings when null
+EXPORT_MANDATORY_COLUMNS = ["identifier", "object", "discharge_point", "user_system"]
+
+# Attributes common to the subclasses (target attribute: (source attribute, conversion)), the row by row
+# and the columnar export mappings are both built from them (see common_values and common_columns)
+WASTEWATER_STRUCTURE_ATTRIBUTES = {
+    "akten": ("records", None),
+    "astatus": ("status", "vl"),
+    "baujahr": ("year_of_construction", None),
+    "baulicherzustand": ("structure_condition", "vl"),
+    "baulos": ("contract_section", None),
+    "bemerkung": ("remark", "text"),
+    "betreiberref": ("fk_operator", "tid"),
+    "bezeichnung": ("identifier", "mandatory"),
+    "bruttokosten": ("gross_costs", None),
+    "detailgeometrie": ("detail_geometry_geometry", "2d"),
+    "eigentuemerref": ("fk_owner", "tid"),
+    "ersatzjahr": ("year_of_replacement", None),
+    "finanzierung": ("financing", "vl"),
+    "inspektionsintervall": ("inspection_interval", None),
+    "sanierungsbedarf": ("renovation_necessity", "vl"),
+    "standortname": ("location_name", None),
+    "subventionen": ("subsidies", None),
+    "wbw_basisjahr": ("rv_base_year", None),
+    "wbw_bauart": ("rv_construction_type", "vl"),
+    "wiederbeschaffungswert": ("replacement_value", None),
+    "zugaenglichkeit": ("accessibility", "vl"),
+}
+WASTEWATER_NETWORKELEMENT_ATTRIBUTES = {
+    "abwasserbauwerkref": ("fk_wastewater_structure", "wws_tid"),
+    "bemerkung": ("remark", "text"),
+    "bezeichnung": ("identifier", "mandatory"),
+}
+
 
 class QgepExportUtils:
 
@@ -22,6 +77,8 @@ class QgepExportUtils:
         subset_ids,
         subset_wws_ids,
         ws_off_sia405abwasser,
+        subset_filter=None,
+        subset_wws_filter=None,
     ):
         self.tid_maker = tid_maker
         self.current_basket = current_basket
@@ -34,6 +91,14 @@ class QgepExportUtils:
         self.subset_ids = subset_ids
         self.subset_wws_ids = subset_wws_ids
         self.ws_off_sia405abwasser = ws_off_sia405abwasser
+        # subqueries on the selection tables, used in the export queries instead of the id lists
+        self.subset_filter = subset_filter if subset_filter is not None else subset_ids
+        self.subset_wws_filter = (
+            subset_wws_filter if subset_wws_filter is not None else subset_wws_ids
+        )
+        # lookups of the columnar export (see export_columnar)
+        self._vl_lookups = {}
+        self._classes_by_table = None
 
     def get_tid(self, relation):
         """
@@ -54,38 +119,134 @@ class QgepExportUtils:
 
     def null_to_emptystr(self, val):
         """
-        Converts nulls to blank strings and raises a warning
+        Converts nulls to blank strings (reported upfront by check_export_values)
         """
         if val is None:
-            logger.warning(
-                "A mandatory value was null. It will be cast to a blank string, and probably cause validation errors",
-            )
             val = ""
         return val
 
     def emptystr_to_null(self, val):
         """
-        Converts blank strings to nulls and raises a warning
+        Converts blank strings to nulls
 
         This is needed as is seems ili2pg 4.4.6 crashes with emptystrings under certain circumstances (see https://github.com/QGEP/qgepqwat2ili/issues/33)
         """
         if val == "":
-            logger.warning(
-                "An empty string was converted to NULL, to workaround ili2pg issue. This should have no impact on output.",
-            )
             val = None
         return val
 
     def truncate(self, val, max_length):
         """
-        Raises a warning if values gets truncated
+        Truncates values exceeding max_length (reported upfront by check_export_values)
         """
         if val is None:
             return None
-        if len(val) > max_length:
-            logger.warning(f"Value '{val}' exceeds expected length ({max_length})")
         return val[0:max_length]
 
+    def check_export_values(self, mapping):
+        """
+        Counts the values of the exported classes that will be truncated or that are missing although
+        mandatory, with one query per class limited to the selection, and logs an aggregated report
+        instead of a warning per exported value
+
+        The mapping (qgep class: [staging classes], see e.g. qgep.mapping) gives the exported classes and
+        the staging columns whose lengths the values are checked against.
+        """
+        logger.info("CHECKING VALUES TO EXPORT...")
+
+        truncated_count = 0
+        missing_count = 0
+        for cls, abwasser_classes in mapping.items():
+            class_name = cls.__name__
+            staging_mapper = inspect(abwasser_classes[0], raiseerr=False)
+            staging_columns = staging_mapper.columns if staging_mapper is not None else {}
+            checks = []
+            for column_name in sorted(set(EXPORT_TEXT_ATTRIBUTES) | set(EXPORT_MANDATORY_COLUMNS)):
+                attribute = getattr(cls, column_name, None)
+                if attribute is None:
+                    continue
+                staging_column = staging_columns.get(EXPORT_TEXT_ATTRIBUTES.get(column_name))
+                max_length = getattr(getattr(staging_column, "type", None), "length", None)
+                if max_length:
+                    checks.append(
+                        (
+                            func.count().filter(func.length(attribute) > max_length),
+                            f"values of {column_name} exceed the expected length ({max_length}), they will be truncated or cause validation errors",
+                            False,
+                        )
+                    )
+                if column_name in EXPORT_MANDATORY_COLUMNS:
+                    checks.append(
+                        (
+                            func.count().filter(attribute.is_(None)),
+                            f"mandatory values of {column_name} are null, they will be cast to blank strings and probably cause validation errors",
+                            True,
+                        )
+                    )
+            if not checks:
+                continue
+
+            # the query of the class includes the tables of its parent classes
+            query = self.qgep_session.query(*[check for check, _, _ in checks]).select_from(cls)
+            if self.filtered:
+                condition = self._selection_condition(cls)
+                if condition is not None:
+                    query = query.filter(condition)
+            counts = query.one()
+
+            for count, (_, message, mandatory) in zip(counts, checks):
+                if not count:
+                    continue
+                logger.warning(f"qgep_od.{class_name}: {count} {message}")
+                if mandatory:
+                    missing_count += count
+                else:
+                    truncated_count += count
+
+        logger.info(
+            f"Values check done: {truncated_count} values too long, {missing_count} mandatory values missing"
+        )
+
+    def _selection_condition(self, cls):
+        """
+        Condition limiting a class to the objects exported with the selection, as the export queries
+        do (None for the classes that are exported entirely)
+        """
+        qgep = self.qgep_model
+        networkelement = qgep.wastewater_networkelement
+        ws_ids = select([networkelement.fk_wastewater_structure]).where(
+            networkelement.obj_id.in_(self.subset_filter)
+        )
+        maintenance_event_ids = select(
+            [qgep.re_maintenance_event_wastewater_structure.fk_maintenance_event]
+        ).where(qgep.re_maintenance_event_wastewater_structure.fk_wastewater_structure.in_(ws_ids))
+
+        if issubclass(cls, networkelement):
+            return cls.obj_id.in_(self.subset_filter)
+        if issubclass(cls, qgep.wastewater_structure):
+            return cls.obj_id.in_(ws_ids)
+        if cls is qgep.reach_point:
+            selected_reach = qgep.reach.obj_id.in_(self.subset_filter)
+            return or_(
+                cls.obj_id.in_(select([qgep.reach.fk_reach_point_from]).where(selected_reach)),
+                cls.obj_id.in_(select([qgep.reach.fk_reach_point_to]).where(selected_reach)),
+            )
+        if issubclass(cls, qgep.maintenance_event):
+            return cls.obj_id.in_(maintenance_event_ids)
+        if issubclass(cls, qgep.damage):
+            return cls.fk_examination.in_(maintenance_event_ids)
+        if cls is qgep.file:
+            damage_ids = select([qgep.damage.obj_id]).where(
+                qgep.damage.fk_examination.in_(maintenance_event_ids)
+            )
+            return or_(cls.object.in_(maintenance_event_ids), cls.object.in_(damage_ids))
+        if hasattr(cls, "fk_wastewater_structure"):
+            return cls.fk_wastewater_structure.in_(self.subset_wws_filter)
+        for fk_networkelement in ["fk_wastewater_node", "fk_wastewater_networkelement"]:
+            if hasattr(cls, fk_networkelement):
+                return getattr(cls, fk_networkelement).in_(self.subset_filter)
+        return None
+
     def modulo_angle(self, val):
         """
         Returns an angle between 0 and 359.9 (for Orientierung in Base_d-20181005.ili)
@@ -100,8 +261,6 @@ class QgepExportUtils:
         if val > 359.9:
             val = 0
 
-        logger.info(f"modulo_angle - added orientation: {self.labelorientation}")
-
         return val
 
     def check_fk_in_subsetid(self, subset, relation):
@@ -182,6 +341,57 @@ class QgepExportUtils:
 
         return base
 
+    def common_values(self, row, attributes, check_fk_in_subset=False):
+        """
+        Returns the values of a row for common attributes (see WASTEWATER_STRUCTURE_ATTRIBUTES). With
+        check_fk_in_subset, the references to wastewater structures outside of the subset are replaced by None.
+        """
+        values = {}
+        for target, (source, conversion) in attributes.items():
+            if conversion == "vl":
+                values[target] = self.get_vl(getattr(row, f"{source}__REL"))
+            elif conversion == "wws_tid" and check_fk_in_subset:
+                values[target] = self.check_fk_in_subsetid(
+                    self.subset_wws_ids, getattr(row, f"{source}__REL")
+                )
+            elif conversion in ("tid", "wws_tid"):
+                values[target] = self.get_tid(getattr(row, f"{source}__REL"))
+            elif conversion == "text":
+                values[target] = self.truncate(
+                    self.emptystr_to_null(getattr(row, source)), EXPORT_MAX_LENGTHS[source]
+                )
+            elif conversion == "mandatory":
+                values[target] = self.null_to_emptystr(getattr(row, source))
+            elif conversion == "2d":
+                values[target] = ST_Force2D(getattr(row, source))
+            else:
+                values[target] = getattr(row, source)
+        return values
+
+    def common_columns(self, source_class, attributes, check_fk_in_subset=False):
+        """
+        Returns the column mappings of common attributes for export_columnar (columnar equivalent of
+        common_values)
+        """
+        columns = {}
+        for target, (source, conversion) in attributes.items():
+            source_column = getattr(source_class, source)
+            if conversion == "vl":
+                columns[target] = self.vl_column(source_column)
+            elif conversion == "wws_tid" and check_fk_in_subset:
+                columns[target] = self.tid_column(source_column, self.subset_wws_ids)
+            elif conversion in ("tid", "wws_tid"):
+                columns[target] = self.tid_column(source_column)
+            elif conversion == "text":
+                columns[target] = self.text_column(source_column, EXPORT_MAX_LENGTHS[source])
+            elif conversion == "mandatory":
+                columns[target] = self.mandatory_column(source_column)
+            elif conversion == "2d":
+                columns[target] = ST_Force2D(source_column)
+            else:
+                columns[target] = source_column
+        return columns
+
     def wastewater_structure_common(self, row):
         """
         Returns common attributes for wastewater_structure
@@ -189,54 +399,22 @@ class QgepExportUtils:
         # logger.warning(
         # "Mapping of wastewater_structure->abwasserbauwerk is not yet implemented for 3D extensions of SIA405 Abwasser, VSA-KEK and VSA-DSS 2015."
         # )
-        return {
-            # --- abwasserbauwerk ---
-            "akten": row.records,
-            "astatus": self.get_vl(row.status__REL),
-            "baujahr": row.year_of_construction,
-            "baulicherzustand": self.get_vl(row.structure_condition__REL),
-            "baulos": row.contract_section,
-            "bemerkung": self.truncate(self.emptystr_to_null(row.remark), 80),
-            "betreiberref": self.get_tid(row.fk_operator__REL),
-            "bezeichnung": self.null_to_emptystr(row.identifier),
-            "bruttokosten": row.gross_costs,
-            "detailgeometrie": ST_Force2D(row.detail_geometry_geometry),
-            "eigentuemerref": self.get_tid(row.fk_owner__REL),
-            "ersatzjahr": row.year_of_replacement,
-            "finanzierung": self.get_vl(row.financing__REL),
-            "inspektionsintervall": row.inspection_interval,
-            "sanierungsbedarf": self.get_vl(row.renovation_necessity__REL),
-            "standortname": row.location_name,
-            "subventionen": row.subsidies,
-            "wbw_basisjahr": row.rv_base_year,
-            "wbw_bauart": self.get_vl(row.rv_construction_type__REL),
-            "wiederbeschaffungswert": row.replacement_value,
-            "zugaenglichkeit": self.get_vl(row.accessibility__REL),
-        }
+        return self.common_values(row, WASTEWATER_STRUCTURE_ATTRIBUTES)
 
     def wastewater_networkelement_common(self, row):
         """
         Returns common attributes for wastewater_networkelement - no check_fk_in_subsetid
         """
-        return {
-            "abwasserbauwerkref": self.get_tid(row.fk_wastewater_structure__REL),
-            "bemerkung": self.truncate(self.emptystr_to_null(row.remark), 80),
-            "bezeichnung": self.null_to_emptystr(row.identifier),
-        }
+        return self.common_values(row, WASTEWATER_NETWORKELEMENT_ATTRIBUTES)
 
     def wastewater_networkelement_common_check_fk_in_subset(self, row):
         """
         Returns common attributes for wastewater_networkelement with check_fk_in_subsetid
         """
-        return {
-            # added check_fk_in_subsetid with subset_wws_ids (only needed for SIA405 Abwasser export wwtp_structure - but as now in qgep_export_utils done for all export - might slow donw export
-            # "abwasserbauwerkref": self.get_tid(row.fk_wastewater_structure__REL),
-            "abwasserbauwerkref": self.check_fk_in_subsetid(
-                self.subset_wws_ids, row.fk_wastewater_structure__REL
-            ),
-            "bemerkung": self.truncate(self.emptystr_to_null(row.remark), 80),
-            "bezeichnung": self.null_to_emptystr(row.identifier),
-        }
+        # added check_fk_in_subsetid with subset_wws_ids (only needed for SIA405 Abwasser export wwtp_structure - but as now in qgep_export_utils done for all export - might slow donw export
+        return self.common_values(
+            row, WASTEWATER_NETWORKELEMENT_ATTRIBUTES, check_fk_in_subset=True
+        )
 
     def structure_part_common(self, row):
         """
@@ -262,6 +440,160 @@ class QgepExportUtils:
             "instandstellung": self.get_vl(row.renovation_demand__REL),
         }
 
+    def get_vl_lookup(self, vl_table):
+        """
+        Returns the code -> value_de lookup of a value list table (loaded once per export)
+        """
+        if vl_table.fullname not in self._vl_lookups:
+            rows = self.qgep_session.execute(
+                select([vl_table.c.code, vl_table.c.value_de])
+            ).fetchall()
+            self._vl_lookups[vl_table.fullname] = dict(rows)
+        return self._vl_lookups[vl_table.fullname]
+
+    def get_class_for_table(self, table):
+        """
+        Returns the qgep model class mapped to a table
+        """
+        if self._classes_by_table is None:
+            self._classes_by_table = {cls.__table__: cls for cls in self.qgep_model}
+        return self._classes_by_table[table]
+
+    def vl_column(self, source_column):
+        """
+        Column mapping of a value list code to its literal value (columnar equivalent of get_vl)
+        """
+        vl_table = next(iter(source_column.property.columns[0].foreign_keys)).column.table
+        lookup = self.get_vl_lookup(vl_table)
+        return source_column, lambda values: [lookup.get(value) for value in values]
+
+    def tid_column(self, source_column, subset=None):
+        """
+        Column mapping of a foreign key to the tid of the referenced row (columnar equivalent of get_tid).
+        If subset is provided, references outside of the subset are replaced by None (see check_fk_in_subsetid).
+        """
+        referred_table = next(iter(source_column.property.columns[0].foreign_keys)).column.table
+        referred_class = self.get_class_for_table(referred_table)
+        subset = set(subset) if subset is not None else None
+
+        def transform(values):
+            tids = []
+            for value in values:
+                if value is None or (subset is not None and value not in subset):
+                    tids.append(None)
+                else:
+                    tids.append(self.tid_maker.tid_for_id(referred_class, value))
+            outside_count = len([value for value in values if value is not None]) - len(
+                [tid for tid in tids if tid is not None]
+            )
+            if outside_count:
+                logger.warning(
+                    f"{outside_count} references of {source_column} are not in subset - replaced with None instead!"
+                )
+            return tids
+
+        return source_column, transform
+
+    def text_column(self, source_column, max_length):
+        """
+        Column mapping of an optional text (columnar equivalent of truncate(emptystr_to_null()))
+        """
+        return source_column, lambda values: [
+            self.truncate(self.emptystr_to_null(value), max_length) for value in values
+        ]
+
+    def mandatory_column(self, source_column):
+        """
+        Column mapping of a mandatory text (columnar equivalent of null_to_emptystr)
+        """
+        return source_column, lambda values: [self.null_to_emptystr(value) for value in values]
+
+    def wastewater_structure_columns(self, source_class):
+        """
+        Returns the column mappings of wastewater_structure (columnar equivalent of wastewater_structure_common)
+        """
+        return self.common_columns(source_class, WASTEWATER_STRUCTURE_ATTRIBUTES)
+
+    def wastewater_networkelement_columns(self, source_class, check_fk_in_subset=False):
+        """
+        Returns the column mappings of wastewater_networkelement (columnar equivalent of
+        wastewater_networkelement_common and wastewater_networkelement_common_check_fk_in_subset)
+        """
+        return self.common_columns(
+            source_class, WASTEWATER_NETWORKELEMENT_ATTRIBUTES, check_fk_in_subset
+        )
+
+    def export_columnar(self, query, target_class, type_name, columns, batch_size=5000):
+        """
+        Exports the rows of a query column by column, instead of creating an ORM instance per row.
+
+        The rows are fetched as plain columns in batches, each column is converted at once (value lists
+        through lookups loaded from qgep_vl, truncation, tids...) and the batch is bulk inserted together
+        with the metaattributes. columns maps the target attributes to a source column (or SQL expression),
+        or to a (source column, transform) tuple, the transform converting the list of values of a batch.
+
+        The rows aren't deduplicated like ORM entities, so the query must return each object once (filter
+        with subqueries instead of joins to one-to-many relations).
+        """
+        source_class = query.column_descriptions[0]["entity"]
+        mappings = list(columns.items())
+        source_columns = [
+            mapping[0] if isinstance(mapping, tuple) else mapping for _, mapping in mappings
+        ]
+        result = self.qgep_session.execute(
+            query.with_entities(
+                source_class.obj_id,
+                source_class.fk_dataowner,
+                source_class.fk_provider,
+                source_class.last_modification,
+                *source_columns,
+            ).statement
+        )
+
+        exported_count = 0
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+
+            obj_ids, dataowners, providers, last_modifications, *source_values = zip(*rows)
+            tids = [self.tid_maker.tid_for_id(source_class, obj_id) for obj_id in obj_ids]
+
+            target_values = {
+                "t_ili_tid": obj_ids,
+                "t_type": [type_name] * len(rows),
+                "obj_id": obj_ids,
+                "t_id": tids,
+            }
+            for (attribute, mapping), values in zip(mappings, source_values):
+                target_values[attribute] = (
+                    mapping[1](list(values)) if isinstance(mapping, tuple) else values
+                )
+            metaattribute_values = {
+                "datenherr": ["unknown" if value is None else value for value in dataowners],
+                "datenlieferant": ["unknown" if value is None else value for value in providers],
+                "letzte_aenderung": last_modifications,
+                "sia405_baseclass_metaattribute": tids,
+                "t_id": tids,
+                "t_seq": [0] * len(rows),
+            }
+            if self.current_basket is not None:
+                target_values["t_basket"] = [self.current_basket.t_id] * len(rows)
+                metaattribute_values["t_basket"] = [self.current_basket.t_id] * len(rows)
+
+            for model_class, values in [
+                (target_class, target_values),
+                (self.abwasser_model.metaattribute, metaattribute_values),
+            ]:
+                self.abwasser_session.bulk_insert_mappings(
+                    model_class,
+                    [dict(zip(values.keys(), row_values)) for row_values in zip(*values.values())],
+                )
+            exported_count += len(rows)
+            print(".", end="")
+
+        logger.info(f"{exported_count} rows exported")
+
     def textpos_common(self, row, t_type, geojson_crs_def):
         """
         Returns common attributes for textpos
@@ -330,7 +662,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.channel)
         if self.filtered:
             query = query.join(self.qgep_model.wastewater_networkelement).filter(
-                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids)
+                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter)
             )
         for row in query:
             # AVAILABLE FIELDS IN QGEP.channel
@@ -371,7 +703,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.manhole)
         if self.filtered:
             query = query.join(self.qgep_model.wastewater_networkelement).filter(
-                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids)
+                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter)
             )
         for row in query:
             # AVAILABLE FIELDS IN QGEP.manhole
@@ -414,7 +746,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.special_structure)
         if self.filtered:
             query = query.join(self.qgep_model.wastewater_networkelement).filter(
-                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids)
+                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter)
             )
         for row in query:
             # AVAILABLE FIELDS IN QGEP.special_structure
@@ -493,7 +825,7 @@ class QgepExportUtils:
     # query = self.qgep_session.query(self.qgep_model.wastewater_node)
     # if self.filtered:
     # query = query.filter(
-    # self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids)
+    # self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter)
     # )
     # # add sql statement to logger
     # statement = query.statement
@@ -535,7 +867,7 @@ class QgepExportUtils:
     # query = self.qgep_session.query(self.qgep_model.wastewater_node)
     # if self.filtered:
     # query = query.filter(
-    # self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids)
+    # self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter)
     # )
     # # add sql statement to logger
     # statement = query.statement
@@ -583,7 +915,7 @@ class QgepExportUtils:
                     == self.qgep_model.reach.fk_reach_point_from,
                     self.qgep_model.reach_point.obj_id == self.qgep_model.reach.fk_reach_point_to,
                 ),
-            ).filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids))
+            ).filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -631,7 +963,7 @@ class QgepExportUtils:
                     == self.qgep_model.reach.fk_reach_point_from,
                     self.qgep_model.reach_point.obj_id == self.qgep_model.reach.fk_reach_point_to,
                 ),
-            ).filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids))
+            ).filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -677,7 +1009,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.reach)
         if self.filtered:
             query = query.filter(
-                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids)
+                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter)
             )
         # add sql statement to logger
         statement = query.statement
@@ -738,7 +1070,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.reach)
         if self.filtered:
             query = query.filter(
-                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids)
+                self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter)
             )
         # add sql statement to logger
         statement = query.statement
@@ -801,12 +1133,12 @@ class QgepExportUtils:
         # query = (
         # query.join(self.qgep_model.wastewater_structure)
         # .join(self.qgep_model.wastewater_networkelement)
-        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids))
+        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter))
         # )
         # filtering only on wastewater_structures that are in subset_wws_ids
         if self.filtered:
             query = query.join(self.qgep_model.wastewater_structure).filter(
-                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
             )
 
         # add sql statement to logger
@@ -847,7 +1179,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.dryweather_downspout)
         # if ws_off_sia405abwasser always filter out with subset_wws_ids
         query = query.join(self.qgep_model.wastewater_structure).filter(
-            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -889,12 +1221,12 @@ class QgepExportUtils:
         # query = (
         # query.join(self.qgep_model.wastewater_structure)
         # .join(self.qgep_model.wastewater_networkelement)
-        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids))
+        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter))
         # )
         # filtering only on wastewater_structures that are in subset_wws_ids
         if self.filtered:
             query = query.join(self.qgep_model.wastewater_structure).filter(
-                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
             )
         # add sql statement to logger
         statement = query.statement
@@ -934,7 +1266,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.access_aid)
         # if ws_off_sia405abwasser always filter out with subset_wws_ids
         query = query.join(self.qgep_model.wastewater_structure).filter(
-            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -976,12 +1308,12 @@ class QgepExportUtils:
         # query = (
         # query.join(self.qgep_model.wastewater_structure)
         # .join(self.qgep_model.wastewater_networkelement)
-        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids))
+        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter))
         # )
         # filtering only on wastewater_structures that are in subset_wws_ids
         if self.filtered:
             query = query.join(self.qgep_model.wastewater_structure).filter(
-                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
             )
         # add sql statement to logger
         statement = query.statement
@@ -1021,7 +1353,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.dryweather_flume)
         # if ws_off_sia405abwasser always filter out with subset_wws_ids
         query = query.join(self.qgep_model.wastewater_structure).filter(
-            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -1063,7 +1395,7 @@ class QgepExportUtils:
         # query = (
         # query.join(self.qgep_model.wastewater_structure)
         # .join(self.qgep_model.wastewater_networkelement)
-        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids))
+        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter))
         # )
         # filtering only on wastewater_structures that are in subset_wws_ids
         if self.filtered:
@@ -1071,7 +1403,7 @@ class QgepExportUtils:
                 self.qgep_model.wastewater_structure,
                 self.qgep_model.cover.fk_wastewater_structure
                 == self.qgep_model.wastewater_structure.obj_id,
-            ).filter(self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids))
+            ).filter(self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -1122,7 +1454,7 @@ class QgepExportUtils:
             self.qgep_model.wastewater_structure,
             self.qgep_model.cover.fk_wastewater_structure
             == self.qgep_model.wastewater_structure.obj_id,
-        ).filter(self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids))
+        ).filter(self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter))
         # add sql statement to logger
         statement = query.statement
         logger.debug(f" selection query = {statement}")
@@ -1172,12 +1504,12 @@ class QgepExportUtils:
         # query = (
         # query.join(self.qgep_model.wastewater_structure)
         # .join(self.qgep_model.wastewater_networkelement)
-        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_ids))
+        # .filter(self.qgep_model.wastewater_networkelement.obj_id.in_(self.subset_filter))
         # )
         # filtering only on wastewater_structures that are in subset_wws_ids
         if self.filtered:
             query = query.join(self.qgep_model.wastewater_structure).filter(
-                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+                self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
             )
         # add sql statement to logger
         statement = query.statement
@@ -1217,7 +1549,7 @@ class QgepExportUtils:
         query = self.qgep_session.query(self.qgep_model.benching)
         # if ws_off_sia405abwasser always filter out with subset_wws_ids
         query = query.join(self.qgep_model.wastewater_structure).filter(
-            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_ids)
+            self.qgep_model.wastewater_structure.obj_id.in_(self.subset_wws_filter)
         )
         # add sql statement to logger
         statement = query.statement
@@ -1257,132 +1589,202 @@ class QgepExportUtils:
 # end class QgepExportUtils
 
 
-# 10.12.2024
-def get_selection_text_for_in_statement(selection_list):
+# A selection resolved in the database : the obj_id column of the sql query (psycopg2 parameters), inserted
+# into the selection table with INSERT ... SELECT instead of going through a list of id's
+SelectionQuery = namedtuple("SelectionQuery", ["sql", "params"])
+
+
+def get_selection_in_geometry(polygon_wkt=None, bbox=None, srid=2056):
     """
-    convert selection_list to selection_text to fit SQL IN statement
+    Get the selection of reaches and wastewater_nodes intersecting a polygon (WKT) or a bounding box (xmin, ymin, xmax, ymax)
+
+    The selection is resolved in the database when the selection table is created (see create_selection_table),
+    so the GiST indexes on reach.progression_geometry and wastewater_node.situation_geometry are used.
     """
-    if selection_list is None:
-        selection_text = None
+    if bbox is not None:
+        geometry_sql = "ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, %(srid)s)"
+        params = dict(zip(["xmin", "ymin", "xmax", "ymax"], bbox), srid=srid)
+    elif polygon_wkt is not None:
+        geometry_sql = "ST_GeomFromText(%(wkt)s, %(srid)s)"
+        params = {"wkt": polygon_wkt, "srid": srid}
     else:
-        if not selection_list:
-            # list is empty - no need for adaption
-            selection_text = None
-        else:
-            selection_text = ""
+        return None
 
-            for list_item in selection_list:
-                selection_text += "'"
-                selection_text += list_item
-                selection_text += "',"
+    # ST_Intersects includes a bounding box comparison (&&) that is answered by the GiST indexes
+    return SelectionQuery(
+        f"""
+        WITH selection_geometry AS (SELECT {geometry_sql} AS geom)
+        SELECT re.obj_id FROM qgep_od.reach re, selection_geometry sg
+        WHERE ST_Intersects(re.progression_geometry, sg.geom)
+        UNION
+        SELECT wn.obj_id FROM qgep_od.wastewater_node wn, selection_geometry sg
+        WHERE ST_Intersects(wn.situation_geometry, sg.geom)
+        """,
+        params,
+    )
+
+
+def is_selection_empty(selection):
+    """
+    Checks whether a selection (list of id's or SelectionQuery) is empty, without fetching a SelectionQuery
+    """
+    if not isinstance(selection, SelectionQuery):
+        return not selection
 
-            # remove last komma to make it a correct IN statement
-            selection_text = selection_text[:-1]
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("source"))
+    connection.set_session(autocommit=True)
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT EXISTS ({selection.sql});", selection.params)
+    exists = cursor.fetchone()[0]
+    connection.close()
+    return not exists
 
-    logger.debug(f"selection_text = {selection_text} ...")
-    return selection_text
 
+def fetch_selection_ids(query, selection_list):
+    """
+    Runs a query with the selection_list bound as one array parameter (use `= ANY(%s)` in the query)
+    and returns the list of id's of the first column or None if no rows are found
+    """
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("source"))
+    connection.set_session(autocommit=True)
+    cursor = connection.cursor()
 
-# 10.12.2024
-def get_connected_we_from_re(subset_reaches):
+    # the ids are passed as one array parameter instead of a literal IN (...) list,
+    # so the statement size does not depend on the size of the selection
+    cursor.execute(query, [list(selection_list)])
+    records = cursor.fetchall()
+    connection.close()
+
+    if not records:
+        return None
+    return [str(row[0]) for row in records]
+
+
+def read_selection_file(path):
     """
-    Get connected wastewater_networkelements (wastewater_nodes and reaches) from subset of reaches
+    Reads a list of id's from a file (one id per line or comma separated)
     """
-    if subset_reaches is None:
-        connected_wn_from_re_ids = None
-    else:
-        # check if list is empty https://stackoverflow.com/questions/53513/how-do-i-check-if-a-list-is-empty
-        if not subset_reaches:
-            connected_wn_from_re_ids = None
-        else:
-            logger.debug(
-                f"get list of id's of connected wastewater_nodes of provides subset of reaches {subset_reaches} ..."
-            )
-            connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
-            connection.set_session(autocommit=True)
-            cursor = connection.cursor()
+    with open(path, encoding="utf-8") as f:
+        selection_ids = [
+            list_item.strip() for list_item in f.read().replace(",", "\n").splitlines()
+        ]
+    selection_ids = [list_item for list_item in selection_ids if list_item]
+    logger.info(f"{len(selection_ids)} id's read from selection file {path}")
+    return selection_ids
 
-            connected_wn_from_re_ids = []
 
-            subset_reaches_text = get_selection_text_for_in_statement(subset_reaches)
+def get_selection_from_query(selection_query):
+    """
+    Get list of id's from an SQL query (the first column of the query result is used as obj_id)
+    """
+    logger.info("get list of id's from selection query ...")
+    connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("source"))
+    connection.set_session(autocommit=True)
+    cursor = connection.cursor()
 
-            # select all connected from wastewater_nodes from provided subset of reaches
-            cursor.execute(
-                f"SELECT  wef.obj_id as wef_obj_id FROM qgep_od.reach re LEFT JOIN qgep_od.reach_point rpf ON rpf.obj_id = re.fk_reach_point_from LEFT JOIN qgep_od.wastewater_networkelement wef ON wef.obj_id = rpf.fk_wastewater_networkelement WHERE re.obj_id IN ({subset_reaches_text}) AND NOT wef.obj_id isNull;"
-            )
+    cursor.execute(
+        f"SELECT DISTINCT * FROM ({selection_query.rstrip().rstrip(';')}) AS selection;"
+    )
+    selection_ids = [str(row[0]) for row in cursor.fetchall() if row[0] is not None]
+    connection.close()
 
-            # cursor.fetchall() - see https://pynative.com/python-cursor-fetchall-fetchmany-fetchone-to-read-rows-from-table/
-            # ws_wn_ids_count = int(cursor.fetchone()[0])
-            # if ws_wn_ids_count == 0:
-            if cursor.fetchone() is None:
-                connected_wn_from_re_ids = None
-            else:
-                # added cursor.execute again to see if with this all records will be available
-                # 15.11.2024 added - see https://stackoverflow.com/questions/58101874/cursor-fetchall-or-other-method-fetchone-is-not-working
-                cursor.execute(
-                    f"SELECT  wef.obj_id as wef_obj_id FROM qgep_od.reach re LEFT JOIN qgep_od.reach_point rpf ON rpf.obj_id = re.fk_reach_point_from LEFT JOIN qgep_od.wastewater_networkelement wef ON wef.obj_id = rpf.fk_wastewater_networkelement WHERE re.obj_id IN ({subset_reaches_text}) AND NOT wef.obj_id isNull;"
+    logger.info(f"{len(selection_ids)} id's found with selection query")
+    return selection_ids
+
+
+def create_selection_table(session, selection_ids, table_name=SELECTION_TABLE):
+    """
+    Stores the selection in a temporary table of the session and returns a subquery on it
+
+    The selection is a list of id's or a SelectionQuery, which is inserted from the database directly.
+    The subquery can be used with `.in_()` in the export queries instead of a literal list of id's.
+    As temporary tables are only visible to the connection that created them, the session must not
+    be committed before the export queries are done.
+    """
+    is_query = isinstance(selection_ids, SelectionQuery)
+
+    if session.execute(text("SELECT pg_is_in_recovery();")).scalar():
+        # temporary tables can't be created on a hot-standby replica, we use the list of id's instead
+        logger.debug(f"read-only source database, selection {table_name} is used as list of id's")
+        if is_query:
+            return [
+                str(row[0])
+                for row in session.connection().execute(
+                    f"SELECT DISTINCT obj_id FROM ({selection_ids.sql}) AS selection;",
+                    selection_ids.params,
                 )
-                records = cursor.fetchall()
-
-                # 15.11.2024 - does not get all records, but only n-1
-                for row in records:
-                    # logger.debug(f" row[0] = {row[0]}")
-                    # https://www.pythontutorial.net/python-string-methods/python-string-concatenation/
-                    strrow = str(row[0])
-                    if strrow is not None:
-                        connected_wn_from_re_ids.append(strrow)
-                        # logger.debug(f" building up '{connected_wn_from_re_ids}' ...")
-            logger.debug(f" connected_wn_from_re_ids: '{connected_wn_from_re_ids}'")
-    return connected_wn_from_re_ids
+            ]
+        # no id's (None) selects nothing, as the empty selection table does
+        return list(selection_ids or [])
+
+    session.execute(
+        text(f"CREATE TEMP TABLE IF NOT EXISTS {table_name} (obj_id varchar(16) PRIMARY KEY);")
+    )
+    session.execute(text(f"TRUNCATE TABLE {table_name};"))
+    if is_query:
+        # plain string, so the query is run with its psycopg2 parameters
+        session.connection().execute(
+            f"INSERT INTO {table_name} (obj_id) SELECT DISTINCT obj_id FROM ({selection_ids.sql}) AS selection ON CONFLICT DO NOTHING;",
+            selection_ids.params,
+        )
+    elif selection_ids:
+        session.execute(
+            text(
+                f"INSERT INTO {table_name} (obj_id) SELECT DISTINCT unnest(CAST(:ids AS varchar[])) ON CONFLICT DO NOTHING;"
+            ),
+            {"ids": list(selection_ids)},
+        )
+    session.execute(text(f"ANALYZE {table_name};"))
+    logger.debug(f"selection table {table_name} created")
+
+    return select([column("obj_id")]).select_from(table(table_name))
+
+
+def read_selection(session, selection_filter):
+    """
+    Returns the list of id's of a selection returned by create_selection_table
+    """
+    if isinstance(selection_filter, list):
+        return selection_filter
+    return [row[0] for row in session.execute(selection_filter)]
 
 
 # 10.12.2024
-def get_connected_we_to_re(subset_reaches):
+def get_connected_we_from_re(subset_reaches):
     """
-    Get connected wastewater_networkelements (wastewater_nodes and reaches) to subset of reaches
+    Get connected wastewater_networkelements (wastewater_nodes and reaches) from subset of reaches
     """
-    if subset_reaches is None:
-        return None
     if not subset_reaches:
         return None
-    else:
-        logger.debug(
-            f"get list of id's of connected wastewater_nodes of provides subset of reaches {subset_reaches} ..."
-        )
-        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
-        connection.set_session(autocommit=True)
-        cursor = connection.cursor()
 
-        connected_wn_to_re_ids = []
-
-        subset_reaches_text = get_selection_text_for_in_statement(subset_reaches)
+    logger.debug(
+        f"get list of id's of connected wastewater_nodes of provided subset of {len(subset_reaches)} reaches ..."
+    )
+    # select all connected from wastewater_nodes from provided subset of reaches
+    connected_wn_from_re_ids = fetch_selection_ids(
+        "SELECT wef.obj_id as wef_obj_id FROM qgep_od.reach re LEFT JOIN qgep_od.reach_point rpf ON rpf.obj_id = re.fk_reach_point_from LEFT JOIN qgep_od.wastewater_networkelement wef ON wef.obj_id = rpf.fk_wastewater_networkelement WHERE re.obj_id = ANY(%s) AND NOT wef.obj_id isNull;",
+        subset_reaches,
+    )
+    logger.debug(f" connected_wn_from_re_ids: '{connected_wn_from_re_ids}'")
+    return connected_wn_from_re_ids
 
-        # select all connected to wastewater_nodes from provided subset of reaches
-        cursor.execute(
-            f"SELECT  wet.obj_id as wet_obj_id FROM qgep_od.reach re LEFT JOIN qgep_od.reach_point rpt ON rpt.obj_id = re.fk_reach_point_to LEFT JOIN qgep_od.wastewater_networkelement wet ON wet.obj_id = rpt.fk_wastewater_networkelement WHERE re.obj_id IN ({subset_reaches_text}) AND NOT wet.obj_id isNull;"
-        )
 
-        # cursor.fetchall() - see https://pynative.com/python-cursor-fetchall-fetchmany-fetchone-to-read-rows-from-table/
-        # ws_wn_ids_count = int(cursor.fetchone()[0])
-        # if ws_wn_ids_count == 0:
-        if cursor.fetchone() is None:
-            connected_wn_to_re_ids = None
-        else:
-            # added cursor.execute again to see if with this all records will be available
-            # 15.11.2024 added - see https://stackoverflow.com/questions/58101874/cursor-fetchall-or-other-method-fetchone-is-not-working
-            cursor.execute(
-                f"SELECT  wet.obj_id as wet_obj_id FROM qgep_od.reach re LEFT JOIN qgep_od.reach_point rpt ON rpt.obj_id = re.fk_reach_point_to LEFT JOIN qgep_od.wastewater_networkelement wet ON wet.obj_id = rpt.fk_wastewater_networkelement WHERE re.obj_id IN ({subset_reaches_text}) AND NOT wet.obj_id isNull;"
-            )
-            records = cursor.fetchall()
+# 10.12.2024
+def get_connected_we_to_re(subset_reaches):
+    """
+    Get connected wastewater_networkelements (wastewater_nodes and reaches) to subset of reaches
+    """
+    if not subset_reaches:
+        return None
 
-            # 15.11.2024 - does not get all records, but only n-1
-            for row in records:
-                # logger.debug(f" row[0] = {row[0]}")
-                # https://www.pythontutorial.net/python-string-methods/python-string-concatenation/
-                strrow = str(row[0])
-                if strrow is not None:
-                    connected_wn_to_re_ids.append(strrow)
-                    # logger.debug(f" building up '{connected_wn_to_re_ids}' ...")
+    logger.debug(
+        f"get list of id's of connected wastewater_nodes of provided subset of {len(subset_reaches)} reaches ..."
+    )
+    # select all connected to wastewater_nodes from provided subset of reaches
+    connected_wn_to_re_ids = fetch_selection_ids(
+        "SELECT wet.obj_id as wet_obj_id FROM qgep_od.reach re LEFT JOIN qgep_od.reach_point rpt ON rpt.obj_id = re.fk_reach_point_to LEFT JOIN qgep_od.wastewater_networkelement wet ON wet.obj_id = rpt.fk_wastewater_networkelement WHERE re.obj_id = ANY(%s) AND NOT wet.obj_id isNull;",
+        subset_reaches,
+    )
     logger.debug(f" connected_wn_to_re_ids: '{connected_wn_to_re_ids}'")
     return connected_wn_to_re_ids
 
@@ -1392,49 +1794,17 @@ def get_connected_overflow_to_wn_ids(selected_ids_ov):
     """
     Get all connected wastewater_nodes from overflows.fk_overflow_to
     """
-    if selected_ids_ov is None:
-        return None
     if not selected_ids_ov:
         return None
-    else:
-        logger.debug(
-            f"Get all connected wastewater_nodes from overflows.fk_overflow_to {selected_ids_ov} ..."
-        )
-        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
-        connection.set_session(autocommit=True)
-        cursor = connection.cursor()
 
-        connected_overflow_to_wn_ids = []
-
-        subset_text = get_selection_text_for_in_statement(selected_ids_ov)
-
-        # select all connected to wastewater_nodes from provided subset of reaches
-        cursor.execute(
-            f"SELECT ov.fk_overflow_to FROM qgep_od.wastewater_node wn LEFT JOIN qgep_od.overflow ov ON wn.obj_id = ov.fk_wastewater_node WHERE wn.obj_id IN ({subset_text}) AND NOT ov.fk_overflow_to isNULL;"
-        )
-
-        # cursor.fetchall() - see https://pynative.com/python-cursor-fetchall-fetchmany-fetchone-to-read-rows-from-table/
-        # ws_wn_ids_count = int(cursor.fetchone()[0])
-        # if ws_wn_ids_count == 0:
-        if cursor.fetchone() is None:
-            connected_overflow_to_wn_ids = None
-        else:
-            # added cursor.execute again to see if with this all records will be available
-            # 15.11.2024 added - see https://stackoverflow.com/questions/58101874/cursor-fetchall-or-other-method-fetchone-is-not-working
-            cursor.execute(
-                f"SELECT ov.fk_overflow_to FROM qgep_od.wastewater_node wn LEFT JOIN qgep_od.overflow ov ON wn.obj_id = ov.fk_wastewater_node WHERE wn.obj_id IN ({subset_text}) AND NOT ov.fk_overflow_to isNULL;"
-            )
-            records = cursor.fetchall()
-
-            # 15.11.2024 - does not get all records, but only n-1
-            for row in records:
-                # logger.debug(f" row[0] = {row[0]}")
-                # https://www.pythontutorial.net/python-string-methods/python-string-concatenation/
-                strrow = str(row[0])
-                if strrow is not None:
-                    connected_overflow_to_wn_ids.append(strrow)
-                    # logger.debug(f" building up '{connected_overflow_to_wn_ids}' ...")
-        logger.debug(f" connected_overflow_to_wn_ids: '{connected_overflow_to_wn_ids}'")
+    logger.debug(
+        f"Get all connected wastewater_nodes from overflows.fk_overflow_to of {len(selected_ids_ov)} selected ids ..."
+    )
+    connected_overflow_to_wn_ids = fetch_selection_ids(
+        "SELECT ov.fk_overflow_to FROM qgep_od.wastewater_node wn LEFT JOIN qgep_od.overflow ov ON wn.obj_id = ov.fk_wastewater_node WHERE wn.obj_id = ANY(%s) AND NOT ov.fk_overflow_to isNULL;",
+        selected_ids_ov,
+    )
+    logger.debug(f" connected_overflow_to_wn_ids: '{connected_overflow_to_wn_ids}'")
     return connected_overflow_to_wn_ids
 
 
@@ -1446,7 +1816,7 @@ def get_ws_wn_ids(classname):
         return None
     else:
         logger.debug(f"get list of id's of wastewater_nodes of {classname} ...")
-        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("source"))
         connection.set_session(autocommit=True)
         cursor = connection.cursor()
 
@@ -1492,7 +1862,7 @@ def get_ws_ids(classname):
         return None
     else:
         logger.debug(f"get list of id's of subclass {classname} ...")
-        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn("source"))
         connection.set_session(autocommit=True)
         cursor = connection.cursor()
 
@@ -1531,51 +1901,17 @@ def get_ws_selected_ww_networkelements(selected_wwn):
 
     if selected_wwn is None:
         return None
-    else:
-
-        logger.debug(
-            f"get list of id's of wastewater_structure of selected wastewater_network_elements {selected_wwn} ..."
-        )
-        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
-        connection.set_session(autocommit=True)
-        cursor = connection.cursor()
-
-        selection_text = ""
-
-        for list_item in selected_wwn:
-            selection_text += "'"
-            selection_text += list_item
-            selection_text += "',"
-
-        # remove last komma to make it a correct IN statement
-        selection_text = selection_text[:-1]
 
-        logger.debug(f"selection_text = {selection_text} ...")
-
-        ws_selected_ww_networkelements_ids = []
-
-        # select all obj_id of the wastewater_nodes of wwtp_structure
-        cursor.execute(
-            f"SELECT ws.obj_id FROM qgep_od.wastewater_structure ws LEFT JOIN qgep_od.wastewater_networkelement wn ON wn.fk_wastewater_structure = ws.obj_id WHERE wn.obj_id IN ({selection_text});"
-        )
-
-        # cursor.fetchall() - see https://pynative.com/python-cursor-fetchall-fetchmany-fetchone-to-read-rows-from-table/
-        # ws_wn_ids_count = int(cursor.fetchone()[0])
-        # if ws_wn_ids_count == 0:
-        if cursor.fetchone() is None:
-            ws_selected_ww_networkelements_ids = None
-        else:
-            records = cursor.fetchall()
-            for row in records:
-                logger.debug(f" row[0] = {row[0]}")
-                # https://www.pythontutorial.net/python-string-methods/python-string-concatenation/
-                strrow = str(row[0])
-                if strrow is not None:
-                    ws_selected_ww_networkelements_ids.append(strrow)
-                    # logger.debug(f" building up '{ws_selected_ww_networkelements_ids}' ...")
-        logger.debug(
-            f" ws_selected_ww_networkelements_ids: '{ws_selected_ww_networkelements_ids}' ..."
-        )
+    logger.debug(
+        f"get list of id's of wastewater_structure of {len(selected_wwn)} selected wastewater_network_elements ..."
+    )
+    ws_selected_ww_networkelements_ids = fetch_selection_ids(
+        "SELECT DISTINCT ws.obj_id FROM qgep_od.wastewater_structure ws LEFT JOIN qgep_od.wastewater_networkelement wn ON wn.fk_wastewater_structure = ws.obj_id WHERE wn.obj_id = ANY(%s);",
+        selected_wwn,
+    )
+    logger.debug(
+        f" ws_selected_ww_networkelements_ids: '{ws_selected_ww_networkelements_ids}' ..."
+    )
     return ws_selected_ww_networkelements_ids
 
 
@@ -1587,49 +1923,14 @@ def filter_reaches(selected_ids_to_filter):
 
     if selected_ids_to_filter is None:
         return None
-    else:
-        logger.debug(f"Filter out reaches from selected_ids {selected_ids_to_filter} ...")
-        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
-        connection.set_session(autocommit=True)
-        cursor = connection.cursor()
 
+    logger.debug(f"Filter out reaches from {len(selected_ids_to_filter)} selected_ids ...")
+    subset_reaches_ids = fetch_selection_ids(
+        "SELECT obj_id FROM qgep_od.reach WHERE obj_id = ANY(%s);", selected_ids_to_filter
+    )
+    if subset_reaches_ids is None:
         subset_reaches_ids = []
-        all_reaches_ids = []
-
-        get_selection_text_for_in_statement(selected_ids_to_filter)
-
-        # select all reaches
-        cursor.execute("SELECT obj_id FROM qgep_od.reach;")
-
-        # cursor.fetchall() - see https://pynative.com/python-cursor-fetchall-fetchmany-fetchone-to-read-rows-from-table/
-        # ws_wn_ids_count = int(cursor.fetchone()[0])
-        # if ws_wn_ids_count == 0:
-        if cursor.fetchone() is None:
-            all_reaches_ids = None
-        else:
-            # added cursor.execute again to see if with this all records will be available
-            # 15.11.2024 added - see https://stackoverflow.com/questions/58101874/cursor-fetchall-or-other-method-fetchone-is-not-working
-            cursor.execute("SELECT obj_id FROM qgep_od.reach;")
-            records = cursor.fetchall()
-
-            # 15.11.2024 - does not get all records, but only n-1
-            for row in records:
-                # logger.debug(f" row[0] = {row[0]}")
-                # https://www.pythontutorial.net/python-string-methods/python-string-concatenation/
-                strrow = str(row[0])
-                if strrow is not None:
-                    all_reaches_ids.append(strrow)
-                    # logger.debug(f" building up '{all_reaches_ids}' ...")
-
-            for list_item in selected_ids_to_filter:
-                if list_item in all_reaches_ids:
-                    subset_reaches_ids.append(list_item)
-                    logger.debug(
-                        f"'filter_reaches: {list_item}' is a reach id - added to subset_reaches_ids"
-                    )
-                else:
-                    logger.debug(f"'filter_reaches: {list_item}' is not a reach id")
-        logger.debug(f"'subset_reaches_ids: {subset_reaches_ids}'")
+    logger.debug(f"'subset_reaches_ids: {subset_reaches_ids}'")
     return subset_reaches_ids
 
 
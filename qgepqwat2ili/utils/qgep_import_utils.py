@@ -0,0 +1,1234 @@
+import collections
+import concurrent.futures
+import datetime
+import decimal
+import os
+import re
+import struct
+
+import psycopg2
+from geoalchemy2.elements import WKBElement
+from geoalchemy2.functions import ST_Force3D, ST_GeomFromEWKB, ST_GeomFromWKB
+from psycopg2 import errorcodes
+from sqlalchemy import (
+    Boolean,
+    Column,
+    MetaData,
+    Table,
+    Text,
+    and_,
+    case,
+    exists,
+    false,
+    func,
+    inspect,
+    literal,
+    null,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.session import close_all_sessions
+from sqlalchemy.sql import ClauseElement, text
+from sqlalchemy.sql.elements import Null
+
+from .sqlalchemy import get_schema_translate_map
+from .various import CmdException, get_pgconf, get_pgconf_as_psycopg2_dsn, logger
+
+# setting of the import sessions in which the guarded symbology triggers are skipped (see
+# install_symbology_trigger_guards)
+SKIP_SYMBOLOGY_TRIGGERS_SETTING = "qgepqwat2ili.skip_symbology_triggers"
+
+# column values of the set-based import mappings (see UpsertImport), besides plain staging attribute names
+# code of the value list entry whose value_de is the staging attribute
+VlValue = collections.namedtuple("VlValue", ["vl_cls", "attribute"])
+# obj_id of the staging object referenced (by t_id) by the staging attribute
+RefValue = collections.namedtuple("RefValue", ["attribute"])
+# staging geometry attribute, forced to 3D
+Geom3DValue = collections.namedtuple("Geom3DValue", ["attribute"])
+
+
+def read_wkb(data, force_3d=False):
+    """
+    Returns the type and coordinates of a (E)WKB geometry as nested tuples, which are equal for geometries that
+    ST_OrderingEquals considers equal. With force_3d, the coordinates are forced to XYZ like ST_Force3D does.
+
+    Raises ValueError for unsupported geometry types.
+    """
+    data = bytes(data)
+
+    def read(offset):
+        byte_order = "<" if data[offset] == 1 else ">"
+        (geometry_type,) = struct.unpack_from(f"{byte_order}I", data, offset + 1)
+        offset += 5
+        if geometry_type & 0x20000000:
+            # EWKB srid
+            offset += 4
+        # EWKB flags or ISO WKB type code
+        has_z = bool(geometry_type & 0x80000000)
+        has_m = bool(geometry_type & 0x40000000)
+        iso_dimensions, geometry_type = divmod(geometry_type & 0x0FFFFFFF, 1000)
+        has_z = has_z or iso_dimensions in (1, 3)
+        has_m = has_m or iso_dimensions in (2, 3)
+        dimensions = 2 + has_z + has_m
+
+        def read_points(offset, count):
+            values = struct.unpack_from(f"{byte_order}{count * dimensions}d", data, offset)
+            points = tuple(values[i : i + dimensions] for i in range(0, len(values), dimensions))
+            if force_3d:
+                points = tuple(point[:3] if has_z else point[:2] + (0.0,) for point in points)
+            return points, offset + 8 * len(values)
+
+        def read_count(offset):
+            return struct.unpack_from(f"{byte_order}I", data, offset)[0], offset + 4
+
+        if geometry_type == 1:
+            # point
+            points, offset = read_points(offset, 1)
+            return (geometry_type, points), offset
+        if geometry_type in (2, 8):
+            # linestring, circularstring
+            count, offset = read_count(offset)
+            points, offset = read_points(offset, count)
+            return (geometry_type, points), offset
+        if geometry_type in (3, 17):
+            # polygon, triangle
+            count, offset = read_count(offset)
+            rings = []
+            for _ in range(count):
+                ring_count, offset = read_count(offset)
+                points, offset = read_points(offset, ring_count)
+                rings.append(points)
+            return (geometry_type, tuple(rings)), offset
+        if geometry_type in (4, 5, 6, 7, 9, 10, 11, 12, 15, 16):
+            # collections and curves made of other geometries
+            count, offset = read_count(offset)
+            parts = []
+            for _ in range(count):
+                part, offset = read(offset)
+                parts.append(part)
+            return (geometry_type, tuple(parts)), offset
+        raise ValueError(f"Unsupported WKB geometry type {geometry_type}")
+
+    return read(0)[0]
+
+
+def install_symbology_trigger_guards(session):
+    """
+    Adds a WHEN condition to the symbology triggers (the ones dropped by qgep_sys.drop_symbology_triggers),
+    so that they are skipped in the sessions where SKIP_SYMBOLOGY_TRIGGERS_SETTING is on, and keep working
+    for all other sessions. Triggers recreated without it (e.g. by qgep_sys.create_symbology_triggers) are
+    guarded again on the next call. The caller commits.
+    """
+    guard = f"current_setting('{SKIP_SYMBOLOGY_TRIGGERS_SETTING}', true) IS DISTINCT FROM 'on'"
+    drop_function = session.execute(
+        text("SELECT pg_get_functiondef('qgep_sys.drop_symbology_triggers()'::regprocedure);")
+    ).scalar()
+    guarded = 0
+    for trigger, table in re.findall(
+        r"DROP TRIGGER (?:IF EXISTS )?(\w+) ON ([\w.]+)", drop_function, flags=re.IGNORECASE
+    ):
+        definition = session.execute(
+            text(
+                "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgname = :trigger AND tgrelid = to_regclass(:table);"
+            ),
+            {"trigger": trigger, "table": table},
+        ).scalar()
+        if definition is None or SKIP_SYMBOLOGY_TRIGGERS_SETTING in definition:
+            continue
+        match = re.search(r"FOR EACH (ROW|STATEMENT) (?:WHEN \((.*)\) )?EXECUTE", definition)
+        when = guard if match.group(2) is None else f"({guard}) AND ({match.group(2)})"
+        definition = (
+            f"{definition[:match.start()]}FOR EACH {match.group(1)} WHEN ({when}) EXECUTE"
+            f"{definition[match.end():]}"
+        )
+        session.execute(text(f"DROP TRIGGER {trigger} ON {table};"))
+        session.execute(text(definition))
+        guarded += 1
+    logger.info(f"{guarded} symbology triggers guarded by {SKIP_SYMBOLOGY_TRIGGERS_SETTING}")
+
+
+class ValueListCache:
+    """
+    Value list instances by their value_de name, each qgep_vl table is loaded once per import run
+    """
+
+    def __init__(self, qgep_session):
+        self.qgep_session = qgep_session
+        self._instances = {}
+        self._misses = collections.defaultdict(collections.Counter)
+
+    def get_vl_instance(self, vl_table, value):
+        """
+        Gets a value list instance from the value_de name. Returns None if not found, misses are
+        collected and logged per table by log_misses.
+        """
+        instances = self._instances.get(vl_table)
+        if instances is None:
+            instances = {}
+            for row in self.qgep_session.query(vl_table):
+                # keep the first row for duplicated names, as query(...).first() did
+                instances.setdefault(row.value_de, row)
+            self._instances[vl_table] = instances
+
+        row = instances.get(value)
+        if row is None and value is not None:
+            self._misses[vl_table][value] += 1
+        return row
+
+    def log_misses(self):
+        """
+        Logs one warning per value list with the values that could not be found
+        """
+        for vl_table, values in self._misses.items():
+            listed = ", ".join(f"`{value}` ({count}x)" for value, count in values.most_common(10))
+            if len(values) > 10:
+                listed += f", ... ({len(values) - 10} more)"
+            logger.warning(
+                f'{sum(values.values())} values not found in value list "{vl_table.__table__.schema}.{vl_table.__name__}", set to None instead: {listed}'
+            )
+
+
+class ExistingObjectCache:
+    """
+    Existing qgep instances of the imported objects, loaded per class in batches before the class
+    is imported, so create_or_update decides between insert and update without a query per row
+    """
+
+    def __init__(self, qgep_session, abwasser_session, batch_size=5000, staging_classes=None):
+        self.qgep_session = qgep_session
+        self.abwasser_session = abwasser_session
+        self.batch_size = batch_size
+        # if set, only these staging classes are imported, the other ones aren't prefetched
+        self.staging_classes = staging_classes
+        # obj_ids of the staging objects per qgep class, and the existing instances among them
+        self._staged_ids = {}
+        self._instances = {}
+
+    def prefetch(self, cls, abwasser_cls):
+        """
+        Collects the obj_ids of abwasser_cls in the staging schema and loads the existing
+        instances of cls with these obj_ids
+        """
+        if self.staging_classes is not None and abwasser_cls.__name__ not in self.staging_classes:
+            return
+        obj_ids = [
+            obj_id
+            for obj_id, in self.abwasser_session.query(abwasser_cls.obj_id)
+            if obj_id is not None
+        ]
+        instances = self._instances.setdefault(cls, {})
+        for i in range(0, len(obj_ids), self.batch_size):
+            batch = obj_ids[i : i + self.batch_size]
+            for instance in self.qgep_session.query(cls).filter(cls.obj_id.in_(batch)):
+                instances[instance.obj_id] = instance
+        self._staged_ids.setdefault(cls, set()).update(obj_ids)
+        logger.debug(
+            f"prefetched {len(instances)} existing of {len(obj_ids)} imported {cls.__name__}"
+        )
+
+    def get(self, cls, obj_id):
+        """
+        Returns the existing instance of cls with obj_id, or None if there is none
+        """
+        instance = self._instances.get(cls, {}).get(obj_id)
+        if instance is not None or obj_id in self._staged_ids.get(cls, ()):
+            return instance
+        # not prefetched, query it
+        return self.qgep_session.query(cls).get(obj_id)
+
+    def add(self, cls, instance):
+        """
+        Registers an instance of cls created by the import, so the next objects with its obj_id update it
+        """
+        self._instances.setdefault(cls, {})[instance.obj_id] = instance
+
+
+class OrganisationIndex:
+    """
+    Organisations by identifier and by obj_id, loaded once from the database and kept up to date
+    with the organisations created or updated during the import
+    """
+
+    def __init__(self, qgep_session, organisation_cls):
+        self.qgep_session = qgep_session
+        self.organisation_cls = organisation_cls
+        self._by_identifier = None
+        self._by_obj_id = None
+
+    def _load(self):
+        self._by_identifier = {}
+        self._by_obj_id = {}
+        for instance in self.qgep_session.query(self.organisation_cls):
+            self.add(instance)
+
+    def add(self, instance):
+        """
+        Indexes a new or updated organisation instance
+        """
+        if self._by_identifier is None:
+            self._load()
+        if instance.identifier is not None:
+            self._by_identifier.setdefault(instance.identifier, instance)
+        if instance.obj_id is not None:
+            self._by_obj_id[instance.obj_id] = instance
+
+    def by_identifier(self, identifier):
+        if self._by_identifier is None:
+            self._load()
+        instance = self._by_identifier.get(identifier)
+        # the identifier may have changed since the instance was indexed
+        if instance is not None and instance.identifier != identifier:
+            del self._by_identifier[identifier]
+            return None
+        return instance
+
+    def by_obj_id(self, obj_id):
+        if self._by_obj_id is None:
+            self._load()
+        return self._by_obj_id.get(obj_id)
+
+
+class StagingObjIdIndex:
+    """
+    obj_id of all staging objects by t_id, loaded at once on first use. The references of the staging rows
+    (`<name>ref` columns holding the t_id of the referenced object) are resolved through it instead of
+    loading every referenced object through its relationship.
+    """
+
+    def __init__(self, abwasser_session, baseclass_cls):
+        self.abwasser_session = abwasser_session
+        self.baseclass_cls = baseclass_cls
+        self._obj_ids = None
+
+    def get(self, t_id):
+        if t_id is None:
+            return None
+        if self._obj_ids is None:
+            self._obj_ids = dict(
+                self.abwasser_session.query(self.baseclass_cls.t_id, self.baseclass_cls.obj_id)
+            )
+        return self._obj_ids.get(t_id)
+
+
+class StructureSuggestions:
+    """
+    Wastewater structures suggested for examinations by their point identifiers : the channels whose reach goes
+    from the structure identified by from_point_identifier to the one identified by to_point_identifier (or the
+    reverse), or the structures identified by from_point_identifier if there's no to_point_identifier.
+
+    The suggestions of all the examinations given to prefetch are loaded with one query per kind, and cached.
+    """
+
+    def __init__(self, session, qgep_model):
+        self.session = session
+        self.QGEP = qgep_model
+        # lists of structures by (from, to) identifiers for channels, by identifier for the other structures
+        self._channels = collections.defaultdict(list)
+        self._structures = collections.defaultdict(list)
+        self._loaded_pairs = set()
+        self._loaded_identifiers = set()
+
+    def prefetch(self, examinations):
+        pairs = set()
+        identifiers = set()
+        for examination in examinations:
+            from_id = examination.from_point_identifier
+            to_id = examination.to_point_identifier
+            if from_id is not None and to_id is not None:
+                pairs.update([(from_id, to_id), (to_id, from_id)])
+            elif from_id is not None:
+                identifiers.add(from_id)
+        self._load_channels(pairs - self._loaded_pairs)
+        self._load_structures(identifiers - self._loaded_identifiers)
+
+    def get(self, examination):
+        self.prefetch([examination])
+        from_id = examination.from_point_identifier
+        to_id = examination.to_point_identifier
+        if from_id is not None and to_id is not None:
+            # If both from/to point identifier are set, we are trying to find a channel
+            return self._channels[(from_id, to_id)] + self._channels[(to_id, from_id)]
+        elif from_id is not None:
+            # If just from point identifier is set, we are trying to find a manhole
+            return list(self._structures[from_id])
+        else:
+            # Otherwise we don't have anything to suggest
+            return []
+
+    def _load_channels(self, pairs):
+        if not pairs:
+            return
+        QGEP = self.QGEP
+        wastewater_ne_from = aliased(QGEP.wastewater_networkelement)
+        wastewater_ne_to = aliased(QGEP.wastewater_networkelement)
+        rp_from = aliased(QGEP.reach_point)
+        rp_to = aliased(QGEP.reach_point)
+        wastewater_st_from = aliased(QGEP.wastewater_structure)
+        wastewater_st_to = aliased(QGEP.wastewater_structure)
+
+        identifiers = {identifier for pair in pairs for identifier in pair}
+        query = (
+            self.session.query(
+                QGEP.wastewater_structure,
+                wastewater_st_from.identifier,
+                wastewater_st_to.identifier,
+            )
+            .select_from(QGEP.wastewater_structure)
+            .join(
+                QGEP.reach, QGEP.reach.fk_wastewater_structure == QGEP.wastewater_structure.obj_id
+            )
+            .join(rp_from, rp_from.obj_id == QGEP.reach.fk_reach_point_from)
+            .join(
+                wastewater_ne_from,
+                wastewater_ne_from.obj_id == rp_from.fk_wastewater_networkelement,
+            )
+            .join(
+                wastewater_st_from,
+                wastewater_st_from.obj_id == wastewater_ne_from.fk_wastewater_structure,
+            )
+            .join(rp_to, rp_to.obj_id == QGEP.reach.fk_reach_point_to)
+            .join(wastewater_ne_to, wastewater_ne_to.obj_id == rp_to.fk_wastewater_networkelement)
+            .join(
+                wastewater_st_to,
+                wastewater_st_to.obj_id == wastewater_ne_to.fk_wastewater_structure,
+            )
+            .filter(
+                wastewater_st_from.identifier.in_(identifiers),
+                wastewater_st_to.identifier.in_(identifiers),
+            )
+        )
+        for structure, from_id, to_id in query:
+            if (from_id, to_id) in pairs and (from_id, to_id) not in self._loaded_pairs:
+                self._channels[(from_id, to_id)].append(structure)
+        self._loaded_pairs.update(pairs)
+
+    def _load_structures(self, identifiers):
+        if not identifiers:
+            return
+        QGEP = self.QGEP
+        query = self.session.query(QGEP.wastewater_structure).filter(
+            QGEP.wastewater_structure.identifier.in_(identifiers)
+        )
+        for structure in query:
+            self._structures[structure.identifier].append(structure)
+        self._loaded_identifiers.update(identifiers)
+
+
+class ChangeDetector:
+    """
+    Applies the imported values to the existing instances, setting only the attributes whose value changed :
+    unchanged objects are not updated at all, and the updates of the changed ones only contain the changed
+    columns. Counts the inserted, updated and unchanged objects per class.
+    """
+
+    def __init__(self, qgep_session):
+        self.qgep_session = qgep_session
+        self.counts = collections.defaultdict(collections.Counter)
+
+    def insert(self, instance):
+        self.counts[instance.__class__.__name__]["inserted"] += 1
+
+    def update(self, instance, values):
+        """
+        Sets the changed values on the instance, returns whether any changed
+        """
+        mapper = inspect(instance).mapper
+        changed = False
+        for key, value in values.items():
+            if key in mapper.relationships:
+                same = self._same_reference(instance, mapper.relationships[key], value)
+            else:
+                same = self._same_value(getattr(instance, key), value)
+            if not same:
+                setattr(instance, key, value)
+                changed = True
+        self.counts[instance.__class__.__name__]["updated" if changed else "unchanged"] += 1
+        return changed
+
+    def _same_reference(self, instance, relationship, value):
+        # compares the foreign keys, as loading the referenced instance would need a query
+        mapper = inspect(instance).mapper
+        value_state = inspect(value) if value is not None else None
+        if value_state is not None and value_state.key is None:
+            # not flushed yet, so it can't be referenced already
+            return False
+        for local_column, remote_column in relationship.local_remote_pairs:
+            current = getattr(instance, mapper.get_property_by_column(local_column).key)
+            new = None
+            if value_state is not None:
+                new = getattr(value, value_state.mapper.get_property_by_column(remote_column).key)
+            if current != new:
+                return False
+        return True
+
+    def _same_value(self, current, new):
+        if isinstance(new, ClauseElement) or isinstance(current, WKBElement):
+            return self._same_geometry(current, new)
+        if isinstance(current, datetime.datetime) and type(new) is datetime.date:
+            return current.date() == new and current.time() == datetime.time()
+        if isinstance(current, decimal.Decimal) and isinstance(new, float):
+            return float(current) == new
+        return current == new
+
+    def _same_geometry(self, current, new):
+        # staged geometries (possibly forced to 3D) are compared in python, other expressions by the database
+        expression = new
+        force_3d = False
+        if isinstance(new, ST_Force3D) and len(new.clauses.clauses) == 1:
+            force_3d = True
+            argument = new.clauses.clauses[0]
+            if isinstance(argument, Null):
+                new = None
+            elif isinstance(argument, (ST_GeomFromWKB, ST_GeomFromEWKB)):
+                new = WKBElement(argument.clauses.clauses[0].value)
+        if new is None or current is None:
+            return new is None and current is None
+        if isinstance(current, WKBElement) and isinstance(new, WKBElement):
+            try:
+                return read_wkb(current.data) == read_wkb(new.data, force_3d=force_3d)
+            except (ValueError, struct.error):
+                # unsupported geometry type, compared by the database
+                pass
+        return bool(
+            self.qgep_session.scalar(select([func.ST_OrderingEquals(current, expression)]))
+        )
+
+    def log_counts(self):
+        for class_name, counts in sorted(self.counts.items()):
+            logger.info(
+                f"{class_name}: {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged"
+            )
+
+
+class ChunkedCommit:
+    """
+    Optional chunked mode of the imports: the imported objects are flushed in savepoints of batch_size
+    objects and the session is committed after each class, as soon as the deferred constraints are
+    satisfied (references to classes imported later postpone the commit to a later class). A failing
+    batch is retried object by object, so that only the failing objects are skipped and reported.
+
+    As the foreign keys are only checked on commit, the objects referencing skipped ones are dropped
+    (new objects deleted, updated ones reverted) and reported by finish, before the final commit.
+
+    Without batch_size, objects are only added to the session, which is committed once at the end.
+    The optional checkpoints (utils.ili2db.ImportCheckpoints) record the classes committed.
+    """
+
+    def __init__(self, qgep_session, batch_size=None, checkpoints=None):
+        self.qgep_session = qgep_session
+        self.batch_size = batch_size
+        self.checkpoints = checkpoints
+        self.failures = []
+        self._batch = []
+        self._savepoint = None
+        # objects added since the last commit by obj_id, with the previous values of updated objects
+        self._pending = {}
+        if batch_size:
+            # the committed objects are still referenced by the next classes, don't reload them
+            qgep_session.expire_on_commit = False
+            # begin_nested flushes the session first, so the savepoint of a batch must be open
+            # before its objects are created or updated
+            self._savepoint = qgep_session.begin_nested()
+
+    def add(self, instance):
+        self.qgep_session.add(instance)
+        if not self.batch_size:
+            return
+        # changed values of updated objects, as the rollback of a failing batch expires them
+        values = None
+        previous = None
+        state = inspect(instance)
+        if state.persistent:
+            values = {attr.key: attr.value for attr in state.attrs if attr.history.added}
+            previous = {
+                prop.key: state.committed_state.get(prop.key, state.dict.get(prop.key))
+                for prop in state.mapper.column_attrs
+                if prop.key in state.dict or prop.key in state.committed_state
+            }
+        self._batch.append((instance, values))
+        obj_id = getattr(instance, "obj_id", None)
+        if obj_id is not None:
+            self._pending.setdefault(obj_id, (instance, previous))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self, reopen=True):
+        """
+        Flushes the current batch in its savepoint, retrying it object by object if it fails
+        """
+        if not self.batch_size:
+            return
+        batch, self._batch = self._batch, []
+        error = self._commit_savepoint(self._savepoint)
+        if error:
+            # the savepoint is rolled back, which expunged the new objects of the batch
+            logger.warning(f"Flushing {len(batch)} objects failed ({error}), retrying one by one")
+            for instance, values in batch:
+                savepoint = self.qgep_session.begin_nested()
+                if values is not None:
+                    for key, value in values.items():
+                        setattr(instance, key, value)
+                self.qgep_session.add(instance)
+                error = self._commit_savepoint(savepoint)
+                if error:
+                    if instance in self.qgep_session:
+                        self.qgep_session.expunge(instance)
+                    self.failures.append((instance, error))
+        self._savepoint = self.qgep_session.begin_nested() if reopen else None
+
+    def _commit_savepoint(self, savepoint):
+        """
+        Releases the savepoint (flushing the session), or rolls it back and returns the error
+        """
+        try:
+            savepoint.commit()
+        except SQLAlchemyError as e:
+            # a failed flush leaves the savepoint as current transaction, until rolled back
+            if self.qgep_session.transaction is savepoint:
+                self.qgep_session.rollback()
+            return e
+        return None
+
+    def commit(self):
+        """
+        Commits the objects imported so far, unless they reference objects not imported yet
+        """
+        if not self.batch_size:
+            return
+        self.flush(reopen=False)
+        savepoint = self.qgep_session.begin_nested()
+        try:
+            self.qgep_session.execute(text("SET CONSTRAINTS ALL IMMEDIATE;"))
+        except SQLAlchemyError:
+            savepoint.rollback()
+            logger.debug("Deferred constraints not satisfied yet, commit postponed")
+        else:
+            savepoint.commit()
+            self.qgep_session.commit()
+            self._pending = {}
+            logger.info("qgep_session committed")
+            if self.checkpoints:
+                self.checkpoints.commit_pending()
+            self.qgep_session.execute(text("SET CONSTRAINTS ALL DEFERRED;"))
+        self._savepoint = self.qgep_session.begin_nested()
+
+    def finish(self):
+        """
+        Flushes the last batch and drops the objects referencing skipped ones, leaving the final commit
+        to the import
+        """
+        if not self.batch_size:
+            return
+        self.flush(reopen=False)
+        while True:
+            savepoint = self.qgep_session.begin_nested()
+            try:
+                self.qgep_session.execute(text("SET CONSTRAINTS ALL IMMEDIATE;"))
+            except SQLAlchemyError as e:
+                savepoint.rollback()
+                dropped = False
+                if getattr(e.orig, "pgcode", None) == errorcodes.FOREIGN_KEY_VIOLATION:
+                    diag = e.orig.diag
+                    dropped = self._drop_referencing(
+                        diag.schema_name, diag.table_name, diag.constraint_name
+                    )
+                if not dropped:
+                    # not caused by objects of this import, left to the final commit to report
+                    logger.warning(f"Deferred constraints not satisfied ({e.orig})")
+                    return
+            else:
+                savepoint.commit()
+                self.qgep_session.execute(text("SET CONSTRAINTS ALL DEFERRED;"))
+                return
+
+    def _drop_referencing(self, schema, table_name, constraint):
+        """
+        Drops the objects of this import violating the foreign key constraint, returns whether any was found.
+        Rows not written by this import are never touched : they are left for the final commit to report
+        """
+        preparer = self.qgep_session.bind.dialect.identifier_preparer
+        table = f"{preparer.quote(schema)}.{preparer.quote(table_name)}"
+        columns, referenced_table, referenced_columns = self.qgep_session.execute(
+            text(
+                """
+                SELECT
+                  ARRAY(SELECT attname FROM unnest(conkey) WITH ORDINALITY AS k(attnum, n)
+                        JOIN pg_attribute ON attrelid = conrelid AND attnum = k.attnum ORDER BY n),
+                  confrelid::regclass::text,
+                  ARRAY(SELECT attname FROM unnest(confkey) WITH ORDINALITY AS k(attnum, n)
+                        JOIN pg_attribute ON attrelid = confrelid AND attnum = k.attnum ORDER BY n)
+                FROM pg_constraint
+                WHERE conrelid = CAST(:table AS regclass) AND conname = :constraint;
+                """
+            ),
+            {"table": table, "constraint": constraint},
+        ).fetchone()
+        not_null = " AND ".join(f"t.{preparer.quote(column)} IS NOT NULL" for column in columns)
+        join = " AND ".join(
+            f"r.{preparer.quote(referenced)} = t.{preparer.quote(column)}"
+            for column, referenced in zip(columns, referenced_columns)
+        )
+        rows = self.qgep_session.execute(
+            text(
+                f"""
+                SELECT DISTINCT to_jsonb(t) ->> 'obj_id' AS obj_id FROM {table} t
+                WHERE {not_null} AND NOT EXISTS (SELECT 1 FROM {referenced_table} r WHERE {join})
+                AND to_jsonb(t) ->> 'obj_id' = ANY(:obj_ids);
+                """
+            ),
+            # only the objects flushed since the last commit, existing rows are never dropped
+            {"obj_ids": list(self._pending)},
+        ).fetchall()
+        message = f"references an object that was not imported ({constraint})"
+        for row in rows:
+            instance, previous = self._pending.pop(row.obj_id)
+            mapper = inspect(instance).mapper
+            # subclass tables first, in case of references to the base table
+            for mapped_table in reversed(mapper.tables):
+                condition = mapped_table.c.obj_id == row.obj_id
+                if previous is None:
+                    self.qgep_session.execute(mapped_table.delete().where(condition))
+                    continue
+                values = {
+                    column.name: previous[mapper.get_property_by_column(column).key]
+                    for column in mapped_table.columns
+                    if mapper.get_property_by_column(column).key in previous
+                }
+                self.qgep_session.execute(mapped_table.update().where(condition).values(values))
+            if previous is None:
+                self.qgep_session.expunge(instance)
+            else:
+                self.qgep_session.expire(instance)
+            self.failures.append((instance, message))
+        return bool(rows)
+
+    def log_failures(self):
+        """
+        Logs the objects that were skipped because they could not be flushed
+        """
+        for instance, error in self.failures:
+            message = getattr(error, "orig", None) or error
+            logger.error(
+                f"{instance.__class__.__name__} {getattr(instance, 'obj_id', None)} skipped: {message}"
+            )
+        if self.failures:
+            logger.warning(f"{len(self.failures)} objects skipped, see errors above")
+
+
+class BulkLoadIndexes:
+    """
+    Context manager of the optional bulk-load mode of the imports : the secondary indexes of the target
+    schema (not backing a primary key, unique or exclusion constraint) are dropped before the import, and
+    rebuilt in parallel followed by ANALYZE on exit, whether the import succeeded or not. With classes, only
+    the indexes of their tables (including the base tables of subclasses) are dropped.
+
+    The definitions of the dropped indexes are saved in a table beforehand, so that if the process dies
+    before rebuilding them, the next bulk load restores them first.
+
+    It must be entered before the import session accesses the tables, and exited after it is closed.
+    """
+
+    TABLE_NAME = "qgep_sys.qgepqwat2ili_dropped_index"
+
+    def __init__(self, schema="qgep_od", enabled=True, workers=None, classes=None):
+        self.schema = schema
+        self.enabled = enabled
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.tables = None
+        if classes is not None:
+            self.tables = sorted(
+                {table.fullname for cls in classes for table in inspect(cls).mapper.tables}
+            )
+        self.connection = None
+
+    def __enter__(self):
+        if self.enabled:
+            try:
+                self.drop()
+            except BaseException:
+                # __exit__ isn't called if __enter__ fails
+                if self.connection is not None:
+                    self.rebuild()
+                raise
+        return self
+
+    def __exit__(self, et, ev, tb):
+        if self.enabled:
+            if et is not None:
+                # the sessions of the failed import would hold the locks the rebuild waits for
+                close_all_sessions()
+            self.rebuild()
+        # implicit return of None => don't swallow exceptions
+
+    def drop(self):
+        self.connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+        self.connection.set_session(autocommit=True)
+        cursor = self.connection.cursor()
+        # only one bulk load at a time, as they would restore each other's indexes
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s));", (self.TABLE_NAME,))
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE_NAME} (indexname text PRIMARY KEY, tablename text, definition text);"
+        )
+
+        cursor.execute(f"SELECT count(*) FROM {self.TABLE_NAME};")
+        if cursor.fetchone()[0]:
+            logger.warning("Restoring the indexes dropped by an interrupted bulk load first")
+            self.rebuild(unlock=False)
+
+        cursor.execute(
+            """
+            SELECT i.indexrelid::regclass::text, i.indrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s
+              AND NOT i.indisprimary
+              AND NOT i.indisunique
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid)
+              AND (%s IS NULL OR i.indrelid = ANY(CAST(%s AS regclass[])));
+            """,
+            (self.schema, self.tables, self.tables),
+        )
+        indexes = cursor.fetchall()
+        logger.info(
+            f"Dropping {len(indexes)} secondary indexes of {len({index[1] for index in indexes})} {self.schema} tables for the bulk load"
+        )
+        for indexname, tablename, definition in indexes:
+            # the definition is saved in the same transaction as the drop
+            cursor.execute("BEGIN;")
+            try:
+                cursor.execute(
+                    f"INSERT INTO {self.TABLE_NAME} (indexname, tablename, definition) VALUES (%s, %s, %s);",
+                    (indexname, tablename, definition),
+                )
+                cursor.execute(f"DROP INDEX {indexname};")
+            except BaseException:
+                cursor.execute("ROLLBACK;")
+                raise
+            cursor.execute("COMMIT;")
+
+    def rebuild(self, unlock=True):
+        """
+        Recreates the dropped indexes in parallel, then analyzes their tables
+        """
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT indexname, tablename, definition FROM {self.TABLE_NAME};")
+        indexes = cursor.fetchall()
+        logger.info(f"Rebuilding {len(indexes)} secondary indexes with {self.workers} workers")
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            results = executor.map(lambda index: self._rebuild_index(*index), indexes)
+            failed = [index[0] for index, ok in zip(indexes, results) if not ok]
+        if failed:
+            logger.error(
+                f"Indexes {', '.join(failed)} could not be rebuilt, they will be restored by the next bulk load"
+            )
+        for tablename in sorted({index[1] for index in indexes}):
+            cursor.execute(f"ANALYZE {tablename};")
+        if unlock:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", (self.TABLE_NAME,))
+            self.connection.close()
+            self.connection = None
+
+    def _rebuild_index(self, indexname, tablename, definition):
+        connection = psycopg2.connect(get_pgconf_as_psycopg2_dsn())
+        try:
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT to_regclass(%s);", (indexname,))
+                if cursor.fetchone()[0] is None:
+                    cursor.execute(definition)
+                cursor.execute(
+                    f"DELETE FROM {self.TABLE_NAME} WHERE indexname = %s;", (indexname,)
+                )
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Rebuilding {indexname} on {tablename} failed: {e}")
+            return False
+        finally:
+            connection.close()
+
+
+class UpsertImport:
+    """
+    Set-based import from the staging schema into qgep_od. Each mapping is compiled into one
+    INSERT ... SELECT ... ON CONFLICT (obj_id) DO UPDATE statement per target table, value lists,
+    references and organisations are resolved through joins in the same statement.
+
+    Mappings are (target class, staging class, columns) with columns mapping target column names to
+    staging attribute names, VlValue, RefValue or Geom3DValue.
+
+    The staging schema is translated with schema_translate_map, or with the map of the current jobs if not given.
+    """
+
+    def __init__(self, connection, qgep_model, abwasser_model, schema_translate_map=None):
+        staging_conf = get_pgconf("staging")
+        main_conf = get_pgconf()
+        if any(staging_conf[key] != main_conf[key] for key in ("host", "port", "dbname")):
+            raise CmdException(
+                "The set-based import needs the staging schema in the main database (no separate staging service)"
+            )
+        # the staging tables are in the job schema (see utils.ili2db.JobSchema)
+        if schema_translate_map is None:
+            schema_translate_map = get_schema_translate_map()
+        self.connection = connection.execution_options(schema_translate_map=schema_translate_map)
+        self.QGEP = qgep_model
+        self.ABWASSER = abwasser_model
+
+    def _unique(self, table, key_column, value_column):
+        """
+        Subquery with one value per key, so joins on it never duplicate the imported rows
+        """
+        key = table.c[key_column]
+        value = table.c[value_column]
+        return select([key, value]).distinct(key).order_by(key, value).alias()
+
+    def _source_select(self, source_cls, values, metaattributes):
+        """
+        Returns the joined staging selectable and the expression of every target column
+        """
+        source = source_cls.__mapper__
+        meta = self.ABWASSER.metaattribute.__table__
+        from_ = source.persist_selectable.join(
+            meta, meta.c.sia405_baseclass_metaattribute == source.primary_key[0]
+        )
+        expressions = {"obj_id": source.columns["obj_id"]}
+
+        if metaattributes:
+            organisation = self.QGEP.organisation.__table__
+            for name, meta_column in (
+                ("fk_dataowner", meta.c.datenherr),
+                ("fk_provider", meta.c.datenlieferant),
+            ):
+                organisations = self._unique(organisation, "identifier", "obj_id")
+                from_ = from_.outerjoin(organisations, organisations.c.identifier == meta_column)
+                expressions[name] = organisations.c.obj_id
+            expressions["last_modification"] = meta.c.letzte_aenderung
+
+        for name, value in values.items():
+            if isinstance(value, VlValue):
+                vl_codes = self._unique(value.vl_cls.__table__, "value_de", "code")
+                from_ = from_.outerjoin(
+                    vl_codes, vl_codes.c.value_de == source.columns[value.attribute]
+                )
+                expressions[name] = vl_codes.c.code
+            elif isinstance(value, RefValue):
+                referenced = self.ABWASSER.sia405_baseclass.__table__.alias()
+                from_ = from_.outerjoin(
+                    referenced, referenced.c.t_id == source.columns[value.attribute]
+                )
+                expressions[name] = referenced.c.obj_id
+            elif isinstance(value, Geom3DValue):
+                expressions[name] = ST_Force3D(source.columns[value.attribute])
+            else:
+                expressions[name] = source.columns[value]
+        return from_, expressions
+
+    def _tables(self, target_cls, expressions):
+        """
+        Returns the tables of target_cls, base table first and subclass tables after
+        """
+        tables = [m.local_table for m in reversed(list(target_cls.__mapper__.iterate_to_root()))]
+        unknown = set(expressions) - {c.name for table in tables for c in table.columns}
+        if unknown:
+            raise ValueError(f"{target_cls.__name__} has no columns {sorted(unknown)}")
+        return tables
+
+    def upsert(self, target_cls, source_cls, values, metaattributes=True, obj_ids=None):
+        """
+        Inserts or updates (by obj_id) target_cls from all source_cls rows of the staging schema, or from
+        the rows whose obj_id is selected by obj_ids if given. Existing rows are only updated if a value changed.
+        """
+        from_, expressions = self._source_select(source_cls, values, metaattributes)
+        tables = self._tables(target_cls, expressions)
+
+        count = 0
+        for table in tables:
+            names = [name for name in expressions if name in table.c]
+            # one row per obj_id, the last imported one if several files (datasets) contain it, as
+            # ON CONFLICT can't update a row twice
+            source_select = (
+                select([expressions[name].label(name) for name in names])
+                .select_from(from_)
+                .distinct(expressions["obj_id"])
+                .order_by(expressions["obj_id"], source_cls.__mapper__.primary_key[0].desc())
+            )
+            if obj_ids is not None:
+                source_select = source_select.where(expressions["obj_id"].in_(obj_ids))
+            statement = insert(table).from_select(names, source_select)
+            updated = {name: statement.excluded[name] for name in names if name != "obj_id"}
+            if updated:
+                # unchanged rows are not rewritten, so that re-imports don't fire the triggers
+                statement = statement.on_conflict_do_update(
+                    index_elements=[table.c.obj_id],
+                    set_=updated,
+                    where=or_(
+                        *[table.c[name].is_distinct_from(value) for name, value in updated.items()]
+                    ),
+                )
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=[table.c.obj_id])
+            # an object may only have changed in some of its tables
+            count = max(count, self.connection.execute(statement).rowcount)
+        logger.info(f"{count} {target_cls.__name__} inserted or updated")
+        return count
+
+    def insert_missing_organisations(self):
+        """
+        Creates the organisations that are referenced by name in the metaattributes but do not exist
+        """
+        meta = self.ABWASSER.metaattribute.__table__
+        organisation = self.QGEP.organisation.__table__
+        names = select([meta.c.datenherr.label("identifier")]).union(
+            select([meta.c.datenlieferant.label("identifier")])
+        )
+        names = names.alias()
+        statement = insert(organisation).from_select(
+            ["identifier"],
+            select([names.c.identifier]).where(
+                and_(
+                    names.c.identifier.isnot(None),
+                    names.c.identifier != "",
+                    ~exists().where(organisation.c.identifier == names.c.identifier),
+                )
+            ),
+        )
+        count = self.connection.execute(statement).rowcount
+        if count:
+            logger.info(f"{count} new organisations created")
+
+    def link(self, target_cls, source_cls, values, obj_ids=None):
+        """
+        Inserts the association rows (e.g. re_maintenance_event_wastewater_structure) of the source_cls
+        rows (whose obj_id is selected by obj_ids if given) that are complete and not existing yet
+        """
+        from_, expressions = self._source_select(source_cls, values, metaattributes=False)
+        source_obj_id = expressions.pop("obj_id")
+        table = target_cls.__table__
+        names = list(expressions)
+        source_select = (
+            select([expressions[name].label(name) for name in names])
+            .distinct()
+            .select_from(from_)
+            .where(and_(*[expressions[name].isnot(None) for name in names]))
+            .where(~exists().where(and_(*[table.c[name] == expressions[name] for name in names])))
+        )
+        if obj_ids is not None:
+            source_select = source_select.where(source_obj_id.in_(obj_ids))
+        statement = insert(table).from_select(names, source_select)
+        count = self.connection.execute(statement).rowcount
+        logger.info(f"{count} {target_cls.__name__} inserted")
+
+
+class StagingDiff:
+    """
+    Differences between the staging schema and qgep_od for the set-based import (see UpsertImport), computed
+    in the database : a temporary table holds the status (new, modified or unchanged) and validity of every
+    imported object and whether it is accepted. The diff is reviewed page by page, then only the accepted new
+    and modified objects are imported, so that reviewing a large file doesn't need its objects in a session.
+
+    The temporary table lives as long as the connection, which is closed by apply or discard. The staging
+    schema must be kept until then, apply reads it through the job schemas current when compute was called.
+
+    Mappings are (target class, staging class, columns, metaattributes) as for UpsertImport.upsert, and
+    import_function(upsert_import, diff) imports the accepted objects (see accepted_obj_ids).
+    """
+
+    # same states and validities as the import wizard (see gui.editors.base.Editor)
+    NEW = "NEW"
+    MODIFIED = "MODIFIED"
+    UNCHANGED = "UNCHANGED"
+    INVALID = "INVALID"
+    WARNING = "WARNING"
+    VALID = "VALID"
+
+    PAGE_SIZE = 200
+
+    def __init__(self, connection, qgep_model, abwasser_model, mapping, import_function):
+        self.connection = connection
+        self.QGEP = qgep_model
+        self.ABWASSER = abwasser_model
+        self.mapping = mapping
+        self.import_function = import_function
+        self.schema_translate_map = None
+        self.table = Table(
+            "qgepqwat2ili_diff",
+            MetaData(),
+            Column("class_name", Text),
+            Column("obj_id", Text),
+            Column("identifier", Text),
+            Column("status", Text),
+            Column("validity", Text),
+            Column("message", Text),
+            Column("accepted", Boolean),
+            prefixes=["TEMPORARY"],
+        )
+
+    def compute(self):
+        """
+        Fills the diff table from the staging schema, the objects that are not invalid are accepted
+        """
+        # the jobs may have changed by the time the diff is applied
+        self.schema_translate_map = get_schema_translate_map()
+        with self.connection.begin():
+            # the connection of UpsertImport (a copy translating the staging schema) must be created in the transaction
+            upsert_import = UpsertImport(
+                self.connection, self.QGEP, self.ABWASSER, self.schema_translate_map
+            )
+            self.table.create(self.connection)
+            for target_cls, source_cls, values, metaattributes in self.mapping:
+                self._insert_class(upsert_import, target_cls, source_cls, values, metaattributes)
+            upsert_import.connection.execute(text(f"ANALYZE {self.table.name};"))
+
+    def _insert_class(self, upsert_import, target_cls, source_cls, values, metaattributes):
+        from_, expressions = upsert_import._source_select(source_cls, values, metaattributes)
+        tables = upsert_import._tables(target_cls, expressions)
+
+        # the existing object, to compare every imported column
+        changed = []
+        for table in tables:
+            existing = table.alias()
+            from_ = from_.outerjoin(existing, existing.c.obj_id == expressions["obj_id"])
+            if table is tables[0]:
+                existing_obj_id = existing.c.obj_id
+            changed.extend(
+                expressions[name].is_distinct_from(existing.c[name])
+                for name in expressions
+                if name in table.c and name != "obj_id"
+            )
+        status = case(
+            [(existing_obj_id.is_(None), self.NEW), (or_(false(), *changed), self.MODIFIED)],
+            else_=self.UNCHANGED,
+        )
+
+        # invalid if a mandatory column is missing, warning if a value list entry is not found
+        invalid = [
+            (expressions[column.name].is_(None), f"missing {column.name}")
+            for table in tables
+            for column in table.columns
+            if column.name in expressions and column.name != "obj_id" and not column.nullable
+        ]
+        source = source_cls.__mapper__
+        warning = [
+            (
+                and_(source.columns[value.attribute].isnot(None), expressions[name].is_(None)),
+                f"no {name} value list entry for {value.attribute}",
+            )
+            for name, value in values.items()
+            if isinstance(value, VlValue)
+        ]
+        validity = case(
+            [
+                (or_(false(), *[condition for condition, _ in invalid]), self.INVALID),
+                (or_(false(), *[condition for condition, _ in warning]), self.WARNING),
+            ],
+            else_=self.VALID,
+        )
+        messages = [case([(condition, message)]) for condition, message in invalid + warning]
+        message = func.concat_ws("; ", *messages) if messages else literal("")
+
+        statement = self.table.insert().from_select(
+            ["class_name", "obj_id", "identifier", "status", "validity", "message", "accepted"],
+            select(
+                [
+                    literal(target_cls.__name__),
+                    expressions["obj_id"],
+                    expressions.get("identifier", null()),
+                    status,
+                    validity,
+                    message,
+                    validity != self.INVALID,
+                ]
+            ).select_from(from_),
+        )
+        upsert_import.connection.execute(statement)
+
+    def counts(self):
+        """
+        Returns (class_name, count, new, modified, invalid, accepted) for each class of the diff
+        """
+        table = self.table
+        return self.connection.execute(
+            select(
+                [
+                    table.c.class_name,
+                    func.count(),
+                    func.count().filter(table.c.status == self.NEW),
+                    func.count().filter(table.c.status == self.MODIFIED),
+                    func.count().filter(table.c.validity == self.INVALID),
+                    func.count().filter(table.c.accepted),
+                ]
+            )
+            .group_by(table.c.class_name)
+            .order_by(table.c.class_name)
+        ).fetchall()
+
+    def page(self, class_name, offset=0, limit=PAGE_SIZE):
+        """
+        Returns the rows of the diff of class_name, by obj_id
+        """
+        table = self.table
+        return self.connection.execute(
+            select([table])
+            .where(table.c.class_name == class_name)
+            .order_by(table.c.obj_id)
+            .offset(offset)
+            .limit(limit)
+        ).fetchall()
+
+    def set_accepted(self, class_name, accepted, obj_ids=None):
+        """
+        Accepts or rejects the objects of class_name with the given obj_ids, or all of them
+        """
+        table = self.table
+        statement = table.update().where(table.c.class_name == class_name)
+        if obj_ids is not None:
+            statement = statement.where(table.c.obj_id.in_(list(obj_ids)))
+        self.connection.execute(statement.values(accepted=accepted))
+
+    def accepted_obj_ids(self, target_cls, changed_only=True):
+        """
+        Returns a select of the accepted obj_ids of target_cls (only the new and modified ones if changed_only)
+        """
+        table = self.table
+        statement = select([table.c.obj_id]).where(
+            and_(table.c.class_name == target_cls.__name__, table.c.accepted)
+        )
+        if changed_only:
+            statement = statement.where(table.c.status != self.UNCHANGED)
+        return statement
+
+    def apply(self):
+        """
+        Imports the accepted new and modified objects in one transaction, closes the connection and returns
+        the imported obj_ids
+        """
+        table = self.table
+        obj_ids = [
+            obj_id
+            for obj_id, in self.connection.execute(
+                select([table.c.obj_id]).where(
+                    and_(table.c.accepted, table.c.status != self.UNCHANGED)
+                )
+            )
+        ]
+        try:
+            with self.connection.begin():
+                # Allow to insert rows with cyclic dependencies at once (UpsertImport is created in the transaction)
+                self.connection.execute(text("SET CONSTRAINTS ALL DEFERRED;"))
+                upsert_import = UpsertImport(
+                    self.connection, self.QGEP, self.ABWASSER, self.schema_translate_map
+                )
+                self.import_function(upsert_import, self)
+        finally:
+            self.discard()
+        return obj_ids
+
+    def discard(self):
+        """
+        Closes the connection, dropping the diff table
+        """
+        if not self.connection.closed:
+            self.connection.close()
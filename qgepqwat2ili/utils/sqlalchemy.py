@@ -1,4 +1,6 @@
+import collections
 import logging
+import threading
 
 import sqlalchemy
 from sqlalchemy import inspect
@@ -7,8 +9,42 @@ from sqlalchemy.orm import ColumnProperty
 
 from .various import get_pgconf
 
+# The job-scoped schemas of the running imports/exports (see utils.ili2db.JobSchema), by ili2pg schema
+# the models are reflected from. Each job only removes its own schema, so that jobs on the same model
+# (e.g. a GUI import kept open for review while another one runs) don't clobber each other, and the
+# latest job is translated to.
+_JOB_SCHEMAS = collections.defaultdict(list)
+_JOB_SCHEMAS_LOCK = threading.Lock()
 
-def create_engine(logger_name=None):
+
+def register_job_schema(schema, job_schema):
+    with _JOB_SCHEMAS_LOCK:
+        _JOB_SCHEMAS[schema].append(job_schema)
+
+
+def unregister_job_schema(schema, job_schema):
+    with _JOB_SCHEMAS_LOCK:
+        if job_schema in _JOB_SCHEMAS[schema]:
+            _JOB_SCHEMAS[schema].remove(job_schema)
+
+
+def get_schema_translate_map():
+    """
+    Returns a copy of the current mapping of the ili2pg schemas to the job-scoped schemas
+    """
+    with _JOB_SCHEMAS_LOCK:
+        return {
+            schema: job_schemas[-1] for schema, job_schemas in _JOB_SCHEMAS.items() if job_schemas
+        }
+
+
+def create_engine(logger_name=None, target=None, schema_translate_map=None):
+    """
+    Creates an engine for the main database, or for the "source"/"staging" target (see utils.various.get_pgconf)
+
+    The staging engines translate the ili2pg schemas to the job schemas of schema_translate_map, or of the
+    current jobs if not given.
+    """
     logging_args = {}
     if logger_name:
         handler = logging.FileHandler(f"qgep_export.{logger_name}.log", mode="w")
@@ -16,12 +52,18 @@ def create_engine(logger_name=None):
         logging.getLogger(f"sqlalchemy.engine.base.Engine.{logger_name}").addHandler(handler)
         logging_args = {"logging_name": logger_name, "echo": True}
 
-    pgconf = get_pgconf()
+    pgconf = get_pgconf(target)
 
-    return sqlalchemy.create_engine(
+    engine = sqlalchemy.create_engine(
         f"postgresql://{pgconf['user']}:{pgconf['password']}@{pgconf['host']}:{pgconf['port']}/{pgconf['dbname']}",
         **logging_args,
     )
+    if target == "staging":
+        if schema_translate_map is None:
+            schema_translate_map = get_schema_translate_map()
+        if schema_translate_map:
+            engine = engine.execution_options(schema_translate_map=schema_translate_map)
+    return engine
 
 
 def custom_name_for_collection_relationship(base, local_cls, referred_cls, constraint):
@@ -48,7 +90,11 @@ def custom_generate_relationship(
 
     # accept circular-dependencies (e.g. organisation.dataowner can be itself)
     # see https://docs.sqlalchemy.org/en/20/orm/relationship_persistence.html#rows-that-point-to-themselves-mutually-dependent-rows)
-    if attrname in ["fk_dataowner__REL", "fk_provider__REL"]:
+    # This costs an additional UPDATE per row, so it's only used on organisations themselves : other classes just
+    # reference organisations, which are inserted first (constraints are deferred during imports anyway).
+    if attrname in ["fk_dataowner__REL", "fk_provider__REL"] and issubclass(
+        local_cls, referred_cls
+    ):
         kw["post_update"] = True
 
     return generate_relationship(
@@ -56,7 +102,7 @@ def custom_generate_relationship(
     )
 
 
-def prepare_automap_base(base, schema):
+def prepare_automap_base(base, schema, target=None):
     """
     Prepares the automap base by reflecting all the fields with some specific configuration for relationship and population Base.classes with manually defined classes (which for some reason isn't done by default)
     """
@@ -69,8 +115,10 @@ def prepare_automap_base(base, schema):
     #         reflect = False
     #         base.metadata = pickle.load(f)
 
+    # reflection doesn't honor the schema_translate_map, the models are always reflected
+    # from the (empty) template schema
     base.prepare(
-        create_engine(),
+        create_engine(target=target),
         reflect=True,
         schema=schema,
         name_for_collection_relationship=custom_name_for_collection_relationship,
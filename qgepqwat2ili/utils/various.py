@@ -1,6 +1,8 @@
 import collections
+import concurrent.futures
 import configparser
 import datetime
+import hashlib
 import logging
 import os
 import subprocess
@@ -211,11 +213,21 @@ def read_pgservice(service_name):
     return config[service_name]
 
 
-def get_pgconf():
+def get_pgconf(target=None):
     """
     Returns the postgres configuration (parsed from the config.PGSERVICE service and overriden by config.PG* settings)
+
+    target can be "source" (database read from on export) or "staging" (database where ili2pg runs), which
+    use config.SOURCE_PGSERVICE or config.STAGING_PGSERVICE if set, and fall back to the main configuration otherwise.
     """
 
+    target_service = {
+        "source": config.SOURCE_PGSERVICE,
+        "staging": config.STAGING_PGSERVICE,
+    }.get(target)
+    if target_service:
+        return collections.defaultdict(str, read_pgservice(target_service))
+
     if config.PGSERVICE:
         pgconf = read_pgservice(config.PGSERVICE)
     else:
@@ -235,10 +247,10 @@ def get_pgconf():
     return collections.defaultdict(str, pgconf)
 
 
-def get_pgconf_as_psycopg2_dsn() -> List[str]:
+def get_pgconf_as_psycopg2_dsn(target=None) -> List[str]:
     """Returns the pgconf as a psycopg2 connection string"""
 
-    pgconf = get_pgconf()
+    pgconf = get_pgconf(target)
     parts = []
     if pgconf["host"]:
         parts.append(f"host={pgconf['host']}")
@@ -253,9 +265,9 @@ def get_pgconf_as_psycopg2_dsn() -> List[str]:
     return " ".join(parts)
 
 
-def get_pgconf_as_ili_args() -> List[str]:
+def get_pgconf_as_ili_args(target=None) -> List[str]:
     """Returns the pgconf as a list of ili2db arguments"""
-    pgconf = get_pgconf()
+    pgconf = get_pgconf(target)
     args = []
     if pgconf["host"]:
         args.extend(["--dbhost", '"' + pgconf["host"] + '"'])
@@ -270,6 +282,33 @@ def get_pgconf_as_ili_args() -> List[str]:
     return args
 
 
+def get_file_hash(path):
+    """Returns the sha256 hex digest of a file, read in blocks"""
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def list_xtf_files(paths):
+    """Returns the given files, with the directories replaced by the .xtf files they contain (sorted by name)"""
+    xtf_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            xtf_files.extend(
+                sorted(
+                    os.path.join(path, name)
+                    for name in os.listdir(path)
+                    if name.lower().endswith(".xtf") and os.path.isfile(os.path.join(path, name))
+                )
+            )
+        else:
+            xtf_files.append(path)
+    # a file given twice is imported once
+    return list(dict.fromkeys(xtf_files))
+
+
 def make_log_path(next_to_path, step_name):
     """Returns a path for logging purposes. If next_to_path is None, it will be saved in the temp directory"""
     now = f"{datetime.datetime.now():%y%m%d%H%M%S}"
@@ -294,3 +333,46 @@ class LoggingHandlerContext:
         logger.removeHandler(self.handler)
         self.handler.close()
         # implicit return of None => don't swallow exceptions
+
+
+def run_dependency_graph(tasks, run, workers, label="Step"):
+    """
+    Calls run(task) for the tasks (having a name and the names of the tasks they depend on as depends_on) in
+    parallel threads, each task starting when the tasks it depends on are done. Logs the duration of each
+    task. The dependents of a failing task are skipped, and the first error is raised once the other tasks
+    are finished.
+    """
+    pending = {task.name: task for task in tasks}
+    done = set()
+    errors = []
+
+    def timed_run(task):
+        start = time.perf_counter()
+        run(task)
+        logger.info(f"{label} {task.name} done in {time.perf_counter() - start:.1f}s")
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        running = {}
+        while pending or running:
+            if not errors:
+                for task in list(pending.values()):
+                    if set(task.depends_on) <= done:
+                        logger.info(f"{label} {task.name} started")
+                        running[executor.submit(timed_run, task)] = pending.pop(task.name)
+            if not running:
+                break
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                task = running.pop(future)
+                if future.exception() is not None:
+                    logger.error(f"{label} {task.name} failed: {future.exception()}")
+                    errors.append(future.exception())
+                else:
+                    done.add(task.name)
+
+    if pending:
+        logger.warning(f"{label}s {', '.join(pending)} skipped")
+    if errors:
+        raise errors[0]